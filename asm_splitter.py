@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Split Borland C++ assembly output (BCC -S) into per-function samples.
+
+The .ASM file is read once, line by line, as bytes. Every `name proc ...
+name endp` block becomes one record with the instructions of the function,
+the C source quoted in the `;` comments, and the source lines from the
+`?debug L` markers. The `?debug C` records are decoded for the include list
+(E9: source file with DOS time stamp) and the current file (E8: file
+switch, for inline functions from headers).
+
+A corpus is split on a pool of worker processes, one .ASM file per task,
+and the records are written as JSON lines:
+
+    python3 asm_splitter.py sources/ -j 8 --output functions.jsonl
+"""
+import os
+import sys
+import json
+import logging
+import argparse
+from pathlib import Path
+from multiprocessing import Pool
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+ENCODING = 'cp866'
+DEBUG = b'\t?debug\t'
+COMMENT = b'   ;'
+# ?debug C record types
+SOURCE_FILE_RECORD = 0xE9
+FILE_SWITCH_RECORD = 0xE8
+
+
+def _decode(value):
+    return value.decode(ENCODING, errors='replace')
+
+
+def decode_debug_record(data):
+    """Decode the file records of a ?debug C line; returns (kind, name) or None"""
+    if len(data) < 3:
+        return None
+    if data[0] == SOURCE_FILE_RECORD and len(data) >= 6:
+        # E9, DOS time stamp (4 bytes), name length, name
+        return 'source', _decode(data[6:6 + data[5]])
+    if data[0] == FILE_SWITCH_RECORD:
+        # E8, file index, name length, name, DOS time stamp
+        return 'switch', _decode(data[3:3 + data[2]])
+    return None
+
+
+def iter_functions(lines):
+    """
+    Yield a record for every function in the lines of a BCC -S .ASM file.
+
+    lines is an iterable of bytes, with or without line endings. A record
+    holds name, file, segment, distance, instructions, the source line of
+    each instruction, the quoted C source, the first and last source lines
+    and the include list of the module, a tuple shared between records.
+    """
+    includes = ()
+    current_file = None
+    segment = None
+    function = None
+    hex_record = b''
+    # Source line and C comments seen since the last function ended; the
+    # first ?debug L of a function comes before its proc line
+    line_number = None
+    source = []
+
+    for line in lines:
+        line = line.rstrip(b'\r\n')
+        if line.startswith(DEBUG):
+            kind = line[8:9]
+            if kind == b'L':
+                line_number = int(line[10:])
+                if function is not None:
+                    function['first_line'] = function['first_line'] or line_number
+                    function['last_line'] = max(function['last_line'] or 0, line_number)
+            elif kind == b'C':
+                hex_record += line[10:].strip()
+                if hex_record.endswith(b'+'):
+                    hex_record = hex_record[:-1]
+                    continue
+                try:
+                    decoded = decode_debug_record(bytes.fromhex(hex_record.decode('ascii')))
+                except ValueError:
+                    decoded = None
+                hex_record = b''
+                if decoded is None:
+                    continue
+                kind, name = decoded
+                if kind == 'switch':
+                    current_file = name
+                elif name:
+                    if current_file is None:
+                        current_file = name
+                    elif name not in includes:
+                        # A new tuple, so records already made keep theirs
+                        includes += (name,)
+            continue
+
+        if line.startswith(COMMENT):
+            text = _decode(line[line.find(b'\t') + 1:]) if b'\t' in line else ''
+            if function is not None:
+                function['source'].append(text)
+            else:
+                source.append(text)
+            continue
+
+        if not line or line[0] in b'\t ':
+            if function is not None and line.strip():
+                function['instructions'].append(_decode(line.strip().replace(b'\t', b' ', 1).rstrip()))
+                function['instruction_lines'].append(line_number)
+            continue
+
+        # Labels and directives in the first column: name proc/endp/segment/ends
+        fields = line.split(None, 2)
+        directive = fields[1].lower() if len(fields) > 1 else b''
+        if directive == b'proc':
+            function = {
+                'name': _decode(fields[0]),
+                'file': current_file,
+                'segment': _decode(segment) if segment else None,
+                'distance': _decode(fields[2]).strip() if len(fields) > 2 else 'near',
+                'first_line': line_number,
+                'last_line': line_number,
+                'instructions': [],
+                'instruction_lines': [],
+                'source': source,
+                'includes': includes
+            }
+        elif directive == b'endp' and function is not None:
+            yield function
+            function = None
+            line_number = None
+            source = []
+        elif directive == b'segment':
+            segment = fields[0]
+        elif directive == b'ends':
+            segment = None
+        elif function is not None:
+            # A local label such as @1@86:
+            function['instructions'].append(_decode(line.strip()))
+            function['instruction_lines'].append(line_number)
+
+
+def split_asm(asm_path):
+    """Yield the function records of one .ASM file"""
+    with open(asm_path, 'rb') as f:
+        for function in iter_functions(f):
+            function['path'] = str(asm_path)
+            yield function
+
+
+def _split_file(asm_path):
+    """Worker: split one file, reporting errors instead of raising them"""
+    try:
+        return asm_path, list(split_asm(asm_path)), None
+    except (OSError, ValueError) as e:
+        return asm_path, [], str(e)
+
+
+def find_asm_files(paths):
+    """Expand directories to the .ASM files below them, in any case"""
+    for path in map(Path, paths):
+        if path.is_dir():
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    if name.lower().endswith('.asm'):
+                        yield os.path.join(root, name)
+        else:
+            yield str(path)
+
+
+def split_corpus(asm_paths, workers=None, chunksize=16):
+    """
+    Split many .ASM files on a pool of worker processes.
+
+    Yields (path, records, error) per file in completion order, so records
+    stream out while the rest of the corpus is still being split.
+    """
+    with Pool(processes=workers or os.cpu_count()) as pool:
+        yield from pool.imap_unordered(_split_file, asm_paths, chunksize)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Split BCC -S assembly output into per-function samples')
+    parser.add_argument('paths', nargs='+', help='.ASM files or directories to search for them')
+    parser.add_argument('--jobs', '-j', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--output', '-o', help='JSON lines file for the records (default: stdout)')
+    args = parser.parse_args()
+
+    output = open(args.output, 'w') if args.output else sys.stdout
+    files = functions = failed = 0
+    try:
+        for path, records, error in split_corpus(find_asm_files(args.paths), args.jobs):
+            files += 1
+            if error:
+                logging.error(f"{path}: {error}")
+                failed += 1
+                continue
+            for record in records:
+                output.write(json.dumps(record) + '\n')
+            functions += len(records)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    logging.info(f"Split {files} files into {functions} functions ({failed} failed)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Borland pipeline from .PRJ to listings in one DOSBox session per project.
+
+Python port of build_prj.sh and comp_bc.sh: a single session runs MAKE
+and, for every source, BCC -S, CPP and TASMX /la, with the errorlevel of
+each stage captured by errorlvl.com. Every call works in a scratch
+workspace of its own, so projects can run in parallel.
+
+The project's own .MAK and .CFG files are used when they exist. Missing
+ones are written by prj_reader.py from the project's options, instead of
+by PRJ2MAK at the start of the session as build_prj.sh does.
+
+The result has one record per source with its .I, .ASM, .LST and .OBJ
+files, the exit code of every stage and the diagnostics they printed.
+"""
+import os
+import sys
+import json
+import logging
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from dos_utility_caller import call_dos_utility_batch
+from dos_utility_caller.diagnostics import parse_diagnostics
+from prj_reader import convert_prj, parse_prj
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+ERRORLVL_COM = Path(__file__).parent.resolve() / 'errorlvl.com'
+# Stages run for every source, after MAKE has built the project
+SOURCE_STAGES = ('asm', 'preprocess', 'listing')
+# Output file of each kind, by extension
+OUTPUTS = {'i': '.I', 'asm': '.ASM', 'lst': '.LST', 'obj': '.OBJ'}
+
+
+def _find_output(directory, name):
+    """Find a file ignoring case, as DOS would; returns its path or None"""
+    for entry in os.scandir(directory):
+        if entry.name.lower() == name.lower() and entry.is_file():
+            return entry.path
+    return None
+
+
+def pipeline_commands(makefile, cfg, sources):
+    """List (stage, source, (command, arguments)) for one session"""
+    commands = [('make', None, ('MAKE', ['-f', makefile]))]
+    for source in sources:
+        stem = os.path.splitext(source)[0]
+        commands.append(('asm', source, ('BCC', ['-S', f'+{cfg}', source])))
+        commands.append(('preprocess', source, ('CPP', [f'+{cfg}', source])))
+        commands.append(('listing', source, ('TASMX', ['/la', f'{stem}.ASM'])))
+    return commands
+
+
+def _stage_record(result):
+    """Reduce a command result to what the pipeline reports for a stage"""
+    return {
+        'exit_code': result['exit_code'],
+        'success': result['success'],
+        'skipped': result.get('skipped', False),
+        'diagnostics': parse_diagnostics(result['stdout'])
+    }
+
+
+def run_pipeline(prj_path, tools_dir=None, bin_dir='D:\\BIN', dosbox_config=None,
+                 errorlevel_program=ERRORLVL_COM):
+    """Run the pipeline for one .PRJ file and return its record"""
+    prj_path = Path(prj_path).resolve()
+    project_dir = prj_path.parent
+    project = parse_prj(prj_path)
+    if project['undecoded_options']:
+        logging.warning(f"{prj_path.name}: options not decoded, left at the compiler defaults (records "
+                        f"{', '.join(f'{key:#06x}' for key in project['undecoded_options'])})")
+    # Keeps the project's own files
+    makefile, cfg = convert_prj(prj_path)
+    sources = [name for name in project['files'] if os.path.splitext(name)[1].lower() in ('.c', '.cpp')]
+    logging.info(f"{prj_path.name}: {len(sources)} sources, one DOSBox session")
+
+    commands = pipeline_commands(makefile.name, cfg.name, sources)
+    results = call_dos_utility_batch(
+        [command for _, _, command in commands],
+        source_dir=str(project_dir),
+        tools_dir=tools_dir,
+        environment={'PATH': f'%PATH%;{bin_dir}'},
+        dosbox_config=dosbox_config,
+        errorlevel_program=str(errorlevel_program) if errorlevel_program else None
+    )
+
+    records = {source: {'source': source, 'stages': {}, 'outputs': {}, 'diagnostics': []} for source in sources}
+    project_stages = {}
+    for (stage, source, _), result in zip(commands, results):
+        stage_record = _stage_record(result)
+        if source is None:
+            project_stages[stage] = stage_record
+            continue
+        records[source]['stages'][stage] = stage_record
+        records[source]['diagnostics'].extend(stage_record['diagnostics'])
+
+    for source, record in records.items():
+        stem = os.path.splitext(source)[0]
+        for kind, extension in OUTPUTS.items():
+            record['outputs'][kind] = _find_output(project_dir, stem + extension)
+        record['success'] = all(stage['success'] for stage in record['stages'].values())
+
+    return {
+        'project': str(prj_path),
+        'makefile': str(makefile),
+        'cfg': str(cfg),
+        'make': project_stages.get('make'),
+        'sources': list(records.values()),
+        'success': 'make' in project_stages and all(stage['success'] for stage in project_stages.values())
+                   and all(r['success'] for r in records.values())
+    }
+
+
+def run_pipelines(prj_paths, jobs=None, **kwargs):
+    """Run the pipeline for several projects at once, one session each"""
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        return list(pool.map(lambda prj_path: run_pipeline(prj_path, **kwargs), prj_paths))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build Borland projects from .PRJ to listings in DOSBox')
+    parser.add_argument('projects', nargs='+', help='.PRJ files')
+    parser.add_argument('--tools-dir', help='Borland C++ installation to mount as D:')
+    parser.add_argument('--bin-dir', default='D:\\BIN', help='DOS directory of the compiler (default: D:\\BIN)')
+    parser.add_argument('--jobs', '-j', type=int, default=None, help='Projects built at once (default: CPU count)')
+    parser.add_argument('--json', help='File to write the records to as JSON')
+    args = parser.parse_args()
+
+    records = run_pipelines(args.projects, args.jobs, tools_dir=args.tools_dir, bin_dir=args.bin_dir)
+    for record in records:
+        logging.info(f"{record['project']}: {'ok' if record['success'] else 'failed'}")
+        for source in record['sources']:
+            stages = ', '.join(f"{stage} {result['exit_code']}" for stage, result in source['stages'].items())
+            logging.info(f"  {source['source']}: {stages}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(records, f, indent=2)
+    return 0 if all(record['success'] for record in records) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
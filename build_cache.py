@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Shared cache of complete BuildToolchain outputs.
+
+An entry holds the collected artifacts of one build (binaries, logs,
+sources, manifest, diagnostics) and is keyed by a hash of the project tree,
+the compiler type, the DOSBox configuration file and the content of the
+compiler installation, so a repeat corpus run or another machine sharing
+the cache directory restores the artifacts instead of emulating the build.
+
+Entries are written to a staging directory and renamed into place, so the
+cache can live on a shared volume with several builders. The cache is
+bounded by total size and number of entries; the least recently used
+entries are evicted first.
+
+    CACHE_DIR/ab/abcd.../entry.json   key inputs, size and time of the build
+    CACHE_DIR/ab/abcd.../artifacts/   the artifacts directory of the build
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from pathlib import Path
+
+from build_state import file_digest, link_or_copy
+
+DEFAULT_CACHE_DIR = Path.home() / '.cache' / 'nndecomp' / 'builds'
+# Artifacts that depend on the machine or on previous builds, not on the inputs
+SKIP_ARTIFACTS = {'build_state', 'build_corpus.log'}
+# Memo of install fingerprints by directory listing, shared by all builders
+FINGERPRINTS_FILE = '.fingerprints.json'
+
+
+def tree_digest(directory, skip=()):
+    """Hash a directory tree by lower-case relative paths and file contents"""
+    directory = Path(directory)
+    skip = {Path(path).resolve() for path in skip}
+    files = []
+    stack = [directory]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                path = Path(entry.path)
+                if entry.is_dir(follow_symlinks=False):
+                    if path.resolve() not in skip:
+                        stack.append(path)
+                elif entry.is_file(follow_symlinks=False):
+                    files.append((path.relative_to(directory).as_posix().lower(), path))
+    digest = hashlib.sha256()
+    for name, path in sorted(files):
+        digest.update(f"{name}\0{file_digest(path)}\n".encode())
+    return digest.hexdigest()
+
+
+class BuildCache:
+    """Size-bounded, least recently used cache of project builds"""
+
+    ENTRY_FILE = 'entry.json'
+    ARTIFACTS_DIR = 'artifacts'
+
+    def __init__(self, cache_dir=None, max_size=10 * 1024 ** 3, max_entries=None):
+        self.cache_dir = Path(cache_dir or DEFAULT_CACHE_DIR)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._install_fingerprints = {}
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    # Keys
+
+    def install_fingerprint(self, install_dir):
+        """Hash the content of a compiler installation.
+
+        Content rather than times, so machines with their own copy of the
+        same installation share entries. Hashing is skipped while the
+        listing (names, sizes, times) matches the one hashed last time."""
+        if not install_dir or not Path(install_dir).is_dir():
+            return ''
+        install_dir = str(Path(install_dir).resolve())
+        with self._lock:
+            if install_dir in self._install_fingerprints:
+                return self._install_fingerprints[install_dir]
+
+        listing = hashlib.sha256()
+        files = []
+        for root, dirs, names in os.walk(install_dir):
+            dirs.sort()
+            for name in sorted(names):
+                path = os.path.join(root, name)
+                st = os.stat(path)
+                relative = os.path.relpath(path, install_dir).lower()
+                listing.update(f"{relative}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+                files.append((relative, path))
+        listing = listing.hexdigest()
+
+        memo_path = self.cache_dir / FINGERPRINTS_FILE
+        try:
+            memo = json.loads(memo_path.read_text())
+        except (OSError, ValueError):
+            memo = {}
+        fingerprint = memo.get(f"{install_dir}|{listing}")
+        if fingerprint is None:
+            digest = hashlib.sha256()
+            for relative, path in files:
+                digest.update(f"{relative}\0{file_digest(path)}\n".encode())
+            fingerprint = digest.hexdigest()
+            memo[f"{install_dir}|{listing}"] = fingerprint
+            self._write_json(memo_path, memo)
+        with self._lock:
+            self._install_fingerprints[install_dir] = fingerprint
+        return fingerprint
+
+    def make_key(self, project_dir, compiler_type, dosbox_config, install_dir, skip=()):
+        """
+        Compute the cache key of a build.
+
+        project_dir is hashed by content, dosbox_config is the path of the
+        DOSBox configuration file, install_dir the compiler installation and
+        skip directories inside the project to leave out, such as the
+        artifacts directory. Returns (key, inputs).
+        """
+        inputs = {
+            'tree': tree_digest(project_dir, skip),
+            'compiler': compiler_type.lower(),
+            'dosbox_config': file_digest(dosbox_config) if dosbox_config and os.path.exists(dosbox_config) else '',
+            'install': self.install_fingerprint(install_dir)
+        }
+        key = hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+        return key, inputs
+
+    # Entries
+
+    def _entry_dir(self, key):
+        return self.cache_dir / key[:2] / key
+
+    @staticmethod
+    def _write_json(path, data):
+        """Write JSON atomically"""
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(temp_path, path)
+
+    def restore(self, key, artifacts_dir):
+        """Restore the artifacts of a cached build; returns False on a miss"""
+        entry = self._entry_dir(key)
+        entry_file = entry / self.ENTRY_FILE
+        if not entry_file.exists():
+            with self._lock:
+                self.misses += 1
+            return False
+
+        source = entry / self.ARTIFACTS_DIR
+        artifacts_dir = Path(artifacts_dir)
+        try:
+            for root, _, names in os.walk(source):
+                for name in names:
+                    path = Path(root) / name
+                    relative = path.relative_to(source)
+                    # Top-level files (build.log, manifest.json, ...) get rewritten in place
+                    link_or_copy(path, artifacts_dir / relative, hardlink=len(relative.parts) > 1)
+        except FileNotFoundError:
+            # Evicted by another builder while restoring
+            with self._lock:
+                self.misses += 1
+            return False
+
+        # Mark the entry as recently used
+        os.utime(entry_file)
+        with self._lock:
+            self.hits += 1
+        logging.info(f"Restored build {key[:12]} from {self.cache_dir}")
+        return True
+
+    def store(self, key, artifacts_dir, inputs=None):
+        """Store the artifacts of a successful build"""
+        artifacts_dir = Path(artifacts_dir)
+        entry = self._entry_dir(key)
+        if entry.exists():
+            return
+        # Build the entry next to its final place and rename it in, so
+        # readers never see a half written entry
+        staging = Path(tempfile.mkdtemp(dir=self.cache_dir, prefix='.tmp'))
+        try:
+            size = 0
+            for root, dirs, names in os.walk(artifacts_dir):
+                dirs[:] = [name for name in dirs if name not in SKIP_ARTIFACTS]
+                for name in names:
+                    path = Path(root) / name
+                    relative = path.relative_to(artifacts_dir)
+                    if relative.parts[0] in SKIP_ARTIFACTS:
+                        continue
+                    # Never hardlink into the cache: the next build of the
+                    # project rewrites its artifacts directory
+                    link_or_copy(path, staging / self.ARTIFACTS_DIR / relative, hardlink=False)
+                    size += path.stat().st_size
+            self._write_json(staging / self.ENTRY_FILE,
+                             {'inputs': inputs or {}, 'size': size, 'stored': time.time()})
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.rename(staging, entry)
+            except OSError:
+                # Another builder stored the same key first
+                return
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+        with self._lock:
+            self.stores += 1
+        logging.info(f"Cached build {key[:12]} ({size} bytes)")
+        self._evict()
+
+    def _entries(self):
+        """List (last use, size, path) of every entry"""
+        entries = []
+        for prefix in os.scandir(self.cache_dir):
+            if not prefix.is_dir() or prefix.name.startswith('.'):
+                continue
+            for entry in os.scandir(prefix.path):
+                entry_file = Path(entry.path) / self.ENTRY_FILE
+                try:
+                    used = entry_file.stat().st_mtime
+                    size = json.loads(entry_file.read_text())['size']
+                except (OSError, ValueError, KeyError):
+                    continue
+                entries.append((used, size, entry.path))
+        return entries
+
+    def _evict(self):
+        """Remove least recently used entries until the cache fits its caps"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        while entries and (total > self.max_size or
+                           (self.max_entries is not None and len(entries) > self.max_entries)):
+            _, size, path = entries.pop(0)
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            evicted += 1
+        if evicted:
+            logging.info(f"Evicted {evicted} cached builds")
+        with self._lock:
+            self.evictions += evicted
+
+    def clear(self):
+        """Remove every entry from the cache"""
+        for _, _, path in self._entries():
+            shutil.rmtree(path, ignore_errors=True)
+
+    def stats(self):
+        """Hits, misses, stores, evictions, number of entries and total size"""
+        entries = self._entries()
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'entries': len(entries),
+                'size': sum(size for _, size, _ in entries)
+            }
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Build a whole corpus of DOS projects in parallel with BuildToolchain.
+
+Each project is copied to a working copy of its own and built in a separate
+worker process running its own DOSBox, so builds never share files. Projects
+come from a root directory (every subdirectory is a project) or a manifest:
+
+    # project directory      compiler
+    bcex/crc16eas/Source     borland
+    sources/tc/calc          turbo
+
+or the same as JSON: [{"project": "bcex/crc16eas/Source", "compiler": "borland"}].
+Relative paths in a manifest are relative to the manifest.
+"""
+import os
+import sys
+import json
+import hashlib
+import time
+import shutil
+import tempfile
+import logging
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from build_toolchain import BuildToolchain
+from build_cache import BuildCache
+
+COMPILERS = ['borland', 'turbo', 'msc']
+
+
+def read_manifest(manifest_path):
+    """Read (project_dir, compiler) pairs from a text or JSON manifest"""
+    manifest_path = Path(manifest_path).resolve()
+    text = manifest_path.read_text()
+    if text.lstrip().startswith('['):
+        entries = [(entry['project'], entry['compiler']) for entry in json.loads(text)]
+    else:
+        entries = []
+        for number, line in enumerate(text.splitlines(), 1):
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            parts = line.rsplit(None, 1)
+            if len(parts) != 2:
+                raise ValueError(f"{manifest_path}:{number}: expected '<project dir> <compiler>'")
+            entries.append((parts[0], parts[1]))
+
+    jobs = []
+    for project, compiler in entries:
+        if compiler.lower() not in COMPILERS:
+            raise ValueError(f"Unsupported compiler type for {project}: {compiler}")
+        jobs.append((str((manifest_path.parent / project).resolve()), compiler.lower()))
+    return jobs
+
+
+def scan_root(root_dir, compiler):
+    """Treat every subdirectory of the root as a project built with one compiler"""
+    root_dir = Path(root_dir).resolve()
+    return [(str(path), compiler) for path in sorted(root_dir.iterdir()) if path.is_dir()]
+
+
+def _artifacts_name(project_dir):
+    """Name the artifacts directory after the project path, so equal basenames don't clash"""
+    path = Path(project_dir).resolve()
+    # The tail keeps the name readable, the hash of the full path keeps it unique
+    digest = hashlib.sha256(str(path).encode()).hexdigest()[:8]
+    parts = [part for part in path.parts[-3:] if part != path.anchor]
+    return '_'.join(parts + [digest])
+
+
+def build_project(project_dir, compiler, artifacts_root, fail_fast=True, cache_dir=None,
+                  cache_size=10 * 1024 ** 3):
+    """Build one project in a working copy of its own; runs in a worker process"""
+    project_dir = Path(project_dir)
+    name = _artifacts_name(project_dir)
+    artifacts_dir = Path(artifacts_root).resolve() / name
+    artifacts_dir.mkdir(parents=True, exist_ok=True)
+
+    # Send this build's log to its artifacts instead of interleaving with other workers
+    root_logger = logging.getLogger()
+    previous_handlers = root_logger.handlers[:]
+    handler = logging.FileHandler(artifacts_dir / 'build_corpus.log', mode='w')
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    root_logger.handlers = [handler]
+
+    summary = {
+        'project': str(project_dir),
+        'compiler': compiler,
+        'status': 'failed',
+        'duration': 0.0,
+        'errors': 0,
+        'warnings': 0,
+        'message': '',
+        'artifacts': str(artifacts_dir)
+    }
+    work_root = tempfile.mkdtemp(prefix='corpus')
+    start = time.monotonic()
+    try:
+        work_dir = Path(work_root) / project_dir.name
+        shutil.copytree(project_dir, work_dir)
+
+        cache = BuildCache(cache_dir, cache_size) if cache_dir else None
+        toolchain = BuildToolchain(work_dir, compiler, fail_fast=fail_fast, cache=cache)
+        toolchain.artifacts_dir = artifacts_dir
+        build_files = toolchain.scan_project()
+        if not build_files:
+            summary['status'] = 'skipped'
+            summary['message'] = 'No build files found'
+            return summary
+        try:
+            if toolchain.restore_cached():
+                summary['status'] = 'cached'
+                return summary
+            output = toolchain.execute_build(build_files)
+        finally:
+            summary['errors'] = sum(1 for d in toolchain.diagnostics if d['severity'] != 'warning')
+            summary['warnings'] = sum(1 for d in toolchain.diagnostics if d['severity'] == 'warning')
+        toolchain.collect_artifacts(output)
+        toolchain.store_cached()
+        summary['status'] = 'success'
+    except Exception as e:
+        logging.error(f"Build process failed: {str(e)}")
+        summary['message'] = str(e)
+    finally:
+        summary['duration'] = time.monotonic() - start
+        shutil.rmtree(work_root, ignore_errors=True)
+        root_logger.handlers = previous_handlers
+        handler.close()
+    return summary
+
+
+def build_corpus(jobs, workers=None, artifacts_root='artifacts', fail_fast=True, cache_dir=None,
+                 cache_size=10 * 1024 ** 3):
+    """Build (project_dir, compiler) jobs on a pool of worker processes"""
+    results = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = {
+            pool.submit(build_project, project, compiler, artifacts_root, fail_fast,
+                        cache_dir, cache_size): (project, compiler)
+            for project, compiler in jobs
+        }
+        for future in as_completed(futures):
+            project, compiler = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker process itself died
+                result = {'project': project, 'compiler': compiler, 'status': 'failed',
+                          'duration': 0.0, 'errors': 0, 'warnings': 0, 'message': str(e),
+                          'artifacts': ''}
+            logging.info(f"[{len(results) + 1}/{len(jobs)}] {result['status']}: {project} "
+                         f"({result['duration']:.1f}s)")
+            results.append(result)
+    # Report in input order, not completion order
+    order = {project: index for index, (project, _) in enumerate(jobs)}
+    results.sort(key=lambda result: order[result['project']])
+    return results
+
+
+def format_summary(results):
+    """Format the results as a table with totals"""
+    width = max([len('Project')] + [len(result['project']) for result in results])
+    lines = [f"{'Project':<{width}}  {'Compiler':<8}  {'Status':<8}  {'Seconds':>8}  {'Errors':>6}  {'Warnings':>8}"]
+    lines.append('-' * len(lines[0]))
+    for result in results:
+        lines.append(f"{result['project']:<{width}}  {result['compiler']:<8}  {result['status']:<8}  "
+                     f"{result['duration']:>8.1f}  {result['errors']:>6}  {result['warnings']:>8}")
+    lines.append('-' * len(lines[0]))
+    counts = {status: sum(1 for result in results if result['status'] == status)
+              for status in ('success', 'cached', 'failed', 'skipped')}
+    total = sum(result['duration'] for result in results)
+    lines.append(f"{len(results)} projects: {counts['success']} succeeded, {counts['cached']} cached, "
+                 f"{counts['failed']} failed, {counts['skipped']} skipped; {total:.1f}s of build time")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build a corpus of DOS projects in parallel')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--root', help='Directory whose subdirectories are projects')
+    source.add_argument('--manifest', help='File listing project directories and compiler types')
+    parser.add_argument('--compiler', choices=COMPILERS, default='borland',
+                        help='Compiler for the projects under --root (default: borland)')
+    parser.add_argument('--workers', '-j', type=int, default=None,
+                        help='Number of builds running at once (default: CPU count)')
+    parser.add_argument('--artifacts', default='artifacts', help='Artifacts directory (default: artifacts)')
+    parser.add_argument('--json', help='File to write the results to as JSON')
+    parser.add_argument('--no-fail-fast', action='store_true',
+                        help='Let builds run to the end after a fatal error')
+    parser.add_argument('--cache', help='Build cache directory, may be shared between machines')
+    parser.add_argument('--cache-size', type=int, default=10240,
+                        help='Build cache size cap in MB (default: 10240)')
+    args = parser.parse_args()
+
+    jobs = read_manifest(args.manifest) if args.manifest else scan_root(args.root, args.compiler)
+    if not jobs:
+        logging.warning("No projects found. Nothing to build.")
+        return 0
+    logging.info(f"Building {len(jobs)} projects with {args.workers or os.cpu_count()} workers")
+
+    results = build_corpus(jobs, args.workers, args.artifacts, fail_fast=not args.no_fail_fast,
+                           cache_dir=args.cache, cache_size=args.cache_size * 1024 ** 2)
+    print(format_summary(results))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 1 if any(result['status'] == 'failed' for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Content-hash build state for incremental builds with BuildToolchain.
+
+DOS timestamps have 2-second resolution and local time, and copying a tree
+resets them, so MAKE's own staleness checks can't be trusted. Instead every
+translation unit gets a fingerprint: a hash of its source, the headers it
+includes from the project, the .CFG files next to it and the compiler
+identity. The outputs (.OBJ, generated .ASM) of a unit are kept in a
+content-addressed store; a unit whose fingerprint hasn't changed gets its
+outputs restored instead of being compiled again.
+
+Restoring outputs only saves work when the build compares timestamps, i.e.
+when the build script runs MAKE; a script that calls the compiler for every
+unit recompiles them anyway, so build_toolchain.py only builds incrementally
+when runs_make() finds a MAKE call in BUILD.BAT.
+
+State layout:
+
+    STATE_DIR/state.json          {unit: {'fingerprint': str, 'outputs': {name: sha256}}}
+    STATE_DIR/objects/ab/abcd...  output files by content hash
+"""
+import os
+import re
+import json
+import stat
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+from pathlib import Path
+try:
+    import fcntl
+except ImportError:  # Windows
+    pass
+
+SOURCE_EXTENSIONS = ('.c', '.cpp', '.asm')
+# Files a translation unit produces, next to its source
+OUTPUT_EXTENSIONS = ('.obj', '.asm')
+INCLUDE = re.compile(rb'^\s*#\s*include\s*[<"]([^>"]+)[>"]', re.MULTILINE)
+ASM_INCLUDE = re.compile(rb'^\s*include\s+(\S+)', re.MULTILINE | re.IGNORECASE)
+# First word of a batch line running MAKE, after @ and CALL
+MAKE_COMMAND = re.compile(r'^\s*@?\s*(?:call\s+)?(?:\S*\\)?(?:make|maker)(?:\.exe)?(?:\s|$)', re.IGNORECASE)
+# Compiler executables whose size and time identify an installation
+COMPILER_FILES = ('BCC.EXE', 'TCC.EXE', 'CL.EXE', 'TASM.EXE', 'TASMX.EXE', 'MASM.EXE', 'TLINK.EXE', 'LINK.EXE')
+# ioctl cloning a file on filesystems with copy-on-write (btrfs, XFS)
+FICLONE = 0x40049409
+
+
+def link_or_copy(source, dest, hardlink=False):
+    """
+    Put a file at dest as a reflink, else a hardlink (if allowed), else a copy;
+    returns the method used. Only allow hardlinks to files nothing rewrites in
+    place: the compiler and DOSBox rewrite project files, and a link would
+    change with them.
+    """
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    if dest.exists() or dest.is_symlink():
+        dest.unlink()
+    try:
+        with open(source, 'rb') as src, open(dest, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        return 'reflink'
+    except (OSError, NameError):
+        dest.unlink(missing_ok=True)
+    if hardlink:
+        try:
+            os.link(source, dest)
+            return 'hardlink'
+        except OSError:
+            pass
+    shutil.copy2(source, dest)
+    dest.chmod(dest.stat().st_mode | stat.S_IWUSR)
+    return 'copy'
+
+
+def file_digest(path):
+    """sha256 of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _find_file(directory, name):
+    """Find a file ignoring case, as DOS would; name may contain backslashes"""
+    path = Path(directory)
+    for part in name.replace('\\', '/').split('/'):
+        if part in ('', '.'):
+            continue
+        if part == '..':
+            path = path.parent
+            continue
+        match = path / part
+        if not match.exists() and path.is_dir():
+            match = next((entry for entry in path.iterdir() if entry.name.lower() == part.lower()), match)
+        path = match
+    return path if path.is_file() else None
+
+
+def compiler_identity(compiler_type, mount_path=None):
+    """Identify the compiler installation by its type and its executables"""
+    parts = [compiler_type.lower()]
+    if mount_path and Path(mount_path).is_dir():
+        for root, _, files in os.walk(mount_path):
+            for name in sorted(files):
+                if name.upper() in COMPILER_FILES:
+                    stat = (Path(root) / name).stat()
+                    parts.append(f"{name.upper()}:{stat.st_size}:{int(stat.st_mtime)}")
+    return hashlib.sha256('|'.join(parts).encode()).hexdigest()
+
+
+def runs_make(project_dir, script='BUILD.BAT'):
+    """Whether the build script of a project runs MAKE, which skips targets newer than their sources"""
+    path = _find_file(project_dir, script)
+    if path is None:
+        return False
+    text = path.read_text(encoding='cp866', errors='replace')
+    return any(MAKE_COMMAND.match(line) for line in text.splitlines())
+
+
+def find_units(project_dir):
+    """List the translation units of a project: .C/.CPP files and hand-written .ASM files"""
+    project_dir = Path(project_dir)
+    sources = [path for path in sorted(project_dir.rglob('*')) if path.is_file()
+               and path.suffix.lower() in SOURCE_EXTENSIONS]
+    compiled = {path.with_suffix('').as_posix().lower() for path in sources if path.suffix.lower() != '.asm'}
+    # An .ASM next to a .C/.CPP of the same name is generated by BCC -S
+    return [path for path in sources
+            if path.suffix.lower() != '.asm' or path.with_suffix('').as_posix().lower() not in compiled]
+
+
+def include_dirs(cfg_files):
+    """Relative include directories named by -I options in .CFG files"""
+    dirs = []
+    for cfg in cfg_files:
+        for line in cfg.read_text(errors='replace').split():
+            if line.startswith('-I'):
+                dirs.extend(path for path in line[2:].split(';') if path and ':' not in path)
+    return dirs
+
+
+def unit_headers(source, search_dirs):
+    """Headers included by a source, recursively, that exist in the project"""
+    pattern = ASM_INCLUDE if source.suffix.lower() == '.asm' else INCLUDE
+    headers = []
+    pending = [source]
+    while pending:
+        current = pending.pop()
+        for name in pattern.findall(current.read_bytes()):
+            name = name.decode('cp866', errors='replace')
+            for directory in [current.parent] + list(search_dirs):
+                header = _find_file(directory, name)
+                if header is not None:
+                    if header not in headers and header != source:
+                        headers.append(header)
+                        pending.append(header)
+                    break
+    return sorted(headers)
+
+
+def unit_fingerprint(source, compiler_id, project_dir=None):
+    """Hash a unit's source, its project headers, its .CFG files and the compiler identity"""
+    source = Path(source)
+    cfg_files = sorted(path for path in source.parent.iterdir() if path.suffix.lower() == '.cfg')
+    search_dirs = [source.parent / directory for directory in include_dirs(cfg_files)]
+    if project_dir is not None:
+        search_dirs.append(Path(project_dir))
+    digest = hashlib.sha256(compiler_id.encode())
+    for path in [source] + unit_headers(source, search_dirs) + cfg_files:
+        digest.update(path.name.lower().encode() + b'\0' + file_digest(path).encode())
+    return digest.hexdigest()
+
+
+def unit_outputs(source):
+    """Existing output files of a unit"""
+    outputs = []
+    for path in source.parent.iterdir():
+        if path != source and path.stem.lower() == source.stem.lower() \
+                and path.suffix.lower() in OUTPUT_EXTENSIONS and path.is_file():
+            outputs.append(path)
+    return sorted(outputs)
+
+
+class BuildState:
+    """Fingerprints and stored outputs of the translation units of one project"""
+
+    def __init__(self, state_dir):
+        self.state_dir = Path(state_dir)
+        self.objects_dir = self.state_dir / 'objects'
+        self.path = self.state_dir / 'state.json'
+        try:
+            self.units = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            self.units = {}
+
+    def _object_path(self, digest):
+        return self.objects_dir / digest[:2] / digest
+
+    def is_fresh(self, unit, fingerprint):
+        """Check that a unit was built from this fingerprint and its outputs are stored"""
+        entry = self.units.get(unit)
+        return (entry is not None and entry['fingerprint'] == fingerprint and bool(entry['outputs'])
+                and all(self._object_path(digest).exists() for digest in entry['outputs'].values()))
+
+    def restore(self, unit, directory):
+        """Put the stored outputs of a unit back into its directory, newer than its inputs"""
+        # Newer than anything MAKE compares them with, even at 2-second resolution
+        stamp = time.time() + 2
+        for name, digest in self.units[unit]['outputs'].items():
+            target = Path(directory) / name
+            # Replace rather than overwrite: the old file may be hardlinked elsewhere
+            target.unlink(missing_ok=True)
+            shutil.copyfile(self._object_path(digest), target)
+            os.utime(target, (stamp, stamp))
+
+    def record(self, unit, fingerprint, outputs):
+        """Store the outputs of a freshly built unit"""
+        stored = {}
+        for path in outputs:
+            digest = file_digest(path)
+            object_path = self._object_path(digest)
+            if not object_path.exists():
+                object_path.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(path, object_path)
+            stored[path.name] = digest
+        self.units[unit] = {'fingerprint': fingerprint, 'outputs': stored}
+
+    def forget(self, unit):
+        """Drop a unit that produced no outputs"""
+        self.units.pop(unit, None)
+
+    def save(self):
+        """Write the state atomically, so an interrupted build leaves the old state"""
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.state_dir, prefix='state', suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.units, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+
+def prepare_incremental_build(state, project_dir, compiler_id):
+    """
+    Restore the outputs of unchanged units and delete those of changed ones,
+    so the build only compiles what changed whatever the timestamps say.
+    This relies on MAKE skipping the restored targets (see runs_make()).
+    Returns {unit: fingerprint} of the units that need compiling.
+    """
+    project_dir = Path(project_dir)
+    units = find_units(project_dir)
+    stale = {}
+    for source in units:
+        unit = source.relative_to(project_dir).as_posix().lower()
+        fingerprint = unit_fingerprint(source, compiler_id, project_dir)
+        if state.is_fresh(unit, fingerprint):
+            state.restore(unit, source.parent)
+        else:
+            stale[unit] = fingerprint
+            for output in unit_outputs(source):
+                if output.suffix.lower() == '.obj':
+                    output.unlink()
+    logging.info(f"Incremental build: {len(stale)} of {len(units)} units to compile")
+    return stale
+
+
+def record_incremental_build(state, project_dir, stale):
+    """Store the outputs of the compiled units after a build"""
+    project_dir = Path(project_dir)
+    for source in find_units(project_dir):
+        unit = source.relative_to(project_dir).as_posix().lower()
+        if unit not in stale:
+            continue
+        outputs = unit_outputs(source)
+        if outputs:
+            state.record(unit, stale[unit], outputs)
+        else:
+            state.forget(unit)
+    state.save()
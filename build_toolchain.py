@@ -1,22 +1,44 @@
 #!/usr/bin/env python3
 import datetime
 import os
+import json
 import shutil
 import subprocess
+import threading
 import logging
 import configparser
 from pathlib import Path
 
+from dos_utility_caller.diagnostics import DiagnosticCollector, format_diagnostic
+from dos_utility_caller.output_handler import OutputStreamer
+from build_state import (BuildState, compiler_identity, file_digest, link_or_copy,
+                         prepare_incremental_build, record_incremental_build, runs_make)
+from build_cache import BuildCache
+
+# File classes of collect_artifacts(), by lower-case extension
+LOG_EXTENSIONS = {'.log', '.out', '.err', '.erl', '.txt'}
+BINARY_EXTENSIONS = {'.exe', '.com', '.obj'}
+# File the output of BUILD.BAT is captured in, for the diagnostics collector
+BUILD_LOG = 'BUILD.LOG'
+
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 class BuildToolchain:
-    def __init__(self, project_dir, compiler_type):
+    def __init__(self, project_dir, compiler_type, fail_fast=True, incremental=True, cache=None):
         self.project_dir = Path(project_dir).resolve()
         self.compiler_type = compiler_type
         self.dosbox_config = self._get_dosbox_config()
         self.mount_path = self._get_mount_path()
         self.artifacts_dir = Path('artifacts') / self.project_dir.name
+        # Stop DOSBox at the first fatal diagnostic instead of running MAKE to the end
+        self.fail_fast = fail_fast
+        self.diagnostics = []
+        # Only compile translation units whose content hash changed since the last build
+        self.incremental = incremental
+        # BuildCache shared between builds; None builds every time
+        self.cache = cache
+        self._cache_key = None
         
     def _get_dosbox_config(self):
         """Get the appropriate DOSBox configuration file based on compiler type"""
@@ -51,6 +73,34 @@ class BuildToolchain:
             raise ValueError(f"Unsupported compiler type: {self.compiler_type}")
         return path
 
+    def cache_key(self):
+        """Cache key of the project tree, compiler, DOSBox config and compiler install"""
+        if self._cache_key is None:
+            self._cache_key = self.cache.make_key(self.project_dir, self.compiler_type, self.dosbox_config,
+                                                  self.mount_path, skip=[self.artifacts_dir])
+        return self._cache_key
+
+    def restore_cached(self):
+        """Restore the artifacts of an identical earlier build from the cache; returns True on a hit"""
+        if self.cache is None:
+            return False
+        key, _ = self.cache_key()
+        if not self.cache.restore(key, self.artifacts_dir):
+            return False
+        try:
+            self.diagnostics = json.loads((self.artifacts_dir / 'diagnostics.json').read_text())
+        except (OSError, ValueError):
+            self.diagnostics = []
+        return True
+
+    def store_cached(self):
+        """Store the collected artifacts of a successful build in the cache"""
+        if self.cache is None:
+            return
+        # Keyed by the inputs as they were before the build wrote its outputs
+        key, inputs = self.cache_key()
+        self.cache.store(key, self.artifacts_dir, inputs)
+
     def scan_project(self):
         """Scan project directory and identify build files"""
         logging.info(f"Scanning project: {self.project_dir}")
@@ -78,6 +128,53 @@ class BuildToolchain:
         logging.info(f"Found {len(build_files)} build files")
         return build_files
 
+    def _run_dosbox(self, cmd, collector):
+        """Run DOSBox, passing the build's output to the collector line by line.
+        
+        DOSBox doesn't send the console output of DOS programs to its own
+        stdout, so the build script runs with its output redirected to
+        BUILD.LOG, which the collector tails. DOSBox is killed as soon as the
+        collector asks for an abort.
+        Returns the return code, stdout and stderr of DOSBox."""
+        # A log left by the last build would be taken for this build's output
+        for entry in self.project_dir.iterdir():
+            if entry.name.upper() == BUILD_LOG and entry.is_file():
+                entry.unlink()
+        process = subprocess.Popen(
+            cmd,
+            cwd=str(self.project_dir),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='cp866',
+            errors='replace'
+        )
+        # Drain both pipes alongside, so a full pipe never blocks DOSBox
+        stdout_lines = []
+        stderr_lines = []
+        readers = [threading.Thread(target=lines.extend, args=(stream,), daemon=True)
+                   for lines, stream in ((stdout_lines, process.stdout), (stderr_lines, process.stderr))]
+        for reader in readers:
+            reader.start()
+        
+        with OutputStreamer(str(self.project_dir / BUILD_LOG), collector):
+            while process.poll() is None:
+                if collector.abort_event.wait(0.1):
+                    logging.error(f"Stopping DOSBox: {format_diagnostic(collector.abort_reason)}")
+                    process.kill()
+                    break
+            process.wait()
+        for reader in readers:
+            reader.join()
+        return process.returncode, ''.join(stdout_lines), ''.join(stderr_lines)
+
+    def _report_diagnostics(self):
+        """Log the diagnostics of the build and save them as diagnostics.json"""
+        for diagnostic in self.diagnostics:
+            log = logging.warning if diagnostic['severity'] == 'warning' else logging.error
+            log(format_diagnostic(diagnostic))
+        (self.artifacts_dir / 'diagnostics.json').write_text(json.dumps(self.diagnostics, indent=2))
+
     def execute_build(self, build_files):
         """Execute build process using DOSBox with centralized build.bat"""
         compiler_cmd = ""
@@ -92,6 +189,17 @@ class BuildToolchain:
         # Create log file for DOSBox output
         dosbox_log = self.artifacts_dir / 'dosbox.log'
         
+        # Restore unchanged units from the build state, kept with the artifacts
+        # so it outlives working copies of the project. Only MAKE skips the
+        # restored .OBJ files; a BUILD.BAT calling the compiler recompiles them
+        incremental = self.incremental and runs_make(self.project_dir)
+        if self.incremental and not incremental:
+            logging.info("Incremental build skipped: BUILD.BAT doesn't run MAKE, so every unit is compiled")
+        if incremental:
+            build_state = BuildState(self.artifacts_dir / 'build_state')
+            stale_units = prepare_incremental_build(
+                build_state, self.project_dir, compiler_identity(self.compiler_type, self.mount_path))
+        
         # No specific batch file needed for direct command execution
         logging.info("Executing DOSBox commands with output redirection")
         
@@ -101,7 +209,9 @@ class BuildToolchain:
             '-conf', self.dosbox_config,
             '-c', 'mount c .',
             '-c', 'c:',
-            '-c', 'BUILD.BAT',
+            # A child COMMAND.COM, since DOS doesn't redirect the output of
+            # a batch file run directly; every tool BUILD.BAT runs writes there
+            '-c', f'COMMAND /C BUILD.BAT > {BUILD_LOG}',
             '--exit'
         ]
         
@@ -112,14 +222,11 @@ class BuildToolchain:
         try:
             # Run headlessly with output redirection
             logging.info("Executing DOSBox build command...")
-            result = subprocess.run(
-                cmd,
-                cwd=str(self.project_dir),
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                check=False
-            )
+            collector = DiagnosticCollector(fail_fast=self.fail_fast)
+            returncode, stdout, stderr = self._run_dosbox(cmd, collector)
+            result = subprocess.CompletedProcess(cmd, returncode, stdout, stderr)
+            self.diagnostics = collector.diagnostics
+            self._report_diagnostics()
             # Write output to log file
             with open(dosbox_log, 'w') as log_f:
                 log_f.write(f"STDOUT:\n{result.stdout}\n\nSTDERR:\n{result.stderr}\n")
@@ -142,6 +249,8 @@ class BuildToolchain:
                 logging.error(f"DOSBox failed with return code {result.returncode}")
                 raise subprocess.CalledProcessError(result.returncode, cmd, result.stdout, result.stderr)
             
+            if incremental:
+                record_incremental_build(build_state, self.project_dir, stale_units)
             logging.info("Build executed successfully")
             return result.stdout
         except subprocess.CalledProcessError as e:
@@ -160,10 +269,27 @@ class BuildToolchain:
             error_output = f"{e.stdout}\n{e.stderr}"
             if "command not found" in error_output or "Bad command or file name" in error_output:
                 logging.error(f"Compiler '{compiler_cmd}' not found in DOS environment")
+            elif self.diagnostics:
+                errors = [d for d in self.diagnostics if d['severity'] != 'warning']
+                logging.error(f"Build failed with {len(errors)} errors, see {self.artifacts_dir / 'diagnostics.json'}")
             else:
                 logging.error(f"Build failed: {error_output}")
             raise
 
+    def _walk_project(self):
+        """Yield (path, relative path, stat) for every file of the project in one scandir pass"""
+        skip = {self.artifacts_dir.resolve()}
+        stack = [self.project_dir]
+        while stack:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if Path(entry.path).resolve() not in skip:
+                            stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        path = Path(entry.path)
+                        yield path, path.relative_to(self.project_dir), entry.stat(follow_symlinks=False)
+
     def collect_artifacts(self, build_output):
         """Collect build artifacts and source files"""
         logging.info(f"Collecting artifacts to {self.artifacts_dir}")
@@ -171,69 +297,79 @@ class BuildToolchain:
         # Save build log
         (self.artifacts_dir / 'build.log').write_text(build_output)
         
-        # Create logs directory for build outputs
-        logs_dir = self.artifacts_dir / 'logs'
-        logs_dir.mkdir(exist_ok=True)
-        
-        # Copy build logs, outputs, errorlevel files, and text files
-        # Check for both lowercase and uppercase versions due to DOSBox case sensitivity issues
-        for pattern in ['*.LOG', '*.log', '*.OUT', '*.out', '*.ERR', '*.err', '*.ERL', '*.erl', '*.TXT', '*.txt']:
-            for file in self.project_dir.glob(pattern):
-                if file.is_file():
-                    file.chmod(0o666)
-                    shutil.copy(file, logs_dir / file.name)
-        
-        # Copy source files and binaries with proper permissions
-        for file in self.project_dir.glob('**/*'):
-            if file.is_file():
-                # Make file writable before copying
-                file.chmod(0o666)
-                dest = self.artifacts_dir / 'sources' / file.name
-                dest.parent.mkdir(parents=True, exist_ok=True)
-                shutil.copy(file, dest)
-                
-        # Copy binaries
-        bin_dir = self.artifacts_dir / 'binaries'
-        bin_dir.mkdir(exist_ok=True)
+        # One walk over the project: every file goes to sources/, logs and
+        # binaries also to logs/ and binaries/, all keeping their relative paths
+        # so same-named files in different directories don't overwrite each other
+        manifest = []
+        link_counts = {}
         binaries_found = False
-        # Check for both lowercase and uppercase extensions due to DOSBox case sensitivity issues
-        for pattern in ['*.EXE', '*.exe', '*.COM', '*.com', '*.OBJ', '*.obj']:
-            for file in self.project_dir.glob(f'**/{pattern}'):
-                # Make file writable before copying
-                file.chmod(0o666)
-                shutil.copy(file, bin_dir / file.name)
+        erl_files = 0
+        for path, relative, info in self._walk_project():
+            extension = path.suffix.lower()
+            categories = ['sources']
+            if extension in LOG_EXTENSIONS:
+                categories.append('logs')
+                erl_files += extension == '.erl'
+            elif extension in BINARY_EXTENSIONS:
+                categories.append('binaries')
                 binaries_found = True
+            links = []
+            for category in categories:
+                # The project file is copied (or reflinked) once, since the next
+                # build rewrites it; the other categories link to that copy
+                source = path if not links else self.artifacts_dir / categories[0] / relative
+                method = link_or_copy(source, self.artifacts_dir / category / relative, hardlink=bool(links))
+                link_counts[method] = link_counts.get(method, 0) + 1
+                links.append(method)
+            manifest.append({
+                'path': relative.as_posix(),
+                'categories': categories,
+                'size': info.st_size,
+                'sha256': file_digest(path),
+                'link': links[0]
+            })
+        (self.artifacts_dir / 'manifest.json').write_text(json.dumps(manifest, indent=2))
         
         # Verify artifacts were created
         if not binaries_found:
             logging.error("No binaries found after build!")
+        elif not erl_files:
+            logging.error("No errorlevel files captured!")
         else:
-            # Check for errorlevel files in any case
-            # Check for errorlevel files (both uppercase and lowercase)
-            erl_files = list(logs_dir.glob('*.ERL')) + list(logs_dir.glob('*.erl'))
-            if not erl_files:
-                logging.error("No errorlevel files captured!")
-            else:
-                logging.info(f"Found {len(erl_files)} errorlevel files")
-                logging.info("Build artifacts verified successfully")
+            logging.info(f"Found {erl_files} errorlevel files")
+            logging.info("Build artifacts verified successfully")
         
-        logging.info(f"Artifacts collected: {len(list(self.artifacts_dir.glob('**/*')))} files")
+        logging.info(f"Artifacts collected: {len(manifest)} files "
+                     f"({', '.join(f'{count} {method}' for method, count in sorted(link_counts.items()))})")
 
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description='DOSBox Build Toolchain')
     parser.add_argument('project_dir', help='Path to project directory')
     parser.add_argument('compiler', choices=['borland', 'turbo', 'msc'], help='Compiler type')
+    parser.add_argument('--no-fail-fast', action='store_true',
+                        help='Let the build run to the end after a fatal error')
+    parser.add_argument('--full', action='store_true',
+                        help='Compile every unit instead of only the changed ones')
+    parser.add_argument('--cache', help='Build cache directory, may be shared between machines')
+    parser.add_argument('--cache-size', type=int, default=10240,
+                        help='Build cache size cap in MB (default: 10240)')
     
     args = parser.parse_args()
     
-    toolchain = BuildToolchain(args.project_dir, args.compiler)
+    cache = BuildCache(args.cache, args.cache_size * 1024 ** 2) if args.cache else None
+    toolchain = BuildToolchain(args.project_dir, args.compiler, fail_fast=not args.no_fail_fast,
+                               incremental=not args.full, cache=cache)
     build_files = toolchain.scan_project()
     
     if build_files:
         try:
-            output = toolchain.execute_build(build_files)
-            toolchain.collect_artifacts(output)
+            if toolchain.restore_cached():
+                logging.info(f"Artifacts restored from cache to {toolchain.artifacts_dir}")
+            else:
+                output = toolchain.execute_build(build_files)
+                toolchain.collect_artifacts(output)
+                toolchain.store_cached()
         except Exception as e:
             logging.error(f"Build process failed: {str(e)}")
     else:
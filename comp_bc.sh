@@ -23,8 +23,8 @@ EOF
 
 convert_prj_to_make()
 {
-  MAKEFILE=$(echo "$1" | perl -pe 's!\.PRJ!\.MAK!i')
-  execute_dos "PRJ2MAK $1 $MAKEFILE"
+  # Writes the .MAK and .CFG next to the .PRJ, as PRJ2MAK does, without DOSBox
+  python3 "$(dirname "${BASH_SOURCE[0]}")/prj_reader.py" "$PRJPATH/$1"
   return $?
 }
 
@@ -6,80 +6,234 @@ Script to convert DOS makefiles to modern makefiles or build scripts.
 import re
 import sys
 import os
+import argparse
+import itertools
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
-def parse_dos_makefile(makefile_content):
+MACRO_DEFINITION = re.compile(r'^([A-Za-z_]\w*)\s*=(.*)$')
+RULE_LINE = re.compile(r'^(.+?)\s*(::?)(?=\s|$)(.*)$')
+MACRO_REFERENCE = re.compile(r'\$\(([A-Za-z_]\w*)(?::([^=)]*)=([^)]*))?\)')
+INLINE_FILE_START = '&&|'
+INLINE_FILE = re.compile(r'&&\|\n(.*?)\n?^\|', re.DOTALL | re.MULTILINE)
+BATCH_GROUP = re.compile(r'\{([^}]*)\}')
+CONDITION_COMPARISON = re.compile(r'^(.*?)\s*(==|!=|<=|>=|<|>)\s*(.*)$')
+# Drive of the scratch files of parallel builds; S: is taken by each call's workspace
+SCRATCH_DRIVE = 't'
+
+# Dot names that are directives rather than targets, with or without a colon
+DIRECTIVES = {'.autodepend', '.noautodepend', '.ignore', '.noignore', '.silent', '.nosilent',
+              '.swap', '.noswap', '.precious', '.suffixes', '.keep', '.nokeep'}
+
+def _strip_comment(line):
     """
-    Parse a DOS makefile and extract targets, dependencies, and rules.
+    Remove a # comment from a makefile line.
     """
-    lines = makefile_content.split('\n')
-    targets = {}
-    variables = {}
-    rules = []
-    
-    current_target = None
-    current_dependencies = []
-    current_commands = []
-    
-    for line in lines:
-        line = line.rstrip()
-        
-        # Skip empty lines
-        if not line.strip():
+    index = line.find('#')
+    return line if index < 0 else line[:index]
+
+def _condition_value(text):
+    """
+    Turn one operand of a !if condition into a number or a string.
+    """
+    text = text.strip().strip('"')
+    try:
+        return int(text, 0)
+    except ValueError:
+        return text
+
+def _evaluate_condition(expression, variables):
+    """
+    Evaluate a !if/!elif condition: $d(MACRO), comparisons, !, && and ||.
+    """
+    expression = re.sub(r'\$d\((\w+)\)', lambda m: '1' if m.group(1) in variables else '0', expression)
+    expression = substitute_variables(expression, variables)
+    for alternative in expression.split('||'):
+        if all(_evaluate_term(term, variables) for term in alternative.split('&&')):
+            return True
+    return False
+
+def _evaluate_term(term, variables):
+    """
+    Evaluate one comparison or value of a !if condition.
+    """
+    term = term.strip()
+    while term.startswith('(') and term.endswith(')'):
+        term = term[1:-1].strip()
+    if term.startswith('!') and not term.startswith('!='):
+        return not _evaluate_term(term[1:], variables)
+    match = CONDITION_COMPARISON.match(term)
+    if match:
+        left, operator, right = _condition_value(match.group(1)), match.group(2), _condition_value(match.group(3))
+        if type(left) != type(right):
+            left, right = str(left), str(right)
+        return {'==': left == right, '!=': left != right, '<': left < right,
+                '>': left > right, '<=': left <= right, '>=': left >= right}[operator]
+    return bool(_condition_value(term))
+
+def _read_command(lines, index, first):
+    """
+    Read a command line and the bodies of its &&| inline files.
+
+    Each inline file is kept in the command as "&&|", its lines and a
+    closing "|" line, followed by the rest of that line. Returns the
+    command and the index of the next line.
+    """
+    command = first
+    pending = command.count(INLINE_FILE_START)
+    while pending and index < len(lines):
+        line = lines[index]
+        index += 1
+        if line.startswith('|'):
+            command += '\n|' + line[1:].rstrip()
+            pending += line[1:].count(INLINE_FILE_START) - 1
+        else:
+            # Comments are dropped from inline files, leaving empty lines
+            command += '\n' + _strip_comment(line).rstrip()
+    return command, index
+
+def parse_borland_makefile(makefile_content, base_dir=None, macros=None):
+    """
+    Parse a makefile in the Borland MAKE dialect.
+
+    Handles backslash continuations, # comments, macro definitions,
+    .AUTODEPEND style directives, !if/!ifdef/!ifndef/!elif/!else/!endif,
+    !include, !undef, !error, explicit and implicit (.c.obj:) rules, &&|
+    inline files and {$< } batched commands. Returns a dict with
+    'variables', 'targets' (implicit rules included under their .c.obj
+    style names), 'directives', 'messages' and 'default_target'.
+    """
+    makefile = {
+        'variables': dict(macros or {}),
+        'targets': {},
+        'directives': [],
+        'messages': [],
+        'default_target': None
+    }
+    _parse_lines(makefile_content.splitlines(), makefile, base_dir)
+    return makefile
+
+def _parse_lines(lines, makefile, base_dir):
+    """
+    Parse makefile lines into a makefile dict (see parse_borland_makefile).
+    """
+    variables = makefile['variables']
+    targets = makefile['targets']
+    # One [active, branch taken] entry per open !if
+    conditions = []
+    current_targets = []
+    index = 0
+    while index < len(lines):
+        line = lines[index].rstrip()
+        index += 1
+        while line.endswith('\\') and index < len(lines):
+            line = line[:-1] + ' ' + lines[index].strip()
+            index += 1
+        stripped = line.strip()
+        active = all(condition[0] for condition in conditions)
+
+        if stripped.startswith('!'):
+            directive, _, argument = _strip_comment(stripped[1:]).strip().partition(' ')
+            directive, argument = directive.lower(), argument.strip()
+            if directive in ('if', 'ifdef', 'ifndef'):
+                if directive == 'if':
+                    value = active and _evaluate_condition(argument, variables)
+                else:
+                    value = active and ((argument in variables) == (directive == 'ifdef'))
+                conditions.append([value, value])
+            elif directive in ('elif', 'else'):
+                if not conditions:
+                    raise ValueError(f"!{directive} without !if")
+                outer = all(condition[0] for condition in conditions[:-1])
+                value = outer and not conditions[-1][1] and (
+                    directive == 'else' or _evaluate_condition(argument, variables))
+                conditions[-1] = [value, conditions[-1][1] or value]
+            elif directive == 'endif':
+                if not conditions:
+                    raise ValueError("!endif without !if")
+                conditions.pop()
+            elif not active:
+                continue
+            elif directive == 'include':
+                name = substitute_variables(argument.strip('"<>'), variables)
+                path = Path(base_dir or '.') / name
+                _parse_lines(path.read_text(errors='replace').splitlines(), makefile, path.parent)
+            elif directive == 'undef':
+                variables.pop(argument, None)
+            elif directive == 'error':
+                raise ValueError(f"!error {substitute_variables(argument, variables)}")
+            elif directive == 'message':
+                makefile['messages'].append(substitute_variables(argument, variables))
             continue
-            
-        # Parse variable assignments
-        if '=' in line and not line.startswith('\t') and not line.startswith(' '):
-            parts = line.split('=', 1)
-            if len(parts) == 2:
-                var_name = parts[0].strip()
-                var_value = parts[1].strip()
-                variables[var_name] = var_value
+        if not active:
             continue
-            
-        # Parse targets (lines that don't start with tab/space)
-        if not line.startswith('\t') and not line.startswith(' '):
-            # Save previous target if exists
-            if current_target:
-                targets[current_target] = {
-                    'dependencies': current_dependencies,
-                    'commands': current_commands
-                }
-            
-            # Parse new target
-            parts = line.split(':', 1)
-            if len(parts) == 2:
-                current_target = parts[0].strip()
-                deps = parts[1].strip()
-                current_dependencies = deps.split() if deps else []
-                current_commands = []
+
+        if line[:1] in (' ', '\t'):
+            if stripped and current_targets:
+                command, index = _read_command(lines, index, stripped)
+                for target in current_targets:
+                    targets[target]['commands'].append(command)
             continue
-            
-        # Parse commands (lines that start with tab)
-        if line.startswith('\t') or line.startswith(' '):
-            command = line.strip()
-            if current_target:
-                current_commands.append(command)
-            else:
-                rules.append(command)
-    
-    # Save the last target
-    if current_target:
-        targets[current_target] = {
-            'dependencies': current_dependencies,
-            'commands': current_commands
-        }
-    
-    return variables, targets, rules
+        line = _strip_comment(line).strip()
+        if not line:
+            continue
+
+        match = MACRO_DEFINITION.match(line)
+        if match:
+            variables[match.group(1)] = match.group(2).strip()
+            current_targets = []
+            continue
+
+        match = RULE_LINE.match(line)
+        name = (match.group(1) if match else line).strip()
+        if name.lower() in DIRECTIVES:
+            makefile['directives'].append((name.upper(), match.group(3).split() if match else []))
+            current_targets = []
+            continue
+        if not match:
+            continue
+
+        # Macros in target and dependency lists are expanded when read
+        names = substitute_variables(match.group(1), variables).split()
+        dependencies = substitute_variables(match.group(3), variables).split()
+        current_targets = []
+        for target in names:
+            entry = targets.setdefault(target, {'dependencies': [], 'commands': []})
+            # A later rule for the same target adds dependencies; a rule
+            # with commands replaces the earlier commands
+            entry['dependencies'].extend(dep for dep in dependencies if dep not in entry['dependencies'])
+            if entry['commands'] and match.group(2) == ':':
+                entry['commands'] = []
+            current_targets.append(target)
+            if makefile['default_target'] is None and not target.startswith('.'):
+                makefile['default_target'] = target
+
+def parse_dos_makefile(makefile_content, base_dir=None):
+    """
+    Parse a DOS makefile and extract targets, dependencies, and rules.
+    """
+    makefile = parse_borland_makefile(makefile_content, base_dir)
+    return makefile['variables'], makefile['targets'], []
 
-def substitute_variables(text, variables):
+def substitute_variables(text, variables, depth=0):
     """
     Substitute variables in text with their values.
+
+    Supports $(NAME) and $(NAME:old=new); macro values are expanded in
+    turn. Undefined macros expand to nothing, as in MAKE.
     """
-    result = text
+    def replace(match):
+        name, old, new = match.groups()
+        value = variables.get(name, '')
+        if depth < 16:
+            value = substitute_variables(value, variables, depth + 1)
+        if old is not None:
+            value = value.replace(old, new)
+        return value
+
+    result = MACRO_REFERENCE.sub(replace, text)
     for var_name, var_value in variables.items():
-        result = result.replace(f"$({var_name})", var_value)
-        result = result.replace(f"${var_name}", var_value)
+        result = re.sub(rf'\${re.escape(var_name)}\b', lambda _: var_value, result)
     return result
 
 def convert_to_modern_makefile(variables, targets, rules):
@@ -115,11 +269,14 @@ def convert_to_modern_makefile(variables, targets, rules):
 def convert_to_build_script(variables, targets, rules, compiler_type='msc'):
     """
     Convert parsed DOS makefile to a build script.
+
+    The script prints its progress and the tools' output to the console;
+    build_toolchain.py captures it by redirecting the whole script.
     """
     output = ["echo on", ""]
     
     # Add header
-    output.append("echo Building project... > BUILD.LOG")
+    output.append("echo Building project...")
     output.append("")
     
     # Resolve variables
@@ -165,12 +322,12 @@ def convert_to_build_script(variables, targets, rules, compiler_type='msc'):
     # Add compilation commands for source files
     for source_file in sorted(source_files):
         obj_file = source_file.replace('.c', '.obj')
-        output.append(f"echo Compiling {source_file} >> BUILD.LOG")
+        output.append(f"echo Compiling {source_file}")
         
         # Substitute $*.c with the actual source file
         compile_command = compile_rule.replace('$*.c', source_file)
-        output.append(f"{compile_command} >> BUILD.LOG 2>&1")
-        output.append("if errorlevel 1 echo Error compiling {source_file} >> BUILD.LOG")
+        output.append(compile_command)
+        output.append(f"if errorlevel 1 echo Error compiling {source_file}")
         output.append("")
     
     # Find the main target (first target in the makefile)
@@ -183,27 +340,308 @@ def convert_to_build_script(variables, targets, rules, compiler_type='msc'):
         target_info = targets[main_target]
         
         # Add link command
-        output.append(f"echo Linking {main_target} >> BUILD.LOG")
+        output.append(f"echo Linking {main_target}")
         for command in target_info['commands']:
             # Substitute variables in commands
             resolved_command = substitute_variables(command, resolved_variables)
-            output.append(f"{resolved_command} >> BUILD.LOG 2>&1")
-            output.append("if errorlevel 1 echo Error linking >> BUILD.LOG")
+            output.append(resolved_command)
+            output.append("if errorlevel 1 echo Error linking")
             output.append("")
     
     # Add completion message
-    output.append("echo Build completed. >> BUILD.LOG")
+    output.append("echo Build completed.")
     
     return '\n'.join(output)
 
+IMPLICIT_RULE = re.compile(r'^\.(\w+)\.(\w+)$')
+
+def _find_file(directory, name):
+    """
+    Find a file in a directory ignoring case, as DOS would.
+    """
+    if directory is None:
+        return None
+    path = Path(directory) / name
+    if path.exists():
+        return path
+    for entry in Path(directory).iterdir():
+        if entry.name.lower() == name.lower():
+            return entry
+    return None
+
+# Longest command line COMMAND.COM accepts
+DOS_COMMAND_LINE = 127
+
+def _expand_rule_commands(commands, source, target):
+    """
+    Expand the automatic macros of an implicit rule for one source file.
+    """
+    stem = os.path.splitext(target)[0]
+    expanded = []
+    for command in commands:
+        command = BATCH_GROUP.sub(lambda match: match.group(1).replace('$<', source).strip(), command)
+        command = command.replace('$<', source).replace('$*', stem).replace('$@', target)
+        expanded.append(command)
+    return expanded
+
+def _expand_batch_commands(commands, sources):
+    """
+    Expand the {$< } groups of an implicit rule for several sources at once,
+    as Borland MAKE does for batched rules.
+    """
+    return [BATCH_GROUP.sub(lambda match: ''.join(match.group(1).replace('$<', source) for source in sources),
+                            command).rstrip()
+            for command in commands]
+
+def _batch_chunks(commands, sources, limit=DOS_COMMAND_LINE):
+    """
+    Split sources into runs whose batched command lines fit the DOS limit.
+    """
+    chunks = [[]]
+    for source in sources:
+        candidate = chunks[-1] + [source]
+        if chunks[-1] and any(len(line) > limit for line in _expand_batch_commands(commands, candidate)):
+            chunks.append([source])
+        else:
+            chunks[-1] = candidate
+    return chunks
+
+def build_dependency_graph(variables, targets, rules, project_dir=None):
+    """
+    Turn parsed makefile targets into a dependency graph.
+
+    Implicit rules such as .c.obj and .cpp.obj give commands to object files
+    that have none: the source is the dependency (or, with project_dir, the
+    file on disk) with the rule's extension and the object's name. Names are
+    compared ignoring case. Every node is
+    {'target': name, 'dependencies': [node keys], 'commands': [str]}
+    under the lower-case target name; dependencies without a node are
+    plain files. Nodes made by a rule with {$< } batching also get
+    'batch': {'commands': [rule commands], 'source': name} so that
+    build_parallel() can compile their sources in one invocation.
+    """
+    implicit = {}
+    for target_name, target_info in targets.items():
+        match = IMPLICIT_RULE.match(target_name)
+        if match:
+            source_ext, target_ext = match.group(1).lower(), match.group(2).lower()
+            implicit.setdefault(target_ext, []).append((source_ext, target_info['commands']))
+
+    graph = {}
+    for target_name, target_info in targets.items():
+        if IMPLICIT_RULE.match(target_name) or target_name.startswith('.'):
+            # Implicit rules and directives like .AUTODEPEND are not targets
+            continue
+        dependencies = substitute_variables(' '.join(target_info['dependencies']), variables).split()
+        graph[target_name.lower()] = {
+            'target': target_name,
+            'dependencies': [dep.lower() for dep in dependencies],
+            'commands': [substitute_variables(command, variables) for command in target_info['commands']]
+        }
+
+    # Objects only mentioned as dependencies still need building
+    for node in list(graph.values()):
+        for dep in node['dependencies']:
+            if dep not in graph and os.path.splitext(dep)[1][1:] in implicit:
+                graph[dep] = {'target': dep, 'dependencies': [], 'commands': []}
+
+    # Apply implicit rules to nodes without commands
+    for key, node in graph.items():
+        stem, ext = os.path.splitext(node['target'])
+        if node['commands'] or ext[1:].lower() not in implicit:
+            continue
+        for source_ext, commands in implicit[ext[1:].lower()]:
+            source = next((dep for dep in node['dependencies']
+                           if dep.lower() == f"{stem}.{source_ext}".lower()), None)
+            if source is None:
+                found = _find_file(project_dir, f"{stem}.{source_ext}")
+                source = found.name.lower() if found else None
+            if source is None:
+                continue
+            if source not in node['dependencies']:
+                node['dependencies'].append(source)
+            commands = [substitute_variables(command, variables) for command in commands]
+            node['commands'] = _expand_rule_commands(commands, source, node['target'])
+            if any(BATCH_GROUP.search(command) for command in commands):
+                node['batch'] = {'commands': commands, 'source': source}
+            break
+    return graph
+
+def topological_order(graph, goal=None):
+    """
+    List the nodes needed for a goal (default: the first target) with every
+    node after its dependencies. Raises ValueError on a dependency cycle.
+    """
+    if goal is None:
+        goal = next(iter(graph), None)
+    order = []
+    state = {}
+
+    def visit(key, path):
+        if state.get(key) == 'done' or key not in graph:
+            return
+        if state.get(key) == 'visiting':
+            raise ValueError(f"Dependency cycle: {' -> '.join(path + [key])}")
+        state[key] = 'visiting'
+        for dep in graph[key]['dependencies']:
+            visit(dep, path + [key])
+        state[key] = 'done'
+        order.append(key)
+
+    if goal is not None:
+        visit(goal.lower(), [])
+    return order
+
+def _is_stale(graph, key, project_dir, rebuilt):
+    """
+    Check whether a target is missing, older than a dependency or depends on
+    something rebuilt in this run.
+    """
+    target = _find_file(project_dir, graph[key]['target'])
+    if target is None:
+        return True
+    target_time = target.stat().st_mtime
+    for dep in graph[key]['dependencies']:
+        if dep in rebuilt:
+            return True
+        dep_file = _find_file(project_dir, dep)
+        if dep_file is not None and dep_file.stat().st_mtime > target_time:
+            return True
+    return False
+
+def _run_node(node, index, project_dir, tools_dir, environment, dosbox_config):
+    """
+    Run the commands of one node in an emulator session of its own.
+
+    The commands go into a batch file that stops at the first failing
+    command, unless the command has MAKE's - prefix, and appends their
+    output to a log next to it. &&| inline files are written out as
+    MKnnnnn.Inn files and replaced by their names. These files live in a
+    scratch workspace mounted as T: (S: is the call's own workspace), so
+    nothing is written into the project directory.
+    """
+    from dos_utility_caller import call_dos_utility
+    from dos_utility_caller.workspace import ScratchWorkspace
+
+    batch_name = f"MK{index:05d}.BAT"
+    log_name = f"MK{index:05d}.LOG"
+    workspace = ScratchWorkspace(drive=SCRATCH_DRIVE, prefix='K')
+    workspace.create()
+    inline_files = itertools.count()
+
+    def write_inline_file(match):
+        name = f"MK{index:05d}.I{next(inline_files):02d}"
+        content = match.group(1)
+        Path(workspace.path(name)).write_bytes(
+            (content.replace('\n', '\r\n') + '\r\n' if content else '').encode('cp866', errors='replace'))
+        return workspace.dos_path(name)
+
+    lines = ["@echo off"]
+    try:
+        for command in node['commands']:
+            command = INLINE_FILE.sub(write_inline_file, command)
+            ignore_errors = False
+            while command[:1] in ('@', '-'):
+                ignore_errors = ignore_errors or command[0] == '-'
+                command = command[1:].lstrip('0123456789').lstrip()
+            lines.append(f"{command} >> {workspace.dos_path(log_name)}")
+            if not ignore_errors:
+                lines.append("if errorlevel 1 goto end")
+        lines.append(":end")
+        Path(workspace.path(batch_name)).write_text('\r\n'.join(lines) + '\r\n')
+        config = dict(dosbox_config or {})
+        config['mount'] = {**config.get('mount', {}), SCRATCH_DRIVE: workspace.directory}
+        # The bare name is found on T: and converted to T:\MKnnnnn.BAT
+        result = call_dos_utility("CALL", [batch_name], source_dir=str(project_dir), tools_dir=tools_dir,
+                                  environment=environment, dosbox_config=config)
+        log_path = Path(workspace.path(log_name))
+        if log_path.exists():
+            result['stdout'] = log_path.read_text(encoding='cp866', errors='replace') + result['stdout']
+        return result
+    finally:
+        workspace.cleanup()
+
+def build_parallel(graph, project_dir, goal=None, jobs=None, tools_dir=None,
+                   environment=None, dosbox_config=None):
+    """
+    Build a goal, running independent nodes concurrently in separate
+    emulator sessions. A node starts once all its dependencies are built,
+    so the link step waits for every object file. Up-to-date targets are
+    skipped. Stale nodes of the same batched rule ({$< }) that are ready
+    together run in one session, with their sources on as few command
+    lines as the DOS length limit allows. Returns {target: result} for the
+    nodes that ran; a failure stops new nodes from starting.
+    """
+    order = topological_order(graph, goal)
+    for key in order:
+        for dep in graph[key]['dependencies']:
+            if dep not in graph and _find_file(project_dir, dep) is None:
+                raise FileNotFoundError(f"Don't know how to make '{dep}' needed by '{graph[key]['target']}'")
+
+    results = {}
+    done = set()
+    rebuilt = set()
+    pending = list(order)
+    running = {}
+    batch_numbers = itertools.count()
+    failed = False
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        while pending or running:
+            # Start every node whose dependencies are finished
+            batches = {}
+            for key in list(pending):
+                if failed:
+                    break
+                if any(dep in graph and dep not in done for dep in graph[key]['dependencies']):
+                    continue
+                pending.remove(key)
+                if not graph[key]['commands'] or not _is_stale(graph, key, project_dir, rebuilt):
+                    done.add(key)
+                    continue
+                if 'batch' in graph[key]:
+                    batches.setdefault(tuple(graph[key]['batch']['commands']), []).append(key)
+                    continue
+                running[pool.submit(_run_node, graph[key], next(batch_numbers), project_dir, tools_dir,
+                                    environment, dosbox_config)] = [key]
+            for commands, keys in batches.items():
+                sources = [graph[key]['batch']['source'] for key in keys]
+                node = {
+                    'target': ' '.join(graph[key]['target'] for key in keys),
+                    'commands': [line for chunk in _batch_chunks(commands, sources)
+                                 for line in _expand_batch_commands(commands, chunk)]
+                }
+                running[pool.submit(_run_node, node, next(batch_numbers), project_dir, tools_dir,
+                                    environment, dosbox_config)] = keys
+            if not running:
+                if pending and not failed:
+                    # Nodes were marked done without running; look again
+                    continue
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                keys = running.pop(future)
+                result = future.result()
+                for key in keys:
+                    results[graph[key]['target']] = result
+                    if result['success']:
+                        done.add(key)
+                        rebuilt.add(key)
+                if not result['success']:
+                    failed = True
+    return results
+
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python3 convert_makefile.py <makefile> [output_type]")
-        print("  output_type: makefile (default) or script")
-        return
-    
-    makefile_path = sys.argv[1]
-    output_type = sys.argv[2] if len(sys.argv) > 2 else "makefile"
+    parser = argparse.ArgumentParser(description='Convert DOS makefiles to modern makefiles or build scripts')
+    parser.add_argument('makefile', help='DOS makefile')
+    parser.add_argument('output_type', nargs='?', default='makefile', choices=['makefile', 'script', 'build'],
+                        help='makefile (default), script, or build to build in parallel in DOSBox')
+    parser.add_argument('jobs', nargs='?', type=int, help='Emulator sessions to run at once when building')
+    parser.add_argument('--tools-dir', help='Borland C++ installation to mount as D: when building')
+    parser.add_argument('--bin-dir', default='D:\\BIN', help='DOS directory of the compiler (default: D:\\BIN)')
+    args = parser.parse_args()
+
+    makefile_path = args.makefile
+    output_type = args.output_type
     
     if not os.path.exists(makefile_path):
         print(f"Error: Makefile '{makefile_path}' not found.")
@@ -212,7 +650,20 @@ def main():
     with open(makefile_path, 'r') as f:
         content = f.read()
     
-    variables, targets, rules = parse_dos_makefile(content)
+    project_dir = os.path.dirname(os.path.abspath(makefile_path))
+    variables, targets, rules = parse_dos_makefile(content, project_dir)
+    
+    if output_type == "build":
+        graph = build_dependency_graph(variables, targets, rules, project_dir)
+        results = build_parallel(graph, project_dir, jobs=args.jobs, tools_dir=args.tools_dir,
+                                 environment={'PATH': f'%PATH%;{args.bin_dir}'})
+        for target, result in results.items():
+            print(f"{target}: {'ok' if result['success'] else 'failed (' + str(result['exit_code']) + ')'}")
+            if not result['success']:
+                print(result['stdout'] or result['stderr'])
+        if not all(result['success'] for result in results.values()):
+            sys.exit(1)
+        return
     
     if output_type == "script":
         output = convert_to_build_script(variables, targets, rules)
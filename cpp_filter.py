@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Strip system headers from Borland CPP output (.I files).
+
+CPP prefixes every line with its file and line number, `crc16.cpp 72: ...`,
+and most of a .I file is usually the compiler's own headers. The filter
+keeps the lines of the project's files and a compact map from output
+lines back to (file, line), so they can be joined with the `?debug L`
+records of the .ASM file (see asm_splitter.py).
+
+The file is read in large chunks of bytes. Runs of lines from a system
+header are skipped with one regex search per run, without splitting or
+decoding them; only kept lines are decoded (cp866) and CRLF is dropped.
+"""
+import os
+import re
+import sys
+import json
+import bisect
+import logging
+import argparse
+from pathlib import Path
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+ENCODING = 'cp866'
+CHUNK_SIZE = 1 << 20
+# Headers of the compiler installation, e.g. C:\BORLANDC\INCLUDE\stdio.h
+SYSTEM_HEADER = re.compile(rb'^[A-Za-z]:\\(?:[^\\]+\\)*INCLUDE\\', re.IGNORECASE)
+
+
+class LineMap:
+    """
+    Map of output lines to (file, line), stored as runs of consecutive lines.
+
+    A run (file index, first output line, first source line, count) covers
+    a block of lines copied from one file; a whole file kept without gaps
+    is a single run. Output lines count from 1.
+    """
+
+    def __init__(self):
+        self.files = []
+        self._file_index = {}
+        self.runs = []
+        self.lines = 0
+
+    def add(self, file_name, line):
+        """Record the source of the next output line"""
+        index = self._file_index.get(file_name)
+        if index is None:
+            index = self._file_index[file_name] = len(self.files)
+            self.files.append(file_name)
+        self.lines += 1
+        if self.runs:
+            last = self.runs[-1]
+            if last[0] == index and line is not None and last[2] is not None \
+                    and last[2] + last[3] == line and last[1] + last[3] == self.lines:
+                last[3] += 1
+                return
+        self.runs.append([index, self.lines, line, 1])
+
+    def lookup(self, output_line):
+        """Return (file, line) of an output line"""
+        position = bisect.bisect_right(self.runs, output_line, key=lambda run: run[1]) - 1
+        if position < 0 or output_line >= self.runs[position][1] + self.runs[position][3]:
+            raise IndexError(f"Output line {output_line} is not mapped")
+        index, first, line, _ = self.runs[position]
+        return self.files[index], None if line is None else line + output_line - first
+
+    def to_dict(self):
+        return {'files': self.files, 'runs': self.runs}
+
+    @classmethod
+    def from_dict(cls, data):
+        line_map = cls()
+        line_map.files = list(data['files'])
+        line_map._file_index = {name: index for index, name in enumerate(line_map.files)}
+        line_map.runs = [list(run) for run in data['runs']]
+        line_map.lines = max((run[1] + run[3] - 1 for run in line_map.runs), default=0)
+        return line_map
+
+
+def _system_matcher(system_dirs):
+    """Build the test for system header names (bytes)"""
+    if not system_dirs:
+        return lambda name: SYSTEM_HEADER.match(name) is not None
+    prefixes = tuple(os.fsencode(directory).upper().rstrip(b'\\') + b'\\' for directory in system_dirs)
+    return lambda name: name.upper().startswith(prefixes)
+
+
+def _split_prefix(line):
+    """Split 'NAME N: text' into (name, line number, text); None if it isn't one"""
+    space = line.find(b' ')
+    colon = line.find(b':', space + 1)
+    if space <= 0 or colon < 0 or not line[space + 1:colon].isdigit():
+        return None
+    text = line[colon + 1:]
+    return line[:space], int(line[space + 1:colon]), text[1:] if text.startswith(b' ') else text
+
+
+def iter_user_lines(stream, system_dirs=None, keep_blank=False, chunk_size=CHUNK_SIZE):
+    """
+    Yield (file, line, text) for the lines of a binary .I stream that come
+    from project files rather than system headers.
+
+    system_dirs are the DOS directories of the system headers; by default
+    any absolute path with an INCLUDE directory counts. Empty lines, which
+    CPP writes for directives and comments, are dropped unless keep_blank.
+    """
+    is_system = _system_matcher(system_dirs)
+    # Regex finding the first line of a run that isn't from a given file
+    run_ends = {}
+    names = {}
+    system = {}
+    pending = b''
+    current = None
+
+    while True:
+        block = stream.read(chunk_size)
+        data = pending + block
+        if not data:
+            break
+        if block:
+            # Only whole lines; the tail waits for the next chunk
+            end = data.rfind(b'\n') + 1
+            if end == 0:
+                pending = data
+                continue
+            data, pending = data[:end], data[end:]
+        else:
+            pending = b''
+
+        position = 0
+        size = len(data)
+        while position < size:
+            if current is not None and system[current]:
+                # Jump over the rest of the header's run in one search
+                pattern = run_ends.get(current)
+                if pattern is None:
+                    pattern = run_ends[current] = re.compile(rb'^(?!' + re.escape(current) + rb' )', re.MULTILINE)
+                match = pattern.search(data, position)
+                if match is None:
+                    break
+                position = match.start()
+                if position >= size:
+                    break
+
+            newline = data.find(b'\n', position)
+            if newline < 0:
+                newline = size
+            line = data[position:newline].rstrip(b'\r')
+            position = newline + 1
+
+            parsed = _split_prefix(line)
+            if parsed is None:
+                # Not a CPP line: belongs to whatever file came last
+                if current is None or system[current] or not (keep_blank or line.strip()):
+                    continue
+                yield names[current], None, line.decode(ENCODING, errors='replace')
+                continue
+            name, number, text = parsed
+            if name not in system:
+                system[name] = is_system(name)
+                names[name] = name.decode(ENCODING, errors='replace')
+            current = name
+            if system[name] or not (keep_blank or text.strip()):
+                continue
+            yield names[name], number, text.decode(ENCODING, errors='replace')
+
+
+def filter_file(i_path, output_path, system_dirs=None, keep_blank=False):
+    """Write the project lines of a .I file to output_path; returns its LineMap"""
+    line_map = LineMap()
+    with open(i_path, 'rb') as source, open(output_path, 'w', encoding=ENCODING, errors='replace',
+                                              newline='\r\n') as output:
+        for file_name, line, text in iter_user_lines(source, system_dirs, keep_blank):
+            output.write(text + '\n')
+            line_map.add(file_name, line)
+    return line_map
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Strip system headers from Borland CPP output')
+    parser.add_argument('paths', nargs='+', help='.I files or directories to search for them')
+    parser.add_argument('--output-dir', help='Directory for the results (default: next to each .I file)')
+    parser.add_argument('--system-dir', action='append', dest='system_dirs',
+                        help='DOS directory of system headers, may be repeated (default: any ...\\INCLUDE\\)')
+    parser.add_argument('--keep-blank', action='store_true', help='Keep the empty lines CPP writes')
+    args = parser.parse_args()
+
+    files = []
+    for path in map(Path, args.paths):
+        if path.is_dir():
+            files.extend(p for p in sorted(path.rglob('*')) if p.suffix.lower() == '.i' and p.is_file())
+        else:
+            files.append(path)
+
+    status = 0
+    for i_path in files:
+        output_dir = Path(args.output_dir) if args.output_dir else i_path.parent
+        output_path = output_dir / f"{i_path.stem}.user{i_path.suffix}"
+        try:
+            line_map = filter_file(i_path, output_path, args.system_dirs, args.keep_blank)
+        except OSError as e:
+            logging.error(f"{i_path}: {e}")
+            status = 1
+            continue
+        (output_dir / f"{i_path.stem}.user.map.json").write_text(json.dumps(line_map.to_dict()))
+        logging.info(f"{i_path}: {line_map.lines} lines kept in {len(line_map.runs)} runs -> {output_path}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
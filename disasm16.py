@@ -0,0 +1,593 @@
+#!/usr/bin/env python3
+"""
+Disassemble 16-bit x86 (8086/80186/80286 and 8087/80287) code from OMF objects.
+
+A native replacement for the `TASMX /la` round trip: segments come from
+omf_reader.py, are decoded with opcode tables, and fixups are symbolized to
+the names in the object file, so an instruction patched by the linker reads
+`call near ptr _PUTS` rather than `call 0000h`. Operands follow the BCC -S
+style: sizes spelled out (`word ptr [bp-5Eh]`), hex numbers with an h suffix.
+
+Output is either listing-like text or columns (offset, length, opcode id,
+operands), as NumPy arrays when NumPy is installed and array.array
+otherwise. A corpus is decoded on a pool of worker processes. --verify
+compares the decoding with a TASM listing of the same module: every
+instruction line of the .LST must start an instruction of the same length,
+bytes and mnemonic.
+
+    python3 disasm16.py CRC16.OBJ
+    python3 disasm16.py CRC16.OBJ --verify CRC16.LST
+"""
+import os
+import sys
+import json
+import struct
+import logging
+import argparse
+from array import array
+from multiprocessing import Pool
+
+from omf_reader import ObjectFile
+from lst_parser import read_listing
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+REG8 = ('al', 'cl', 'dl', 'bl', 'ah', 'ch', 'dh', 'bh')
+REG16 = ('ax', 'cx', 'dx', 'bx', 'sp', 'bp', 'si', 'di')
+SREG = ('es', 'cs', 'ss', 'ds')
+RM16 = ('bx+si', 'bx+di', 'bp+si', 'bp+di', 'si', 'di', 'bp', 'bx')
+SIZES = {'b': 'byte ptr ', 'w': 'word ptr ', 'd': 'dword ptr ', 'q': 'qword ptr ', 't': 'tbyte ptr ', '': ''}
+
+ALU = ('add', 'or', 'adc', 'sbb', 'and', 'sub', 'xor', 'cmp')
+SHIFTS = ('rol', 'ror', 'rcl', 'rcr', 'shl', 'shr', 'sal', 'sar')
+JCC = ('jo', 'jno', 'jb', 'jae', 'je', 'jne', 'jbe', 'ja', 'js', 'jns', 'jp', 'jnp', 'jl', 'jge', 'jle', 'jg')
+SEGMENT_PREFIXES = {0x26: 'es', 0x2E: 'cs', 0x36: 'ss', 0x3E: 'ds'}
+# String instructions take REPE/REPNE, the others plain REP
+COMPARING_STRINGS = {0xA6, 0xA7, 0xAE, 0xAF}
+
+# Operand codes, after the Intel opcode map: E r/m, G reg, I immediate, S
+# immediate sign-extended from a byte, J relative, O direct offset, A far
+# pointer, M memory only, R segment register, then b/w/d for the size.
+# Anything else is a literal operand.
+OPCODES = {}
+for _index, _name in enumerate(ALU):
+    _base = _index * 8
+    OPCODES.update({_base: (_name, 'Eb', 'Gb'), _base + 1: (_name, 'Ew', 'Gw'), _base + 2: (_name, 'Gb', 'Eb'),
+                    _base + 3: (_name, 'Gw', 'Ew'), _base + 4: (_name, 'al', 'Ib'), _base + 5: (_name, 'ax', 'Iw')})
+for _index, _name in enumerate(SREG):
+    OPCODES[0x06 + _index * 8] = ('push', _name)
+    if _name != 'cs':
+        OPCODES[0x07 + _index * 8] = ('pop', _name)
+OPCODES.update({0x27: ('daa',), 0x2F: ('das',), 0x37: ('aaa',), 0x3F: ('aas',)})
+for _index, _name in enumerate(REG16):
+    OPCODES.update({0x40 + _index: ('inc', _name), 0x48 + _index: ('dec', _name),
+                    0x50 + _index: ('push', _name), 0x58 + _index: ('pop', _name),
+                    0xB8 + _index: ('mov', _name, 'Iw')})
+    if _index:
+        OPCODES[0x90 + _index] = ('xchg', 'ax', _name)
+for _index, _name in enumerate(REG8):
+    OPCODES[0xB0 + _index] = ('mov', _name, 'Ib')
+for _index, _name in enumerate(JCC):
+    OPCODES[0x70 + _index] = (_name, 'Jb')
+OPCODES.update({
+    0x60: ('pusha',), 0x61: ('popa',), 0x62: ('bound', 'Gw', 'Md'), 0x63: ('arpl', 'Ew', 'Gw'),
+    0x68: ('push', 'Iw'), 0x69: ('imul', 'Gw', 'Ew', 'Iw'), 0x6A: ('push', 'Sb'),
+    0x6B: ('imul', 'Gw', 'Ew', 'Sb'), 0x6C: ('insb',), 0x6D: ('insw',), 0x6E: ('outsb',), 0x6F: ('outsw',),
+    0x84: ('test', 'Eb', 'Gb'), 0x85: ('test', 'Ew', 'Gw'), 0x86: ('xchg', 'Eb', 'Gb'),
+    0x87: ('xchg', 'Ew', 'Gw'), 0x88: ('mov', 'Eb', 'Gb'), 0x89: ('mov', 'Ew', 'Gw'),
+    0x8A: ('mov', 'Gb', 'Eb'), 0x8B: ('mov', 'Gw', 'Ew'), 0x8C: ('mov', 'Ew', 'Rw'),
+    0x8D: ('lea', 'Gw', 'Mw'), 0x8E: ('mov', 'Rw', 'Ew'), 0x90: ('nop',), 0x98: ('cbw',), 0x99: ('cwd',),
+    0x9A: ('call', 'Ad'), 0x9B: ('wait',), 0x9C: ('pushf',), 0x9D: ('popf',), 0x9E: ('sahf',),
+    0x9F: ('lahf',), 0xA0: ('mov', 'al', 'Ob'), 0xA1: ('mov', 'ax', 'Ow'), 0xA2: ('mov', 'Ob', 'al'),
+    0xA3: ('mov', 'Ow', 'ax'), 0xA4: ('movsb',), 0xA5: ('movsw',), 0xA6: ('cmpsb',), 0xA7: ('cmpsw',),
+    0xA8: ('test', 'al', 'Ib'), 0xA9: ('test', 'ax', 'Iw'), 0xAA: ('stosb',), 0xAB: ('stosw',),
+    0xAC: ('lodsb',), 0xAD: ('lodsw',), 0xAE: ('scasb',), 0xAF: ('scasw',), 0xC2: ('ret', 'Iw'),
+    0xC3: ('ret',), 0xC4: ('les', 'Gw', 'Md'), 0xC5: ('lds', 'Gw', 'Md'), 0xC8: ('enter', 'Iw', 'Ib'),
+    0xC9: ('leave',), 0xCA: ('retf', 'Iw'), 0xCB: ('retf',), 0xCC: ('int', '3'), 0xCD: ('int', 'Ib'),
+    0xCE: ('into',), 0xCF: ('iret',), 0xD4: ('aam', 'Ib'), 0xD5: ('aad', 'Ib'), 0xD7: ('xlat',),
+    0xE0: ('loopne', 'Jb'), 0xE1: ('loope', 'Jb'), 0xE2: ('loop', 'Jb'), 0xE3: ('jcxz', 'Jb'),
+    0xE4: ('in', 'al', 'Ib'), 0xE5: ('in', 'ax', 'Ib'), 0xE6: ('out', 'Ib', 'al'), 0xE7: ('out', 'Ib', 'ax'),
+    0xE8: ('call', 'Jw'), 0xE9: ('jmp', 'Jw'), 0xEA: ('jmp', 'Ad'), 0xEB: ('jmp', 'Jb'),
+    0xEC: ('in', 'al', 'dx'), 0xED: ('in', 'ax', 'dx'), 0xEE: ('out', 'dx', 'al'), 0xEF: ('out', 'dx', 'ax'),
+    0xF4: ('hlt',), 0xF5: ('cmc',), 0xF8: ('clc',), 0xF9: ('stc',), 0xFA: ('cli',), 0xFB: ('sti',),
+    0xFC: ('cld',), 0xFD: ('std',),
+})
+
+# Opcodes whose ModRM reg field selects the instruction: (mnemonic, operands...) per reg
+GROUPS = {
+    0x80: [(name, 'Eb', 'Ib') for name in ALU],
+    0x81: [(name, 'Ew', 'Iw') for name in ALU],
+    0x82: [(name, 'Eb', 'Ib') for name in ALU],
+    0x83: [(name, 'Ew', 'Sb') for name in ALU],
+    0x8F: [('pop', 'Ew')] + [None] * 7,
+    0xC0: [(name, 'Eb', 'Ib') for name in SHIFTS],
+    0xC1: [(name, 'Ew', 'Ib') for name in SHIFTS],
+    0xC6: [('mov', 'Eb', 'Ib')] + [None] * 7,
+    0xC7: [('mov', 'Ew', 'Iw')] + [None] * 7,
+    0xD0: [(name, 'Eb', '1') for name in SHIFTS],
+    0xD1: [(name, 'Ew', '1') for name in SHIFTS],
+    0xD2: [(name, 'Eb', 'cl') for name in SHIFTS],
+    0xD3: [(name, 'Ew', 'cl') for name in SHIFTS],
+    0xF6: [('test', 'Eb', 'Ib'), ('test', 'Eb', 'Ib'), ('not', 'Eb'), ('neg', 'Eb'),
+           ('mul', 'Eb'), ('imul', 'Eb'), ('div', 'Eb'), ('idiv', 'Eb')],
+    0xF7: [('test', 'Ew', 'Iw'), ('test', 'Ew', 'Iw'), ('not', 'Ew'), ('neg', 'Ew'),
+           ('mul', 'Ew'), ('imul', 'Ew'), ('div', 'Ew'), ('idiv', 'Ew')],
+    0xFE: [('inc', 'Eb'), ('dec', 'Eb')] + [None] * 6,
+    0xFF: [('inc', 'Ew'), ('dec', 'Ew'), ('call', 'Ew'), ('call', 'Md'),
+           ('jmp', 'Ew'), ('jmp', 'Md'), ('push', 'Ew'), None],
+}
+# 80286 system instructions behind 0F
+EXTENDED_GROUPS = {
+    0x00: [('sldt', 'Ew'), ('str', 'Ew'), ('lldt', 'Ew'), ('ltr', 'Ew'), ('verr', 'Ew'), ('verw', 'Ew'), None, None],
+    0x01: [('sgdt', 'M'), ('sidt', 'M'), ('lgdt', 'M'), ('lidt', 'M'), ('smsw', 'Ew'), None, ('lmsw', 'Ew'), None],
+}
+EXTENDED = {0x02: ('lar', 'Gw', 'Ew'), 0x03: ('lsl', 'Gw', 'Ew'), 0x05: ('loadall',), 0x06: ('clts',)}
+
+# 8087/80287 escape opcodes D8-DF: memory forms by reg, as (mnemonic, size)
+FPU_ARITHMETIC = ('fadd', 'fmul', 'fcom', 'fcomp', 'fsub', 'fsubr', 'fdiv', 'fdivr')
+FPU_MEMORY = {
+    0xD8: [(name, 'd') for name in FPU_ARITHMETIC],
+    0xD9: [('fld', 'd'), None, ('fst', 'd'), ('fstp', 'd'), ('fldenv', ''), ('fldcw', 'w'),
+           ('fstenv', ''), ('fstcw', 'w')],
+    0xDA: [('fi' + name[1:], 'd') for name in FPU_ARITHMETIC],
+    0xDB: [('fild', 'd'), None, ('fist', 'd'), ('fistp', 'd'), None, ('fld', 't'), None, ('fstp', 't')],
+    0xDC: [(name, 'q') for name in FPU_ARITHMETIC],
+    0xDD: [('fld', 'q'), None, ('fst', 'q'), ('fstp', 'q'), ('frstor', ''), None, ('fsave', ''), ('fstsw', 'w')],
+    0xDE: [('fi' + name[1:], 'w') for name in FPU_ARITHMETIC],
+    0xDF: [('fild', 'w'), None, ('fist', 'w'), ('fistp', 'w'), ('fbld', 't'), ('fild', 'q'),
+           ('fbstp', 't'), ('fistp', 'q')],
+}
+# Register forms: 'st,i' is st,st(i); 'i,st' is st(i),st; 'i' is st(i)
+FPU_REGISTER = {
+    0xD8: [('fadd', 'st,i'), ('fmul', 'st,i'), ('fcom', 'i'), ('fcomp', 'i'),
+           ('fsub', 'st,i'), ('fsubr', 'st,i'), ('fdiv', 'st,i'), ('fdivr', 'st,i')],
+    0xD9: [('fld', 'i'), ('fxch', 'i')],
+    0xDC: [('fadd', 'i,st'), ('fmul', 'i,st'), ('fcom', 'i'), ('fcomp', 'i'),
+           ('fsubr', 'i,st'), ('fsub', 'i,st'), ('fdivr', 'i,st'), ('fdiv', 'i,st')],
+    0xDD: [('ffree', 'i'), None, ('fst', 'i'), ('fstp', 'i')],
+    0xDE: [('faddp', 'i,st'), ('fmulp', 'i,st'), None, None,
+           ('fsubrp', 'i,st'), ('fsubp', 'i,st'), ('fdivrp', 'i,st'), ('fdivp', 'i,st')],
+}
+# Register forms without operands, by the ModRM byte
+FPU_SPECIAL = {
+    (0xD9, 0xD0): 'fnop', (0xD9, 0xE0): 'fchs', (0xD9, 0xE1): 'fabs', (0xD9, 0xE4): 'ftst', (0xD9, 0xE5): 'fxam',
+    (0xD9, 0xE8): 'fld1', (0xD9, 0xE9): 'fldl2t', (0xD9, 0xEA): 'fldl2e', (0xD9, 0xEB): 'fldpi',
+    (0xD9, 0xEC): 'fldlg2', (0xD9, 0xED): 'fldln2', (0xD9, 0xEE): 'fldz', (0xD9, 0xF0): 'f2xm1',
+    (0xD9, 0xF1): 'fyl2x', (0xD9, 0xF2): 'fptan', (0xD9, 0xF3): 'fpatan', (0xD9, 0xF4): 'fxtract',
+    (0xD9, 0xF6): 'fdecstp', (0xD9, 0xF7): 'fincstp', (0xD9, 0xF8): 'fprem', (0xD9, 0xF9): 'fyl2xp1',
+    (0xD9, 0xFA): 'fsqrt', (0xD9, 0xFC): 'frndint', (0xD9, 0xFD): 'fscale', (0xDB, 0xE0): 'feni',
+    (0xDB, 0xE1): 'fdisi', (0xDB, 0xE2): 'fclex', (0xDB, 0xE3): 'finit', (0xDB, 0xE4): 'fsetpm',
+    (0xDE, 0xD9): 'fcompp', (0xDF, 0xE0): 'fstsw ax',
+}
+
+# Mnemonics, so columnar output can store an id per instruction
+MNEMONICS = sorted({entry[0] for entry in OPCODES.values()}
+                   | {entry[0] for group in list(GROUPS.values()) + list(EXTENDED_GROUPS.values())
+                      for entry in group if entry}
+                   | {entry[0] for entry in EXTENDED.values()}
+                   | {entry[0] for group in list(FPU_MEMORY.values()) + list(FPU_REGISTER.values())
+                      for entry in group if entry}
+                   | set(FPU_SPECIAL.values()) | {'db'})
+MNEMONIC_IDS = {name: index for index, name in enumerate(MNEMONICS)}
+# Spellings TASM accepts for the same encoding, for --verify
+ALIASES = {
+    'jz': 'je', 'jnz': 'jne', 'jc': 'jb', 'jnae': 'jb', 'jnb': 'jae', 'jnc': 'jae', 'jna': 'jbe',
+    'jnbe': 'ja', 'jpe': 'jp', 'jpo': 'jnp', 'jnge': 'jl', 'jnl': 'jge', 'jng': 'jle', 'jnle': 'jg',
+    'sal': 'shl', 'retn': 'ret', 'retf': 'ret', 'loopz': 'loope', 'loopnz': 'loopne', 'fwait': 'wait',
+    'repz': 'repe', 'repnz': 'repne'
+}
+
+
+def _hex(value):
+    """Format a number as TASM does: 0..9 in decimal, else hex with an h suffix"""
+    if value < 10:
+        return str(value)
+    text = f"{value:X}h"
+    return '0' + text if text[0] in 'ABCDEF' else text
+
+
+def _signed(value):
+    """Format a signed displacement as +n/-n"""
+    return f"-{_hex(-value)}" if value < 0 else f"+{_hex(value)}"
+
+
+class Disassembler:
+    """
+    Decoder for one code image.
+
+    fixups are those of omf_reader's segment_image(); symbols maps
+    (segment name, offset) to a name, e.g. the publics of the module, and
+    segment is the name of the segment being decoded.
+    """
+
+    def __init__(self, code, fixups=(), symbols=None, segment=None):
+        self.code = bytes(code)
+        self.fixups = {fixup['offset']: fixup for fixup in fixups}
+        self.symbols = symbols or {}
+        self.segment = segment
+
+    def _symbol(self, fixup, value):
+        """Name a fixed-up field: the target plus the value already in the field"""
+        kind, name = fixup['target']
+        value = (value + fixup['displacement']) & 0xFFFF
+        symbol = self.symbols.get((name, value)) if kind == 'segment' else None
+        if symbol is None:
+            symbol = (name or '?') + (_signed(value) if value else '')
+        frame_kind, frame = fixup['frame']
+        if frame_kind == 'group' and not fixup['relative']:
+            symbol = f"{frame}:{symbol}"
+        if fixup['location'] == 'segment':
+            return f"seg {name}"
+        return symbol
+
+    def _modrm(self, position, size, segment_prefix):
+        """Decode the r/m part of a ModRM operand; returns (text, length of ModRM and displacement)"""
+        code = self.code
+        modrm = code[position]
+        mod = modrm >> 6
+        rm = modrm & 7
+        if mod == 3:
+            return (REG8 if size == 'b' else REG16)[rm], 1
+        prefix = SIZES.get(size, '') + (f"{segment_prefix}:" if segment_prefix else '')
+        if mod == 0 and rm == 6:
+            value = code[position + 1] | (code[position + 2] << 8)
+            fixup = self.fixups.get(position + 1)
+            if fixup is not None:
+                symbol = self._symbol(fixup, value)
+                # DGROUP:_name already names the segment
+                return prefix + (symbol if ':' in symbol or segment_prefix else f"ds:{symbol}"), 3
+            return prefix + f"ds:[{_hex(value)}]" if not segment_prefix else prefix + f"[{_hex(value)}]", 3
+        base = RM16[rm]
+        if mod == 0:
+            return f"{prefix}[{base}]", 1
+        if mod == 1:
+            displacement = code[position + 1]
+            displacement -= (displacement & 0x80) << 1
+            return f"{prefix}[{base}{_signed(displacement) if displacement else ''}]", 2
+        value = code[position + 1] | (code[position + 2] << 8)
+        fixup = self.fixups.get(position + 1)
+        if fixup is not None:
+            return f"{prefix}{self._symbol(fixup, value)}[{base}]", 3
+        displacement = value - ((value & 0x8000) << 1)
+        return f"{prefix}[{base}{_signed(displacement)}]", 3
+
+    def _immediate(self, position, size, offset_keyword=True):
+        """Decode an immediate; returns (text, length)"""
+        code = self.code
+        if size == 'b':
+            return _hex(code[position]), 1
+        value = code[position] | (code[position + 1] << 8)
+        fixup = self.fixups.get(position)
+        if fixup is not None:
+            symbol = self._symbol(fixup, value)
+            return (f"offset {symbol}" if offset_keyword and fixup['location'] == 'offset' else symbol), 2
+        return _hex(value), 2
+
+    def decode(self, start=0, end=None):
+        """Yield (offset, length, mnemonic, operands) for the code between start and end"""
+        code = self.code
+        end = len(code) if end is None else end
+        position = start
+        while position < end:
+            try:
+                instruction = self._decode_one(position, end)
+            except IndexError:
+                # Ran past the end of the code
+                instruction = None
+            if instruction is None or position + instruction[1] > end:
+                instruction = (position, 1, 'db', (_hex(code[position]),))
+            yield instruction
+            position += instruction[1]
+
+    def _decode_one(self, start, end):
+        code = self.code
+        position = start
+        segment_prefix = None
+        words = []
+        # Prefixes: segment override, LOCK, REP/REPNE
+        while True:
+            opcode = code[position]
+            if opcode in SEGMENT_PREFIXES:
+                segment_prefix = SEGMENT_PREFIXES[opcode]
+            elif opcode == 0xF0:
+                words.append('lock')
+            elif opcode in (0xF2, 0xF3):
+                words.append(opcode)
+            else:
+                break
+            position += 1
+            if position >= end:
+                return None
+
+        if opcode in OPCODES:
+            entry = OPCODES[opcode]
+            position += 1
+        elif opcode in GROUPS:
+            entry = GROUPS[opcode][(code[position + 1] >> 3) & 7]
+            position += 1
+        elif opcode == 0x0F:
+            second = code[position + 1]
+            position += 2
+            if second in EXTENDED_GROUPS:
+                entry = EXTENDED_GROUPS[second][(code[position] >> 3) & 7]
+            else:
+                entry = EXTENDED.get(second)
+        elif 0xD8 <= opcode <= 0xDF:
+            return self._decode_fpu(start, position, segment_prefix, words)
+        else:
+            entry = None
+        if entry is None:
+            return None
+
+        mnemonic = entry[0]
+        for index, word in enumerate(words):
+            if word in (0xF2, 0xF3):
+                if opcode in COMPARING_STRINGS:
+                    words[index] = 'repe' if word == 0xF3 else 'repne'
+                else:
+                    words[index] = 'rep' if word == 0xF3 else 'repne'
+
+        operands = []
+        modrm_position = position
+        has_modrm = any(spec[0] in 'EGMR' for spec in entry[1:])
+        if has_modrm:
+            position += 1
+        memory_used = False
+        for spec in entry[1:]:
+            kind = spec[0]
+            size = spec[1:] if len(spec) > 1 else ''
+            if kind == 'E' or kind == 'M':
+                if kind == 'M' and code[modrm_position] >> 6 == 3:
+                    return None
+                text, length = self._modrm(modrm_position, size, segment_prefix)
+                memory_used = memory_used or code[modrm_position] >> 6 != 3
+                position = modrm_position + length
+                operands.append(text)
+            elif kind == 'G':
+                operands.append((REG8 if size == 'b' else REG16)[(code[modrm_position] >> 3) & 7])
+            elif kind == 'R':
+                register = (code[modrm_position] >> 3) & 7
+                if register > 3:
+                    return None
+                operands.append(SREG[register])
+            elif kind == 'I':
+                text, length = self._immediate(position, size)
+                operands.append(text)
+                position += length
+            elif kind == 'S':
+                value = code[position]
+                operands.append(str(value - 256) if value & 0x80 else _hex(value))
+                position += 1
+            elif kind == 'J':
+                operands.append(self._relative(position, size, mnemonic))
+                position += 1 if size == 'b' else 2
+            elif kind == 'O':
+                value = code[position] | (code[position + 1] << 8)
+                fixup = self.fixups.get(position)
+                override = f"{segment_prefix or 'ds'}:"
+                target = self._symbol(fixup, value) if fixup is not None else f"[{_hex(value)}]"
+                operands.append(SIZES[size] + (target if ':' in target else override + target))
+                memory_used = True
+                position += 2
+            elif kind == 'A':
+                fixup = self.fixups.get(position)
+                if fixup is not None:
+                    operands.append(f"far ptr {self._symbol(fixup, code[position] | (code[position + 1] << 8))}")
+                else:
+                    offset = code[position] | (code[position + 1] << 8)
+                    segment = code[position + 2] | (code[position + 3] << 8)
+                    operands.append(f"{_hex(segment)}:{_hex(offset)}")
+                position += 4
+            else:
+                operands.append(spec)
+
+        if segment_prefix and not memory_used:
+            # An override with no memory operand to attach to, e.g. es: movsb
+            words.insert(0, f"{segment_prefix}:")
+        if words:
+            mnemonic = ' '.join(words + [mnemonic])
+        return start, position - start, mnemonic, tuple(operands)
+
+    def _relative(self, position, size, mnemonic):
+        """Decode a jump or call target as a symbol or segment offset"""
+        code = self.code
+        if size == 'b':
+            displacement = code[position]
+            displacement -= (displacement & 0x80) << 1
+            target = (position + 1 + displacement) & 0xFFFF
+            label = self.symbols.get((self.segment, target), _hex(target))
+            return label if mnemonic != 'jmp' else f"short {label}"
+        value = code[position] | (code[position + 1] << 8)
+        fixup = self.fixups.get(position)
+        if fixup is not None:
+            return f"near ptr {self._symbol(fixup, value)}"
+        target = (position + 2 + value) & 0xFFFF
+        return f"near ptr {self.symbols.get((self.segment, target), _hex(target))}"
+
+    def _decode_fpu(self, start, position, segment_prefix, words):
+        code = self.code
+        opcode = code[position]
+        modrm = code[position + 1]
+        reg = (modrm >> 3) & 7
+        if modrm >> 6 != 3:
+            entry = FPU_MEMORY[opcode][reg]
+            if entry is None:
+                return None
+            text, length = self._modrm(position + 1, entry[1], segment_prefix)
+            mnemonic, operands = entry[0], (text,)
+            position += 1 + length
+        elif (opcode, modrm) in FPU_SPECIAL:
+            mnemonic, operands = FPU_SPECIAL[(opcode, modrm)], ()
+            position += 2
+        else:
+            forms = FPU_REGISTER.get(opcode, ())
+            entry = forms[reg] if reg < len(forms) else None
+            if entry is None:
+                return None
+            register = f"st({modrm & 7})"
+            mnemonic = entry[0]
+            operands = {'st,i': ('st', register), 'i,st': (register, 'st'), 'i': (register,)}[entry[1]]
+            position += 2
+        if words:
+            mnemonic = ' '.join(str(word) for word in words if isinstance(word, str)) + ' ' + mnemonic
+        return start, position - start, mnemonic.strip(), operands
+
+
+def format_instruction(instruction, code):
+    """Format an instruction as a listing line: offset, bytes, instruction"""
+    offset, length, mnemonic, operands = instruction
+    data = ' '.join(f"{byte:02X}" for byte in code[offset:offset + length])
+    return f"{offset:04X}  {data:<20}  {mnemonic:<7} {','.join(operands)}".rstrip()
+
+
+def to_columns(instructions):
+    """
+    Turn decoded instructions into columns: offset, length, opcode (an id in
+    MNEMONICS, prefixes dropped) and operands (a list of strings)
+    """
+    offsets = array('I')
+    lengths = array('B')
+    opcodes = array('H')
+    operands = []
+    for offset, length, mnemonic, instruction_operands in instructions:
+        offsets.append(offset)
+        lengths.append(length)
+        opcodes.append(MNEMONIC_IDS.get(mnemonic.rsplit(' ', 1)[-1], MNEMONIC_IDS['db']))
+        operands.append(','.join(instruction_operands))
+    columns = {'offset': offsets, 'length': lengths, 'opcode': opcodes, 'operands': operands}
+    if numpy is not None:
+        for name in ('offset', 'length', 'opcode'):
+            columns[name] = numpy.frombuffer(columns[name], dtype=columns[name].typecode)
+    return columns
+
+
+def disassemble_object(obj_path):
+    """Decode every code segment of an object file; returns {segment: (code, instructions)}"""
+    with ObjectFile.open(obj_path) as obj:
+        summary = obj.summary()
+        symbols = {(public['segment'], public['offset']): public['name'] for public in summary['publics']}
+        segments = {}
+        for segment in summary['segments']:
+            if not segment['class'].upper().endswith('CODE'):
+                continue
+            image, fixups = obj.segment_image(segment['name'])
+            disassembler = Disassembler(image, fixups, symbols, segment['name'])
+            segments[segment['name']] = (bytes(image), list(disassembler.decode()))
+    return segments
+
+
+def _disassemble_file(obj_path):
+    """Worker: decode one object file into columns per segment"""
+    try:
+        return obj_path, {name: to_columns(instructions)
+                          for name, (_, instructions) in disassemble_object(obj_path).items()}, None
+    except (OSError, ValueError, KeyError, IndexError, struct.error) as e:
+        # A corrupt file must not stop the rest of the corpus
+        return obj_path, {}, str(e)
+
+
+def disassemble_corpus(obj_paths, workers=None, chunksize=16):
+    """Decode many object files on a pool of worker processes; yields (path, columns, error)"""
+    with Pool(processes=workers or os.cpu_count()) as pool:
+        yield from pool.imap_unordered(_disassemble_file, obj_paths, chunksize)
+
+
+PREFIXES = ('rep', 'repe', 'repz', 'repne', 'repnz', 'lock')
+
+
+def _normalize(mnemonic):
+    return ALIASES.get(mnemonic, mnemonic)
+
+
+def verify_listing(obj_path, lst_path):
+    """
+    Check the decoding of an object file against a TASM listing of it.
+
+    Returns {'checked': n, 'mismatches': [...]}; each mismatch has the
+    segment, offset, listing bytes and source, and what was decoded there.
+    """
+    segments = disassemble_object(obj_path)
+    segments = {name.upper(): value for name, value in segments.items()}
+    decoded = {name: {instruction[0]: instruction for instruction in instructions}
+               for name, (_, instructions) in segments.items()}
+    checked = 0
+    mismatches = []
+    for _, segment, offset, data, source in read_listing(lst_path):
+        segment = segment and segment.upper()
+        if segment not in decoded or not source or source.startswith(';'):
+            continue
+        words = source.lower().split()
+        if words[0] in ('db', 'dw', 'dd', 'dq', 'dt') or words[0].endswith(':'):
+            continue
+        checked += 1
+        code = segments[segment][0]
+        instructions = decoded[segment]
+        # TASM pads forward jumps it made short with NOPs
+        found = []
+        position = offset
+        while position < offset + len(data) and position in instructions:
+            found.append(instructions[position])
+            position += instructions[position][1]
+        expected = _normalize(next((word for word in words if word not in PREFIXES), words[0]))
+        got = _normalize(found[0][2].split()[-1]) if found else None
+        ok = (position == offset + len(data) and code[offset:position] == data
+              and got == expected and all(instruction[2] == 'nop' for instruction in found[1:]))
+        if not ok:
+            mismatches.append({
+                'segment': segment,
+                'offset': offset,
+                'listing': data.hex(),
+                'source': source,
+                'decoded': [format_instruction(instruction, code) for instruction in found]
+            })
+    return {'checked': checked, 'mismatches': mismatches}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Disassemble 16-bit code from OMF object files')
+    parser.add_argument('objects', nargs='+', help='.OBJ files')
+    parser.add_argument('--verify', metavar='LST', help='Compare the decoding of one object with its TASM listing')
+    parser.add_argument('--columns', action='store_true', help='Print columns as JSON instead of text')
+    parser.add_argument('--jobs', '-j', type=int, default=None, help='Worker processes for --columns')
+    args = parser.parse_args()
+
+    if args.verify:
+        result = verify_listing(args.objects[0], args.verify)
+        for mismatch in result['mismatches']:
+            print(f"{mismatch['segment']}:{mismatch['offset']:04X}  {mismatch['listing']:<16}  "
+                  f"{mismatch['source']}  <>  {' / '.join(mismatch['decoded']) or 'nothing decoded'}")
+        print(f"{result['checked']} instructions checked, {len(result['mismatches'])} mismatches")
+        return 1 if result['mismatches'] else 0
+
+    status = 0
+    if args.columns:
+        for path, segments, error in disassemble_corpus(args.objects, args.jobs):
+            if error:
+                logging.error(f"{path}: {error}")
+                status = 1
+                continue
+            for name, columns in segments.items():
+                print(json.dumps({'path': path, 'segment': name, 'mnemonics': MNEMONICS,
+                                  **{key: list(map(int, value)) if key != 'operands' else value
+                                     for key, value in columns.items()}}))
+        return status
+
+    for path in args.objects:
+        try:
+            for name, (code, instructions) in disassemble_object(path).items():
+                print(f"{path}: {name}")
+                for instruction in instructions:
+                    print(format_instruction(instruction, code))
+        except (OSError, ValueError, KeyError, IndexError, struct.error) as e:
+            print(f"Error: {path}: {e}")
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
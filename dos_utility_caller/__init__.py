@@ -1,16 +1,39 @@
-from .dos_caller import call_dos_utility
+from .dos_caller import call_dos_utility, call_dos_utility_batch, stream_dos_utility
 from .config_manager import ConfigManager
 from .batch_generator import BatchGenerator
 from .dosbox_executor import DOSBoxExecutor
-from .output_handler import OutputHandler
+from .emu2_executor import Emu2Executor
+from .emulator_backend import EmulatorBackend, create_executor
+from .output_handler import OutputHandler, SpooledOutput
 from .filename_validator import FilenameValidator, FilenameValidationError
+from .workspace import ScratchWorkspace
+from .result_cache import ResultCache
+from .timing import PhaseTimer
+from .async_dos_caller import async_call_dos_utility, async_call_dos_utility_batch, set_max_concurrency
+from .dosbox_pool import DOSBoxWorker, DOSBoxWorkerPool, get_worker_pool, shutdown_worker_pools
 
 __all__ = [
     'call_dos_utility',
+    'call_dos_utility_batch',
+    'stream_dos_utility',
+    'async_call_dos_utility',
+    'async_call_dos_utility_batch',
+    'set_max_concurrency',
     'ConfigManager',
     'BatchGenerator',
     'DOSBoxExecutor',
+    'Emu2Executor',
+    'EmulatorBackend',
+    'create_executor',
     'OutputHandler',
+    'SpooledOutput',
     'FilenameValidator',
-    'FilenameValidationError'
+    'FilenameValidationError',
+    'ScratchWorkspace',
+    'ResultCache',
+    'PhaseTimer',
+    'DOSBoxWorker',
+    'DOSBoxWorkerPool',
+    'get_worker_pool',
+    'shutdown_worker_pools'
 ]
\ No newline at end of file
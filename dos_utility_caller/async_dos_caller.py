@@ -0,0 +1,246 @@
+"""
+Asynchronous DOS Utility Caller
+
+Coroutine versions of call_dos_utility() and call_dos_utility_batch() for
+running many DOSBox instances from a single event loop. A global semaphore
+caps the number of emulators running at once.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+import weakref
+from typing import List, Dict, Any, Tuple, Union
+
+from .dosbox_executor import DOSBoxExecutionError
+from .emulator_backend import create_executor
+from .filename_validator import FilenameValidationError
+from .output_handler import OutputLineHook, OutputStreamer
+from .workspace import ScratchWorkspace
+from .dos_caller import (
+    _error_result,
+    _apply_adaptive_timeout,
+    _normalize_commands,
+    _prepare_call,
+    _collect_result,
+    _prepare_batch_call,
+    _collect_batch_results,
+    _attach_timings,
+)
+from .timing import PhaseTimer, TimingHook
+
+
+# Maximum number of DOSBox instances running at once across all async calls
+_max_concurrency = os.cpu_count() or 1
+
+# One semaphore per event loop, created on first use
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = \
+    weakref.WeakKeyDictionary()
+
+
+def set_max_concurrency(limit: int) -> None:
+    """
+    Set the maximum number of DOSBox instances run at once by async calls.
+
+    Takes effect for event loops that have not made an async call yet.
+
+    Args:
+        limit: Maximum number of concurrent DOSBox instances
+    """
+    global _max_concurrency
+    if limit < 1:
+        raise ValueError("Concurrency limit must be at least 1")
+    _max_concurrency = limit
+    _semaphores.clear()
+
+
+def get_max_concurrency() -> int:
+    """Get the maximum number of DOSBox instances run at once by async calls."""
+    return _max_concurrency
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    """Get the concurrency semaphore of the running event loop."""
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(_max_concurrency)
+        _semaphores[loop] = semaphore
+    return semaphore
+
+
+async def async_call_dos_utility(
+    command: str,
+    arguments: List[str] = None,
+    source_dir: str = None,
+    tools_dir: str = None,
+    environment: Dict[str, str] = None,
+    dosbox_config: Dict[str, Any] = None,
+    capture_output: bool = True,
+    working_dir: str = None,
+    timeout: float = None,
+    timing_hook: TimingHook = None,
+    on_output_line: OutputLineHook = None,
+    spool_threshold: int = None,
+    spool_dir: str = None,
+    abort_event: threading.Event = None
+) -> Dict[str, Any]:
+    """
+    Execute a DOS utility command without blocking the event loop.
+
+    Cancelling the awaiting task kills DOSBox and re-raises CancelledError.
+
+    Args:
+        command: DOS command to execute
+        arguments: Command arguments
+        source_dir: Source directory to mount as C:
+        tools_dir: Tools directory to mount as D:
+        environment: Additional environment variables
+        dosbox_config: DOSBox configuration overrides
+        capture_output: Whether to capture output
+        working_dir: Working directory for DOSBox
+        timeout: Seconds DOSBox may run before it is killed (defaults to
+                 the configured execution timeout, or the adaptive deadline
+                 when adaptive_timeout is on). Time spent waiting for the
+                 concurrency semaphore does not count.
+        timing_hook: Callable receiving the phase timings of the call
+        on_output_line: Callable receiving each line of output while the
+                        command runs, called from a background thread
+        spool_threshold: Size in bytes above which the output is left in a
+                         spool file instead of being read into 'stdout'
+        spool_dir: Directory for spool files
+        abort_event: Event that kills DOSBox when set
+
+    Returns:
+        Result dictionary in the same shape as call_dos_utility() returns
+    """
+    logger = logging.getLogger(__name__)
+    timer = PhaseTimer()
+    try:
+        logger.debug("async_call_dos_utility called with command=%s, arguments=%s", command, arguments)
+
+        async with _get_semaphore():
+            workspace = ScratchWorkspace()
+            workspace.create()
+            try:
+                prepared = _prepare_call(
+                    workspace, command, arguments, source_dir, tools_dir,
+                    environment, dosbox_config, capture_output, timer=timer
+                )
+                # An explicit timeout wins over the learned deadline
+                tracking = _apply_adaptive_timeout(prepared, command) if timeout is None else None
+                start = time.monotonic()
+                streamer = None
+                if on_output_line is not None and prepared['stdout_file']:
+                    streamer = OutputStreamer(prepared['stdout_file'], on_output_line)
+                    streamer.start()
+                try:
+                    exit_code = await create_executor(prepared['config']).execute_async(
+                        prepared['batch_file'], prepared['config'], working_dir,
+                        batch_command=prepared['batch_command'],
+                        config_dir=workspace.directory,
+                        timeout=timeout,
+                        timer=timer,
+                        abort_event=abort_event
+                    )
+                finally:
+                    if streamer is not None:
+                        streamer.stop()
+                if tracking is not None:
+                    tracking[0].record(tracking[1], time.monotonic() - start)
+                logger.debug("DOSBox execution completed with exit code: %d", exit_code)
+                result = _collect_result(prepared, exit_code, timer, spool_threshold, spool_dir)
+            finally:
+                workspace.cleanup()
+
+    except FilenameValidationError as e:
+        result = _error_result(f'Filename validation error: {str(e)}', 'validation_error')
+    except DOSBoxExecutionError as e:
+        result = _error_result(f'DOSBox execution error: {str(e)}', e.failure)
+    except Exception as e:
+        result = _error_result(f'Unexpected error: {str(e)}', 'unexpected_error')
+
+    _attach_timings([result], timer, timing_hook)
+    return result
+
+
+async def async_call_dos_utility_batch(
+    commands: List[Union[str, Tuple[str, List[str]]]],
+    source_dir: str = None,
+    tools_dir: str = None,
+    environment: Dict[str, str] = None,
+    dosbox_config: Dict[str, Any] = None,
+    working_dir: str = None,
+    stop_on_error: bool = False,
+    timeout: float = None,
+    timing_hook: TimingHook = None,
+    errorlevel_program: str = None
+) -> List[Dict[str, Any]]:
+    """
+    Execute several DOS commands in one DOSBox launch without blocking the
+    event loop.
+
+    Cancelling the awaiting task kills DOSBox and re-raises CancelledError.
+
+    Args:
+        commands: Commands to execute, each either a command string or a
+                  (command, arguments) tuple
+        source_dir: Source directory to mount as C:
+        tools_dir: Tools directory to mount as D:
+        environment: Additional environment variables
+        dosbox_config: DOSBox configuration overrides
+        working_dir: Working directory for DOSBox
+        stop_on_error: Skip the remaining commands once one of them
+                       returns a non-zero errorlevel
+        timeout: Seconds DOSBox may run before it is killed (defaults to
+                 the configured execution timeout)
+        timing_hook: Callable receiving the phase timings of the launch
+        errorlevel_program: Host path of a DOS program printing the
+                            errorlevel (such as ERRORLVL.COM) to capture
+                            exit codes with instead of %ERRORLEVEL%
+
+    Returns:
+        List with one result dictionary per command, in the same shape as
+        call_dos_utility_batch() returns
+    """
+    logger = logging.getLogger(__name__)
+    command_lines = _normalize_commands(commands)
+    if not command_lines:
+        return []
+
+    timer = PhaseTimer()
+    try:
+        logger.debug("async_call_dos_utility_batch called with commands=%s", command_lines)
+
+        async with _get_semaphore():
+            workspace = ScratchWorkspace()
+            workspace.create()
+            try:
+                prepared = _prepare_batch_call(
+                    workspace, command_lines, source_dir, tools_dir,
+                    environment, dosbox_config, stop_on_error, timer=timer,
+                    errorlevel_program=errorlevel_program
+                )
+                exit_code = await create_executor(prepared['config']).execute_async(
+                    prepared['batch_file'], prepared['config'], working_dir,
+                    batch_command=prepared['batch_command'],
+                    config_dir=workspace.directory,
+                    timeout=timeout,
+                    timer=timer
+                )
+                logger.debug("DOSBox execution completed with exit code: %d", exit_code)
+                results = _collect_batch_results(prepared, timer)
+            finally:
+                workspace.cleanup()
+
+    except FilenameValidationError as e:
+        results = [_error_result(f'Filename validation error: {str(e)}', 'validation_error') for _ in command_lines]
+    except DOSBoxExecutionError as e:
+        results = [_error_result(f'DOSBox execution error: {str(e)}', e.failure) for _ in command_lines]
+    except Exception as e:
+        results = [_error_result(f'Unexpected error: {str(e)}', 'unexpected_error') for _ in command_lines]
+
+    _attach_timings(results, timer, timing_hook)
+    return results
@@ -6,8 +6,9 @@ Generates DOS batch files with dynamic variable substitution.
 
 import tempfile
 import os
+import secrets
 import logging
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from pathlib import Path
 
 
@@ -19,7 +20,9 @@ class BatchGenerator:
         pass
     
     def generate_simple_batch(self, command: str, arguments: List[str] = None,
-                             stdout_file: str = "stdout.txt") -> str:
+                             stdout_file: str = "stdout.txt",
+                             exit_code_file: str = "C:\\EXITCODE.TXT",
+                             directory: str = None) -> str:
         """
         Generate a simple batch file for command execution.
         
@@ -27,6 +30,9 @@ class BatchGenerator:
             command: DOS command to execute
             arguments: Command arguments
             stdout_file: File to capture stdout
+            exit_code_file: File to capture the errorlevel
+            directory: Directory to write the batch file to
+                       (defaults to the current directory)
             
         Returns:
             Path to the generated batch file
@@ -39,12 +45,60 @@ class BatchGenerator:
         # Create batch content
         batch_content = f"""@echo on
 {command}{arg_str} > {stdout_file}
-echo %ERRORLEVEL% > C:\\EXITCODE.TXT
+echo %ERRORLEVEL% > {exit_code_file}
 exit
 """
         
         # Write to temporary file
-        return self._write_batch_file(batch_content)
+        return self._write_batch_file(batch_content, directory)
+    
+    def generate_multi_batch(self, commands: List[Tuple[str, List[str]]],
+                             stdout_files: List[str], exit_code_files: List[str],
+                             stop_on_error: bool = False, directory: str = None,
+                             errorlevel_command: str = None) -> str:
+        """
+        Generate a batch file running several commands in sequence.
+        
+        Args:
+            commands: List of (command, arguments) tuples
+            stdout_files: DOS path of the stdout file for each command
+            exit_code_files: DOS path of the errorlevel file for each command
+            stop_on_error: Jump to the end after the first command that
+                           returns a non-zero errorlevel
+            directory: Directory to write the batch file to
+                       (defaults to the current directory)
+            errorlevel_command: DOS program printing the errorlevel, such
+                                as ERRORLVL.COM, for shells where
+                                %ERRORLEVEL% is not set (defaults to
+                                echo %ERRORLEVEL%)
+            
+        Returns:
+            Path to the generated batch file
+        """
+        if not (len(commands) == len(stdout_files) == len(exit_code_files)):
+            raise ValueError("Each command needs its own stdout and errorlevel file")
+        
+        batch_content = "@echo on\n"
+        for (command, arguments), stdout_file, exit_code_file in zip(
+                commands, stdout_files, exit_code_files):
+            # Create argument string
+            arg_str = ""
+            if arguments:
+                arg_str = " " + " ".join(arguments)
+            
+            capture = errorlevel_command or "echo %ERRORLEVEL%"
+            batch_content += f"""{command}{arg_str} > {stdout_file}
+{capture} > {exit_code_file}
+"""
+            if stop_on_error:
+                batch_content += "if errorlevel 1 goto END\n"
+        
+        if stop_on_error:
+            batch_content += ":END\n"
+        batch_content += "exit\n"
+        
+        # Write to temporary file
+        return self._write_batch_file(batch_content, directory)
     
     def generate_compilation_batch(self, command: str, arguments: List[str] = None,
                                   tool_name: str = "compiler", 
@@ -94,13 +148,16 @@ dir {file_pattern}
         # Write to temporary file
         return self._write_batch_file(batch_content)
     
-    def generate_batch_with_case_warning(self, command: str, arguments: List[str] = None) -> str:
+    def generate_batch_with_case_warning(self, command: str, arguments: List[str] = None,
+                                         directory: str = None) -> str:
         """
         Generate a batch file with case warning.
         
         Args:
             command: DOS command to execute
             arguments: Command arguments
+            directory: Directory to write the batch file to
+                       (defaults to the current directory)
             
         Returns:
             Path to the generated batch file
@@ -125,14 +182,16 @@ echo.
 """
         
         # Write to temporary file
-        return self._write_batch_file(batch_content)
+        return self._write_batch_file(batch_content, directory)
     
-    def _write_batch_file(self, content: str) -> str:
+    def _write_batch_file(self, content: str, directory: str = None) -> str:
         """
-        Write batch content to a file in the current directory.
+        Write batch content to a uniquely named file.
         
         Args:
             content: Batch file content
+            directory: Directory to write the batch file to
+                       (defaults to the current directory)
             
         Returns:
             Path to the generated batch file
@@ -141,25 +200,24 @@ echo.
         logger = logging.getLogger(__name__)
         logger.debug("Writing batch file with content:\n%s", content)
         
-        
-        # Create file in current directory with 8.3 compliant name
-        import os
-        import time
-        import random
-        # Generate a unique 8.3 compliant filename in the current directory
-        temp_dir = os.getcwd()
-        
-        # Generate a unique identifier using timestamp and random number
-        unique_id = f"{int(time.time() * 1000000) % 1000000:06d}"
+        temp_dir = directory or os.getcwd()
         
         # Create 8.3 compliant filename (8 chars for name, 3 for extension)
-        # Use first 5 chars of unique_id + fixed prefix for name
-        name_part = f"BAT{unique_id[:5]}"
-        filename = f"{name_part}.BAT"
-        filepath = os.path.join(temp_dir, filename)
-        
-        # Write content to file
-        with open(filepath, 'w') as f:
-            f.write(content)
+        # from a fixed prefix and five random hex digits. O_EXCL makes the
+        # creation fail instead of overwriting another caller's batch file.
+        for _ in range(100):
+            name_part = f"BAT{secrets.token_hex(3)[:5].upper()}"
+            filename = f"{name_part}.BAT"
+            filepath = os.path.join(temp_dir, filename)
+            try:
+                fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            except FileExistsError:
+                continue
+            
+            # Write content to file
+            with os.fdopen(fd, 'w') as f:
+                f.write(content)
             logger.debug("Created batch file: %s", filepath)
-            return filepath
\ No newline at end of file
+            return filepath
+        
+        raise RuntimeError(f"Could not create a unique batch file in {temp_dir}")
@@ -0,0 +1,269 @@
+"""
+Benchmarks for DOS Utility Caller
+
+Measures per-call Python overhead, calls per second at 1..N concurrent
+calls and memory per call, and writes the results as JSON so regressions
+can be tracked. By default DOSBox is replaced by the fake_dosbox stand-in,
+so the benchmarks run on any Linux box.
+
+Usage:
+    python -m dos_utility_caller.benchmark --calls 200 --max-workers 8 --output bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import platform
+import argparse
+import tempfile
+import tracemalloc
+import statistics
+import logging
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any
+
+from .dos_caller import call_dos_utility
+from .async_dos_caller import async_call_dos_utility, set_max_concurrency, get_max_concurrency
+from .dosbox_pool import DOSBoxWorkerPool
+from .fake_dosbox import make_fake_dosbox
+
+
+# Ways of running concurrent calls
+MODES = ('launch', 'async', 'pool')
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    """Summarize a list of seconds in milliseconds."""
+    ordered = sorted(values)
+    return {
+        'mean_ms': statistics.mean(ordered) * 1000,
+        'median_ms': statistics.median(ordered) * 1000,
+        'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        'max_ms': ordered[-1] * 1000
+    }
+
+
+def _dosbox_config(emulator_path: str, latency: float) -> Dict[str, Dict[str, str]]:
+    """Configuration pointing calls at the emulator under test."""
+    return {
+        'execution': {'emulator_path': emulator_path},
+        'fake_dosbox': {'latency': str(latency)}
+    }
+
+
+def measure_overhead(emulator_path: str, source_dir: str, calls: int = 100) -> Dict[str, Any]:
+    """
+    Measure the time a call spends outside the emulator process.
+
+    Args:
+        emulator_path: Emulator executable
+        source_dir: Directory to mount as C:
+        calls: Number of calls
+
+    Returns:
+        Summaries of the total and the Python overhead per call, and the
+        mean seconds per phase
+    """
+    config = _dosbox_config(emulator_path, 0)
+    totals, overheads = [], []
+    phases: Dict[str, List[float]] = {}
+    for _ in range(calls):
+        timings = call_dos_utility("ver", source_dir=source_dir, dosbox_config=config)['timings']
+        totals.append(timings['total'])
+        overheads.append(timings['total'] - timings.get('emulator_spawn', 0)
+                         - timings.get('emulator_runtime', 0))
+        for phase, seconds in timings.items():
+            phases.setdefault(phase, []).append(seconds)
+    return {
+        'calls': calls,
+        'total': _summary(totals),
+        'python_overhead': _summary(overheads),
+        'phases_mean_ms': {phase: statistics.mean(values) * 1000 for phase, values in phases.items()}
+    }
+
+
+def _run_concurrent(mode: str, workers: int, calls: int, config: Dict[str, Dict[str, str]],
+                    source_dir: str) -> List[Dict[str, Any]]:
+    """Run calls with the given concurrency and return their results."""
+    if mode == 'launch':
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(
+                lambda _: call_dos_utility("ver", source_dir=source_dir, dosbox_config=config),
+                range(calls)))
+
+    if mode == 'async':
+        async def run_all():
+            return await asyncio.gather(*(
+                async_call_dos_utility("ver", source_dir=source_dir, dosbox_config=config)
+                for _ in range(calls)))
+        previous = get_max_concurrency()
+        set_max_concurrency(workers)
+        try:
+            return asyncio.run(run_all())
+        finally:
+            set_max_concurrency(previous)
+
+    if mode == 'pool':
+        with DOSBoxWorkerPool(size=workers, source_dir=source_dir, dosbox_config=config,
+                              dosbox_path=config['execution']['emulator_path']) as pool:
+            # Boot every session before the real calls
+            _run_concurrent_on_pool(pool, workers, workers)
+            return _run_concurrent_on_pool(pool, workers, calls)
+
+    raise ValueError(f"Unknown mode '{mode}', expected one of: {', '.join(MODES)}")
+
+
+def _run_concurrent_on_pool(pool: DOSBoxWorkerPool, workers: int, calls: int) -> List[Dict[str, Any]]:
+    """Run calls on a worker pool from as many threads as it has sessions."""
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda _: call_dos_utility("ver", worker_pool=pool), range(calls)))
+
+
+def measure_throughput(emulator_path: str, source_dir: str, calls: int = 100,
+                       max_workers: int = None, latency: float = 0.05,
+                       modes: List[str] = MODES) -> List[Dict[str, Any]]:
+    """
+    Measure calls per second at 1..max_workers concurrent calls.
+
+    Args:
+        emulator_path: Emulator executable
+        source_dir: Directory to mount as C:
+        calls: Number of calls per measurement
+        max_workers: Highest concurrency (defaults to the CPU count)
+        latency: Simulated emulator startup in seconds
+        modes: Ways of running concurrent calls: 'launch' (a thread per
+               call launching the emulator), 'async' (async calls limited
+               by the concurrency semaphore), 'pool' (warm worker pool)
+
+    Returns:
+        One entry per mode and concurrency with calls per second and the
+        number of failed calls
+    """
+    logger = logging.getLogger(__name__)
+    config = _dosbox_config(emulator_path, latency)
+    measurements = []
+    for mode in modes:
+        for workers in range(1, (max_workers or os.cpu_count() or 1) + 1):
+            start = time.perf_counter()
+            results = _run_concurrent(mode, workers, calls, config, source_dir)
+            elapsed = time.perf_counter() - start
+            measurements.append({
+                'mode': mode,
+                'workers': workers,
+                'calls': calls,
+                'seconds': elapsed,
+                'calls_per_second': calls / elapsed,
+                'failures': sum(1 for result in results if not result['success'])
+            })
+            logger.info("%s x%d: %.1f calls/s", mode, workers, calls / elapsed)
+    return measurements
+
+
+def measure_memory(emulator_path: str, source_dir: str, calls: int = 50) -> Dict[str, Any]:
+    """
+    Measure Python memory allocated per call with tracemalloc.
+
+    Args:
+        emulator_path: Emulator executable
+        source_dir: Directory to mount as C:
+        calls: Number of calls
+
+    Returns:
+        Peak bytes allocated during a call and bytes still held after
+        the calls, per call
+    """
+    config = _dosbox_config(emulator_path, 0)
+    # Warm up imports and caches so they are not counted
+    call_dos_utility("ver", source_dir=source_dir, dosbox_config=config)
+
+    tracemalloc.start()
+    try:
+        peaks = []
+        baseline = tracemalloc.get_traced_memory()[0]
+        for _ in range(calls):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            call_dos_utility("ver", source_dir=source_dir, dosbox_config=config)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+        retained = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+    return {
+        'calls': calls,
+        'peak_bytes_per_call': statistics.mean(peaks),
+        'max_peak_bytes': max(peaks),
+        'retained_bytes_per_call': retained / calls
+    }
+
+
+def run_benchmarks(calls: int = 100, max_workers: int = None, latency: float = 0.05,
+                   emulator_path: str = None, modes: List[str] = MODES) -> Dict[str, Any]:
+    """
+    Run every benchmark.
+
+    Args:
+        calls: Number of calls per measurement
+        max_workers: Highest concurrency for the throughput benchmark
+        latency: Simulated emulator startup for the throughput benchmark
+        emulator_path: Emulator executable (defaults to the fake_dosbox stand-in)
+        modes: Concurrency modes for the throughput benchmark
+
+    Returns:
+        Benchmark report
+    """
+    work_dir = tempfile.mkdtemp()
+    try:
+        source_dir = os.path.join(work_dir, "C")
+        os.mkdir(source_dir)
+        emulator = emulator_path or make_fake_dosbox(work_dir)
+        return {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'environment': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'emulator': emulator_path or 'fake_dosbox'
+            },
+            'overhead': measure_overhead(emulator, source_dir, calls),
+            'throughput': measure_throughput(emulator, source_dir, calls, max_workers, latency, modes),
+            'memory': measure_memory(emulator, source_dir, max(1, calls // 2))
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main() -> None:
+    """Main function for the benchmark command."""
+    parser = argparse.ArgumentParser(description='Benchmark the DOS utility caller')
+    parser.add_argument('--calls', '-n', type=int, default=100,
+                        help='Calls per measurement (default: 100)')
+    parser.add_argument('--max-workers', '-j', type=int, default=None,
+                        help='Highest concurrency to measure (default: CPU count)')
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='Simulated emulator startup in seconds (default: 0.05)')
+    parser.add_argument('--mode', action='append', dest='modes', choices=MODES,
+                        help='Concurrency mode to measure (can be used multiple times, default: all)')
+    parser.add_argument('--emulator', help='Emulator to benchmark instead of the stand-in')
+    parser.add_argument('--output', '-o', help='File to write the JSON report to (default: stdout)')
+    parser.add_argument('--debug', action='store_true', help='Enable debug logging')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    report = run_benchmarks(args.calls, args.max_workers, args.latency, args.emulator,
+                            args.modes or MODES)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -14,7 +14,7 @@ from pathlib import Path
 # Add the parent directory to the path so we can import dos_utility_caller
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from dos_utility_caller import call_dos_utility
+from dos_utility_caller import call_dos_utility, ConfigManager
 
 
 def parse_arguments() -> argparse.Namespace:
@@ -29,6 +29,7 @@ Examples:
   %(prog)s echo Hello World
   %(prog)s cl /c test.c
   %(prog)s --config config.doscfg dir *.txt
+  %(prog)s --profile max-throughput bcc -c test.c
   %(prog)s -c /path/to/source -d /path/to/tools dir C:\\
         """
     )
@@ -57,6 +58,14 @@ Examples:
         help='Timeout in seconds (default: 300)'
     )
     
+    parser.add_argument(
+        '--profile',
+        '-p',
+        type=str,
+        choices=list(ConfigManager.PROFILES) + [ConfigManager.TUNED_PROFILE],
+        help='Execution profile (default: accurate; tuned: the one chosen by profile_tuner)'
+    )
+    
     parser.add_argument(
         '--no-capture',
         action='store_true',
@@ -184,6 +193,10 @@ def main() -> None:
             dosbox_config['execution'] = {}
         dosbox_config['execution']['timeout'] = str(args.timeout)
     
+    # Select the execution profile if provided
+    if args.profile:
+        dosbox_config.setdefault('execution', {})['profile'] = args.profile
+    
     # Log the command being executed
     logger.debug("Executing command: %s %s", args.command, ' '.join(args.arguments))
     logger.debug("Environment variables: %s", environment)
@@ -5,15 +5,73 @@ Handles DOSBox configuration, environment variables, and mount points.
 """
 
 import configparser
+import json
 import os
 import re
 from typing import Dict, Any, Optional
 from pathlib import Path
 
 
+_THROUGHPUT_SETTINGS = {
+    'cpu': {
+        'core': 'dynamic',
+        'cputype': 'auto',
+        'cycles': 'max'
+    },
+    'dosbox': {
+        'machine': 'vgaonly'
+    },
+    'render': {
+        'frameskip': '10'
+    },
+    'mixer': {
+        'nosound': 'true'
+    },
+    'sblaster': {
+        'sbtype': 'none'
+    },
+    'gus': {
+        'gus': 'false'
+    },
+    'speaker': {
+        'pcspeaker': 'false',
+        'tandy': 'off',
+        'disney': 'false'
+    },
+    'midi': {
+        'mpu401': 'none'
+    },
+    'joystick': {
+        'joysticktype': 'none'
+    }
+}
+
+
 class ConfigManager:
     """Manages configuration for DOSBox execution environment."""
     
+    # Named execution profiles, applied on top of the default configuration
+    PROFILES = {
+        # Period-accurate speed, the default configuration unchanged
+        'accurate': {},
+        # Dynamic core at full speed with sound and video work cut down
+        'max-throughput': _THROUGHPUT_SETTINGS,
+        # max-throughput without a window or audio device
+        'headless': dict(_THROUGHPUT_SETTINGS, sdl={'output': 'surface'}, execution={
+            'sdl_videodriver': 'dummy',
+            'sdl_audiodriver': 'dummy'
+        })
+    }
+    
+    DEFAULT_PROFILE = 'accurate'
+    
+    # Pseudo profile resolved to the result of the last profile_tuner run
+    TUNED_PROFILE = 'tuned'
+    
+    # Where profile_tuner stores its result
+    TUNED_PROFILE_FILE = os.path.join(
+        os.path.expanduser("~"), ".config", "dos_utility_caller", "tuned_profile.json")
+    
     def __init__(self, config_file: Optional[str] = None):
         """
         Initialize the configuration manager.
@@ -200,7 +258,9 @@ class ConfigManager:
         
         
         self.config['execution'] = {
-            'timeout': '300'  # 5 minutes default timeout
+            'timeout': '300',  # 5 minutes default timeout
+            'stall_timeout': '0',  # seconds without progress before killing, 0 is off, see progress_watchdog.py
+            'backend': 'dosbox'  # emulator backend, see emulator_backend.py
         }
     
     def get_dosbox_config(self) -> Dict[str, Dict[str, str]]:
@@ -309,6 +369,44 @@ class ConfigManager:
             for key, value in settings.items():
                 self.config[section][key] = str(value)
     
+    @classmethod
+    def load_tuned_profile(cls, filepath: str = None) -> str:
+        """
+        Get the profile chosen by the last profile_tuner run.
+        
+        Args:
+            filepath: File the tuner result was saved to
+                      (defaults to TUNED_PROFILE_FILE)
+            
+        Returns:
+            Profile name, or DEFAULT_PROFILE if the tuner has not been run
+        """
+        try:
+            with open(filepath or cls.TUNED_PROFILE_FILE, 'r') as f:
+                profile = json.load(f).get('profile')
+        except (OSError, ValueError):
+            return cls.DEFAULT_PROFILE
+        return profile if profile in cls.PROFILES else cls.DEFAULT_PROFILE
+    
+    def apply_profile(self, name: str) -> None:
+        """
+        Apply a named execution profile to the configuration.
+        
+        Args:
+            name: Profile name from PROFILES, or 'tuned' for the profile
+                  chosen by profile_tuner
+            
+        Raises:
+            ValueError: If the profile is unknown
+        """
+        if name == self.TUNED_PROFILE:
+            name = self.load_tuned_profile()
+        if name not in self.PROFILES:
+            raise ValueError(f"Unknown execution profile '{name}', expected one of: "
+                             f"{', '.join(list(self.PROFILES) + [self.TUNED_PROFILE])}")
+        self.update_config(self.PROFILES[name])
+        self.update_config({'execution': {'profile': name}})
+    
     def save_config(self, filepath: str) -> None:
         """
         Save configuration to a file.
@@ -0,0 +1,187 @@
+"""
+Compiler Diagnostics for DOS Utility Caller
+
+Recognizes the error and warning lines of Borland/Turbo C++ (BCC, TCC,
+TLINK, TASM, MAKE) and Microsoft C (CL, LINK, MASM, NMAKE) in command
+output, and can abort a running build as soon as it is certain to fail.
+"""
+
+import re
+import threading
+import logging
+from typing import Any, Dict, List, Optional
+
+
+# Severities from least to most serious
+SEVERITIES = ('warning', 'error', 'fatal')
+
+# Borland compilers: "Error CRC16.CPP 12: Undefined symbol 'x'"
+_BORLAND_LOCATED = re.compile(r'^(Error|Warning|Fatal)\s+(\S+)\s+(\d+):\s*(.*)$', re.IGNORECASE)
+# TASM: "**Error** CRC16.ASM(12) Undefined symbol: X"
+_TASM_LOCATED = re.compile(r'^\*+(Error|Warning|Fatal)\*+\s+(\S+?)\((\d+)\)\s*(.*)$', re.IGNORECASE)
+# TASM without a location: "**Fatal** Command line: Can't locate file: X"
+_TASM = re.compile(r'^\*+(Error|Warning|Fatal)\*+\s+(.*)$', re.IGNORECASE)
+# TLINK and MAKE: "Fatal: Unable to open file 'X.OBJ'"
+_BORLAND = re.compile(r'^(Error|Warning|Fatal):\s*(.*)$', re.IGNORECASE)
+# Borland MAKE when a command fails: "** error 1 ** deleting CRC16.OBJ"
+_MAKE_FAILED = re.compile(r'^\*\*\s*error\s+(\d+)\s*\*\*\s*(.*)$', re.IGNORECASE)
+# Microsoft tools: "TEST.C(12) : error C2065: 'x' : undefined",
+# "LINK : fatal error L1093: object not found"
+_MSC = re.compile(
+    r'^(.*?)(?:\((\d+)\))?\s*:\s*(fatal error|error|warning)\s+([A-Z]\d{4})\s*:\s*(.*)$',
+    re.IGNORECASE)
+
+
+def _diagnostic(severity: str, message: str, text: str, file: str = None,
+                line: str = None, code: str = None) -> Dict[str, Any]:
+    """Build a diagnostic dictionary."""
+    return {
+        'file': file,
+        'line': int(line) if line else None,
+        'severity': severity,
+        'code': code,
+        'message': message.strip(),
+        'text': text
+    }
+
+
+def parse_diagnostic(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse one line of compiler, assembler, linker or MAKE output.
+
+    Args:
+        text: Output line
+
+    Returns:
+        {
+            'file': str or None,     # Source file named by the diagnostic
+            'line': int or None,     # Line number in the file
+            'severity': str,         # 'warning', 'error' or 'fatal'
+            'code': str or None,     # Message number, e.g. 'C2065'
+            'message': str,          # Message text
+            'text': str              # The line as printed
+        }
+        or None if the line is not a diagnostic
+    """
+    line = text.strip()
+    if not line:
+        return None
+
+    match = _MSC.match(line)
+    if match:
+        location, number, severity, code, message = match.groups()
+        severity = 'fatal' if severity.lower() == 'fatal error' else severity.lower()
+        location = location.strip()
+        # "LINK : ..." names the tool, not a file
+        file = location if number or '.' in location else None
+        return _diagnostic(severity, message, text, file, number, code.upper())
+
+    match = _BORLAND_LOCATED.match(line) or _TASM_LOCATED.match(line)
+    if match:
+        severity, file, number, message = match.groups()
+        return _diagnostic(severity.lower(), message, text, file, number)
+
+    match = _TASM.match(line) or _BORLAND.match(line)
+    if match:
+        severity, message = match.groups()
+        return _diagnostic(severity.lower(), message, text)
+
+    match = _MAKE_FAILED.match(line)
+    if match:
+        status, message = match.groups()
+        return _diagnostic('error', f"Command failed with errorlevel {status} {message}", text)
+
+    return None
+
+
+def parse_diagnostics(output: str) -> List[Dict[str, Any]]:
+    """
+    Parse every diagnostic in command output.
+
+    Args:
+        output: Command output
+
+    Returns:
+        Diagnostics in output order, see parse_diagnostic()
+    """
+    diagnostics = []
+    for line in output.splitlines():
+        diagnostic = parse_diagnostic(line)
+        if diagnostic is not None:
+            diagnostics.append(diagnostic)
+    return diagnostics
+
+
+def format_diagnostic(diagnostic: Dict[str, Any]) -> str:
+    """
+    Format a diagnostic as "FILE(LINE): severity CODE: message".
+
+    Args:
+        diagnostic: Diagnostic from parse_diagnostic()
+
+    Returns:
+        One-line description
+    """
+    location = diagnostic['file'] or ''
+    if diagnostic['line'] is not None:
+        location += f"({diagnostic['line']})"
+    severity = diagnostic['severity']
+    if diagnostic['code']:
+        severity += f" {diagnostic['code']}"
+    return f"{location}: {severity}: {diagnostic['message']}" if location else \
+        f"{severity}: {diagnostic['message']}"
+
+
+class DiagnosticCollector:
+    """
+    Collects diagnostics from streamed output and signals when to give up.
+
+    Pass the collector as on_output_line and its abort_event as
+    abort_event to call_dos_utility(); with fail_fast set, the emulator is
+    killed as soon as a diagnostic of stop_severity or worse appears.
+    """
+
+    def __init__(self, fail_fast: bool = True, stop_severity: str = 'fatal'):
+        """
+        Initialize the collector.
+
+        Args:
+            fail_fast: Whether to request an abort on a serious diagnostic
+            stop_severity: Least serious severity that aborts the build,
+                           'fatal' or 'error'
+
+        Raises:
+            ValueError: If stop_severity is unknown
+        """
+        if stop_severity not in SEVERITIES:
+            raise ValueError(f"Unknown severity '{stop_severity}', expected one of: {', '.join(SEVERITIES)}")
+        self.fail_fast = fail_fast
+        self.stop_severity = stop_severity
+        self.diagnostics: List[Dict[str, Any]] = []
+        self.abort_event = threading.Event()
+        # Diagnostic that triggered the abort
+        self.abort_reason: Optional[Dict[str, Any]] = None
+
+    def __call__(self, line: str) -> None:
+        """Take one output line."""
+        diagnostic = parse_diagnostic(line)
+        if diagnostic is None:
+            return
+        self.diagnostics.append(diagnostic)
+        if (self.fail_fast and self.abort_reason is None and
+                SEVERITIES.index(diagnostic['severity']) >= SEVERITIES.index(self.stop_severity)):
+            logging.getLogger(__name__).info("Aborting on %s", format_diagnostic(diagnostic))
+            self.abort_reason = diagnostic
+            self.abort_event.set()
+
+    def count(self, severity: str) -> int:
+        """
+        Count the diagnostics of a severity.
+
+        Args:
+            severity: 'warning', 'error' or 'fatal'
+
+        Returns:
+            Number of diagnostics
+        """
+        return sum(1 for diagnostic in self.diagnostics if diagnostic['severity'] == severity)
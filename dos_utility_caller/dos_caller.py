@@ -6,16 +6,491 @@ while handling environment setup, argument passing, and output capture.
 """
 
 import os
-import tempfile
+import time
+import queue
+import shutil
 import logging
-from typing import List, Dict, Any, Optional
-from pathlib import Path
+import threading
+from typing import List, Dict, Any, Iterator, Optional, Tuple, Union
 
 from .config_manager import ConfigManager
 from .batch_generator import BatchGenerator
-from .dosbox_executor import DOSBoxExecutor, DOSBoxExecutionError
-from .output_handler import OutputHandler
+from .dosbox_executor import DOSBoxExecutionError
+from .emulator_backend import create_executor
+from .output_handler import OutputHandler, OutputLineHook, OutputStreamer
 from .filename_validator import FilenameValidator, FilenameValidationError
+from .dosbox_pool import DOSBoxWorkerPool
+from .workspace import ScratchWorkspace
+from .result_cache import ResultCache
+from .timing import PhaseTimer, TimingHook, optional_phase
+from .progress_watchdog import DurationHistory, get_duration_history, adaptive_timeout
+
+
+def _error_result(stderr: str, failure: str = 'unexpected_error') -> Dict[str, Any]:
+    """Build the result dictionary reported for a failed call."""
+    return {
+        'stdout': '',
+        'stderr': stderr,
+        'exit_code': 1,
+        'success': False,
+        'failure': failure
+    }
+
+
+def _validate_arguments(arguments: List[str] = None) -> None:
+    """
+    Validate the filenames among command arguments.
+    
+    Args:
+        arguments: Command arguments
+        
+    Raises:
+        FilenameValidationError: If any filename is incompatible with DOS 8.3
+    """
+    if arguments:
+        # Only validate arguments that don't start with / or - (command-line flags)
+        filenames = [arg for arg in arguments if not arg.startswith('/') and not arg.startswith('-')]
+        if filenames:
+            logging.getLogger(__name__).debug("Validating filenames: %s", filenames)
+            FilenameValidator.validate_filenames(filenames)
+
+
+def _build_config_manager(source_dir: str = None, tools_dir: str = None,
+                          environment: Dict[str, str] = None,
+                          dosbox_config: Dict[str, Any] = None) -> ConfigManager:
+    """
+    Build the configuration for a call from its parameters.
+    
+    Args:
+        source_dir: Source directory to mount as C:
+        tools_dir: Tools directory to mount as D:
+        environment: Additional environment variables
+        dosbox_config: DOSBox configuration overrides
+        
+    Returns:
+        Configured ConfigManager
+    """
+    logger = logging.getLogger(__name__)
+    config_manager = ConfigManager()
+    
+    # Apply the execution profile first so explicit settings override it
+    profile = (dosbox_config or {}).get('execution', {}).get('profile')
+    if profile:
+        logger.debug("Applying execution profile: %s", profile)
+        config_manager.apply_profile(profile)
+    
+    # Update configuration if provided
+    if dosbox_config:
+        logger.debug("Updating configuration: %s", dosbox_config)
+        config_manager.update_config(dosbox_config)
+    
+    # Update mount points if provided
+    mount_updates = {}
+    if source_dir:
+        mount_updates['c'] = source_dir
+    if tools_dir:
+        mount_updates['d'] = tools_dir
+        
+    if mount_updates:
+        logger.debug("Updating mount points: %s", mount_updates)
+        config_manager.update_config({'mount': mount_updates})
+    
+    # Update environment variables if provided
+    if environment:
+        logger.debug("Updating environment variables: %s", environment)
+        config_manager.update_config({'environment': environment})
+    
+    return config_manager
+
+
+def _get_execution_config(config_manager: ConfigManager,
+                          environment: Dict[str, str] = None,
+                          workspace: ScratchWorkspace = None) -> Dict[str, Dict[str, str]]:
+    """
+    Get the DOSBox configuration passed to the executor.
+    
+    Args:
+        config_manager: Configuration for the call
+        environment: Environment variables given for the call
+        workspace: Scratch workspace to mount for the call
+        
+    Returns:
+        DOSBox configuration dictionary
+    """
+    config = config_manager.get_dosbox_config()
+    
+    # Update environment variables with path conversion
+    # Only add environment variables if they were explicitly provided
+    if environment:
+        env_vars = config_manager.get_environment_vars_with_path_conversion()
+        if 'environment' in config:
+            config['environment'].update(env_vars)
+        else:
+            config['environment'] = env_vars
+    
+    if workspace is not None:
+        config.setdefault('mount', {})[workspace.drive] = workspace.directory
+    return config
+
+
+def _convert_command_line(config_manager: ConfigManager, command: str,
+                          arguments: List[str] = None):
+    """
+    Convert a command and its arguments to DOS paths.
+    
+    Args:
+        config_manager: Configuration holding the mount points
+        command: Command to convert
+        arguments: Arguments to convert
+        
+    Returns:
+        Tuple of the DOS command and the list of DOS arguments
+    """
+    dos_command = config_manager.convert_path_to_dosbox(command)
+    dos_arguments = []
+    if arguments:
+        for arg in arguments:
+            # Don't convert command-line switches
+            if arg.startswith('/') or arg.startswith('-'):
+                dos_arguments.append(arg)
+            else:
+                dos_arguments.append(config_manager.convert_path_to_dosbox(arg))
+    return dos_command, dos_arguments
+
+
+def _normalize_commands(commands: List[Union[str, Tuple[str, List[str]]]]) -> List[Tuple[str, List[str]]]:
+    """Turn batch command entries into (command, arguments) tuples."""
+    return [
+        (command, []) if isinstance(command, str) else (command[0], list(command[1] or []))
+        for command in commands
+    ]
+
+
+def _prepare_call(workspace: ScratchWorkspace, command: str, arguments: List[str] = None,
+                  source_dir: str = None, tools_dir: str = None,
+                  environment: Dict[str, str] = None, dosbox_config: Dict[str, Any] = None,
+                  capture_output: bool = True, timer: PhaseTimer = None,
+                  validate: bool = True) -> Dict[str, Any]:
+    """
+    Validate a call and write its batch file into the workspace.
+    
+    Args:
+        workspace: Scratch workspace of the call
+        command: DOS command to execute
+        arguments: Command arguments
+        source_dir: Source directory to mount as C:
+        tools_dir: Tools directory to mount as D:
+        environment: Additional environment variables
+        dosbox_config: DOSBox configuration overrides
+        capture_output: Whether to capture output
+        timer: Timer receiving the preparation phases
+        validate: Whether to validate the arguments (skipped when the
+                  caller already did)
+        
+    Returns:
+        Dictionary with the batch file, the DOSBox configuration, the DOS
+        command line invoking the batch file and the output file paths
+        
+    Raises:
+        FilenameValidationError: If an argument is not a valid DOS filename
+    """
+    logger = logging.getLogger(__name__)
+    
+    # Validate filenames in arguments (skip command-line flags)
+    if validate:
+        with optional_phase(timer, 'validation'):
+            _validate_arguments(arguments)
+    
+    # Initialize components
+    logger.debug("Initializing components")
+    with optional_phase(timer, 'config_build'):
+        config_manager = _build_config_manager(source_dir, tools_dir, environment, dosbox_config)
+        config = _get_execution_config(config_manager, environment, workspace)
+    batch_generator = BatchGenerator()
+    
+    # Convert command and arguments to DOS paths
+    with optional_phase(timer, 'path_conversion'):
+        dos_command, dos_arguments = _convert_command_line(config_manager, command, arguments)
+    
+    prepared = {
+        'capture_output': capture_output,
+        'stdout_file': None,
+        'exit_code_file': None
+    }
+    
+    # Generate batch file
+    with optional_phase(timer, 'batch_generation'):
+        if capture_output:
+            prepared['stdout_file'] = workspace.path("STDOUT.TXT")
+            prepared['exit_code_file'] = workspace.path("EXITCODE.TXT")
+            # Create empty file
+            open(prepared['stdout_file'], 'w').close()
+            logger.debug("Created temporary file: stdout=%s", prepared['stdout_file'])
+            
+            # Pass absolute paths to the batch generator
+            batch_file = batch_generator.generate_simple_batch(
+                dos_command, dos_arguments, workspace.dos_path("STDOUT.TXT"),
+                workspace.dos_path("EXITCODE.TXT"), directory=workspace.directory
+            )
+            logger.debug("Generated simple batch file: %s", batch_file)
+        else:
+            batch_file = batch_generator.generate_batch_with_case_warning(
+                dos_command, dos_arguments, directory=workspace.directory)
+            logger.debug("Generated batch file with case warning: %s", batch_file)
+    
+    prepared['batch_file'] = batch_file
+    prepared['batch_command'] = workspace.dos_path(os.path.basename(batch_file))
+    prepared['config'] = config
+    return prepared
+
+
+def _collect_result(prepared: Dict[str, Any], exit_code: int,
+                    timer: PhaseTimer = None, spool_threshold: int = None,
+                    spool_dir: str = None) -> Dict[str, Any]:
+    """
+    Build the result of a call once DOSBox has exited.
+    
+    Args:
+        prepared: Dictionary returned by _prepare_call()
+        exit_code: Exit code of the DOSBox process
+        timer: Timer receiving the output_capture phase
+        spool_threshold: Output size in bytes above which stdout is spooled
+        spool_dir: Directory for spool files
+        
+    Returns:
+        Result dictionary
+    """
+    logger = logging.getLogger(__name__)
+    
+    # Process output
+    if prepared['capture_output']:
+        output_handler = OutputHandler()
+        logger.debug("Capturing output from files: stdout=%s", prepared['stdout_file'])
+        with optional_phase(timer, 'output_capture'):
+            output = output_handler.capture_output(
+                prepared['stdout_file'], spool_threshold, spool_dir)
+            result = output_handler.process_output(
+                output['stdout'], exit_code_file=prepared['exit_code_file'])
+            if 'stdout_spool' in output:
+                result['stdout_spool'] = output['stdout_spool']
+        logger.debug("Captured output: %s", output)
+        logger.debug("Processed output result: %s", result)
+    else:
+        result = {
+            'stdout': '',
+            'stderr': '',
+            'exit_code': exit_code,
+            'success': exit_code == 0
+        }
+        logger.debug("No output capture, result: %s", result)
+    return result
+
+
+def _apply_adaptive_timeout(prepared: Dict[str, Any], command: str) -> Optional[Tuple[DurationHistory, str]]:
+    """
+    Shorten the timeout of a prepared call to the deadline its history allows.
+    
+    Args:
+        prepared: Dictionary returned by _prepare_call()
+        command: DOS command of the call
+        
+    Returns:
+        Tuple of the duration history and the key to record the run time
+        under, or None if adaptive timeouts are off
+    """
+    config = prepared['config']
+    history = get_duration_history(config)
+    if history is None:
+        return None
+    key = DurationHistory.make_key(command, config)
+    execution = config.setdefault('execution', {})
+    timeout = float(execution.get('timeout', 300))
+    execution['timeout'] = str(adaptive_timeout(history, key, config, timeout))
+    return history, key
+
+
+def _execute_prepared(prepared: Dict[str, Any], workspace: ScratchWorkspace,
+                      working_dir: str = None, timer: PhaseTimer = None,
+                      on_output_line: OutputLineHook = None, command: str = None,
+                      abort_event: threading.Event = None) -> int:
+    """
+    Run a prepared call in its emulator, streaming its output if asked to.
+    
+    Args:
+        prepared: Dictionary returned by _prepare_call()
+        workspace: Scratch workspace of the call
+        working_dir: Working directory for the emulator
+        timer: Timer receiving the emulator phases
+        on_output_line: Callable receiving each output line as it is written
+        command: DOS command of the call, for adaptive timeouts
+        abort_event: Event that stops the emulator when set
+        
+    Returns:
+        Exit code of the emulator
+    """
+    tracking = _apply_adaptive_timeout(prepared, command) if command else None
+    if tracking is None:
+        return _run_executor(prepared, workspace, working_dir, timer, on_output_line, abort_event)
+    start = time.monotonic()
+    exit_code = _run_executor(prepared, workspace, working_dir, timer, on_output_line, abort_event)
+    tracking[0].record(tracking[1], time.monotonic() - start)
+    return exit_code
+
+
+def _run_executor(prepared: Dict[str, Any], workspace: ScratchWorkspace,
+                  working_dir: str = None, timer: PhaseTimer = None,
+                  on_output_line: OutputLineHook = None,
+                  abort_event: threading.Event = None) -> int:
+    """Start the emulator of a prepared call and wait for it."""
+    executor = create_executor(prepared['config'])
+    
+    def execute():
+        return executor.execute(
+            prepared['batch_file'], prepared['config'], working_dir,
+            batch_command=prepared['batch_command'],
+            config_dir=workspace.directory,
+            timer=timer,
+            abort_event=abort_event
+        )
+    
+    if on_output_line is None or not prepared['stdout_file']:
+        return execute()
+    with OutputStreamer(prepared['stdout_file'], on_output_line):
+        return execute()
+
+
+def _replay_output(result: Dict[str, Any], on_output_line: OutputLineHook = None) -> None:
+    """Pass the captured output of a call that could not be streamed to the callback."""
+    if on_output_line is None or not result.get('stdout'):
+        return
+    for line in result['stdout'].splitlines():
+        try:
+            on_output_line(line)
+        except Exception:
+            logging.getLogger(__name__).warning("Output line callback failed", exc_info=True)
+
+
+def _prepare_batch_call(workspace: ScratchWorkspace, command_lines: List[Tuple[str, List[str]]],
+                        source_dir: str = None, tools_dir: str = None,
+                        environment: Dict[str, str] = None, dosbox_config: Dict[str, Any] = None,
+                        stop_on_error: bool = False, timer: PhaseTimer = None,
+                        errorlevel_program: str = None) -> Dict[str, Any]:
+    """
+    Validate a batch of commands and write their batch file into the workspace.
+    
+    Args:
+        workspace: Scratch workspace of the call
+        command_lines: List of (command, arguments) tuples
+        source_dir: Source directory to mount as C:
+        tools_dir: Tools directory to mount as D:
+        environment: Additional environment variables
+        dosbox_config: DOSBox configuration overrides
+        stop_on_error: Skip the remaining commands after a failure
+        timer: Timer receiving the preparation phases
+        errorlevel_program: Host path of a DOS program printing the
+                            errorlevel, copied into the workspace
+        
+    Returns:
+        Dictionary with the batch file, the DOSBox configuration, the DOS
+        command line invoking the batch file and the per-command output files
+        
+    Raises:
+        FilenameValidationError: If an argument is not a valid DOS filename
+    """
+    logger = logging.getLogger(__name__)
+    with optional_phase(timer, 'validation'):
+        for _, arguments in command_lines:
+            _validate_arguments(arguments)
+    
+    with optional_phase(timer, 'config_build'):
+        config_manager = _build_config_manager(source_dir, tools_dir, environment, dosbox_config)
+        config = _get_execution_config(config_manager, environment, workspace)
+    batch_generator = BatchGenerator()
+    
+    with optional_phase(timer, 'path_conversion'):
+        dos_command_lines = [
+            _convert_command_line(config_manager, command, arguments)
+            for command, arguments in command_lines
+        ]
+    
+    # Every command gets its own numbered stdout and errorlevel file
+    stdout_names = [f"OUT{index:05d}.TXT" for index in range(len(command_lines))]
+    exit_code_names = [f"ERL{index:05d}.TXT" for index in range(len(command_lines))]
+    
+    with optional_phase(timer, 'batch_generation'):
+        errorlevel_command = None
+        if errorlevel_program:
+            program_name = os.path.basename(errorlevel_program).upper()
+            shutil.copyfile(errorlevel_program, workspace.path(program_name))
+            errorlevel_command = workspace.dos_path(program_name)
+        batch_file = batch_generator.generate_multi_batch(
+            dos_command_lines,
+            [workspace.dos_path(name) for name in stdout_names],
+            [workspace.dos_path(name) for name in exit_code_names],
+            stop_on_error=stop_on_error,
+            directory=workspace.directory,
+            errorlevel_command=errorlevel_command
+        )
+    logger.debug("Generated multi-command batch file: %s", batch_file)
+    
+    return {
+        'batch_file': batch_file,
+        'batch_command': workspace.dos_path(os.path.basename(batch_file)),
+        'config': config,
+        'stdout_files': [workspace.path(name) for name in stdout_names],
+        'exit_code_files': [workspace.path(name) for name in exit_code_names]
+    }
+
+
+def _collect_batch_results(prepared: Dict[str, Any], timer: PhaseTimer = None) -> List[Dict[str, Any]]:
+    """
+    Build one result per command once DOSBox has exited.
+    
+    Args:
+        prepared: Dictionary returned by _prepare_batch_call()
+        timer: Timer receiving the output_capture phase
+        
+    Returns:
+        List of result dictionaries
+    """
+    output_handler = OutputHandler()
+    results = []
+    for stdout_file, exit_code_file in zip(prepared['stdout_files'], prepared['exit_code_files']):
+        if not os.path.exists(exit_code_file):
+            # The batch file never reached this command
+            results.append({
+                'stdout': '',
+                'stderr': '',
+                'exit_code': -1,
+                'success': False,
+                'skipped': True
+            })
+            continue
+        with optional_phase(timer, 'output_capture'):
+            output = output_handler.capture_output(stdout_file)
+            results.append(output_handler.process_output(output['stdout'], exit_code_file=exit_code_file))
+    return results
+
+
+def _attach_timings(results: List[Dict[str, Any]], timer: PhaseTimer,
+                    timing_hook: TimingHook = None) -> None:
+    """
+    Add the phase timings of a call to its results and pass them to the hook.
+    
+    Args:
+        results: Result dictionaries of the call
+        timer: Timer of the call
+        timing_hook: Callable receiving the timings
+    """
+    timings = timer.as_dict()
+    for result in results:
+        result['timings'] = dict(timings)
+    if timing_hook is not None:
+        try:
+            timing_hook(timings)
+        except Exception:
+            # A broken hook must not turn a finished call into a failure
+            logging.getLogger(__name__).warning("Timing hook failed", exc_info=True)
 
 
 def call_dos_utility(
@@ -26,7 +501,15 @@ def call_dos_utility(
     environment: Dict[str, str] = None,
     dosbox_config: Dict[str, Any] = None,
     capture_output: bool = True,
-    working_dir: str = None
+    working_dir: str = None,
+    worker_pool: DOSBoxWorkerPool = None,
+    result_cache: ResultCache = None,
+    bypass_cache: bool = False,
+    timing_hook: TimingHook = None,
+    on_output_line: OutputLineHook = None,
+    spool_threshold: int = None,
+    spool_dir: str = None,
+    abort_event: threading.Event = None
 ) -> Dict[str, Any]:
     """
     Execute a DOS utility command and return results.
@@ -40,150 +523,291 @@ def call_dos_utility(
         dosbox_config: DOSBox configuration overrides
         capture_output: Whether to capture output
         working_dir: Working directory for DOSBox
+        worker_pool: Run the command on a warm DOSBox session from this
+                     pool instead of launching DOSBox. The pool's own
+                     mounts, environment and configuration are used,
+                     except for the [execution] timeout of dosbox_config.
+        result_cache: Reuse the result and produced files of an identical
+                      earlier call from this cache, and store new results in it.
+                      Only calls with a source_dir are cached; a call that ran
+                      alongside another call on the same tree is not stored
+        bypass_cache: Neither look up nor store this call in result_cache
+        timing_hook: Callable receiving the phase timings of the call
+        on_output_line: Callable receiving each line of output while the
+                        command runs. It is called from a background
+                        thread. Output of calls served from result_cache
+                        or worker_pool is passed on once the call is done.
+        spool_threshold: Size in bytes above which the output is left in a
+                         spool file instead of being read into 'stdout'
+        spool_dir: Directory for spool files (defaults to the system
+                   temporary directory)
+        abort_event: Event that kills the emulator when set, e.g. from
+                     on_output_line once the output shows the command
+                     is bound to fail (see diagnostics.DiagnosticCollector)
         
     Returns:
         {
             'stdout': str,           # Standard output
             'stderr': str,           # Standard error
             'exit_code': int,        # Exit code
-            'success': bool          # Success status
+            'success': bool,         # Success status
+            'timings': dict          # Seconds per phase, see timing.PHASES
         }
+        Results served from result_cache also have 'cached' set to True.
+        Calls that failed to run have 'failure' set to 'validation_error',
+        'execution_error', 'timeout', 'stalled', 'aborted' or
+        'unexpected_error'.
+        Spooled output leaves 'stdout' empty and adds 'stdout_spool', a
+        SpooledOutput handle the caller deletes when done with it.
     """
     
     # Set up logging
     logger = logging.getLogger(__name__)
+    timer = PhaseTimer()
+    cache_run = None
     try:
         logger.debug("call_dos_utility called with command=%s, arguments=%s", command, arguments)
         
         # Validate filenames in arguments (skip command-line flags)
-        if arguments:
-            # Only validate arguments that don't start with / or - (command-line flags)
-            filenames = [arg for arg in arguments if not arg.startswith('/') and not arg.startswith('-')]
-            if filenames:
-                logger.debug("Validating filenames: %s", filenames)
-                FilenameValidator.validate_filenames(filenames)
-        
-        # Initialize components
-        logger.debug("Initializing components")
-        config_manager = ConfigManager()
-        batch_generator = BatchGenerator()
-        dosbox_executor = DOSBoxExecutor()
-        output_handler = OutputHandler()
+        with timer.phase('validation'):
+            _validate_arguments(arguments)
         
-        # Update configuration if provided
-        if dosbox_config:
-            logger.debug("Updating configuration: %s", dosbox_config)
-            config_manager.update_config(dosbox_config)
-        
-        # Update mount points if provided
-        mount_updates = {}
-        if source_dir:
-            mount_updates['c'] = source_dir
-        if tools_dir:
-            mount_updates['d'] = tools_dir
-            
-        if mount_updates:
-            logger.debug("Updating mount points: %s", mount_updates)
-            config_manager.update_config({'mount': mount_updates})
-        
-        # Update environment variables if provided
-        if environment:
-            logger.debug("Updating environment variables: %s", environment)
-            config_manager.update_config({'environment': environment})
-        
-        # Convert command and arguments to DOS paths
-        dos_command = config_manager.convert_path_to_dosbox(command)
-        dos_arguments = []
-        if arguments:
-            for arg in arguments:
-                # Don't convert command-line switches
-                if arg.startswith('/') or arg.startswith('-'):
-                    dos_arguments.append(arg)
-                else:
-                    dos_arguments.append(config_manager.convert_path_to_dosbox(arg))
-
-        # Generate batch file
-        if capture_output:
-            # Create temporary file for output capture in the current working directory
-            stdout_file = os.path.join(os.getcwd(), "STDOUT.TXT")
-            # Create empty file
-            open(stdout_file, 'w').close()
-            logger.debug("Created temporary file: stdout=%s", stdout_file)
-            
-            # Pass absolute paths to the batch generator
-            batch_file = batch_generator.generate_simple_batch(
-                dos_command, dos_arguments, "C:\\STDOUT.TXT"
-            )
-            logger.debug("Generated simple batch file: %s", batch_file)
+        cache_key = None
+        result = None
+        if result_cache is not None and not bypass_cache:
+            if worker_pool is not None:
+                cache_config = worker_pool.config
+            else:
+                cache_config = _get_execution_config(
+                    _build_config_manager(source_dir, tools_dir, environment, dosbox_config),
+                    environment)
+            cache_dir = cache_config.get('mount', {}).get('c')
+            # Only an explicit source directory is hashed, never whatever
+            # the current directory happens to be
+            if not source_dir or not cache_dir or os.path.realpath(cache_dir) != os.path.realpath(source_dir):
+                logger.debug("Not using the result cache: no source_dir mounted as C:")
+                result_cache = None
+        if result_cache is not None and not bypass_cache:
+            with timer.phase('cache_lookup'):
+                # Registered before the snapshot, so that nothing another call
+                # writes into the tree from here on ends up in this call's entry
+                cache_run = result_cache.begin_run(cache_dir)
+                before = result_cache.snapshot(cache_dir)
+                cache_key = result_cache.make_key(command, arguments, cache_config, before)
+                result = result_cache.get(cache_key, cache_dir)
+                if result is not None:
+                    cache_key = None
+        
+        if result is not None:
+            logger.debug("Served from result cache")
+            _replay_output(result, on_output_line)
+        elif worker_pool is not None:
+            with timer.phase('path_conversion'):
+                dos_command, dos_arguments = _convert_command_line(
+                    worker_pool.config_manager, command, arguments)
+            logger.debug("Running on worker pool: %s %s", dos_command, dos_arguments)
+            with timer.phase('emulator_runtime'):
+                # The pool's sessions are set up already, but the call's deadline still applies
+                timeout = (dosbox_config or {}).get('execution', {}).get('timeout')
+                result = worker_pool.run(dos_command, dos_arguments,
+                                         float(timeout) if timeout is not None else None)
+            _replay_output(result, on_output_line)
         else:
-            batch_file = batch_generator.generate_batch_with_case_warning(dos_command, dos_arguments)
-            logger.debug("Generated batch file with case warning: %s", batch_file)
+            # Batch file, DOSBox config and captured output live in a scratch
+            # directory of their own, so concurrent calls never share files
+            workspace = ScratchWorkspace()
+            workspace.create()
+            try:
+                prepared = _prepare_call(
+                    workspace, command, arguments, source_dir, tools_dir,
+                    environment, dosbox_config, capture_output,
+                    timer=timer, validate=False
+                )
+                
+                # Execute in DOSBox
+                logger.debug("Executing DOSBox with batch file: %s", prepared['batch_file'])
+                exit_code = _execute_prepared(prepared, workspace, working_dir, timer,
+                                              on_output_line, command, abort_event)
+                logger.debug("DOSBox execution completed with exit code: %d", exit_code)
+                
+                result = _collect_result(prepared, exit_code, timer, spool_threshold, spool_dir)
+            finally:
+                workspace.cleanup()
         
-        # Get configuration
-        config = config_manager.get_dosbox_config()
+        if cache_key is not None and 'stdout_spool' in result:
+            # Spooled output is not part of the result dictionary
+            logger.debug("Not caching a result with spooled output")
+        elif cache_key is not None:
+            with timer.phase('cache_store'):
+                result_cache.put(cache_key, result, cache_dir, before, cache_run)
         
-        # Update environment variables with path conversion
-        # Only add environment variables if they were explicitly provided
-        if environment:
-            env_vars = config_manager.get_environment_vars_with_path_conversion()
-            if 'environment' in config:
-                config['environment'].update(env_vars)
-            else:
-                config['environment'] = env_vars
+    except FilenameValidationError as e:
+        result = _error_result(f'Filename validation error: {str(e)}', 'validation_error')
+    except DOSBoxExecutionError as e:
+        result = _error_result(f'DOSBox execution error: {str(e)}', e.failure)
+    except Exception as e:
+        result = _error_result(f'Unexpected error: {str(e)}', 'unexpected_error')
+    finally:
+        if cache_run is not None:
+            result_cache.end_run(cache_run)
+    
+    _attach_timings([result], timer, timing_hook)
+    logger.debug("Call timings: %s", result['timings'])
+    return result
+
+
+class OutputStream:
+    """
+    Iterator over the output lines of a call running in a background thread.
+    
+    The result dictionary is available as 'result' once iteration is done.
+    """
+    
+    # Marks the end of the output in the line queue
+    _END = object()
+    
+    def __init__(self, command: str, arguments: List[str] = None, **kwargs):
+        """
+        Start the call.
         
-        # Execute in DOSBox
-        logger.debug("Executing DOSBox with batch file: %s", batch_file)
-        exit_code = dosbox_executor.execute(batch_file, config, working_dir)
-        logger.debug("DOSBox execution completed with exit code: %d", exit_code)
+        Args:
+            command: DOS command to execute
+            arguments: Command arguments
+            **kwargs: Further arguments of call_dos_utility()
+        """
+        self.result = None
+        self._lines = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run, args=(command, arguments), kwargs=kwargs,
+            name="dos-output-stream", daemon=True)
+        self._thread.start()
+    
+    def _run(self, command: str, arguments: List[str], **kwargs) -> None:
+        """Run the call, queueing its output lines."""
+        try:
+            self.result = call_dos_utility(command, arguments, on_output_line=self._lines.put, **kwargs)
+        finally:
+            self._lines.put(self._END)
+    
+    def __iter__(self) -> Iterator[str]:
+        """Yield output lines until the call finishes."""
+        while True:
+            line = self._lines.get()
+            if line is self._END:
+                self._thread.join()
+                return
+            yield line
+    
+    def wait(self) -> Dict[str, Any]:
+        """
+        Wait for the call, discarding output not read yet.
         
-        # Process output
-        if capture_output:
-            logger.debug("Capturing output from files: stdout=%s", stdout_file)
-            output = output_handler.capture_output(stdout_file)
-            logger.debug("Captured output: %s", output)
-            result = output_handler.process_output(output['stdout'])
-            logger.debug("Processed output result: %s", result)
-            
-            # Clean up temporary files
-            # Temporarily disable cleanup for debugging
-            # for temp_file in [stdout_file, batch_file]:
-            #     if os.path.exists(temp_file):
-            #         logger.debug("Cleaning up temporary file: %s", temp_file)
-            #         os.remove(temp_file)
-            logger.debug("Skipping cleanup of temporary files for debugging")
-        else:
-            result = {
-                'stdout': '',
-                'stderr': '',
-                'exit_code': exit_code,
-                'success': exit_code == 0
-            }
-            logger.debug("No output capture, result: %s", result)
-            # Clean up batch file
-            if os.path.exists(batch_file):
-                logger.debug("Cleaning up batch file: %s", batch_file)
-                os.remove(batch_file)
+        Returns:
+            Result dictionary of the call
+        """
+        for _ in self:
+            pass
+        return self.result
+
+
+def stream_dos_utility(command: str, arguments: List[str] = None, **kwargs) -> OutputStream:
+    """
+    Execute a DOS utility command, yielding its output lines as they are written.
+    
+    Example:
+        stream = stream_dos_utility("MAKE", ["-f", "BIG.MAK"], source_dir=src)
+        for line in stream:
+            print(line)
+        print(stream.result['exit_code'])
+    
+    Args:
+        command: DOS command to execute
+        arguments: Command arguments
+        **kwargs: Further arguments of call_dos_utility(), for example
+                  spool_threshold to keep the complete output out of memory
         
-        return result
+    Returns:
+        OutputStream iterating over the lines; its 'result' holds the
+        result dictionary once iteration is done
+    """
+    return OutputStream(command, arguments, **kwargs)
+
+
+def call_dos_utility_batch(
+    commands: List[Union[str, Tuple[str, List[str]]]],
+    source_dir: str = None,
+    tools_dir: str = None,
+    environment: Dict[str, str] = None,
+    dosbox_config: Dict[str, Any] = None,
+    working_dir: str = None,
+    stop_on_error: bool = False,
+    timing_hook: TimingHook = None,
+    errorlevel_program: str = None
+) -> List[Dict[str, Any]]:
+    """
+    Execute several DOS commands in sequence within a single DOSBox launch.
+    
+    Args:
+        commands: Commands to execute, each either a command string or a
+                  (command, arguments) tuple
+        source_dir: Source directory to mount as C:
+        tools_dir: Tools directory to mount as D:
+        environment: Additional environment variables
+        dosbox_config: DOSBox configuration overrides
+        working_dir: Working directory for DOSBox
+        stop_on_error: Skip the remaining commands once one of them
+                       returns a non-zero errorlevel
+        timing_hook: Callable receiving the phase timings of the launch
+        errorlevel_program: Host path of a DOS program printing the
+                            errorlevel (such as ERRORLVL.COM) to capture
+                            exit codes with instead of %ERRORLEVEL%
+        
+    Returns:
+        List with one result dictionary per command, in the same shape as
+        call_dos_utility() returns. Commands skipped because of
+        stop_on_error have exit code -1 and 'skipped' set to True. The
+        'timings' of every result cover the whole launch.
+    """
+    
+    # Set up logging
+    logger = logging.getLogger(__name__)
+    command_lines = _normalize_commands(commands)
+    if not command_lines:
+        return []
+    
+    timer = PhaseTimer()
+    try:
+        logger.debug("call_dos_utility_batch called with commands=%s", command_lines)
+        
+        workspace = ScratchWorkspace()
+        workspace.create()
+        try:
+            prepared = _prepare_batch_call(
+                workspace, command_lines, source_dir, tools_dir,
+                environment, dosbox_config, stop_on_error, timer=timer,
+                errorlevel_program=errorlevel_program
+            )
+            
+            logger.debug("Executing DOSBox with batch file: %s", prepared['batch_file'])
+            exit_code = create_executor(prepared['config']).execute(
+                prepared['batch_file'], prepared['config'], working_dir,
+                batch_command=prepared['batch_command'],
+                config_dir=workspace.directory,
+                timer=timer
+            )
+            logger.debug("DOSBox execution completed with exit code: %d", exit_code)
+            
+            results = _collect_batch_results(prepared, timer)
+        finally:
+            workspace.cleanup()
+        logger.debug("Batch results: %s", results)
         
     except FilenameValidationError as e:
-        return {
-            'stdout': '',
-            'stderr': f'Filename validation error: {str(e)}',
-            'exit_code': 1,
-            'success': False
-        }
+        results = [_error_result(f'Filename validation error: {str(e)}', 'validation_error') for _ in command_lines]
     except DOSBoxExecutionError as e:
-        return {
-            'stdout': '',
-            'stderr': f'DOSBox execution error: {str(e)}',
-            'exit_code': 1,
-            'success': False
-        }
+        results = [_error_result(f'DOSBox execution error: {str(e)}', e.failure) for _ in command_lines]
     except Exception as e:
-        return {
-            'stdout': '',
-            'stderr': f'Unexpected error: {str(e)}',
-            'exit_code': 1,
-            'success': False
-        }
\ No newline at end of file
+        results = [_error_result(f'Unexpected error: {str(e)}', 'unexpected_error') for _ in command_lines]
+    
+    _attach_timings(results, timer, timing_hook)
+    return results
@@ -4,6 +4,8 @@ DOSBox Executor for DOS Utility Caller
 Handles execution of DOS commands through DOSBox.
 """
 
+import asyncio
+import threading
 import subprocess
 import tempfile
 import os
@@ -14,15 +16,45 @@ import logging
 from typing import Dict, List, Optional
 from pathlib import Path
 
+from .emulator_backend import EmulatorBackend, register_backend
+from .timing import PhaseTimer, optional_phase
+from .progress_watchdog import ProgressWatchdog
+
 
 class DOSBoxExecutionError(Exception):
     """Exception raised for DOSBox execution errors."""
-    pass
+    
+    # Failure class reported in the result of the call
+    failure = 'execution_error'
+
+
+class DOSBoxTimeoutError(DOSBoxExecutionError):
+    """Exception raised when the emulator runs past its deadline."""
+    
+    failure = 'timeout'
+
+
+class DOSBoxStallError(DOSBoxExecutionError):
+    """Exception raised when the watchdog finds the emulator making no progress."""
+    
+    failure = 'stalled'
+
+
+class DOSBoxAbortedError(DOSBoxExecutionError):
+    """Exception raised when the caller asked to stop the emulator."""
+    
+    failure = 'aborted'
 
 
-class DOSBoxExecutor:
+@register_backend
+class DOSBoxExecutor(EmulatorBackend):
     """Executes DOS commands through DOSBox."""
     
+    name = 'dosbox'
+    
+    # Seconds between looks at the abort event
+    ABORT_POLL_INTERVAL = 0.05
+    
     def __init__(self, dosbox_path: str = "dosbox"):
         """
         Initialize the DOSBox executor.
@@ -35,7 +67,9 @@ class DOSBoxExecutor:
         self.default_timeout = 300
     
     def execute(self, batch_file: str, config: Dict[str, Dict[str, str]],
-                working_dir: str = None) -> int:
+                working_dir: str = None, batch_command: str = None,
+                config_dir: str = None, timer: PhaseTimer = None,
+                abort_event: threading.Event = None) -> int:
         """
         Execute a batch file in DOSBox.
         
@@ -43,18 +77,29 @@ class DOSBoxExecutor:
             batch_file: Path to the batch file to execute
             config: DOSBox configuration
             working_dir: Working directory for DOSBox
+            batch_command: DOS command line used to invoke the batch file
+                           (defaults to the batch file name on drive C:)
+            config_dir: Directory to write the DOSBox config file to
+                        (defaults to the system temporary directory)
+            timer: Timer receiving the config_write, emulator_spawn and
+                   emulator_runtime phases
+            abort_event: Event that kills DOSBox when set
             
         Returns:
             Exit code from DOSBox execution
             
         Raises:
+            DOSBoxTimeoutError: If DOSBox runs past the timeout
+            DOSBoxStallError: If the watchdog finds DOSBox making no progress
+            DOSBoxAbortedError: If abort_event was set
             DOSBoxExecutionError: If DOSBox execution fails
         """
         
         # Set up logging
         logger = logging.getLogger(__name__)
         # Create temporary config file
-        config_file = self._create_config_file(config, batch_file)
+        with optional_phase(timer, 'config_write'):
+            config_file = self._create_config_file(config, batch_file, batch_command, config_dir)
         
         # Prepare command
         cmd = [self.dosbox_path, "-conf", config_file, "-noconsole", "--exit"]
@@ -64,34 +109,237 @@ class DOSBoxExecutor:
         
         # Get timeout from config or use default
         timeout = config.get('execution', {}).get('timeout', self.default_timeout)
-        timeout = int(timeout)
+        timeout = float(timeout)
         
         try:
-            # Execute DOSBox with timeout
-            result = subprocess.run(
-                cmd,
-                cwd=cwd,
-                capture_output=True,
-                text=True,
-                timeout=timeout
-            )
-            return result.returncode
-        except subprocess.TimeoutExpired:
-            raise DOSBoxExecutionError(f"DOSBox execution timed out after {timeout} seconds")
+            # Start DOSBox separately from waiting for it, so process
+            # creation and the run itself are timed apart
+            with optional_phase(timer, 'emulator_spawn'):
+                process = subprocess.Popen(
+                    cmd,
+                    cwd=cwd,
+                    env=self._get_process_env(config),
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE
+                )
+        except Exception as e:
+            raise DOSBoxExecutionError(f"Failed to execute DOSBox: {str(e)}")
+        
+        try:
+            # Execute DOSBox with timeout, waking up for the watchdog
+            with optional_phase(timer, 'emulator_runtime'):
+                watchdog = ProgressWatchdog.from_config(process.pid, config)
+                deadline = time.monotonic() + timeout
+                while True:
+                    try:
+                        process.communicate(timeout=self._poll_interval(deadline, watchdog, abort_event))
+                        return process.returncode
+                    except subprocess.TimeoutExpired:
+                        self._check_progress(process.pid, watchdog, deadline, timeout, abort_event)
+        except DOSBoxExecutionError:
+            process.kill()
+            process.communicate()
+            raise
         except Exception as e:
+            process.kill()
             raise DOSBoxExecutionError(f"Failed to execute DOSBox: {str(e)}")
         #finally:
         #    # Clean up temporary config file
         #    if os.path.exists(config_file):
         #        os.remove(config_file)
     
-    def _create_config_file(self, config: Dict[str, Dict[str, str]], batch_file: str) -> str:
+    async def execute_async(self, batch_file: str, config: Dict[str, Dict[str, str]],
+                            working_dir: str = None, batch_command: str = None,
+                            config_dir: str = None, timeout: float = None,
+                            timer: PhaseTimer = None,
+                            abort_event: threading.Event = None) -> int:
+        """
+        Execute a batch file in DOSBox without blocking the event loop.
+        
+        DOSBox is killed if the timeout expires or the awaiting task is
+        cancelled, so no emulator outlives the call that started it.
+        
+        Args:
+            batch_file: Path to the batch file to execute
+            config: DOSBox configuration
+            working_dir: Working directory for DOSBox
+            batch_command: DOS command line used to invoke the batch file
+                           (defaults to the batch file name on drive C:)
+            config_dir: Directory to write the DOSBox config file to
+                        (defaults to the system temporary directory)
+            timeout: Timeout in seconds (defaults to the configured
+                     execution timeout)
+            timer: Timer receiving the config_write, emulator_spawn and
+                   emulator_runtime phases
+            abort_event: Event that kills DOSBox when set
+        
+        Returns:
+            Exit code from DOSBox execution
+        
+        Raises:
+            DOSBoxTimeoutError: If DOSBox runs past the timeout
+            DOSBoxStallError: If the watchdog finds DOSBox making no progress
+            DOSBoxAbortedError: If abort_event was set
+            DOSBoxExecutionError: If DOSBox execution fails
+        """
+        logger = logging.getLogger(__name__)
+        with optional_phase(timer, 'config_write'):
+            config_file = self._create_config_file(config, batch_file, batch_command, config_dir)
+        cmd = [self.dosbox_path, "-conf", config_file, "-noconsole", "--exit"]
+        logger.debug(cmd)
+        
+        if timeout is None:
+            timeout = float(config.get('execution', {}).get('timeout', self.default_timeout))
+        
+        try:
+            with optional_phase(timer, 'emulator_spawn'):
+                process = await asyncio.create_subprocess_exec(
+                    *cmd,
+                    cwd=working_dir if working_dir else None,
+                    env=self._get_process_env(config),
+                    stdin=asyncio.subprocess.DEVNULL,
+                    stdout=asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.DEVNULL
+                )
+        except Exception as e:
+            raise DOSBoxExecutionError(f"Failed to execute DOSBox: {str(e)}")
+        
+        try:
+            with optional_phase(timer, 'emulator_runtime'):
+                watchdog = ProgressWatchdog.from_config(process.pid, config)
+                deadline = time.monotonic() + timeout
+                while True:
+                    try:
+                        return await asyncio.wait_for(
+                            process.wait(), self._poll_interval(deadline, watchdog, abort_event))
+                    except asyncio.TimeoutError:
+                        self._check_progress(process.pid, watchdog, deadline, timeout, abort_event)
+        finally:
+            if process.returncode is None:
+                logger.debug("Killing DOSBox process %s", process.pid)
+                try:
+                    process.kill()
+                except ProcessLookupError:
+                    pass
+                # Reap the process; shielded so a cancelled task still
+                # leaves no zombie behind
+                await asyncio.shield(process.wait())
+
+    def _poll_interval(self, deadline: float, watchdog: Optional[ProgressWatchdog],
+                       abort_event: Optional[threading.Event]) -> float:
+        """Get the seconds to wait for DOSBox before looking at it again."""
+        interval = deadline - time.monotonic()
+        if watchdog is not None:
+            interval = min(interval, watchdog.poll_interval)
+        if abort_event is not None:
+            interval = min(interval, self.ABORT_POLL_INTERVAL)
+        return max(0, interval)
+    
+    def _check_progress(self, pid: int, watchdog: Optional[ProgressWatchdog],
+                        deadline: float, timeout: float,
+                        abort_event: threading.Event = None) -> None:
+        """
+        Decide whether a running DOSBox process has to be stopped.
+        
+        Args:
+            pid: DOSBox process ID
+            watchdog: Watchdog of the process, if enabled
+            deadline: time.monotonic() value at which the timeout expires
+            timeout: Timeout in seconds, for the error message
+            abort_event: Event set when the caller wants DOSBox stopped
+            
+        Raises:
+            DOSBoxAbortedError: If abort_event is set
+            DOSBoxTimeoutError: If the deadline has passed
+            DOSBoxStallError: If the watchdog reports no progress
+        """
+        if abort_event is not None and abort_event.is_set():
+            raise DOSBoxAbortedError("DOSBox was stopped on request")
+        if time.monotonic() >= deadline:
+            raise DOSBoxTimeoutError(f"DOSBox execution timed out after {timeout:g} seconds")
+        if watchdog is not None and watchdog.stalled():
+            logging.getLogger(__name__).warning(
+                "DOSBox process %s made no progress for %g seconds", pid, watchdog.stall_timeout)
+            raise DOSBoxStallError(f"DOSBox made no progress for {watchdog.stall_timeout:g} seconds")
+    
+    def start(self, batch_file: str, config: Dict[str, Dict[str, str]],
+              working_dir: str = None, batch_command: str = None,
+              config_dir: str = None) -> subprocess.Popen:
+        """
+        Launch DOSBox running a batch file without waiting for it to finish.
+        
+        Used for long-lived sessions such as the warm worker pool, where the
+        batch file keeps DOSBox busy until it is told to exit.
+        
+        Args:
+            batch_file: Path to the batch file to execute
+            config: DOSBox configuration
+            working_dir: Working directory for DOSBox
+            batch_command: DOS command line used to invoke the batch file
+                           (defaults to the batch file name on drive C:)
+            config_dir: Directory to write the DOSBox config file to
+                        (defaults to the system temporary directory)
+            
+        Returns:
+            Handle of the running DOSBox process
+            
+        Raises:
+            DOSBoxExecutionError: If DOSBox cannot be started
+        """
+        logger = logging.getLogger(__name__)
+        config_file = self._create_config_file(config, batch_file, batch_command, config_dir)
+        cmd = [self.dosbox_path, "-conf", config_file, "-noconsole", "--exit"]
+        logger.debug(cmd)
+        
+        try:
+            # Nobody reads DOSBox's own console output, so don't let it
+            # fill up a pipe and stall a session that runs for hours
+            return subprocess.Popen(
+                cmd,
+                cwd=working_dir if working_dir else None,
+                env=self._get_process_env(config),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+        except Exception as e:
+            raise DOSBoxExecutionError(f"Failed to start DOSBox: {str(e)}")
+    
+    def _get_process_env(self, config: Dict[str, Dict[str, str]]) -> Optional[Dict[str, str]]:
+        """
+        Get the host environment for the DOSBox process.
+        
+        [execution] sdl_videodriver and sdl_audiodriver select SDL drivers,
+        e.g. 'dummy' to run without a display or sound device.
+        
+        Args:
+            config: DOSBox configuration
+            
+        Returns:
+            Environment dictionary, or None to inherit the current one
+        """
+        execution = config.get('execution', {})
+        overrides = {}
+        if execution.get('sdl_videodriver'):
+            overrides['SDL_VIDEODRIVER'] = execution['sdl_videodriver']
+        if execution.get('sdl_audiodriver'):
+            overrides['SDL_AUDIODRIVER'] = execution['sdl_audiodriver']
+        if not overrides:
+            return None
+        return dict(os.environ, **overrides)
+    
+    def _create_config_file(self, config: Dict[str, Dict[str, str]], batch_file: str,
+                            batch_command: str = None, config_dir: str = None) -> str:
         """
         Create a temporary DOSBox configuration file.
         
         Args:
             config: DOSBox configuration dictionary
             batch_file: Path to the batch file to execute
+            batch_command: DOS command line used to invoke the batch file
+                           (defaults to the batch file name on drive C:)
+            config_dir: Directory to write the config file to
+                        (defaults to the system temporary directory)
             
         Returns:
             Path to the temporary configuration file
@@ -99,8 +347,8 @@ class DOSBoxExecutor:
         # Set up logging
         logger = logging.getLogger(__name__)
         
-        # Create config parser
-        config_parser = configparser.ConfigParser()
+        # Create config parser; no interpolation, values like %PATH% are DOS syntax
+        config_parser = configparser.ConfigParser(interpolation=None)
         
         # Add configuration sections except autoexec
         for section, settings in config.items():
@@ -124,19 +372,22 @@ class DOSBoxExecutor:
             autoexec_lines.append(f"mount c \"{mount_points['c']}\"")
         if 'd' in mount_points:
             autoexec_lines.append(f"mount d \"{mount_points['d']}\"")
+        for drive in sorted(mount_points):
+            if drive not in ('c', 'd'):
+                autoexec_lines.append(f"mount {drive} \"{mount_points[drive]}\"")
                 
         # Change to C: drive
         autoexec_lines.append("c:")
         
         # Add the batch file call
-        autoexec_lines.append(f"{os.path.basename(batch_file)}")
+        autoexec_lines.append(batch_command or f"{os.path.basename(batch_file)}")
         
         # Set the autoexec content
         autoexec_content = "\n".join(autoexec_lines)
         logger.debug("Final autoexec content:\n%s", autoexec_content)
         
         # Write to temporary file
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.conf', delete=False) as f:
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.conf', dir=config_dir, delete=False) as f:
             # Write all sections except autoexec using configparser
             # Remove autoexec section if it exists
             if config_parser.has_section('autoexec'):
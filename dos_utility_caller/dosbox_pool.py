@@ -0,0 +1,474 @@
+"""
+DOSBox Worker Pool for DOS Utility Caller
+
+Keeps long-lived DOSBox sessions booted and waiting on a mounted mailbox
+directory, so that commands can be executed without paying the emulator
+start-up cost on every call.
+"""
+
+import os
+import json
+import queue
+import threading
+import time
+import atexit
+import logging
+from typing import List, Dict, Any
+
+from .config_manager import ConfigManager
+from .dosbox_executor import DOSBoxExecutor, DOSBoxExecutionError, DOSBoxTimeoutError
+from .output_handler import OutputHandler
+from .workspace import ScratchWorkspace
+
+
+class DOSBoxWorker:
+    """A single warm DOSBox session fed with jobs through a mailbox directory."""
+
+    # Drive letter the mailbox directory is mounted as inside DOSBox
+    MAILBOX_DRIVE = 'm'
+
+    LOOP_FILE = "LOOP.BAT"
+    JOB_FILE = "JOB.BAT"
+    RUN_FILE = "RUN.BAT"
+    JOB_TEMP_FILE = "JOB.TMP"
+    QUIT_FILE = "QUIT.FLG"
+    DONE_FILE = "DONE.TXT"
+    STDOUT_FILE = "STDOUT.TXT"
+    EXITCODE_FILE = "EXITCODE.TXT"
+
+    def __init__(self, config: Dict[str, Dict[str, str]], dosbox_path: str = "dosbox",
+                 working_dir: str = None, poll_interval: float = 0.05):
+        """
+        Initialize the worker.
+
+        Args:
+            config: DOSBox configuration the session is booted with
+            dosbox_path: Path to the DOSBox executable
+            working_dir: Working directory for DOSBox
+            poll_interval: Seconds between checks of the mailbox for results
+        """
+        self.config = config
+        self.dosbox_executor = DOSBoxExecutor(dosbox_path)
+        self.output_handler = OutputHandler()
+        self.working_dir = working_dir
+        self.poll_interval = poll_interval
+        self.mailbox = None
+        self.mailbox_dir = None
+        self.process = None
+        self.jobs_run = 0
+        self.last_used = 0.0
+
+    def start(self) -> None:
+        """
+        Boot the DOSBox session and leave it polling the mailbox.
+
+        Raises:
+            DOSBoxExecutionError: If DOSBox cannot be started
+        """
+        logger = logging.getLogger(__name__)
+        self.mailbox = ScratchWorkspace(drive=self.MAILBOX_DRIVE, prefix="M")
+        self.mailbox_dir = self.mailbox.create()
+        loop_file = os.path.join(self.mailbox_dir, self.LOOP_FILE)
+        with open(loop_file, 'w') as f:
+            f.write(self._generate_loop_batch())
+
+        config = {section: dict(settings) for section, settings in self.config.items()}
+        config.setdefault('mount', {})[self.MAILBOX_DRIVE] = self.mailbox_dir
+
+        self.process = self.dosbox_executor.start(
+            loop_file, config, self.working_dir,
+            batch_command=self.mailbox.dos_path(self.LOOP_FILE),
+            config_dir=self.mailbox_dir
+        )
+        self.jobs_run = 0
+        self.last_used = time.monotonic()
+        logger.debug("Started DOSBox worker pid=%s mailbox=%s", self.process.pid, self.mailbox_dir)
+
+    def _generate_loop_batch(self) -> str:
+        """
+        Generate the batch file that waits for jobs inside DOSBox.
+
+        Returns:
+            Batch file content
+        """
+        drive = self.MAILBOX_DRIVE.upper()
+        env_lines = "".join(
+            f"set {key.upper()}={value}\n"
+            for key, value in self.config.get('environment', {}).items()
+        )
+        # DOSBox caches directory listings of host mounts, so the mailbox
+        # drive has to be rescanned before every look for a new job. The job
+        # is renamed before it runs: the host posts the next JOB.BAT as soon
+        # as DONE.TXT appears, which can be before the loop gets to clean up
+        return f"""@echo off
+{env_lines}{drive}:
+:WAIT
+rescan
+if exist {self.QUIT_FILE} goto QUIT
+if not exist {self.JOB_FILE} goto WAIT
+ren {self.JOB_FILE} {self.RUN_FILE}
+call {self.RUN_FILE}
+{drive}:
+del {self.RUN_FILE}
+goto WAIT
+:QUIT
+exit
+"""
+
+    def _generate_job_batch(self, command: str, arguments: List[str] = None) -> str:
+        """
+        Generate the batch file for a single job.
+
+        Args:
+            command: DOS command to execute
+            arguments: Command arguments
+
+        Returns:
+            Batch file content
+        """
+        drive = self.MAILBOX_DRIVE.upper()
+        arg_str = ""
+        if arguments:
+            arg_str = " " + " ".join(arguments)
+
+        return f"""@echo off
+c:
+cd \\
+{command}{arg_str} > {drive}:\\{self.STDOUT_FILE}
+echo %ERRORLEVEL% > {drive}:\\{self.EXITCODE_FILE}
+echo done > {drive}:\\{self.DONE_FILE}
+"""
+
+    def _mailbox_path(self, name: str) -> str:
+        return os.path.join(self.mailbox_dir, name)
+
+    def _clear_results(self) -> None:
+        """Remove result files left over from the previous job."""
+        for name in (self.STDOUT_FILE, self.EXITCODE_FILE, self.DONE_FILE):
+            path = self._mailbox_path(name)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def is_alive(self) -> bool:
+        """
+        Check whether the DOSBox process is still running.
+
+        Returns:
+            True if the session is running
+        """
+        return self.process is not None and self.process.poll() is None
+
+    def run(self, command: str, arguments: List[str] = None,
+            timeout: float = None) -> Dict[str, Any]:
+        """
+        Run a command in the warm session.
+
+        Args:
+            command: DOS command to execute (already converted to a DOS path)
+            arguments: Command arguments (already converted to DOS paths)
+            timeout: Seconds to wait for the job to finish
+
+        Returns:
+            Result dictionary in the same shape as OutputHandler.process_output
+
+        Raises:
+            DOSBoxTimeoutError: If the job timed out
+            DOSBoxExecutionError: If the session died
+        """
+        logger = logging.getLogger(__name__)
+        if not self.is_alive():
+            raise DOSBoxExecutionError("DOSBox worker is not running")
+
+        if timeout is None:
+            timeout = int(self.config.get('execution', {}).get(
+                'timeout', self.dosbox_executor.default_timeout))
+
+        self._clear_results()
+
+        # Write under a temporary name and rename, so the loop never picks
+        # up a half-written job file
+        temp_file = self._mailbox_path(self.JOB_TEMP_FILE)
+        with open(temp_file, 'w') as f:
+            f.write(self._generate_job_batch(command, arguments))
+        os.replace(temp_file, self._mailbox_path(self.JOB_FILE))
+        logger.debug("Posted job to worker pid=%s: %s %s", self.process.pid, command, arguments)
+
+        done_file = self._mailbox_path(self.DONE_FILE)
+        deadline = time.monotonic() + timeout
+        while not os.path.exists(done_file):
+            if not self.is_alive():
+                raise DOSBoxExecutionError("DOSBox worker exited while running a job")
+            if time.monotonic() > deadline:
+                raise DOSBoxTimeoutError(f"DOSBox worker job timed out after {timeout} seconds")
+            time.sleep(self.poll_interval)
+
+        output = self.output_handler.capture_output(self._mailbox_path(self.STDOUT_FILE))
+        result = self.output_handler.process_output(
+            output['stdout'], exit_code_file=self._mailbox_path(self.EXITCODE_FILE)
+        )
+        self._clear_results()
+
+        self.jobs_run += 1
+        self.last_used = time.monotonic()
+        return result
+
+    def health_check(self, timeout: float = 10) -> bool:
+        """
+        Check that the session is alive and still picking up jobs.
+
+        Args:
+            timeout: Seconds to wait for the probe job
+
+        Returns:
+            True if the worker answered the probe
+        """
+        if not self.is_alive():
+            return False
+        try:
+            result = self.run("echo", ["PING"], timeout=timeout)
+        except DOSBoxExecutionError:
+            return False
+        # The probe shouldn't count towards the recycling limit
+        self.jobs_run -= 1
+        return 'PING' in result['stdout']
+
+    def stop(self, timeout: float = 5) -> None:
+        """
+        Shut the session down and remove its mailbox.
+
+        Args:
+            timeout: Seconds to wait for DOSBox to exit on its own
+        """
+        if self.process is not None:
+            if self.is_alive():
+                try:
+                    open(self._mailbox_path(self.QUIT_FILE), 'w').close()
+                    self.process.wait(timeout=timeout)
+                except Exception:
+                    self.process.kill()
+                    self.process.wait()
+            self.process = None
+        if self.mailbox is not None:
+            self.mailbox.cleanup()
+        self.mailbox = None
+        self.mailbox_dir = None
+
+
+class DOSBoxWorkerPool:
+    """Pool of warm DOSBox sessions sharing one configuration profile."""
+
+    def __init__(self, size: int = 2, max_jobs_per_worker: int = 100,
+                 source_dir: str = None, tools_dir: str = None,
+                 environment: Dict[str, str] = None,
+                 dosbox_config: Dict[str, Any] = None,
+                 dosbox_path: str = "dosbox", working_dir: str = None,
+                 health_check_interval: float = 60):
+        """
+        Initialize the pool. Workers are booted lazily on first use.
+
+        Args:
+            size: Maximum number of concurrent DOSBox sessions
+            max_jobs_per_worker: Jobs a session runs before it is recycled
+            source_dir: Source directory to mount as C:
+            tools_dir: Tools directory to mount as D:
+            environment: Additional environment variables
+            dosbox_config: DOSBox configuration overrides
+            dosbox_path: Path to the DOSBox executable
+            working_dir: Working directory for DOSBox
+            health_check_interval: Idle seconds after which a worker is
+                                   probed before it is handed out again
+        """
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.size = size
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.dosbox_path = dosbox_path
+        self.working_dir = working_dir
+        self.health_check_interval = health_check_interval
+
+        self.config_manager = ConfigManager()
+        profile = (dosbox_config or {}).get('execution', {}).get('profile')
+        if profile:
+            self.config_manager.apply_profile(profile)
+        if dosbox_config:
+            self.config_manager.update_config(dosbox_config)
+        mount_updates = {}
+        if source_dir:
+            mount_updates['c'] = source_dir
+        if tools_dir:
+            mount_updates['d'] = tools_dir
+        if mount_updates:
+            self.config_manager.update_config({'mount': mount_updates})
+        if environment:
+            self.config_manager.update_config({'environment': environment})
+
+        self.config = self.config_manager.get_dosbox_config()
+        if environment:
+            self.config['environment'] = self.config_manager.get_environment_vars_with_path_conversion()
+        else:
+            self.config.pop('environment', None)
+
+        backend = self.config.get('execution', {}).get('backend', 'dosbox')
+        if backend != 'dosbox':
+            raise ValueError(f"Worker pools need the dosbox backend, not '{backend}'")
+
+        self._idle = queue.LifoQueue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _create_worker(self) -> DOSBoxWorker:
+        worker = DOSBoxWorker(self.config, self.dosbox_path, self.working_dir)
+        worker.start()
+        return worker
+
+    def _retire(self, worker: DOSBoxWorker) -> None:
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+        worker.stop()
+
+    def _acquire(self) -> DOSBoxWorker:
+        """Take an idle worker, booting a new one if the pool isn't full."""
+        logger = logging.getLogger(__name__)
+        while True:
+            if self._closed:
+                raise DOSBoxExecutionError("DOSBox worker pool is closed")
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_grow = len(self._workers) < self.size
+                    if can_grow:
+                        # Reserve the slot before booting outside the lock
+                        self._workers.append(None)
+                if can_grow:
+                    try:
+                        worker = self._create_worker()
+                    finally:
+                        with self._lock:
+                            self._workers.remove(None)
+                    with self._lock:
+                        self._workers.append(worker)
+                    return worker
+                worker = self._idle.get()
+
+            idle_for = time.monotonic() - worker.last_used
+            if not worker.is_alive() or (
+                    idle_for > self.health_check_interval and not worker.health_check()):
+                logger.debug("Replacing unhealthy DOSBox worker")
+                self._retire(worker)
+                continue
+            return worker
+
+    def _release(self, worker: DOSBoxWorker) -> None:
+        """Return a worker to the pool, recycling it if it is worn out."""
+        if self._closed or not worker.is_alive() or worker.jobs_run >= self.max_jobs_per_worker:
+            self._retire(worker)
+        else:
+            self._idle.put(worker)
+
+    def run(self, command: str, arguments: List[str] = None,
+            timeout: float = None) -> Dict[str, Any]:
+        """
+        Run a command on one of the pooled sessions.
+
+        Args:
+            command: DOS command to execute (already converted to a DOS path)
+            arguments: Command arguments (already converted to DOS paths)
+            timeout: Seconds to wait for the job to finish (defaults to the
+                     pool's configured timeout)
+
+        Returns:
+            Result dictionary in the same shape as OutputHandler.process_output
+
+        Raises:
+            DOSBoxExecutionError: If the job could not be run
+        """
+        worker = self._acquire()
+        try:
+            return worker.run(command, arguments, timeout)
+        except DOSBoxExecutionError:
+            # A timed out or crashed session is in an unknown state
+            worker.stop()
+            raise
+        finally:
+            self._release(worker)
+
+    def health_check(self) -> Dict[str, int]:
+        """
+        Probe every idle worker and replace the ones that don't answer.
+
+        Returns:
+            Dictionary with the number of healthy and replaced workers
+        """
+        idle = []
+        while True:
+            try:
+                idle.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+        healthy = 0
+        replaced = 0
+        for worker in idle:
+            if worker.health_check():
+                healthy += 1
+                self._idle.put(worker)
+            else:
+                replaced += 1
+                self._retire(worker)
+        return {'healthy': healthy, 'replaced': replaced}
+
+    def close(self) -> None:
+        """Shut down every session in the pool."""
+        self._closed = True
+        with self._lock:
+            workers = [worker for worker in self._workers if worker is not None]
+            self._workers = []
+        for worker in workers:
+            worker.stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+_pools: Dict[str, DOSBoxWorkerPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_worker_pool(profile: str, **kwargs) -> DOSBoxWorkerPool:
+    """
+    Get the shared pool for a compiler profile, creating it on first use.
+
+    Pools are shared by calls with the same profile and the same pool
+    arguments; a call with other mounts, environment or configuration gets
+    a pool of its own rather than sessions set up for another tree.
+
+    Args:
+        profile: Name of the compiler profile (e.g. 'borland', 'msc')
+        **kwargs: DOSBoxWorkerPool arguments used when the pool is created
+
+    Returns:
+        The worker pool for the profile and arguments
+    """
+    key = json.dumps([profile, kwargs], sort_keys=True, default=str)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool._closed:
+            pool = DOSBoxWorkerPool(**kwargs)
+            _pools[key] = pool
+        return pool
+
+
+@atexit.register
+def shutdown_worker_pools() -> None:
+    """Shut down every shared worker pool."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,313 @@
+"""
+emu2 Executor for DOS Utility Caller
+
+Runs generated batch files with emu2, a headless command-line DOS emulator
+that starts in milliseconds and maps host directories straight to DOS
+drives. emu2 runs a single program, so the batch file is interpreted here
+and each command line is handed to its own emu2 process.
+"""
+
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+import logging
+from typing import Dict, Optional
+
+from .emulator_backend import EmulatorBackend, register_backend
+from .dosbox_executor import DOSBoxExecutionError, DOSBoxTimeoutError, DOSBoxAbortedError
+from .timing import PhaseTimer, optional_phase
+
+
+@register_backend
+class Emu2Executor(EmulatorBackend):
+    """Executes DOS commands through emu2."""
+
+    name = 'emu2'
+
+    # Seconds between looks at the abort event
+    ABORT_POLL_INTERVAL = 0.05
+
+    # Extensions tried, in order, for a command given without one
+    PROGRAM_EXTENSIONS = ('.COM', '.EXE')
+
+    # Command, > or >>, and the file output is redirected to
+    REDIRECTION = re.compile(r'(.*?)\s*(>>?)\s*(\S+)\s*')
+    # echo, echo text, echo. and echo:, with the text printed
+    ECHO = re.compile(r'echo(?:[ .:](.*))?', re.IGNORECASE)
+
+    def __init__(self, emu2_path: str = "emu2"):
+        """
+        Initialize the emu2 executor.
+
+        Args:
+            emu2_path: Path to the emu2 executable
+        """
+        self.emu2_path = emu2_path
+        # Default timeout is 5 minutes (300 seconds)
+        self.default_timeout = 300
+
+    def execute(self, batch_file: str, config: Dict[str, Dict[str, str]],
+                working_dir: str = None, batch_command: str = None,
+                config_dir: str = None, timer: PhaseTimer = None,
+                abort_event: threading.Event = None) -> int:
+        """
+        Interpret a generated batch file, running each command in emu2.
+
+        Supports the constructs BatchGenerator emits: set, drive changes,
+        cd, commands with > and >> redirection, echo (also echo. and
+        echo:), labels, goto, if errorlevel and exit.
+
+        Args:
+            batch_file: Path to the batch file to execute
+            config: Configuration with mounts, environment and timeout
+            working_dir: Working directory for emu2
+            batch_command: Unused, emu2 reads the batch file from the host
+            config_dir: Unused, emu2 takes no configuration file
+            timer: Timer receiving the emulator_spawn and emulator_runtime
+                   phases, summed over all commands
+            abort_event: Event that kills the running program when set
+
+        Returns:
+            Errorlevel of the last program run, as DOSBox exits with
+
+        Raises:
+            DOSBoxTimeoutError: If the batch file runs past the timeout
+            DOSBoxAbortedError: If abort_event was set
+            DOSBoxExecutionError: If a program cannot be found or run
+        """
+        logger = logging.getLogger(__name__)
+        timeout = float(config.get('execution', {}).get('timeout', self.default_timeout))
+        deadline = time.monotonic() + timeout
+
+        emu2 = shutil.which(self.emu2_path)
+        if emu2 is None:
+            raise DOSBoxExecutionError(f"emu2 executable not found: {self.emu2_path}")
+
+        mounts = {drive.lower(): path for drive, path in config.get('mount', {}).items()}
+        env: Dict[str, str] = {}
+        for name, value in config.get('environment', {}).items():
+            env[name.upper()] = self._expand(value, env, 0).lstrip(';')
+
+        with open(batch_file, 'r', encoding='cp866', errors='replace') as f:
+            lines = [line.strip() for line in f]
+        labels = {line[1:].strip().upper(): index
+                  for index, line in enumerate(lines) if line.startswith(':')}
+
+        drive, cwd = 'c', '\\'
+        errorlevel = 0
+        index = 0
+        while index < len(lines):
+            line = lines[index]
+            index += 1
+            lower = line.lower()
+            if not line or line.startswith(':') or line.startswith('@') or lower.startswith('rem'):
+                continue
+            if lower == 'exit':
+                break
+            if re.fullmatch(r'[a-z]:', lower):
+                drive = lower[0]
+                continue
+            if lower.startswith('cd ') or lower.startswith('cd\\'):
+                cwd = self._change_dir(cwd, line[2:].strip())
+                continue
+            if lower.startswith('set '):
+                name, _, value = line[4:].partition('=')
+                env[name.strip().upper()] = self._expand(value, env, errorlevel)
+                continue
+            if lower.startswith('goto '):
+                index = self._jump(labels, line[5:])
+                continue
+            match = re.fullmatch(r'if\s+errorlevel\s+(\d+)\s+goto\s+(\S+)', line, re.IGNORECASE)
+            if match:
+                if errorlevel >= int(match.group(1)):
+                    index = self._jump(labels, match.group(2))
+                continue
+
+            line = self._expand(line, env, errorlevel)
+            command_line, append, redirect = line, False, None
+            match = self.REDIRECTION.fullmatch(line)
+            if match:
+                command_line, append, redirect = match.group(1), match.group(2) == '>>', match.group(3)
+            stdout_path = self._host_path(redirect, mounts, drive, cwd) if redirect else None
+
+            match = self.ECHO.fullmatch(command_line)
+            if match:
+                # 'echo.' and 'echo:' print an empty line, or the text after them
+                if stdout_path:
+                    with open(stdout_path, 'a' if append else 'w', encoding='cp866') as out:
+                        out.write(f"{match.group(1) or ''}\r\n")
+                continue
+
+            if abort_event is not None and abort_event.is_set():
+                raise DOSBoxAbortedError("emu2 was stopped on request")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DOSBoxTimeoutError(f"emu2 execution timed out after {timeout:g} seconds")
+            errorlevel = self._run_program(
+                emu2, command_line, stdout_path, append, mounts, env, drive, cwd,
+                working_dir, remaining, timeout, timer, abort_event)
+            logger.debug("emu2 command %s finished with errorlevel %d", command_line, errorlevel)
+        return errorlevel
+
+    def _run_program(self, emu2: str, command_line: str, stdout_path: Optional[str], append: bool,
+                     mounts: Dict[str, str], env: Dict[str, str], drive: str, cwd: str,
+                     working_dir: str, remaining: float, timeout: float,
+                     timer: PhaseTimer = None, abort_event: threading.Event = None) -> int:
+        """Run one command line in emu2 and return its errorlevel."""
+        parts = command_line.split()
+        program = self._find_program(parts[0], mounts, env, drive, cwd)
+
+        # emu2 builds the DOS environment from its own, so hand it only the
+        # DOS variables and the drive mapping, not the host environment
+        emu2_env = dict(env)
+        if 'PATH' in env:
+            emu2_env['EMU2_PATH'] = env['PATH']
+        for letter, path in mounts.items():
+            emu2_env[f"EMU2_DRIVE_{letter.upper()}"] = os.path.abspath(path)
+        emu2_env['EMU2_DEFAULT_DRIVE'] = drive.upper()
+        emu2_env['EMU2_CWD'] = f"{drive.upper()}:{cwd}"
+        emu2_env['EMU2_PROGNAME'] = self._dos_name(parts[0])
+
+        cmd = [emu2, program] + parts[1:]
+        logging.getLogger(__name__).debug(cmd)
+        stdout = open(stdout_path, 'ab' if append else 'wb') if stdout_path else subprocess.DEVNULL
+        try:
+            with optional_phase(timer, 'emulator_spawn'):
+                process = subprocess.Popen(
+                    cmd,
+                    cwd=working_dir if working_dir else None,
+                    env=emu2_env,
+                    stdin=subprocess.DEVNULL,
+                    stdout=stdout,
+                    stderr=subprocess.DEVNULL
+                )
+        except OSError as e:
+            raise DOSBoxExecutionError(f"Failed to execute emu2: {str(e)}")
+        finally:
+            if stdout_path:
+                stdout.close()
+
+        deadline = time.monotonic() + remaining
+        try:
+            with optional_phase(timer, 'emulator_runtime'):
+                while True:
+                    interval = deadline - time.monotonic()
+                    if abort_event is not None:
+                        interval = min(interval, self.ABORT_POLL_INTERVAL)
+                    try:
+                        return process.wait(timeout=max(0, interval))
+                    except subprocess.TimeoutExpired:
+                        if abort_event is not None and abort_event.is_set():
+                            raise DOSBoxAbortedError("emu2 was stopped on request")
+                        if time.monotonic() >= deadline:
+                            raise DOSBoxTimeoutError(f"emu2 execution timed out after {timeout:g} seconds")
+        except DOSBoxExecutionError:
+            process.kill()
+            process.wait()
+            raise
+
+    @staticmethod
+    def _expand(text: str, env: Dict[str, str], errorlevel: int) -> str:
+        """Substitute %ERRORLEVEL% and %VAR% references."""
+        def replace(match):
+            name = match.group(1).upper()
+            if name == 'ERRORLEVEL':
+                return str(errorlevel)
+            return env.get(name, '')
+        return re.sub(r'%([^%\s]+)%', replace, text)
+
+    @staticmethod
+    def _jump(labels: Dict[str, int], label: str) -> int:
+        """Get the line index following a label."""
+        label = label.strip().lstrip(':').upper()
+        if label not in labels:
+            raise DOSBoxExecutionError(f"Label not found in batch file: {label}")
+        return labels[label] + 1
+
+    @staticmethod
+    def _change_dir(cwd: str, target: str) -> str:
+        """Apply a cd to the current DOS directory of the current drive."""
+        if len(target) > 1 and target[1] == ':':
+            target = target[2:]
+        if not target:
+            return cwd
+        if target.startswith('\\'):
+            parts = []
+        else:
+            parts = [part for part in cwd.split('\\') if part]
+        for part in target.split('\\'):
+            if part == '..':
+                if parts:
+                    parts.pop()
+            elif part and part != '.':
+                parts.append(part)
+        return '\\' + '\\'.join(parts)
+
+    @staticmethod
+    def _dos_name(path: str) -> str:
+        """Get the file name part of a DOS path."""
+        return path.replace('/', '\\').split('\\')[-1].split(':')[-1].upper()
+
+    @staticmethod
+    def _match_case(directory: str, name: str) -> str:
+        """Find a directory entry ignoring case, as DOS would."""
+        exact = os.path.join(directory, name)
+        if os.path.exists(exact):
+            return exact
+        try:
+            for entry in os.listdir(directory):
+                if entry.upper() == name.upper():
+                    return os.path.join(directory, entry)
+        except OSError:
+            pass
+        return exact
+
+    def _host_path(self, dos_path: str, mounts: Dict[str, str], drive: str, cwd: str) -> str:
+        """
+        Map a DOS path to a host path through the mounted drives.
+
+        Raises:
+            DOSBoxExecutionError: If the drive is not mounted
+        """
+        if len(dos_path) > 1 and dos_path[1] == ':':
+            drive, dos_path = dos_path[0].lower(), dos_path[2:]
+            if not dos_path.startswith('\\'):
+                dos_path = '\\' + dos_path
+        if drive not in mounts:
+            raise DOSBoxExecutionError(f"Drive {drive.upper()}: is not mounted")
+        if not dos_path.startswith('\\'):
+            dos_path = cwd.rstrip('\\') + '\\' + dos_path
+        host = mounts[drive]
+        for part in dos_path.split('\\'):
+            if part:
+                host = self._match_case(host, part)
+        return host
+
+    def _find_program(self, name: str, mounts: Dict[str, str], env: Dict[str, str],
+                      drive: str, cwd: str) -> str:
+        """
+        Find the host file of a program the way COMMAND.COM would: in the
+        current directory, then along PATH, trying .COM and .EXE.
+
+        Raises:
+            DOSBoxExecutionError: If the program cannot be found
+        """
+        candidates = [name]
+        if '\\' not in name and ':' not in name:
+            candidates += [directory.rstrip('\\') + '\\' + name
+                           for directory in env.get('PATH', '').split(';') if directory]
+
+        has_extension = '.' in self._dos_name(name)
+        for path in candidates:
+            extensions = ('',) if has_extension else self.PROGRAM_EXTENSIONS
+            for extension in extensions:
+                try:
+                    host = self._host_path(path + extension, mounts, drive, cwd)
+                except DOSBoxExecutionError:
+                    continue
+                if os.path.isfile(host):
+                    return host
+        raise DOSBoxExecutionError(f"Bad command or file name: {name}")
@@ -0,0 +1,125 @@
+"""
+Emulator Backends for DOS Utility Caller
+
+Defines the interface every emulator backend implements and the registry
+used to pick a backend from the [execution] section of a configuration.
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Dict, Type
+
+from .timing import PhaseTimer
+
+
+class EmulatorBackend:
+    """Base class of the emulators that run generated batch files."""
+
+    # Name used to select the backend in [execution] backend
+    name = None
+
+    def execute(self, batch_file: str, config: Dict[str, Dict[str, str]],
+                working_dir: str = None, batch_command: str = None,
+                config_dir: str = None, timer: PhaseTimer = None,
+                abort_event: threading.Event = None) -> int:
+        """
+        Execute a batch file and wait for it to finish.
+
+        Args:
+            batch_file: Path to the batch file to execute
+            config: Emulator configuration
+            working_dir: Working directory for the emulator
+            batch_command: DOS command line used to invoke the batch file
+            config_dir: Directory for files the backend writes per call
+            timer: Timer receiving the config_write, emulator_spawn and
+                   emulator_runtime phases
+            abort_event: Event that stops the emulator when set
+
+        Returns:
+            Exit code of the emulator
+
+        Raises:
+            DOSBoxExecutionError: If execution fails
+        """
+        raise NotImplementedError
+
+    async def execute_async(self, batch_file: str, config: Dict[str, Dict[str, str]],
+                            working_dir: str = None, batch_command: str = None,
+                            config_dir: str = None, timeout: float = None,
+                            timer: PhaseTimer = None,
+                            abort_event: threading.Event = None) -> int:
+        """
+        Execute a batch file without blocking the event loop.
+
+        The default implementation runs execute() in a thread, which ignores
+        timeout and cannot be interrupted by cancelling the awaiting task.
+        Backends with long-running emulators should override it.
+
+        Returns:
+            Exit code of the emulator
+        """
+        return await asyncio.to_thread(
+            self.execute, batch_file, config, working_dir, batch_command, config_dir, timer,
+            abort_event)
+
+    def start(self, batch_file: str, config: Dict[str, Dict[str, str]],
+              working_dir: str = None, batch_command: str = None,
+              config_dir: str = None):
+        """
+        Launch a long-lived emulator session without waiting for it.
+
+        Only needed by the warm worker pool.
+
+        Returns:
+            Handle of the running process
+        """
+        raise NotImplementedError(f"The {self.name} backend does not support long-lived sessions")
+
+
+# Backend classes by name
+BACKENDS: Dict[str, Type[EmulatorBackend]] = {}
+
+DEFAULT_BACKEND = 'dosbox'
+
+
+def register_backend(backend_class: Type[EmulatorBackend]) -> Type[EmulatorBackend]:
+    """
+    Register a backend class under its name.
+
+    Args:
+        backend_class: Backend class to register
+
+    Returns:
+        The backend class, so this can be used as a decorator
+    """
+    BACKENDS[backend_class.name] = backend_class
+    return backend_class
+
+
+def create_executor(config: Dict[str, Dict[str, str]]) -> EmulatorBackend:
+    """
+    Create the backend selected by a configuration.
+
+    The backend is named by [execution] backend (default: dosbox); the
+    emulator executable can be given as [execution] emulator_path.
+
+    Args:
+        config: Configuration dictionary
+
+    Returns:
+        Backend instance
+
+    Raises:
+        ValueError: If the backend is unknown
+    """
+    execution = config.get('execution', {})
+    name = execution.get('backend', DEFAULT_BACKEND).strip().lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown emulator backend '{name}', expected one of: {', '.join(sorted(BACKENDS))}")
+    logging.getLogger(__name__).debug("Using emulator backend: %s", name)
+
+    emulator_path = execution.get('emulator_path')
+    if emulator_path:
+        return BACKENDS[name](emulator_path)
+    return BACKENDS[name]()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Stand-in for DOSBox used by the benchmarks and tests.
+
+Accepts the DOSBox command line DOSBoxExecutor generates
+(dosbox -conf FILE -noconsole --exit), reads the mounts and the batch file
+call from the [autoexec] section and interprets the batch file on the host:
+set, drive changes, cd, echo, > and >> redirection, labels, goto,
+if errorlevel, if [not] exist, call, del, ren, rescan and exit, which covers the
+batch files of single calls, batches and worker pool sessions. Programs are
+not run; instead
+
+    exitcode N    sets the errorlevel to N
+    sleep S       waits S seconds
+    lines N S     writes N numbered lines, S seconds apart
+    ERRORLVL.COM  prints "Error level: N" like errorlvl.c and keeps the errorlevel
+    anything else prints its command line in upper case and sets errorlevel 0
+
+Before the batch file runs the stand-in waits for the configured latency,
+standing in for emulator startup: FAKE_DOSBOX_LATENCY in the environment or
+latency in a [fake_dosbox] section of the config, in seconds.
+"""
+
+import os
+import re
+import sys
+import stat
+import time
+import configparser
+from typing import Dict, List, Optional, TextIO
+
+
+class FakeDOSBox:
+    """Interprets the autoexec and batch files of one DOSBox launch."""
+
+    def __init__(self, mounts: Dict[str, str] = None):
+        self.mounts = dict(mounts or {})
+        self.env: Dict[str, str] = {'PATH': 'Z:\\', 'COMSPEC': 'Z:\\COMMAND.COM'}
+        self.drive = 'z'
+        self.cwd = {}
+        self.errorlevel = 0
+        self.exited = False
+
+    def host_path(self, dos_path: str) -> str:
+        """Map a DOS path to a host path through the mounts, ignoring case."""
+        drive = self.drive
+        if len(dos_path) > 1 and dos_path[1] == ':':
+            drive, dos_path = dos_path[0].lower(), dos_path[2:]
+        if drive not in self.mounts:
+            raise OSError(f"Drive {drive.upper()}: does not exist")
+        if not dos_path.startswith('\\'):
+            dos_path = self.cwd.get(drive, '\\').rstrip('\\') + '\\' + dos_path
+        host = self.mounts[drive]
+        for part in dos_path.split('\\'):
+            if not part:
+                continue
+            match = os.path.join(host, part)
+            if not os.path.exists(match) and os.path.isdir(host):
+                for entry in os.listdir(host):
+                    if entry.upper() == part.upper():
+                        match = os.path.join(host, entry)
+                        break
+            host = match
+        return host
+
+    def expand(self, text: str) -> str:
+        """Substitute %ERRORLEVEL% and %VAR% references."""
+        def replace(match):
+            name = match.group(1).upper()
+            if name == 'ERRORLEVEL':
+                return str(self.errorlevel)
+            return self.env.get(name, '')
+        return re.sub(r'%([^%\s]+)%', replace, text)
+
+    def run_line(self, line: str, labels: Dict[str, int] = None) -> Optional[int]:
+        """
+        Run one command line.
+
+        Returns:
+            Line index to continue at after a goto, otherwise None
+        """
+        line = line.strip().lstrip('@')
+        lower = line.lower()
+        if not line or line.startswith(':') or lower.startswith('rem') or lower in ('echo on', 'echo off'):
+            return None
+        if lower == 'exit' or lower.startswith('exit '):
+            self.exited = True
+            return None
+        if re.fullmatch(r'[a-z]:', lower):
+            if lower[0] not in self.mounts:
+                print(f"Drive {lower[0].upper()} does not exist!")
+            else:
+                self.drive = lower[0]
+            return None
+        if lower.startswith('mount '):
+            parts = re.findall(r'"[^"]*"|\S+', line)
+            if len(parts) >= 3:
+                self.mounts[parts[1].rstrip(':').lower()] = parts[2].strip('"')
+            return None
+        if lower.startswith('set '):
+            name, _, value = line[4:].partition('=')
+            self.env[name.strip().upper()] = self.expand(value)
+            return None
+        if lower.startswith('cd ') or lower.startswith('cd\\'):
+            target = line[2:].strip()
+            cwd = '' if target.startswith('\\') else self.cwd.get(self.drive, '\\')
+            self.cwd[self.drive] = '\\' + '\\'.join(
+                part for part in (cwd + '\\' + target).split('\\') if part and part != '.')
+            return None
+        if lower.startswith('goto '):
+            return labels[line[5:].strip().lstrip(':').upper()] + 1
+        match = re.fullmatch(r'if\s+errorlevel\s+(\d+)\s+goto\s+(\S+)', line, re.IGNORECASE)
+        if match:
+            if self.errorlevel >= int(match.group(1)):
+                return labels[match.group(2).lstrip(':').upper()] + 1
+            return None
+        match = re.fullmatch(r'if\s+(not\s+)?exist\s+(\S+)\s+goto\s+(\S+)', line, re.IGNORECASE)
+        if match:
+            if os.path.exists(self.host_path(match.group(2))) != bool(match.group(1)):
+                return labels[match.group(3).lstrip(':').upper()] + 1
+            return None
+        if lower == 'rescan':
+            # Polling loops rescan between looks; don't spin the host CPU
+            time.sleep(0.005)
+            return None
+        if lower.startswith('del '):
+            path = self.host_path(line[4:].strip())
+            if os.path.exists(path):
+                os.remove(path)
+            return None
+        match = re.fullmatch(r'ren(?:ame)?\s+(\S+)\s+(\S+)', line, re.IGNORECASE)
+        if match:
+            source = self.host_path(match.group(1))
+            os.rename(source, os.path.join(os.path.dirname(source), match.group(2)))
+            return None
+
+        line = self.expand(line)
+        command_line, mode, target = line, None, None
+        match = re.match(r'(.*?)\s*(>>?)\s*(\S+)\s*$', line)
+        if match:
+            command_line, mode, target = match.group(1), match.group(2), match.group(3)
+
+        out: TextIO
+        if target:
+            out = open(self.host_path(target), 'a' if mode == '>>' else 'w',
+                       encoding='cp866', newline='')
+        else:
+            out = sys.stdout
+        try:
+            self.run_command(command_line, out)
+        finally:
+            if target:
+                out.close()
+        return None
+
+    def run_command(self, command_line: str, out: TextIO) -> None:
+        """Run a command with its output going to out."""
+        parts = command_line.split()
+        name = parts[0].lower() if parts else ''
+        if name == 'echo' or command_line.lower().startswith('echo.'):
+            out.write(command_line[5:] + "\r\n")
+        elif name == 'call':
+            self.run_batch(self.host_path(parts[1]))
+        elif name == 'exitcode':
+            self.errorlevel = int(parts[1]) if len(parts) > 1 else 0
+        elif name == 'sleep':
+            time.sleep(float(parts[1]) if len(parts) > 1 else 0)
+            self.errorlevel = 0
+        elif name == 'lines':
+            for number in range(1, int(parts[1]) + 1):
+                if number > 1 and len(parts) > 2:
+                    time.sleep(float(parts[2]))
+                out.write(f"Line {number}\r\n")
+                out.flush()
+            self.errorlevel = 0
+        elif name.rsplit('\\', 1)[-1] in ('errorlvl', 'errorlvl.com'):
+            out.write(f"Error level: {self.errorlevel}\r\n")
+        elif name.endswith('.bat'):
+            self.run_batch(self.host_path(parts[0]))
+        else:
+            out.write(command_line.upper() + "\r\n")
+            self.errorlevel = 0
+
+    def run_batch(self, path: str) -> None:
+        """Interpret a batch file."""
+        with open(path, 'r', encoding='cp866', errors='replace') as f:
+            lines = f.read().splitlines()
+        labels = {line.strip()[1:].strip().upper(): index
+                  for index, line in enumerate(lines) if line.strip().startswith(':')}
+        index = 0
+        while index < len(lines) and not self.exited:
+            jump = self.run_line(lines[index], labels)
+            index = index + 1 if jump is None else jump
+
+
+def make_fake_dosbox(directory: str) -> str:
+    """
+    Write an executable wrapper running the stand-in with this interpreter.
+
+    Args:
+        directory: Directory to write the wrapper to
+
+    Returns:
+        Path to the wrapper, usable as [execution] emulator_path
+    """
+    path = os.path.join(directory, "dosbox")
+    with open(path, 'w') as f:
+        f.write(f'#!/bin/sh\nexec "{sys.executable}" "{os.path.abspath(__file__)}" "$@"\n')
+    os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    return path
+
+
+def main(argv: List[str] = None) -> int:
+    """Run the stand-in with a DOSBox command line."""
+    argv = sys.argv[1:] if argv is None else argv
+    if '-conf' not in argv:
+        print("fake_dosbox: -conf FILE is required", file=sys.stderr)
+        return 1
+    conf_file = argv[argv.index('-conf') + 1]
+
+    # The autoexec section holds DOS commands, not key=value pairs
+    with open(conf_file, 'r') as f:
+        text = f.read()
+    settings_text, _, autoexec = text.partition('[autoexec]')
+    config = configparser.ConfigParser(interpolation=None)
+    config.read_string(settings_text)
+
+    latency = os.environ.get('FAKE_DOSBOX_LATENCY')
+    if latency is None and config.has_option('fake_dosbox', 'latency'):
+        latency = config.get('fake_dosbox', 'latency')
+    if latency:
+        time.sleep(float(latency))
+
+    dosbox = FakeDOSBox()
+    for line in autoexec.splitlines():
+        dosbox.run_line(line)
+        if dosbox.exited:
+            break
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,12 +1,181 @@
 """
 Output Handler for DOS Utility Caller
 
-Handles capturing and processing of DOS command output.
+Handles capturing and processing of DOS command output, either once the
+command has finished or line by line while it runs.
 """
 
 import os
 import re
-from typing import Dict, Optional
+import codecs
+import shutil
+import logging
+import tempfile
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, TextIO
+
+
+# Receives each line of output as the DOS program writes it
+OutputLineHook = Callable[[str], None]
+
+
+class SpooledOutput:
+    """Handle to command output spooled to a file instead of held in memory."""
+
+    def __init__(self, path: str, encoding: str = 'cp866'):
+        """
+        Initialize the handle.
+
+        Args:
+            path: Spool file holding the raw output
+            encoding: Encoding of the output
+        """
+        self.path = path
+        self.encoding = encoding
+
+    @property
+    def size(self) -> int:
+        """Size of the spooled output in bytes."""
+        return os.path.getsize(self.path)
+
+    def open(self) -> TextIO:
+        """Open the spooled output as decoded text."""
+        return open(self.path, 'r', encoding=self.encoding, errors='replace')
+
+    def read(self) -> str:
+        """Read the whole spooled output."""
+        with self.open() as f:
+            return f.read()
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the lines of the spooled output without line endings."""
+        with self.open() as f:
+            for line in f:
+                yield line.rstrip('\r\n')
+
+    def delete(self) -> None:
+        """Remove the spool file."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __repr__(self) -> str:
+        return f"SpooledOutput({self.path!r})"
+
+
+class OutputTail:
+    """Reads the lines appended to an output file since the last read."""
+
+    def __init__(self, path: str, encoding: str = 'cp866'):
+        """
+        Initialize the tail.
+
+        Args:
+            path: Output file, which need not exist yet
+            encoding: Encoding of the output
+        """
+        self.path = path
+        self.offset = 0
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        self._pending = ''
+
+    def read_lines(self) -> List[str]:
+        """
+        Read the lines completed since the last read.
+
+        A trailing partial line is kept until its line ending arrives.
+
+        Returns:
+            Complete lines without line endings
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size < self.offset:
+                    # The file was truncated, start over
+                    self.offset = 0
+                f.seek(self.offset)
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        self.offset += len(data)
+        return self._split(self._decoder.decode(data))
+
+    def finish(self) -> List[str]:
+        """
+        Read the remaining output, including a final unterminated line.
+
+        Returns:
+            Remaining lines without line endings
+        """
+        lines = self.read_lines()
+        rest = self._pending + self._decoder.decode(b'', final=True)
+        self._pending = ''
+        if rest:
+            lines.append(rest.rstrip('\r'))
+        return lines
+
+    def _split(self, text: str) -> List[str]:
+        """Split decoded text into complete lines, keeping the remainder."""
+        text = self._pending + text
+        lines = text.split('\n')
+        self._pending = lines.pop()
+        return [line.rstrip('\r') for line in lines]
+
+
+class OutputStreamer:
+    """Tails an output file in a background thread while a command runs."""
+
+    def __init__(self, path: str, on_line: OutputLineHook,
+                 poll_interval: float = 0.05, encoding: str = 'cp866'):
+        """
+        Initialize the streamer.
+
+        Args:
+            path: Output file the command redirects to
+            on_line: Callable receiving each line
+            poll_interval: Seconds between looks at the file
+            encoding: Encoding of the output
+        """
+        self.tail = OutputTail(path, encoding)
+        self.on_line = on_line
+        self.poll_interval = poll_interval
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        """Start tailing the file."""
+        self._thread = threading.Thread(target=self._run, name="dos-output-streamer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop tailing and deliver the rest of the output."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._deliver(self.tail.finish())
+
+    def _run(self) -> None:
+        """Poll the file until stopped."""
+        while not self._stopped.wait(self.poll_interval):
+            self._deliver(self.tail.read_lines())
+
+    def _deliver(self, lines: List[str]) -> None:
+        """Pass lines to the callback."""
+        for line in lines:
+            try:
+                self.on_line(line)
+            except Exception:
+                # A broken callback must not stop the command or lose its result
+                logging.getLogger(__name__).warning("Output line callback failed", exc_info=True)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
 
 
 class OutputHandler:
@@ -16,20 +185,35 @@ class OutputHandler:
         """Initialize the output handler."""
         pass
     
-    def capture_output(self, stdout_file: str = None) -> Dict[str, str]:
+    def capture_output(self, stdout_file: str = None, spool_threshold: int = None,
+                       spool_dir: str = None) -> Dict[str, any]:
         """
         Capture output from files.
         
         Args:
             stdout_file: File containing stdout
+            spool_threshold: Size in bytes above which the output is moved
+                             to a spool file instead of being read
+            spool_dir: Directory for spool files (defaults to the system
+                       temporary directory)
             
         Returns:
-            Dictionary with stdout content
+            Dictionary with stdout content. Spooled output leaves 'stdout'
+            empty and adds 'stdout_spool' holding a SpooledOutput.
         """
         output = {
             'stdout': '',
         }
         
+        if (spool_threshold is not None and stdout_file and os.path.exists(stdout_file)
+                and os.path.getsize(stdout_file) > spool_threshold):
+            # Keep large output out of memory; the scratch copy is about to be deleted
+            fd, spool_file = tempfile.mkstemp(prefix='dosout', suffix='.txt', dir=spool_dir)
+            os.close(fd)
+            shutil.move(stdout_file, spool_file)
+            output['stdout_spool'] = SpooledOutput(spool_file)
+            return output
+        
         # Read stdout if file exists
         if stdout_file and os.path.exists(stdout_file):
             try:
@@ -55,19 +239,22 @@ class OutputHandler:
         Returns:
             Exit code if found, None otherwise
         """
-        # Look for exit code pattern
-        match = re.search(r'Exit code: (\d+)', output)
+        # Look for exit code pattern, or the line ERRORLVL.COM prints
+        match = re.search(r'(?:Exit code|Error level): (\d+)', output)
         if match:
             return int(match.group(1))
         return None
     
-    def process_output(self, stdout: str = "", stderr: str = "") -> Dict[str, any]:
+    def process_output(self, stdout: str = "", stderr: str = "",
+                       exit_code_file: str = None) -> Dict[str, any]:
         """
         Process output and extract relevant information.
         
         Args:
             stdout: Standard output
             stderr: Standard error
+            exit_code_file: File holding the errorlevel written by the batch
+                            file (defaults to EXITCODE.TXT in the current directory)
             
         Returns:
             Dictionary with processed output information
@@ -80,15 +267,19 @@ class OutputHandler:
         }
         
         # Read exit code from file
-        exit_code_file = os.path.join(os.getcwd(), "EXITCODE.TXT")
+        if exit_code_file is None:
+            exit_code_file = os.path.join(os.getcwd(), "EXITCODE.TXT")
         if os.path.exists(exit_code_file):
-            with open(exit_code_file, 'r') as f:
+            with open(exit_code_file, 'r', encoding='cp866', errors='replace') as f:
+                content = f.read().strip()
                 try:
-                    exit_code = int(f.read().strip())
+                    exit_code = int(content)
+                except (ValueError, TypeError):
+                    # Written by an errorlevel program rather than echo
+                    exit_code = self.extract_exit_code(content)
+                if exit_code is not None:
                     result['exit_code'] = exit_code
                     result['success'] = (exit_code == 0)
-                except (ValueError, TypeError):
-                    pass # Ignore if the file is empty or contains non-integer data
             # Clean up the exit code file
             try:
                 os.remove(exit_code_file)
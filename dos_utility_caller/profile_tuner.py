@@ -0,0 +1,205 @@
+"""
+Execution Profile Tuner for DOS Utility Caller
+
+Runs a fixed Borland C++ compile workload under every execution profile,
+checks that each profile produces the same files as the 'accurate' profile
+and saves the fastest correct one. Calls pick it up with the profile name
+'tuned'.
+
+Usage:
+    python -m dos_utility_caller.profile_tuner --tools-dir /path/to/borlandc
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+import logging
+import statistics
+from datetime import datetime
+from typing import List, Dict, Any, Tuple
+
+from .config_manager import ConfigManager
+from .dos_caller import call_dos_utility_batch
+
+
+# Sample project compiled by the workload
+DEFAULT_WORKLOAD_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bcex", "crc16eas", "Source")
+
+# Files copied from the sample project for each run
+WORKLOAD_FILES = ["CRC16.CPP"]
+
+# Compile to an object file and to assembler source
+WORKLOAD_COMMANDS = [
+    ("BCC", ["-c", "-ID:\\INCLUDE", "CRC16.CPP"]),
+    ("BCC", ["-S", "-ID:\\INCLUDE", "CRC16.CPP"])
+]
+
+# Files whose contents must match the baseline
+WORKLOAD_OUTPUTS = ["CRC16.OBJ", "CRC16.ASM"]
+
+
+def _find_file(directory: str, name: str) -> str:
+    """Find a file in a directory ignoring case."""
+    for entry in os.listdir(directory):
+        if entry.upper() == name.upper():
+            return os.path.join(directory, entry)
+    return os.path.join(directory, name)
+
+
+def run_workload(profile: str, tools_dir: str, workload_dir: str = DEFAULT_WORKLOAD_DIR,
+                 environment: Dict[str, str] = None) -> Tuple[float, Dict[str, Any]]:
+    """
+    Run the workload once under a profile in a scratch copy of the sources.
+
+    Args:
+        profile: Execution profile name
+        tools_dir: Borland C++ directory to mount as D:
+        workload_dir: Directory holding the workload sources
+        environment: Environment variables (defaults to PATH=D:\\BIN)
+
+    Returns:
+        Tuple of the elapsed seconds and a fingerprint of the results:
+        the exit code of every command and the sha256 of every output file
+    """
+    with tempfile.TemporaryDirectory() as source_dir:
+        for name in WORKLOAD_FILES:
+            shutil.copy2(_find_file(workload_dir, name), os.path.join(source_dir, name))
+
+        start = time.perf_counter()
+        results = call_dos_utility_batch(
+            WORKLOAD_COMMANDS,
+            source_dir=source_dir,
+            tools_dir=tools_dir,
+            environment=environment or {"PATH": "D:\\BIN"},
+            dosbox_config={'execution': {'profile': profile}}
+        )
+        elapsed = time.perf_counter() - start
+
+        outputs = {}
+        for name in WORKLOAD_OUTPUTS:
+            path = _find_file(source_dir, name)
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    outputs[name] = hashlib.sha256(f.read()).hexdigest()
+            else:
+                outputs[name] = None
+        fingerprint = {
+            'exit_codes': [result['exit_code'] for result in results],
+            'outputs': outputs
+        }
+    return elapsed, fingerprint
+
+
+def tune_profiles(tools_dir: str, workload_dir: str = DEFAULT_WORKLOAD_DIR,
+                  profiles: List[str] = None, repeat: int = 3,
+                  environment: Dict[str, str] = None,
+                  output_file: str = None, save: bool = True) -> Dict[str, Any]:
+    """
+    Time the workload under each profile and save the fastest correct one.
+
+    The 'accurate' profile always runs first and provides the expected
+    results. A profile is correct if every run reproduces them.
+
+    Args:
+        tools_dir: Borland C++ directory to mount as D:
+        workload_dir: Directory holding the workload sources
+        profiles: Profiles to try (defaults to all of ConfigManager.PROFILES)
+        repeat: Number of runs per profile; the median time is compared
+        environment: Environment variables for the workload
+        output_file: File to save the result to
+                     (defaults to ConfigManager.TUNED_PROFILE_FILE)
+        save: Whether to save the result
+
+    Returns:
+        {
+            'profile': str,       # Fastest correct profile
+            'profiles': {name: {'median': float, 'times': [float], 'correct': bool}},
+            'tuned_at': str       # ISO timestamp
+        }
+
+    Raises:
+        RuntimeError: If the baseline workload fails
+    """
+    logger = logging.getLogger(__name__)
+    candidates = [ConfigManager.DEFAULT_PROFILE] + [
+        name for name in (profiles or ConfigManager.PROFILES)
+        if name != ConfigManager.DEFAULT_PROFILE
+    ]
+
+    baseline = None
+    report = {}
+    for profile in candidates:
+        times = []
+        correct = True
+        for _ in range(repeat):
+            elapsed, fingerprint = run_workload(profile, tools_dir, workload_dir, environment)
+            times.append(elapsed)
+            if baseline is None:
+                if any(fingerprint['exit_codes']) or None in fingerprint['outputs'].values():
+                    raise RuntimeError(f"Baseline workload failed: {fingerprint}")
+                baseline = fingerprint
+            elif fingerprint != baseline:
+                correct = False
+        report[profile] = {
+            'median': statistics.median(times),
+            'times': times,
+            'correct': correct
+        }
+        logger.info("Profile %s: median %.3fs, correct: %s", profile, report[profile]['median'], correct)
+
+    fastest = min((name for name in candidates if report[name]['correct']),
+                  key=lambda name: report[name]['median'])
+    result = {
+        'profile': fastest,
+        'profiles': report,
+        'tuned_at': datetime.now().isoformat(timespec='seconds')
+    }
+
+    if save:
+        output_file = output_file or ConfigManager.TUNED_PROFILE_FILE
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+        with open(output_file, 'w') as f:
+            json.dump(result, f, indent=2)
+        logger.info("Saved tuned profile %s to %s", fastest, output_file)
+    return result
+
+
+def main() -> None:
+    """Main function for the tuner command."""
+    parser = argparse.ArgumentParser(
+        description='Find the fastest execution profile that still compiles correctly')
+    parser.add_argument('--tools-dir', '-d', default=os.environ.get('TOOL_ROOT_DIR'),
+                        help='Borland C++ directory to mount as D: (default: TOOL_ROOT_DIR env var)')
+    parser.add_argument('--workload-dir', default=DEFAULT_WORKLOAD_DIR,
+                        help='Directory holding CRC16.CPP (default: bcex/crc16eas/Source)')
+    parser.add_argument('--profile', action='append', dest='profiles',
+                        choices=sorted(ConfigManager.PROFILES),
+                        help='Profile to try (can be used multiple times, default: all)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per profile (default: 3)')
+    parser.add_argument('--output', help='File to save the result to')
+    parser.add_argument('--dry-run', action='store_true', help='Do not save the result')
+    parser.add_argument('--debug', action='store_true', help='Enable debug logging')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if not args.tools_dir:
+        parser.error("--tools-dir is required when TOOL_ROOT_DIR is not set")
+
+    try:
+        result = tune_profiles(args.tools_dir, args.workload_dir, args.profiles, args.repeat,
+                               output_file=args.output, save=not args.dry_run)
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,334 @@
+"""
+Progress Watchdog for DOS Utility Caller
+
+Detects emulator sessions that stopped making progress, such as a compiler
+waiting on an interactive prompt or a PAUSE left in a batch file, so they
+can be killed long before the flat execution timeout. Also keeps a history
+of past run times to derive per-command deadlines from.
+
+[execution] settings:
+
+    stall_timeout         Seconds without progress before the emulator is
+                          killed (0, the default, disables the watchdog)
+    stall_cpu_threshold   Share of one CPU the emulator must use to count
+                          as working when its output does not change
+                          (unset: CPU use never counts)
+    adaptive_timeout      Whether to derive deadlines from the history
+    adaptive_factor       Multiplier applied to the p99 run time
+    adaptive_min_samples  Runs recorded before the history is trusted
+    adaptive_min_timeout  Lowest adaptive deadline in seconds
+    duration_history      JSON file holding the history
+"""
+
+import os
+import json
+import math
+import time
+import tempfile
+import threading
+import logging
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+# CPU use is not a sign of progress by default: DOSBox keeps emulating
+# while a program sits at a PAUSE or a prompt, at full speed with cycles=max
+DEFAULT_STALL_CPU_THRESHOLD = None
+DEFAULT_ADAPTIVE_FACTOR = 3.0
+DEFAULT_ADAPTIVE_MIN_SAMPLES = 5
+DEFAULT_ADAPTIVE_MIN_TIMEOUT = 10.0
+DEFAULT_HISTORY_FILE = os.path.join(
+    os.path.expanduser("~"), ".cache", "dos_utility_caller", "durations.json")
+
+_CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+
+def process_cpu_time(pid: int) -> Optional[float]:
+    """
+    Get the CPU seconds a process has used.
+
+    Uses psutil when it is installed and /proc otherwise.
+
+    Args:
+        pid: Process ID
+
+    Returns:
+        User plus system CPU seconds, or None if they cannot be read
+    """
+    if psutil is not None:
+        try:
+            times = psutil.Process(pid).cpu_times()
+            return times.user + times.system
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid}/stat", 'r') as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # The command name may contain spaces, the fields after it do not
+    fields = stat[stat.rfind(')') + 2:].split()
+    return (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+
+
+def _directory_signature(directories: List[str]) -> Tuple:
+    """Summarize the names, sizes and modification times of the files below directories."""
+    signature = []
+    pending = list(directories)
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        # Output directories such as OBJ\ count as progress too
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    signature.append((entry.path, stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            continue
+    return tuple(sorted(signature))
+
+
+class ProgressWatchdog:
+    """Decides whether an emulator process has stopped making progress."""
+
+    def __init__(self, pid: int, watch_dirs: List[str], stall_timeout: float,
+                 cpu_threshold: Optional[float] = DEFAULT_STALL_CPU_THRESHOLD):
+        """
+        Initialize the watchdog.
+
+        The process makes progress while its output or a file in one of
+        the watched directories changes. With a cpu_threshold, using at
+        least that share of a CPU breaks the tie when no file changed;
+        only set it high, and not for cycles=max sessions, which use a
+        whole CPU while waiting on a prompt. Where CPU time cannot be
+        read, only the files count.
+
+        Args:
+            pid: Emulator process ID
+            watch_dirs: Directories the program writes its output to
+            stall_timeout: Seconds without progress after which the
+                           process counts as stalled
+            cpu_threshold: Share of one CPU that counts as working, or
+                           None to ignore CPU use
+        """
+        self.pid = pid
+        self.watch_dirs = watch_dirs
+        self.stall_timeout = stall_timeout
+        self.cpu_threshold = cpu_threshold
+        # Look often enough to notice a stall soon after the window ends
+        self.poll_interval = min(1.0, stall_timeout / 4)
+        now = time.monotonic()
+        self._last_check = now
+        self._last_progress = now
+        self._signature = _directory_signature(watch_dirs)
+        self._cpu = process_cpu_time(pid) if cpu_threshold is not None else None
+
+    def stalled(self) -> bool:
+        """
+        Check for progress since the last call.
+
+        Returns:
+            True once no progress was seen for stall_timeout seconds
+        """
+        now = time.monotonic()
+        if now - self._last_check < self.poll_interval:
+            # Asked more often than it looks, e.g. while also polling for an abort
+            return now - self._last_progress >= self.stall_timeout
+        signature = _directory_signature(self.watch_dirs)
+        cpu = process_cpu_time(self.pid) if self.cpu_threshold is not None else None
+
+        progressed = signature != self._signature
+        if not progressed and cpu is not None and self._cpu is not None and now > self._last_check:
+            progressed = (cpu - self._cpu) / (now - self._last_check) >= self.cpu_threshold
+        if progressed:
+            self._last_progress = now
+
+        self._signature, self._cpu, self._last_check = signature, cpu, now
+        return now - self._last_progress >= self.stall_timeout
+
+    @classmethod
+    def from_config(cls, pid: int, config: Dict[str, Dict[str, str]]) -> Optional["ProgressWatchdog"]:
+        """
+        Create the watchdog configured for a call.
+
+        Watches every mounted directory except the tools drive D:.
+
+        Args:
+            pid: Emulator process ID
+            config: Emulator configuration
+
+        Returns:
+            Watchdog, or None if stall_timeout is not set
+        """
+        execution = config.get('execution', {})
+        stall_timeout = float(execution.get('stall_timeout', 0) or 0)
+        if stall_timeout <= 0:
+            return None
+        watch_dirs = [path for drive, path in config.get('mount', {}).items() if drive.lower() != 'd']
+        cpu_threshold = execution.get('stall_cpu_threshold')
+        return cls(pid, watch_dirs, stall_timeout,
+                   float(cpu_threshold) if cpu_threshold else DEFAULT_STALL_CPU_THRESHOLD)
+
+
+class DurationHistory:
+    """Past run times per compiler and command, persisted as JSON."""
+
+    # Runs kept per key
+    MAX_SAMPLES = 200
+
+    def __init__(self, filepath: str = DEFAULT_HISTORY_FILE):
+        """
+        Initialize the history, loading the file if it exists.
+
+        Args:
+            filepath: JSON file holding the history
+        """
+        self.filepath = filepath
+        self._lock = threading.Lock()
+        self.samples: Dict[str, List[float]] = {}
+        try:
+            with open(filepath, 'r') as f:
+                self.samples = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def make_key(command: str, config: Dict[str, Dict[str, str]]) -> str:
+        """
+        Build the history key of a call: the tools mount and the program name.
+
+        Args:
+            command: DOS command of the call
+            config: Emulator configuration
+
+        Returns:
+            History key
+        """
+        program = command.replace('\\', '/').rsplit('/', 1)[-1].upper()
+        program = os.path.splitext(program)[0]
+        return f"{config.get('mount', {}).get('d', '')}|{program}"
+
+    def record(self, key: str, seconds: float) -> None:
+        """
+        Record a run time and save the history.
+
+        Args:
+            key: History key from make_key()
+            seconds: Run time
+        """
+        with self._lock:
+            samples = self.samples.setdefault(key, [])
+            samples.append(round(seconds, 3))
+            del samples[:-self.MAX_SAMPLES]
+            self._save()
+
+    def percentile(self, key: str, percent: float = 99) -> Optional[float]:
+        """
+        Get a percentile of the recorded run times.
+
+        Args:
+            key: History key from make_key()
+            percent: Percentile to compute
+
+        Returns:
+            Run time in seconds, or None without samples
+        """
+        with self._lock:
+            samples = sorted(self.samples.get(key, []))
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, math.ceil(len(samples) * percent / 100) - 1)]
+
+    def deadline(self, key: str, factor: float = DEFAULT_ADAPTIVE_FACTOR,
+                 min_samples: int = DEFAULT_ADAPTIVE_MIN_SAMPLES,
+                 min_timeout: float = DEFAULT_ADAPTIVE_MIN_TIMEOUT) -> Optional[float]:
+        """
+        Get the adaptive deadline of a key: p99 of the run times times factor.
+
+        Args:
+            key: History key from make_key()
+            factor: Multiplier applied to the p99 run time
+            min_samples: Runs needed before a deadline is given
+            min_timeout: Lowest deadline returned
+
+        Returns:
+            Deadline in seconds, or None with too few samples
+        """
+        with self._lock:
+            count = len(self.samples.get(key, []))
+        if count < min_samples:
+            return None
+        return max(min_timeout, self.percentile(key) * factor)
+
+    def _save(self) -> None:
+        """Write the history atomically; the caller holds the lock."""
+        directory = os.path.dirname(self.filepath) or '.'
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_file = tempfile.mkstemp(dir=directory, prefix='.durations')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.samples, f)
+            os.replace(temp_file, self.filepath)
+        except OSError:
+            logging.getLogger(__name__).warning("Cannot save duration history to %s",
+                                                self.filepath, exc_info=True)
+
+
+# Histories by file, shared by all calls of the process
+_histories: Dict[str, DurationHistory] = {}
+_histories_lock = threading.Lock()
+
+
+def get_duration_history(config: Dict[str, Dict[str, str]]) -> Optional[DurationHistory]:
+    """
+    Get the duration history a call uses.
+
+    Args:
+        config: Emulator configuration
+
+    Returns:
+        Shared history, or None if adaptive_timeout is off
+    """
+    execution = config.get('execution', {})
+    if str(execution.get('adaptive_timeout', 'false')).strip().lower() not in ('1', 'true', 'yes', 'on'):
+        return None
+    filepath = os.path.expanduser(execution.get('duration_history') or DEFAULT_HISTORY_FILE)
+    with _histories_lock:
+        if filepath not in _histories:
+            _histories[filepath] = DurationHistory(filepath)
+        return _histories[filepath]
+
+
+def adaptive_timeout(history: DurationHistory, key: str,
+                     config: Dict[str, Dict[str, str]], timeout: float) -> float:
+    """
+    Shorten a timeout to the adaptive deadline of a key.
+
+    Args:
+        history: Duration history
+        key: History key from DurationHistory.make_key()
+        config: Emulator configuration with the adaptive_* settings
+        timeout: Configured timeout, which is never exceeded
+
+    Returns:
+        Timeout to use in seconds
+    """
+    execution = config.get('execution', {})
+    deadline = history.deadline(
+        key,
+        float(execution.get('adaptive_factor', DEFAULT_ADAPTIVE_FACTOR)),
+        int(execution.get('adaptive_min_samples', DEFAULT_ADAPTIVE_MIN_SAMPLES)),
+        float(execution.get('adaptive_min_timeout', DEFAULT_ADAPTIVE_MIN_TIMEOUT)))
+    if deadline is None:
+        return timeout
+    logging.getLogger(__name__).debug("Adaptive deadline for %s: %.1fs", key, deadline)
+    return min(timeout, deadline)
@@ -0,0 +1,486 @@
+"""
+Result Cache for DOS Utility Caller
+
+Content-addressed on-disk cache of command results. An entry is keyed by the
+command line, the contents of every file under the C: mount, the effective
+DOSBox configuration and a fingerprint of the tools directory, and stores the
+result dictionary together with the files the command produced.
+
+Hashing the whole C: tree rather than the files named on the command line
+keeps headers, .CFG and response files and makefile dependencies in the
+key; file digests are remembered by size and modification time, so only
+changed files are read again.
+
+Files are told apart as produced by a call by comparing the C: tree before
+and after it. Calls on the same tree may run at the same time, in threads or
+in other processes, so every cached run is registered in a small state file
+next to the entries, under a file lock held only while restoring or
+publishing. A run that overlapped another run or a restore on its tree is
+not stored, since its outputs can't be told from the other call's.
+"""
+
+import os
+import json
+import shutil
+import uuid
+import hashlib
+import tempfile
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+try:
+    import fcntl
+except ImportError:  # Windows: only calls within this process are coordinated
+    fcntl = None
+
+
+class ResultCache:
+    """Size-bounded, least recently used cache of command results."""
+
+    RESULT_FILE = "result.json"
+    FILES_DIR = "files"
+    # Lock and run state files of the source trees, skipped as entries
+    TREES_DIR = ".trees"
+
+    def __init__(self, cache_dir: str = None, max_size: int = 1024 * 1024 * 1024):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory holding the cache entries
+                       (defaults to ~/.cache/dos_utility_caller/results)
+            max_size: Maximum total size of the cache in bytes
+        """
+        self.cache_dir = cache_dir or os.path.join(
+            os.path.expanduser("~"), ".cache", "dos_utility_caller", "results")
+        self.max_size = max_size
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._tools_fingerprints: Dict[str, str] = {}
+        self._file_digests: Dict[str, Tuple[Tuple[int, int], str]] = {}
+        self._directory_locks: Dict[str, threading.Lock] = {}
+        self._total_size: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    # Keys
+
+    @staticmethod
+    def _hash_file(path: str) -> str:
+        """Get the sha256 hex digest of a file."""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _tree_inputs(self, source_dir: str, files: Dict[str, Tuple[int, int]]) -> List[Tuple[str, str]]:
+        """
+        Get the digest of every file under the C: mount.
+
+        Args:
+            source_dir: Directory mounted as C:
+            files: snapshot() of the source directory
+
+        Returns:
+            Sorted list of (path relative to the source directory, sha256)
+        """
+        inputs = []
+        for name, stat in sorted(files.items()):
+            path = os.path.join(source_dir, name)
+            with self._lock:
+                known = self._file_digests.get(path)
+            if known is not None and known[0] == stat:
+                digest = known[1]
+            else:
+                try:
+                    digest = self._hash_file(path)
+                except OSError:
+                    continue
+                with self._lock:
+                    self._file_digests[path] = (stat, digest)
+            inputs.append((name, digest))
+        return inputs
+
+    def _tools_fingerprint(self, tools_dir: str) -> str:
+        """
+        Get a fingerprint of the tools directory from file names, sizes and
+        modification times. Computed once per directory and cache instance.
+        """
+        if not tools_dir or not os.path.isdir(tools_dir):
+            return ''
+        with self._lock:
+            fingerprint = self._tools_fingerprints.get(tools_dir)
+        if fingerprint is not None:
+            return fingerprint
+
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(tools_dir):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                digest.update(f"{os.path.relpath(path, tools_dir)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+        fingerprint = digest.hexdigest()
+        with self._lock:
+            self._tools_fingerprints[tools_dir] = fingerprint
+        return fingerprint
+
+    def refresh_tools_fingerprint(self) -> None:
+        """Forget tools directory fingerprints, e.g. after updating a compiler."""
+        with self._lock:
+            self._tools_fingerprints.clear()
+
+    def _tree_path(self, source_dir: str, suffix: str) -> str:
+        name = hashlib.sha256(os.path.realpath(source_dir).encode()).hexdigest()[:32]
+        return os.path.join(self.cache_dir, self.TREES_DIR, name + suffix)
+
+    @contextmanager
+    def tree_lock(self, source_dir: str) -> Iterator[None]:
+        """
+        Hold the lock of a source directory, shared with other processes
+        using the same cache directory, for a short read or publish step.
+
+        Args:
+            source_dir: Directory mounted as C:
+        """
+        with self._lock:
+            thread_lock = self._directory_locks.setdefault(os.path.realpath(source_dir), threading.Lock())
+        lock_path = self._tree_path(source_dir, '.lock')
+        os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+        with thread_lock, open(lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_runs(self, source_dir: str) -> Dict[str, Any]:
+        """Read the run state of a source directory; call with tree_lock() held."""
+        try:
+            with open(self._tree_path(source_dir, '.json'), 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        active = {}
+        for token, pid in state.get('active', {}).items():
+            # Forget runs of processes that died without ending them
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                continue
+            except OSError:
+                pass
+            active[token] = pid
+        return {'epoch': state.get('epoch', 0), 'active': active}
+
+    def _write_runs(self, source_dir: str, state: Dict[str, Any]) -> None:
+        path = self._tree_path(source_dir, '.json')
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(path + '.tmp', path)
+
+    def _bump_epoch(self, source_dir: str) -> Dict[str, Any]:
+        """Mark the tree as changed by someone; call with tree_lock() held."""
+        state = self._read_runs(source_dir)
+        state['epoch'] += 1
+        self._write_runs(source_dir, state)
+        return state
+
+    def begin_run(self, source_dir: str) -> Dict[str, Any]:
+        """
+        Register a call about to run on a source directory.
+
+        Args:
+            source_dir: Directory mounted as C:
+
+        Returns:
+            Run record to pass to put() or end_run()
+        """
+        with self.tree_lock(source_dir):
+            state = self._read_runs(source_dir)
+            # Runs still going on the tree make this one ambiguous
+            overlapped = bool(state['active'])
+            token = uuid.uuid4().hex
+            state['epoch'] += 1
+            state['active'][token] = os.getpid()
+            self._write_runs(source_dir, state)
+        return {'source_dir': source_dir, 'token': token, 'epoch': state['epoch'],
+                'overlapped': overlapped, 'ended': False}
+
+    def _end_run(self, run: Dict[str, Any]) -> bool:
+        """End a run; call with tree_lock() held. Returns True if it ran alone."""
+        if run['ended']:
+            return False
+        run['ended'] = True
+        state = self._read_runs(run['source_dir'])
+        state['active'].pop(run['token'], None)
+        # Anything started or restored on the tree since changes the epoch
+        alone = not run['overlapped'] and state['epoch'] == run['epoch']
+        self._write_runs(run['source_dir'], state)
+        return alone
+
+    def end_run(self, run: Dict[str, Any]) -> None:
+        """
+        End a run that isn't stored, e.g. one that failed. Runs passed to
+        put() are ended there; ending a run twice does nothing.
+
+        Args:
+            run: Run record from begin_run()
+        """
+        if not run['ended']:
+            with self.tree_lock(run['source_dir']):
+                self._end_run(run)
+
+    def make_key(self, command: str, arguments: List[str], config: Dict[str, Dict[str, str]],
+                 files: Dict[str, Tuple[int, int]] = None) -> str:
+        """
+        Compute the cache key of a call.
+
+        Args:
+            command: DOS command to execute
+            arguments: Command arguments
+            config: Effective DOSBox configuration of the call
+            files: snapshot() of the C: directory, if already taken
+
+        Returns:
+            Hex digest identifying the call
+        """
+        mounts = config.get('mount', {})
+        source_dir = mounts.get('c')
+        if not source_dir:
+            raise ValueError("Cached calls need a source directory mounted as C:")
+        tools_dir = mounts.get('d')
+
+        # The location of the source directory doesn't matter to DOS, only
+        # what is in it, so the C: path itself is left out of the snapshot
+        snapshot = {section: dict(settings) for section, settings in config.items()}
+        snapshot.get('mount', {}).pop('c', None)
+
+        if files is None:
+            files = self.snapshot(source_dir)
+        inputs = self._tree_inputs(source_dir, files)
+
+        key = {
+            'command': command,
+            'arguments': list(arguments or []),
+            'inputs': inputs,
+            'config': snapshot,
+            'tools': self._tools_fingerprint(tools_dir)
+        }
+        return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+    # Produced files
+
+    @staticmethod
+    def snapshot(directory: str) -> Dict[str, Tuple[int, int]]:
+        """
+        Record the size and modification time of every file in a directory.
+
+        Args:
+            directory: Directory to scan
+
+        Returns:
+            Mapping of relative path to (size, mtime_ns)
+        """
+        files = {}
+        pending = [directory]
+        while pending:
+            current = pending.pop()
+            try:
+                entries = list(os.scandir(current))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    st = entry.stat(follow_symlinks=False)
+                    files[os.path.relpath(entry.path, directory)] = (st.st_size, st.st_mtime_ns)
+        return files
+
+    # Entries
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get(self, key: str, source_dir: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a call and restore the files it produced.
+
+        Args:
+            key: Cache key from make_key()
+            source_dir: Directory mounted as C: to restore produced files into
+
+        Returns:
+            Cached result dictionary with 'cached' set to True, or None on a miss
+        """
+        logger = logging.getLogger(__name__)
+        entry = self._entry_dir(key)
+        result_file = os.path.join(entry, self.RESULT_FILE)
+        try:
+            with open(result_file, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            logger.debug("Cache miss: %s", key)
+            return None
+
+        files_dir = os.path.join(entry, self.FILES_DIR)
+        try:
+            files = result.pop('files', [])
+            with self.tree_lock(source_dir):
+                if files:
+                    # Calls running on the tree now can't tell these from their own
+                    self._bump_epoch(source_dir)
+                for name in files:
+                    target = os.path.join(source_dir, name)
+                    os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+                    shutil.copyfile(os.path.join(files_dir, name), target)
+            # Mark the entry as recently used
+            os.utime(result_file)
+        except OSError:
+            # Evicted while being read; the command runs again and replaces
+            # whatever was restored so far
+            with self._lock:
+                self.misses += 1
+            logger.debug("Cache miss, entry went away: %s", key)
+            return None
+        with self._lock:
+            self.hits += 1
+        logger.debug("Cache hit: %s", key)
+        result['cached'] = True
+        return result
+
+    def put(self, key: str, result: Dict[str, Any], source_dir: str,
+            before: Dict[str, Tuple[int, int]], run: Dict[str, Any] = None) -> None:
+        """
+        Store a result and the files the command produced.
+
+        Args:
+            key: Cache key from make_key()
+            result: Result dictionary of the call
+            source_dir: Directory mounted as C:
+            before: snapshot() of the source directory taken before the call
+            run: Run record from begin_run(); the result is only stored if
+                 nothing else ran on or was restored into the tree meanwhile
+        """
+        if run is None:
+            self._publish(key, result, source_dir, before)
+        else:
+            with self.tree_lock(source_dir):
+                if not self._end_run(run):
+                    logging.getLogger(__name__).debug("Not caching %s: the tree changed under another call", key)
+                    return
+                self._publish(key, result, source_dir, before)
+        self._evict()
+
+    def _publish(self, key: str, result: Dict[str, Any], source_dir: str,
+                 before: Dict[str, Tuple[int, int]]) -> None:
+        """Copy a result and its produced files into a new entry."""
+        logger = logging.getLogger(__name__)
+        after = self.snapshot(source_dir)
+        produced = sorted(name for name, stat in after.items() if before.get(name) != stat)
+
+        # Build the entry next to its final place and rename it in, so
+        # readers never see a half written entry
+        staging = tempfile.mkdtemp(dir=self.cache_dir, prefix='.tmp')
+        try:
+            size = 0
+            for name in produced:
+                target = os.path.join(staging, self.FILES_DIR, name)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copyfile(os.path.join(source_dir, name), target)
+                size += os.path.getsize(target)
+            stored = dict(result, files=produced)
+            stored.pop('cached', None)
+            with open(os.path.join(staging, self.RESULT_FILE), 'w', encoding='utf-8') as f:
+                json.dump(stored, f)
+            size += os.path.getsize(os.path.join(staging, self.RESULT_FILE))
+
+            entry = self._entry_dir(key)
+            os.makedirs(os.path.dirname(entry), exist_ok=True)
+            try:
+                os.rename(staging, entry)
+            except OSError:
+                # Another call stored the same key first
+                return
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+        logger.debug("Cached result %s with files %s", key, produced)
+        with self._lock:
+            self.stores += 1
+            if self._total_size is not None:
+                self._total_size += size
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        """List (last use, size, path) of every entry."""
+        entries = []
+        for prefix in os.scandir(self.cache_dir):
+            if not prefix.is_dir() or prefix.name.startswith('.'):
+                continue
+            for entry in os.scandir(prefix.path):
+                try:
+                    used = os.stat(os.path.join(entry.path, self.RESULT_FILE)).st_mtime
+                except OSError:
+                    continue
+                size = sum(item[0] for item in self.snapshot(entry.path).values())
+                entries.append((used, size, entry.path))
+        return entries
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until the cache fits max_size."""
+        with self._lock:
+            if self._total_size is not None and self._total_size <= self.max_size:
+                return
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        while entries and total > self.max_size:
+            _, size, path = entries.pop(0)
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            evicted += 1
+        if evicted:
+            logging.getLogger(__name__).debug("Evicted %d cache entries", evicted)
+        with self._lock:
+            self._total_size = total
+            self.evictions += evicted
+
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+        for _, _, path in self._entries():
+            shutil.rmtree(path, ignore_errors=True)
+        with self._lock:
+            self._total_size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with hits, misses, stores, evictions, hit rate,
+            number of entries and total size in bytes
+        """
+        entries = self._entries()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(entries),
+                'size': sum(size for _, size, _ in entries)
+            }
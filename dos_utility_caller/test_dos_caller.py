@@ -2,29 +2,58 @@
 Unit tests for the DOS Utility Caller.
 """
 
+import asyncio
+import json
 import unittest
+from unittest import mock
 import tempfile
 import os
+import stat
+import time
 from pathlib import Path
 
 # Import our modules
 try:
-    from .dos_caller import call_dos_utility
+    from .dos_caller import call_dos_utility, call_dos_utility_batch, stream_dos_utility
+    from .async_dos_caller import async_call_dos_utility, async_call_dos_utility_batch, set_max_concurrency
     from .config_manager import ConfigManager
     from .batch_generator import BatchGenerator
     from .dosbox_executor import DOSBoxExecutor
-    from .output_handler import OutputHandler
+    from .output_handler import OutputHandler, OutputTail
     from .filename_validator import FilenameValidator, FilenameValidationError
+    from .dosbox_pool import DOSBoxWorker, DOSBoxWorkerPool, get_worker_pool, shutdown_worker_pools
+    from .workspace import ScratchWorkspace
+    from .fake_dosbox import make_fake_dosbox
+    from . import benchmark
+    from .timing import PhaseTimer, PHASES
+    from . import profile_tuner
+    from .emulator_backend import create_executor
+    from .emu2_executor import Emu2Executor
+    from .result_cache import ResultCache
+    from .progress_watchdog import DurationHistory, ProgressWatchdog, process_cpu_time
+    from .diagnostics import parse_diagnostic, parse_diagnostics, DiagnosticCollector
 except ImportError:
     # Fallback for direct execution
     import sys
     sys.path.insert(0, str(Path(__file__).parent))
-    from dos_caller import call_dos_utility
+    from dos_caller import call_dos_utility, call_dos_utility_batch, stream_dos_utility
+    from async_dos_caller import async_call_dos_utility, async_call_dos_utility_batch, set_max_concurrency
     from config_manager import ConfigManager
     from batch_generator import BatchGenerator
     from dosbox_executor import DOSBoxExecutor
-    from output_handler import OutputHandler
+    from output_handler import OutputHandler, OutputTail
     from filename_validator import FilenameValidator, FilenameValidationError
+    from dosbox_pool import DOSBoxWorker, DOSBoxWorkerPool, get_worker_pool, shutdown_worker_pools
+    from workspace import ScratchWorkspace
+    from fake_dosbox import make_fake_dosbox
+    import benchmark
+    from timing import PhaseTimer, PHASES
+    import profile_tuner
+    from emulator_backend import create_executor
+    from emu2_executor import Emu2Executor
+    from result_cache import ResultCache
+    from progress_watchdog import DurationHistory, ProgressWatchdog, process_cpu_time
+    from diagnostics import parse_diagnostic, parse_diagnostics, DiagnosticCollector
 
 
 class TestFilenameValidator(unittest.TestCase):
@@ -119,6 +148,60 @@ class TestConfigManager(unittest.TestCase):
         config = config_manager.get_dosbox_config()
         self.assertEqual(config['dosbox']['memsize'], '32')
         self.assertEqual(config['cpu']['cycles'], '30000')
+    
+    def test_profiles(self):
+        """Test that named profiles overlay the default configuration."""
+        config_manager = ConfigManager()
+        config_manager.apply_profile('headless')
+        config = config_manager.get_dosbox_config()
+        self.assertEqual(config['cpu']['core'], 'dynamic')
+        self.assertEqual(config['cpu']['cycles'], 'max')
+        self.assertEqual(config['mixer']['nosound'], 'true')
+        self.assertEqual(config['execution']['sdl_videodriver'], 'dummy')
+        self.assertEqual(config['execution']['profile'], 'headless')
+        # Settings outside the profile keep their defaults
+        self.assertEqual(config['sdl']['fullscreen'], 'false')
+        self.assertEqual(DOSBoxExecutor()._get_process_env(config)['SDL_VIDEODRIVER'], 'dummy')
+        
+        accurate = ConfigManager()
+        accurate.apply_profile('accurate')
+        self.assertEqual(accurate.get_dosbox_config()['cpu']['cycles'], '20000')
+        self.assertIsNone(DOSBoxExecutor()._get_process_env(accurate.get_dosbox_config()))
+        
+        with self.assertRaises(ValueError):
+            ConfigManager().apply_profile('turbo')
+    
+    def test_tuned_profile(self):
+        """Test that the 'tuned' profile resolves to the saved tuner result."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            tuned_file = os.path.join(temp_dir, "tuned.json")
+            with mock.patch.object(ConfigManager, 'TUNED_PROFILE_FILE', tuned_file):
+                self.assertEqual(ConfigManager.load_tuned_profile(), 'accurate')
+                with open(tuned_file, 'w') as f:
+                    f.write('{"profile": "max-throughput"}')
+                config_manager = ConfigManager()
+                config_manager.apply_profile('tuned')
+                self.assertEqual(config_manager.get_dosbox_config()['cpu']['cycles'], 'max')
+    
+    def test_tuner_picks_fastest_correct_profile(self):
+        """Test that a fast profile with wrong output is not chosen."""
+        delays = {'accurate': 0.03, 'max-throughput': 0.01, 'headless': 0.0}
+        
+        def fake_batch(commands, source_dir=None, dosbox_config=None, **kwargs):
+            profile = dosbox_config['execution']['profile']
+            time.sleep(delays[profile])
+            for name in profile_tuner.WORKLOAD_OUTPUTS:
+                with open(os.path.join(source_dir, name), 'w') as f:
+                    f.write("broken" if profile == 'headless' else name)
+            return [{'exit_code': 0} for _ in commands]
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            tuned_file = os.path.join(temp_dir, "tuned.json")
+            with mock.patch.object(profile_tuner, 'call_dos_utility_batch', fake_batch):
+                result = profile_tuner.tune_profiles("/tools", repeat=2, output_file=tuned_file)
+            self.assertEqual(result['profile'], 'max-throughput')
+            self.assertFalse(result['profiles']['headless']['correct'])
+            self.assertEqual(ConfigManager.load_tuned_profile(tuned_file), 'max-throughput')
 
 
 class TestBatchGenerator(unittest.TestCase):
@@ -162,6 +245,25 @@ class TestBatchGenerator(unittest.TestCase):
         # Clean up
         os.remove(batch_file)
     
+    def test_multi_batch_generation(self):
+        """Test generation of a batch file running several commands."""
+        generator = BatchGenerator()
+        batch_file = generator.generate_multi_batch(
+            [("dir", ["*.txt"]), ("ver", [])],
+            ["C:\\OUT00000.TXT", "C:\\OUT00001.TXT"],
+            ["C:\\ERL00000.TXT", "C:\\ERL00001.TXT"],
+            stop_on_error=True
+        )
+        
+        with open(batch_file, 'r') as f:
+            content = f.read()
+            self.assertIn("dir *.txt > C:\\OUT00000.TXT", content)
+            self.assertIn("echo %ERRORLEVEL% > C:\\ERL00001.TXT", content)
+            self.assertIn("if errorlevel 1 goto END", content)
+        
+        # Clean up
+        os.remove(batch_file)
+    
     def test_8_3_filename_compliance(self):
         """Test that generated batch files have 8.3 compliant names."""
         generator = BatchGenerator()
@@ -203,6 +305,9 @@ class TestOutputHandler(unittest.TestCase):
         exit_code = handler.extract_exit_code(output)
         self.assertEqual(exit_code, 0)
         
+        # Test the line ERRORLVL.COM prints
+        self.assertEqual(handler.extract_exit_code("Error level: 2\n"), 2)
+        
         # Test no exit code
         output = "Some command output\nMore output"
         exit_code = handler.extract_exit_code(output)
@@ -221,6 +326,947 @@ class TestOutputHandler(unittest.TestCase):
         result = handler.process_output("Exit code: 1\n", "Error occurred")
         self.assertFalse(result['success'])
         self.assertEqual(result['exit_code'], 1)
+    
+    def test_output_tail(self):
+        """Test that the tail returns complete lines and keeps partial ones."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "STDOUT.TXT")
+            tail = OutputTail(path)
+            self.assertEqual(tail.read_lines(), [])
+            
+            with open(path, 'wb') as f:
+                f.write(b"first\r\nsec")
+            self.assertEqual(tail.read_lines(), ["first"])
+            with open(path, 'ab') as f:
+                f.write(b"ond\r\n\x8f\xe0\xa8")
+            self.assertEqual(tail.read_lines(), ["second"])
+            self.assertEqual(tail.finish(), ["\u041f\u0440\u0438"])
+    
+    def test_spooled_output(self):
+        """Test that output above the threshold is moved to a spool file."""
+        handler = OutputHandler()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "STDOUT.TXT")
+            with open(path, 'wb') as f:
+                f.write(b"one\r\ntwo\r\n")
+            
+            self.assertEqual(handler.capture_output(path, spool_threshold=100)['stdout'], "one\ntwo\n")
+            
+            output = handler.capture_output(path, spool_threshold=4, spool_dir=temp_dir)
+            self.assertEqual(output['stdout'], '')
+            spool = output['stdout_spool']
+            self.assertFalse(os.path.exists(path))
+            self.assertEqual(list(spool), ["one", "two"])
+            self.assertEqual(spool.size, 10)
+            spool.delete()
+            self.assertFalse(os.path.exists(spool.path))
+
+
+class FakeWorker(DOSBoxWorker):
+    """Worker that answers jobs without launching DOSBox."""
+    
+    def start(self):
+        self.started = True
+        self.stopped = False
+        self.jobs_run = 0
+        self.last_used = time.monotonic()
+    
+    def is_alive(self):
+        return not self.stopped
+    
+    def run(self, command, arguments=None, timeout=None):
+        self.jobs_run += 1
+        self.last_used = time.monotonic()
+        self.timeout = timeout
+        return {'stdout': command, 'stderr': '', 'exit_code': 0, 'success': True}
+    
+    def stop(self, timeout=5):
+        self.stopped = True
+
+
+class FakeWorkerPool(DOSBoxWorkerPool):
+    """Pool that hands out FakeWorker sessions."""
+    
+    def _create_worker(self):
+        worker = FakeWorker(self.config)
+        worker.start()
+        self.created = getattr(self, 'created', 0) + 1
+        return worker
+
+
+class TestDOSBoxWorkerPool(unittest.TestCase):
+    """Test cases for the warm DOSBox worker pool."""
+    
+    def test_loop_batch_polls_mailbox(self):
+        """Test that the session loop rescans the mailbox and runs jobs."""
+        worker = DOSBoxWorker({'environment': {'include': 'D:\\INCLUDE'}})
+        content = worker._generate_loop_batch()
+        self.assertIn("set INCLUDE=D:\\INCLUDE", content)
+        self.assertIn("rescan", content)
+        self.assertIn("ren JOB.BAT RUN.BAT\ncall RUN.BAT", content)
+        self.assertNotIn("del JOB.BAT", content)
+        self.assertIn("if exist QUIT.FLG goto QUIT", content)
+    
+    def test_job_batch_captures_output(self):
+        """Test that a job writes stdout, errorlevel and a completion marker."""
+        worker = DOSBoxWorker({})
+        content = worker._generate_job_batch("dir", ["*.txt"])
+        self.assertIn("dir *.txt > M:\\STDOUT.TXT", content)
+        self.assertIn("echo %ERRORLEVEL% > M:\\EXITCODE.TXT", content)
+        self.assertIn("M:\\DONE.TXT", content)
+    
+    def test_workers_are_reused_and_recycled(self):
+        """Test that a worker is reused until it reaches its job limit."""
+        pool = FakeWorkerPool(size=1, max_jobs_per_worker=3)
+        for _ in range(7):
+            self.assertTrue(pool.run("ver")['success'])
+        self.assertEqual(pool.created, 3)
+        pool.close()
+    
+    def test_dead_worker_is_replaced(self):
+        """Test that a worker which died while idle is not handed out."""
+        pool = FakeWorkerPool(size=1)
+        pool.run("ver")
+        worker = pool._idle.get_nowait()
+        worker.stopped = True
+        pool._idle.put(worker)
+        pool.run("ver")
+        self.assertEqual(pool.created, 2)
+        pool.close()
+    
+    def test_call_dos_utility_uses_pool(self):
+        """Test that call_dos_utility hands the command to the pool."""
+        pool = FakeWorkerPool(size=1)
+        result = call_dos_utility("ver", worker_pool=pool)
+        self.assertEqual(result['stdout'], "ver")
+        pool.close()
+    
+    def test_call_timeout_reaches_worker(self):
+        """Test that a pooled call keeps its own timeout."""
+        pool = FakeWorkerPool(size=1)
+        call_dos_utility("ver", worker_pool=pool, dosbox_config={'execution': {'timeout': '7'}})
+        self.assertEqual(pool._idle.get_nowait().timeout, 7)
+        pool.close()
+    
+    def test_shared_pools_follow_their_arguments(self):
+        """Test that calls on another tree don't get a pool mounted for the first one."""
+        try:
+            first = get_worker_pool('borland', source_dir='/tmp/a', size=1)
+            self.assertIs(get_worker_pool('borland', source_dir='/tmp/a', size=1), first)
+            other = get_worker_pool('borland', source_dir='/tmp/b', size=1)
+            self.assertIsNot(other, first)
+            self.assertEqual(other.config['mount']['c'], '/tmp/b')
+            self.assertIsNot(get_worker_pool('borland', source_dir='/tmp/a', size=1,
+                                             dosbox_config={'execution': {'timeout': '5'}}), first)
+        finally:
+            shutdown_worker_pools()
+
+
+def fake_dosbox_execute(self, batch_file, config, working_dir=None,
+                        batch_command=None, config_dir=None, timer=None, abort_event=None):
+    """Stand-in for DOSBoxExecutor.execute that interprets simple batch files."""
+    with open(batch_file, 'r') as f:
+        lines = [line.strip() for line in f]
+    for line in lines:
+        if ' > ' not in line:
+            continue
+        command, target = line.split(' > ')
+        drive, name = target.split(':\\')
+        path = os.path.join(config['mount'][drive.lower()], name)
+        failed = command.startswith('echo %ERRORLEVEL%') and last_command.startswith('fail')
+        with open(path, 'w') as out:
+            if command.startswith('echo %ERRORLEVEL%'):
+                out.write("2\n" if failed else "0\n")
+            else:
+                out.write(f"ran {command}\n")
+                last_command = command
+        if failed and 'goto END' in ''.join(lines):
+            break
+    return 0
+
+
+class TestDOSCallerBatch(unittest.TestCase):
+    """Test cases for running several commands in one DOSBox launch."""
+    
+    def setUp(self):
+        self.old_cwd = os.getcwd()
+        self.temp_dir = tempfile.mkdtemp()
+        os.chdir(self.temp_dir)
+    
+    def tearDown(self):
+        os.chdir(self.old_cwd)
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_results_per_command(self):
+        """Test that every command gets its own output and exit code."""
+        with mock.patch.object(DOSBoxExecutor, 'execute', fake_dosbox_execute):
+            results = call_dos_utility_batch(["ver", ("fail", ["x.c"]), ("dir", ["*.c"])])
+        
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0]['stdout'], "ran ver\n")
+        self.assertTrue(results[0]['success'])
+        self.assertEqual(results[1]['exit_code'], 2)
+        self.assertFalse(results[1]['success'])
+        self.assertTrue(results[2]['success'])
+    
+    def test_stop_on_error(self):
+        """Test that commands after a failure are reported as skipped."""
+        with mock.patch.object(DOSBoxExecutor, 'execute', fake_dosbox_execute):
+            results = call_dos_utility_batch(["fail", "ver"], stop_on_error=True)
+        
+        self.assertEqual(results[0]['exit_code'], 2)
+        self.assertTrue(results[1]['skipped'])
+        self.assertFalse(results[1]['success'])
+    
+    def test_invalid_filename_fails_every_command(self):
+        """Test that a validation error is reported for each command."""
+        results = call_dos_utility_batch(["ver", ("type", ["toolongname.txt"])])
+        self.assertEqual(len(results), 2)
+        for result in results:
+            self.assertFalse(result['success'])
+            self.assertIn("Filename validation error", result['stderr'])
+
+
+class TestAsyncDOSCaller(unittest.TestCase):
+    """Test cases for the asyncio front end."""
+    
+    def setUp(self):
+        self.old_cwd = os.getcwd()
+        self.temp_dir = tempfile.mkdtemp()
+        os.chdir(self.temp_dir)
+    
+    def tearDown(self):
+        os.chdir(self.old_cwd)
+        set_max_concurrency(os.cpu_count() or 1)
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _fake_dosbox(self, script):
+        """Write a stand-in DOSBox that records its PID and hangs."""
+        path = os.path.join(self.temp_dir, "dosbox")
+        with open(path, 'w') as f:
+            f.write(f"#!/bin/sh\necho $$ > {self.temp_dir}/PID\n{script}\n")
+        os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+        return path
+    
+    def _assert_process_gone(self):
+        with open(os.path.join(self.temp_dir, "PID")) as f:
+            pid = int(f.read())
+        with self.assertRaises(ProcessLookupError):
+            os.kill(pid, 0)
+    
+    def test_concurrency_limit(self):
+        """Test that the semaphore caps the number of running emulators."""
+        state = {'running': 0, 'peak': 0}
+        
+        async def execute_async(executor, batch_file, config, working_dir=None,
+                                batch_command=None, config_dir=None, timeout=None, timer=None,
+                                abort_event=None):
+            state['running'] += 1
+            state['peak'] = max(state['peak'], state['running'])
+            await asyncio.sleep(0.01)
+            state['running'] -= 1
+            return fake_dosbox_execute(executor, batch_file, config, working_dir,
+                                       batch_command, config_dir)
+        
+        async def run_all():
+            return await asyncio.gather(*(async_call_dos_utility(f"cmd{i}") for i in range(20)))
+        
+        set_max_concurrency(3)
+        with mock.patch.object(DOSBoxExecutor, 'execute_async', execute_async):
+            results = asyncio.run(run_all())
+        
+        self.assertEqual(state['peak'], 3)
+        for i, result in enumerate(results):
+            self.assertEqual(result['stdout'], f"ran cmd{i}\n")
+    
+    def test_batch(self):
+        """Test that the async batch variant reports one result per command."""
+        async def execute_async(executor, *args, timeout=None, **kwargs):
+            return fake_dosbox_execute(executor, *args, **kwargs)
+        
+        with mock.patch.object(DOSBoxExecutor, 'execute_async', execute_async):
+            results = asyncio.run(async_call_dos_utility_batch(["ver", "fail"]))
+        
+        self.assertEqual(results[0]['stdout'], "ran ver\n")
+        self.assertEqual(results[1]['exit_code'], 2)
+    
+    def test_timeout_kills_emulator(self):
+        """Test that a timed out call kills DOSBox and reports an error."""
+        executor = DOSBoxExecutor(self._fake_dosbox("exec sleep 30"))
+        batch_file = os.path.join(self.temp_dir, "RUN.BAT")
+        open(batch_file, 'w').close()
+        
+        with self.assertRaises(Exception) as context:
+            asyncio.run(executor.execute_async(
+                batch_file, {'mount': {}}, config_dir=self.temp_dir, timeout=0.5))
+        self.assertIn("timed out", str(context.exception))
+        self._assert_process_gone()
+    
+    def test_cancellation_kills_emulator(self):
+        """Test that cancelling the awaiting task kills DOSBox."""
+        executor = DOSBoxExecutor(self._fake_dosbox("exec sleep 30"))
+        batch_file = os.path.join(self.temp_dir, "RUN.BAT")
+        open(batch_file, 'w').close()
+        
+        async def run_and_cancel():
+            task = asyncio.ensure_future(executor.execute_async(
+                batch_file, {'mount': {}}, config_dir=self.temp_dir))
+            while not os.path.exists(os.path.join(self.temp_dir, "PID")):
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+        
+        asyncio.run(run_and_cancel())
+        self._assert_process_gone()
+
+
+def fake_compile_execute(self, batch_file, config, working_dir=None,
+                         batch_command=None, config_dir=None, timer=None, abort_event=None):
+    """Stand-in for DOSBoxExecutor.execute that "compiles" X.C into X.OBJ."""
+    fake_compile_execute.calls += 1
+    with open(batch_file, 'r') as f:
+        line = next(line for line in f if ' > ' in line)
+    source = line.split(' > ')[0].split()[-1].split('\\')[-1]
+    source_dir = config['mount']['c']
+    with open(os.path.join(source_dir, source), 'r') as f:
+        text = f.read()
+    with open(os.path.join(source_dir, source.rsplit('.', 1)[0] + ".OBJ"), 'w') as f:
+        f.write(text.upper())
+    return fake_dosbox_execute(self, batch_file, config, working_dir, batch_command, config_dir)
+
+
+class TestResultCache(unittest.TestCase):
+    """Test cases for the content-addressed result cache."""
+    
+    def setUp(self):
+        self.source_dir = tempfile.mkdtemp()
+        self.cache = ResultCache(tempfile.mkdtemp())
+        with open(os.path.join(self.source_dir, "TEST.C"), 'w') as f:
+            f.write("int main() { return 0; }")
+        fake_compile_execute.calls = 0
+    
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.source_dir, ignore_errors=True)
+        shutil.rmtree(self.cache.cache_dir, ignore_errors=True)
+    
+    def _compile(self, **kwargs):
+        with mock.patch.object(DOSBoxExecutor, 'execute', fake_compile_execute):
+            return call_dos_utility("bcc", ["-c", "TEST.C"], source_dir=self.source_dir,
+                                    result_cache=self.cache, **kwargs)
+    
+    def test_hit_restores_produced_files(self):
+        """Test that a repeated call is served from the cache with its outputs."""
+        first = self._compile()
+        self.assertNotIn('cached', first)
+        os.remove(os.path.join(self.source_dir, "TEST.OBJ"))
+        
+        second = self._compile()
+        self.assertTrue(second['cached'])
+        self.assertEqual(second['stdout'], first['stdout'])
+        self.assertEqual(fake_compile_execute.calls, 1)
+        with open(os.path.join(self.source_dir, "TEST.OBJ")) as f:
+            self.assertEqual(f.read(), "INT MAIN() { RETURN 0; }")
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+    
+    def test_changed_input_misses(self):
+        """Test that editing a referenced input file invalidates the entry."""
+        self._compile()
+        with open(os.path.join(self.source_dir, "TEST.C"), 'w') as f:
+            f.write("int main() { return 1; }")
+        result = self._compile()
+        self.assertTrue(result['success'])
+        self.assertNotIn('cached', result)
+        self.assertEqual(fake_compile_execute.calls, 2)
+    
+    def test_changed_header_misses(self):
+        """Test that files not named on the command line are part of the key."""
+        with open(os.path.join(self.source_dir, "TEST.H"), 'w') as f:
+            f.write("#define A 1")
+        self._compile()
+        with open(os.path.join(self.source_dir, "TEST.H"), 'w') as f:
+            f.write("#define A 2")
+        self.assertNotIn('cached', self._compile())
+        self.assertEqual(fake_compile_execute.calls, 2)
+    
+    def test_missing_entry_file_misses(self):
+        """Test that an entry whose files went away is a miss, not an error."""
+        self._compile()
+        os.remove(os.path.join(self.source_dir, "TEST.OBJ"))
+        for root, _, names in os.walk(self.cache.cache_dir):
+            if "TEST.OBJ" in names:
+                os.remove(os.path.join(root, "TEST.OBJ"))
+        result = self._compile()
+        self.assertTrue(result['success'], result)
+        self.assertNotIn('cached', result)
+        self.assertEqual(fake_compile_execute.calls, 2)
+        self.assertEqual(self.cache.stats()['misses'], 2)
+    
+    def test_concurrent_calls_keep_their_files(self):
+        """Test that concurrent calls on one directory store only their own outputs."""
+        from concurrent.futures import ThreadPoolExecutor
+        names = [f"T{i}.C" for i in range(4)]
+        for name in names:
+            with open(os.path.join(self.source_dir, name), 'w') as f:
+                f.write(name)
+        
+        def compile_one(name):
+            return call_dos_utility("bcc", ["-c", name], source_dir=self.source_dir,
+                                    result_cache=self.cache)
+        
+        with mock.patch.object(DOSBoxExecutor, 'execute', fake_compile_execute):
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                self.assertTrue(all(r['success'] for r in pool.map(compile_one, names)))
+        for root, _, files in os.walk(self.cache.cache_dir):
+            if ResultCache.RESULT_FILE in files:
+                with open(os.path.join(root, ResultCache.RESULT_FILE)) as f:
+                    self.assertEqual(len(json.load(f)['files']), 1)
+    
+    def test_run_in_other_process_is_not_stored(self):
+        """Test that a call overlapping a run registered elsewhere isn't cached."""
+        import subprocess
+        import sys
+        other = ResultCache(self.cache.cache_dir)
+        run = other.begin_run(self.source_dir)
+        self._compile()
+        self.assertEqual(self.cache.stats()['stores'], 0)
+        other.end_run(run)
+        self._compile()
+        self.assertEqual(self.cache.stats()['stores'], 1)
+
+        # Runs of processes that died are forgotten
+        run = other.begin_run(self.source_dir)
+        process = subprocess.Popen([sys.executable, "-c", "pass"])
+        process.wait()
+        with other.tree_lock(self.source_dir):
+            state = other._read_runs(self.source_dir)
+            state['active'][run['token']] = process.pid
+            other._write_runs(self.source_dir, state)
+        with open(os.path.join(self.source_dir, "TEST.C"), 'a') as f:
+            f.write("\n")
+        self._compile()
+        self.assertEqual(self.cache.stats()['stores'], 2)
+
+    def test_needs_source_dir(self):
+        """Test that calls without a source_dir don't hash the current directory."""
+        with mock.patch.object(DOSBoxExecutor, 'execute', fake_dosbox_execute):
+            result = call_dos_utility("ver", result_cache=self.cache)
+        self.assertNotIn('cached', result)
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['stores']), (0, 0, 0))
+        with self.assertRaises(ValueError):
+            self.cache.make_key("ver", [], {'mount': {}})
+
+    def test_config_change_misses(self):
+        """Test that the DOSBox configuration is part of the key."""
+        self._compile()
+        self._compile(dosbox_config={'cpu': {'cycles': 'max'}})
+        self.assertEqual(fake_compile_execute.calls, 2)
+    
+    def test_bypass(self):
+        """Test that bypass_cache runs the command without touching the cache."""
+        self._compile()
+        result = self._compile(bypass_cache=True)
+        self.assertNotIn('cached', result)
+        self.assertEqual(fake_compile_execute.calls, 2)
+        self.assertEqual(self.cache.stats()['hits'] + self.cache.stats()['misses'], 1)
+    
+    def test_lru_eviction(self):
+        """Test that the least recently used entries go once the cache is full."""
+        config = {'mount': {'c': self.source_dir}}
+        keys = []
+        for i in range(3):
+            key = self.cache.make_key(f"cmd{i}", [], config)
+            self.cache.put(key, {'stdout': 'x' * 400, 'exit_code': 0}, self.source_dir,
+                           self.cache.snapshot(self.source_dir))
+            keys.append(key)
+            time.sleep(0.01)
+        self.cache.get(keys[0], self.source_dir)
+        
+        self.cache.max_size = 1000
+        self.cache._total_size = None
+        self.cache._evict()
+        
+        self.assertIsNotNone(self.cache.get(keys[0], self.source_dir))
+        self.assertIsNone(self.cache.get(keys[1], self.source_dir))
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+
+class TestEmu2Backend(unittest.TestCase):
+    """Test cases for selecting and running the emu2 backend."""
+    
+    def setUp(self):
+        self.source_dir = tempfile.mkdtemp()
+        self.tools_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.tools_dir, "bin"))
+        open(os.path.join(self.tools_dir, "bin", "bcc.exe"), 'w').close()
+        # Stand-in emu2 that reports what it was asked to run
+        self.emu2 = os.path.join(self.tools_dir, "emu2")
+        with open(self.emu2, 'w') as f:
+            f.write('#!/bin/sh\n'
+                    'echo "$EMU2_PROGNAME $EMU2_CWD $EMU2_PATH ${1##*/} $2"\n'
+                    'case "$2" in FAIL*) exit 3;; esac\n')
+        os.chmod(self.emu2, os.stat(self.emu2).st_mode | stat.S_IEXEC)
+        self.config = {'execution': {'backend': 'emu2', 'emulator_path': self.emu2}}
+    
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.source_dir, ignore_errors=True)
+        shutil.rmtree(self.tools_dir, ignore_errors=True)
+    
+    def test_backend_selection(self):
+        """Test that the [execution] backend option picks the executor."""
+        self.assertIsInstance(create_executor({}), DOSBoxExecutor)
+        self.assertIsInstance(create_executor(self.config), Emu2Executor)
+        with self.assertRaises(ValueError):
+            create_executor({'execution': {'backend': 'pcem'}})
+    
+    def test_call_through_emu2(self):
+        """Test that a call runs the program found along PATH and gets its errorlevel."""
+        result = call_dos_utility("bcc", ["TEST.C"], source_dir=self.source_dir,
+                                  tools_dir=self.tools_dir, environment={'PATH': 'D:\\BIN'},
+                                  dosbox_config=self.config)
+        self.assertTrue(result['success'], result)
+        self.assertEqual(result['stdout'].strip(), "BCC C:\\ D:\\BIN bcc.exe TEST.C")
+    
+    def test_batch_through_emu2(self):
+        """Test that errorlevels and stop_on_error work without DOSBox."""
+        results = call_dos_utility_batch(
+            [("bcc", ["FAIL.C"]), ("bcc", ["TEST.C"])], source_dir=self.source_dir,
+            tools_dir=self.tools_dir, environment={'PATH': 'D:\\BIN'},
+            dosbox_config=self.config, stop_on_error=True)
+        self.assertEqual(results[0]['exit_code'], 3)
+        self.assertTrue(results[1]['skipped'])
+    
+    def test_missing_program(self):
+        """Test that an unknown command is reported as an error."""
+        result = call_dos_utility("nosuch", source_dir=self.source_dir,
+                                  tools_dir=self.tools_dir, dosbox_config=self.config)
+        self.assertFalse(result['success'])
+        self.assertIn("Bad command or file name", result['stderr'])
+    
+    def _execute(self, content):
+        batch_file = os.path.join(self.source_dir, "RUN.BAT")
+        with open(batch_file, 'w') as f:
+            f.write(content)
+        config = {'mount': {'c': self.source_dir, 'd': self.tools_dir},
+                  'environment': {'PATH': 'D:\\BIN'}}
+        return Emu2Executor(self.emu2).execute(batch_file, config)
+    
+    def test_echo_forms(self):
+        """Test that echo. and echo: print a line instead of running a program."""
+        self._execute("echo.> C:\\OUT.TXT\necho:text >> C:\\OUT.TXT\necho. >> C:\\OUT.TXT\n")
+        with open(os.path.join(self.source_dir, "OUT.TXT"), encoding='cp866') as f:
+            self.assertEqual(f.read(), "\n" + "text\n\n")
+    
+    def test_append_redirection(self):
+        """Test that >> appends to the file instead of naming one that starts with >."""
+        self._execute("echo first > C:\\OUT.TXT\nbcc TEST.C >> C:\\OUT.TXT\n")
+        with open(os.path.join(self.source_dir, "OUT.TXT"), encoding='cp866') as f:
+            self.assertEqual(f.read().splitlines(), ["first", "BCC C:\\ D:\\BIN bcc.exe TEST.C"])
+        self.assertFalse(os.path.exists(os.path.join(self.source_dir, ">C")))
+    
+    def test_returns_last_errorlevel(self):
+        """Test that the batch exit code is the errorlevel of the last program."""
+        self.assertEqual(self._execute("bcc FAIL.C\necho done\n"), 3)
+        self.assertEqual(self._execute("bcc FAIL.C\nbcc TEST.C\n"), 0)
+        result = call_dos_utility("bcc", ["FAIL.C"], source_dir=self.source_dir,
+                                  tools_dir=self.tools_dir, environment={'PATH': 'D:\\BIN'},
+                                  dosbox_config=self.config, capture_output=False)
+        self.assertEqual(result['exit_code'], 3)
+
+
+class TestPhaseTimings(unittest.TestCase):
+    """Test cases for per-phase timings in call results."""
+    
+    def setUp(self):
+        self.source_dir = tempfile.mkdtemp()
+        # Stand-in DOSBox that only takes its time
+        self.dosbox = os.path.join(self.source_dir, "dosbox")
+        with open(self.dosbox, 'w') as f:
+            f.write("#!/bin/sh\nsleep 0.2\n")
+        os.chmod(self.dosbox, os.stat(self.dosbox).st_mode | stat.S_IEXEC)
+    
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.source_dir, ignore_errors=True)
+    
+    def test_every_phase_is_timed(self):
+        """Test that the result and the hook get a span for every phase."""
+        spans = []
+        result = call_dos_utility("ver", source_dir=self.source_dir,
+                                  dosbox_config={'execution': {'emulator_path': self.dosbox}},
+                                  timing_hook=spans.append)
+        
+        timings = result['timings']
+        for phase in PHASES:
+            self.assertIn(phase, timings)
+        self.assertGreaterEqual(timings['emulator_runtime'], 0.2)
+        self.assertLess(timings['emulator_spawn'], timings['emulator_runtime'])
+        self.assertGreaterEqual(timings['total'], sum(
+            seconds for phase, seconds in timings.items() if phase != 'total'))
+        self.assertEqual(spans, [timings])
+    
+    def test_failed_call_is_timed(self):
+        """Test that error results carry timings and a broken hook is ignored."""
+        def broken_hook(timings):
+            raise RuntimeError("hook")
+        
+        result = call_dos_utility("type", ["toolongname.txt"], timing_hook=broken_hook)
+        self.assertFalse(result['success'])
+        self.assertIn('validation', result['timings'])
+        self.assertNotIn('emulator_runtime', result['timings'])
+    
+    def test_timer_accumulates(self):
+        """Test that repeated phases add up."""
+        timer = PhaseTimer()
+        with timer.phase('output_capture'):
+            time.sleep(0.01)
+        timer.add('output_capture', 1.0)
+        self.assertGreater(timer.as_dict()['output_capture'], 1.0)
+
+
+class TestFakeDOSBox(unittest.TestCase):
+    """Test cases running the real executor against the DOSBox stand-in."""
+    
+    def setUp(self):
+        self.source_dir = tempfile.mkdtemp()
+        self.config = {'execution': {'emulator_path': make_fake_dosbox(self.source_dir)}}
+    
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.source_dir, ignore_errors=True)
+    
+    def test_output_and_exit_codes(self):
+        """Test that output and errorlevels make it back through the files."""
+        result = call_dos_utility("ver", source_dir=self.source_dir, dosbox_config=self.config)
+        self.assertEqual(result['stdout'], "VER\n")
+        self.assertTrue(result['success'])
+        
+        result = call_dos_utility("exitcode", ["4"], source_dir=self.source_dir,
+                                  dosbox_config=self.config)
+        self.assertEqual(result['exit_code'], 4)
+        
+        results = call_dos_utility_batch(["ver", ("exitcode", ["1"]), "dir"],
+                                         source_dir=self.source_dir,
+                                         dosbox_config=self.config, stop_on_error=True)
+        self.assertEqual([r['exit_code'] for r in results], [0, 1, -1])
+    
+    def test_errorlevel_program(self):
+        """Test capturing errorlevels with an errorlevel program instead of echo."""
+        program = os.path.join(self.source_dir, "errorlvl.com")
+        with open(program, 'wb') as f:
+            f.write(b'\xc3')
+        results = call_dos_utility_batch([("exitcode", ["3"]), "ver"], source_dir=self.source_dir,
+                                         dosbox_config=self.config, errorlevel_program=program)
+        self.assertEqual([r['exit_code'] for r in results], [3, 0])
+        self.assertEqual(results[1]['stdout'], "VER\n")
+    
+    def test_worker_pool(self):
+        """Test that the stand-in runs a worker pool session."""
+        with DOSBoxWorkerPool(size=1, source_dir=self.source_dir, dosbox_config=self.config,
+                              dosbox_path=self.config['execution']['emulator_path']) as pool:
+            result = call_dos_utility("mem", worker_pool=pool)
+        self.assertEqual(result['stdout'], "MEM\n")
+
+    def test_worker_consecutive_jobs(self):
+        """Test that a warm worker runs jobs posted right after the previous one finished."""
+        class SlowReturnWorker(DOSBoxWorker):
+            # The job batch keeps running after signalling, as on a slow emulator
+            def _generate_job_batch(self, command, arguments=None):
+                return super()._generate_job_batch(command, arguments) + "sleep 0.2\n"
+
+        worker = SlowReturnWorker({'mount': {'c': self.source_dir}},
+                                  dosbox_path=self.config['execution']['emulator_path'])
+        worker.start()
+        try:
+            for number in range(3):
+                result = worker.run("exitcode", [str(number)], timeout=5)
+                self.assertEqual(result['exit_code'], number)
+            self.assertEqual(worker.jobs_run, 3)
+        finally:
+            worker.stop()
+
+    def test_streamed_output(self):
+        """Test that output lines arrive while the program is still running."""
+        arrivals = []
+        result = call_dos_utility(
+            "lines", ["3", "0.3"], source_dir=self.source_dir, dosbox_config=self.config,
+            on_output_line=lambda line: arrivals.append((time.monotonic(), line)))
+        self.assertEqual([line for _, line in arrivals], ["Line 1", "Line 2", "Line 3"])
+        self.assertLess(arrivals[0][0], arrivals[-1][0] - 0.3)
+        self.assertEqual(result['stdout'], "Line 1\nLine 2\nLine 3\n")
+    
+    def test_stream_and_spool(self):
+        """Test the line generator together with spooling the full output."""
+        stream = stream_dos_utility("lines", ["2"], source_dir=self.source_dir,
+                                    dosbox_config=self.config, spool_threshold=0,
+                                    spool_dir=self.source_dir)
+        self.assertEqual(list(stream), ["Line 1", "Line 2"])
+        self.assertTrue(stream.result['success'])
+        self.assertEqual(stream.result['stdout'], '')
+        spool = stream.result['stdout_spool']
+        self.assertEqual(spool.read(), "Line 1\nLine 2\n")
+        spool.delete()
+    
+    def test_benchmark_report(self):
+        """Test that the benchmark report has every section."""
+        report = benchmark.run_benchmarks(calls=2, max_workers=1, latency=0, modes=['launch'])
+        self.assertEqual(report['environment']['emulator'], 'fake_dosbox')
+        self.assertIn('median_ms', report['overhead']['python_overhead'])
+        self.assertEqual(report['throughput'][0]['failures'], 0)
+        self.assertGreater(report['memory']['peak_bytes_per_call'], 0)
+        json.dumps(report)
+
+
+class TestProgressWatchdog(unittest.TestCase):
+    """Test cases for stall detection and adaptive deadlines."""
+    
+    def setUp(self):
+        self.source_dir = tempfile.mkdtemp()
+        self.emulator = make_fake_dosbox(self.source_dir)
+    
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.source_dir, ignore_errors=True)
+    
+    def _call(self, command, arguments, **execution):
+        execution['emulator_path'] = self.emulator
+        return call_dos_utility(command, arguments, source_dir=self.source_dir,
+                                dosbox_config={'execution': execution})
+    
+    def test_stalled_session_is_killed(self):
+        """Test that a silent, idle emulator is killed after the stall window."""
+        start = time.monotonic()
+        result = self._call("sleep", ["30"], stall_timeout='0.5')
+        self.assertLess(time.monotonic() - start, 10)
+        self.assertFalse(result['success'])
+        self.assertEqual(result['failure'], 'stalled')
+    
+    def test_output_counts_as_progress(self):
+        """Test that growing output keeps the emulator alive past the stall window."""
+        result = self._call("lines", ["4", "0.3"], stall_timeout='0.5', stall_cpu_threshold='100')
+        self.assertTrue(result['success'])
+        self.assertEqual(result['stdout'].count("Line"), 4)
+    
+    def test_busy_silent_process_stalls(self):
+        """Test that CPU use alone, like DOSBox spinning at a prompt, is not progress."""
+        import subprocess
+        import sys
+        process = subprocess.Popen([sys.executable, "-c", "while True: pass"])
+        try:
+            watchdog = ProgressWatchdog(process.pid, [self.source_dir], 0.5)
+            busy = ProgressWatchdog(process.pid, [self.source_dir], 0.5, cpu_threshold=0.5)
+            deadline = time.monotonic() + 5
+            while not watchdog.stalled() and time.monotonic() < deadline:
+                time.sleep(0.1)
+            self.assertTrue(watchdog.stalled())
+            self.assertFalse(busy.stalled())
+        finally:
+            process.kill()
+            process.wait()
+    
+    def test_subdirectory_writes_count_as_progress(self):
+        """Test that files written below a watched directory are progress."""
+        output_dir = os.path.join(self.source_dir, "OBJ")
+        os.mkdir(output_dir)
+        watchdog = ProgressWatchdog(os.getpid(), [self.source_dir], 0.4)
+        for index in range(6):
+            time.sleep(0.15)
+            with open(os.path.join(output_dir, "MAIN.OBJ"), 'a') as f:
+                f.write("x" * (index + 1))
+            self.assertFalse(watchdog.stalled())
+        time.sleep(0.5)
+        self.assertTrue(watchdog.stalled())
+
+    def test_disabled_by_default(self):
+        """Test that the watchdog is only on when stall_timeout is set."""
+        config = ConfigManager().get_dosbox_config()
+        self.assertIsNone(ProgressWatchdog.from_config(os.getpid(), config))
+    
+    def test_timeout_failure_class(self):
+        """Test that running past the deadline is reported as a timeout."""
+        result = self._call("sleep", ["30"], timeout='1', stall_timeout='0')
+        self.assertEqual(result['failure'], 'timeout')
+        self.assertIn("timed out", result['stderr'])
+        
+        result = call_dos_utility("bcc", ["averylongfilename.c"])
+        self.assertEqual(result['failure'], 'validation_error')
+    
+    def test_cpu_time(self):
+        """Test reading the CPU time of a process."""
+        self.assertGreater(process_cpu_time(os.getpid()), 0)
+    
+    def test_duration_history(self):
+        """Test percentiles, deadlines and persistence of run times."""
+        path = os.path.join(self.source_dir, "durations.json")
+        history = DurationHistory(path)
+        key = DurationHistory.make_key("D:\\BIN\\BCC.EXE", {'mount': {'d': '/opt/bc'}})
+        self.assertEqual(key, "/opt/bc|BCC")
+        self.assertIsNone(history.deadline(key))
+        for seconds in [1, 2, 3, 4, 10]:
+            history.record(key, seconds)
+        self.assertEqual(history.percentile(key, 50), 3)
+        self.assertEqual(history.deadline(key, factor=2, min_timeout=1), 20)
+        self.assertEqual(history.deadline(key, factor=2, min_timeout=30), 30)
+        self.assertIsNone(history.deadline(key, min_samples=6))
+        self.assertEqual(DurationHistory(path).samples[key], [1, 2, 3, 4, 10])
+    
+    def test_adaptive_deadline(self):
+        """Test that a learned deadline replaces the configured timeout."""
+        path = os.path.join(self.source_dir, "durations.json")
+        settings = {'adaptive_timeout': 'true', 'duration_history': path,
+                    'adaptive_min_samples': '3', 'adaptive_min_timeout': '1'}
+        self.assertTrue(self._call("sleep", ["0"], **settings)['success'])
+        with open(path) as f:
+            samples = json.load(f)
+        key = next(iter(samples))
+        self.assertTrue(key.endswith("|SLEEP"))
+        
+        history = DurationHistory(path)
+        history.samples[key] = [0.1, 0.1, 0.1]
+        history._save()
+        # Histories are shared per file, so use a fresh file name
+        os.replace(path, path + ".2")
+        settings['duration_history'] = path + ".2"
+        result = self._call("sleep", ["30"], stall_timeout='0', **settings)
+        self.assertEqual(result['failure'], 'timeout')
+        self.assertIn("after 1 seconds", result['stderr'])
+
+
+class TestDiagnostics(unittest.TestCase):
+    """Test cases for compiler diagnostics and fail-fast builds."""
+    
+    def test_borland_diagnostics(self):
+        """Test the Borland compiler, TASM, TLINK and MAKE formats."""
+        diagnostic = parse_diagnostic("Error CRC16.CPP 12: Undefined symbol 'crc' in function main()")
+        self.assertEqual((diagnostic['file'], diagnostic['line'], diagnostic['severity']),
+                         ("CRC16.CPP", 12, 'error'))
+        self.assertEqual(diagnostic['message'], "Undefined symbol 'crc' in function main()")
+        self.assertIsNone(diagnostic['code'])
+        
+        diagnostic = parse_diagnostic("**Fatal** CRC16.ASM(7) Unexpected end of file encountered")
+        self.assertEqual((diagnostic['file'], diagnostic['line'], diagnostic['severity']),
+                         ("CRC16.ASM", 7, 'fatal'))
+        
+        diagnostic = parse_diagnostic("Fatal: Unable to open file 'CRC16.OBJ'")
+        self.assertEqual((diagnostic['file'], diagnostic['severity']), (None, 'fatal'))
+        
+        self.assertEqual(parse_diagnostic("** error 1 ** deleting CRC16.OBJ")['severity'], 'error')
+        self.assertIsNone(parse_diagnostic("Turbo Link  Version 5.1 Copyright (c) 1992 Borland International"))
+        self.assertIsNone(parse_diagnostic("  Available memory 407044"))
+    
+    def test_msc_diagnostics(self):
+        """Test the Microsoft C compiler and linker formats."""
+        output = ("TEST.C\r\n"
+                  "test.c(12) : error C2065: 'x' : undefined\r\n"
+                  "test.c(3) : warning C4013: 'puts' undefined; assuming extern returning int\r\n"
+                  "test.c(4) : fatal error C1083: Cannot open include file: 'foo.h'\r\n"
+                  "LINK : fatal error L1093: TEST.OBJ : object not found\r\n")
+        diagnostics = parse_diagnostics(output)
+        self.assertEqual([(d['file'], d['line'], d['severity'], d['code']) for d in diagnostics], [
+            ("test.c", 12, 'error', "C2065"),
+            ("test.c", 3, 'warning', "C4013"),
+            ("test.c", 4, 'fatal', "C1083"),
+            (None, None, 'fatal', "L1093")
+        ])
+        self.assertEqual(diagnostics[0]['message'], "'x' : undefined")
+    
+    def test_collector_severity(self):
+        """Test that the collector aborts at the configured severity."""
+        collector = DiagnosticCollector(stop_severity='error')
+        collector("Warning CRC16.CPP 5: Possibly incorrect assignment in function main")
+        self.assertFalse(collector.abort_event.is_set())
+        collector("Error CRC16.CPP 9: Statement missing ; in function main")
+        self.assertTrue(collector.abort_event.is_set())
+        self.assertEqual(collector.abort_reason['line'], 9)
+        self.assertEqual((collector.count('warning'), collector.count('error')), (1, 1))
+        
+        collector = DiagnosticCollector(fail_fast=False)
+        collector("Fatal: Out of memory")
+        self.assertFalse(collector.abort_event.is_set())
+        self.assertEqual(len(collector.diagnostics), 1)
+    
+    def test_fail_fast_stops_emulator(self):
+        """Test that a fatal diagnostic stops the emulator right away."""
+        import shutil
+        source_dir = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(source_dir, "BUILD.BAT"), 'w') as f:
+                f.write("echo Fatal: Unable to open file 'CRC16.OBJ' >> S:\\STDOUT.TXT\r\n"
+                        "sleep 30\r\n")
+            collector = DiagnosticCollector()
+            start = time.monotonic()
+            result = call_dos_utility(
+                "BUILD.BAT", source_dir=source_dir,
+                dosbox_config={'execution': {'emulator_path': make_fake_dosbox(source_dir)}},
+                on_output_line=collector, abort_event=collector.abort_event)
+            self.assertLess(time.monotonic() - start, 10)
+            self.assertEqual(result['failure'], 'aborted')
+            self.assertEqual(collector.abort_reason['message'], "Unable to open file 'CRC16.OBJ'")
+        finally:
+            shutil.rmtree(source_dir, ignore_errors=True)
+
+
+class TestScratchWorkspace(unittest.TestCase):
+    """Test cases for per-call scratch workspaces."""
+    
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+    
+    def test_name_is_8_3_compliant(self):
+        """Test that workspace directories get 8.3 compliant names."""
+        with ScratchWorkspace(self.base_dir) as workspace:
+            name = os.path.basename(workspace.directory)
+            self.assertTrue(FilenameValidator.validate_dos_filename(name))
+            self.assertTrue(name.isalnum())
+            self.assertEqual(workspace.dos_path("STDOUT.TXT"), "S:\\STDOUT.TXT")
+    
+    def test_cleanup_removes_directory(self):
+        """Test that the workspace is removed even when the call fails."""
+        with self.assertRaises(ValueError):
+            with ScratchWorkspace(self.base_dir) as workspace:
+                directory = workspace.directory
+                open(workspace.path("STDOUT.TXT"), 'w').close()
+                raise ValueError("boom")
+        self.assertFalse(os.path.exists(directory))
+    
+    def test_concurrent_workspaces_are_unique(self):
+        """Test that parallel threads never share a workspace."""
+        from concurrent.futures import ThreadPoolExecutor
+        
+        def create(_):
+            return ScratchWorkspace(self.base_dir).create()
+        
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            directories = list(pool.map(create, range(200)))
+        self.assertEqual(len(set(directories)), 200)
+    
+    def test_parallel_calls_do_not_interfere(self):
+        """Test that concurrent calls each read back their own output."""
+        from concurrent.futures import ThreadPoolExecutor
+        old_cwd = os.getcwd()
+        os.chdir(self.base_dir)
+        try:
+            with mock.patch.object(DOSBoxExecutor, 'execute', fake_dosbox_execute):
+                with ThreadPoolExecutor(max_workers=8) as pool:
+                    results = list(pool.map(
+                        lambda i: call_dos_utility(f"cmd{i}"), range(50)))
+        finally:
+            os.chdir(old_cwd)
+        
+        for i, result in enumerate(results):
+            self.assertEqual(result['stdout'], f"ran cmd{i}\n")
+        # Nothing is left behind in the project directory
+        self.assertEqual(os.listdir(self.base_dir), [])
 
 
 class TestDOSCallerIntegration(unittest.TestCase):
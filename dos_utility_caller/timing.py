@@ -0,0 +1,84 @@
+"""
+Phase Timing for DOS Utility Caller
+
+Measures how long each stage of a call takes, so a slow job can be traced
+to Python, to emulator startup or to the DOS program itself.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+
+# Stages of a call, in the order they run
+PHASES = (
+    'config_build',
+    'validation',
+    'path_conversion',
+    'batch_generation',
+    'config_write',
+    'emulator_spawn',
+    'emulator_runtime',
+    'output_capture'
+)
+
+# Receives the timings of a finished call
+TimingHook = Callable[[Dict[str, float]], None]
+
+
+class PhaseTimer:
+    """Accumulates the seconds spent in each phase of a call."""
+
+    def __init__(self):
+        """Initialize the timer; the total runs from here."""
+        self.started = time.perf_counter()
+        self.spans: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Time a block of code as a phase.
+
+        Time spent in the same phase more than once is added up.
+
+        Args:
+            name: Phase name
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float) -> None:
+        """
+        Add time to a phase.
+
+        Args:
+            name: Phase name
+            seconds: Time spent
+        """
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def as_dict(self) -> Dict[str, float]:
+        """
+        Get the phase timings.
+
+        Returns:
+            Seconds per phase, known phases first in call order, plus
+            'total' for the whole call so far
+        """
+        timings = {name: self.spans[name] for name in PHASES if name in self.spans}
+        timings.update((name, seconds) for name, seconds in self.spans.items() if name not in timings)
+        timings['total'] = time.perf_counter() - self.started
+        return timings
+
+
+@contextmanager
+def optional_phase(timer: Optional[PhaseTimer], name: str):
+    """Time a phase if a timer is given, otherwise just run the block."""
+    if timer is None:
+        yield
+    else:
+        with timer.phase(name):
+            yield
@@ -0,0 +1,102 @@
+"""
+Scratch Workspace for DOS Utility Caller
+
+Gives each call its own uniquely named, 8.3 compliant directory for batch
+files and captured output, mounted into DOSBox as a separate drive.
+"""
+
+import os
+import secrets
+import shutil
+import tempfile
+import logging
+from typing import Optional
+
+
+class ScratchWorkspace:
+    """A per-call scratch directory mounted into DOSBox."""
+
+    # Drive letter the workspace is mounted as inside DOSBox
+    DEFAULT_DRIVE = 's'
+
+    def __init__(self, base_dir: str = None, drive: str = DEFAULT_DRIVE, prefix: str = "W"):
+        """
+        Initialize the workspace. The directory is created by create().
+
+        Args:
+            base_dir: Directory the workspace is created in
+                      (defaults to the system temporary directory)
+            drive: Drive letter the workspace is mounted as
+            prefix: Single character starting the directory name
+        """
+        if len(prefix) != 1 or not prefix.isalpha():
+            raise ValueError("Workspace prefix must be a single letter")
+        self.base_dir = base_dir or tempfile.gettempdir()
+        self.drive = drive.lower()
+        self.prefix = prefix.upper()
+        self.directory: Optional[str] = None
+
+    def create(self, attempts: int = 100) -> str:
+        """
+        Create the workspace directory.
+
+        The name is the prefix followed by seven random hex digits. Creation
+        uses mkdir, which fails if the name is taken, so concurrent threads
+        and processes can never end up sharing a directory.
+
+        Args:
+            attempts: Number of names to try before giving up
+
+        Returns:
+            Path to the workspace directory
+        """
+        logger = logging.getLogger(__name__)
+        for _ in range(attempts):
+            name = f"{self.prefix}{secrets.token_hex(4)[:7].upper()}"
+            path = os.path.join(self.base_dir, name)
+            try:
+                os.mkdir(path)
+            except FileExistsError:
+                continue
+            self.directory = path
+            logger.debug("Created scratch workspace: %s", path)
+            return path
+        raise RuntimeError(f"Could not create a unique workspace in {self.base_dir}")
+
+    def path(self, name: str) -> str:
+        """
+        Get the host path of a file in the workspace.
+
+        Args:
+            name: File name
+
+        Returns:
+            Host path of the file
+        """
+        return os.path.join(self.directory, name)
+
+    def dos_path(self, name: str) -> str:
+        """
+        Get the DOS path of a file in the workspace.
+
+        Args:
+            name: File name
+
+        Returns:
+            DOS path of the file on the workspace drive
+        """
+        return f"{self.drive.upper()}:\\{name}"
+
+    def cleanup(self) -> None:
+        """Remove the workspace directory and everything in it."""
+        if self.directory and os.path.exists(self.directory):
+            logging.getLogger(__name__).debug("Removing scratch workspace: %s", self.directory)
+            shutil.rmtree(self.directory, ignore_errors=True)
+        self.directory = None
+
+    def __enter__(self):
+        self.create()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cleanup()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Parse Turbo Assembler listings (.LST) into instruction-level bytes/source rows.
+
+A listing line is the source line number, then the offset and the bytes
+assembled for it, then the source text, separated by tabs:
+
+        589	0008  B8 0200r			     mov     ax,offset DGROUP:s@
+        890	0200  43 52 43 31 36 20	45+	     db	     'CRC16 Easy!  Version 0.1 ...'
+        891	      61 73 79 21 20 20	56+
+
+Words and pointers are printed as numbers (stored little-endian), followed
+by a letter for relocations (r, e, s); a trailing + continues the bytes on
+the next line, which has no offset and no source. Every page starts with a
+header ("Turbo Assembler  Version 3.2 ... Page N", the title, blank
+lines), and the symbol tables follow the last source line.
+
+The parser streams the listing once and yields one row per source line
+with bytes; listing_columns() packs rows into columns (offset, length,
+start in a shared byte buffer, source line id, segment id), as NumPy
+arrays when NumPy is installed and array.array otherwise.
+"""
+import re
+import sys
+import json
+import argparse
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+ENCODING = 'cp866'
+NUMBERED_LINE = re.compile(r'^ *(\d+)[^\t]*\t(.*)$')
+OFFSET = re.compile(r'([0-9A-F]{4})(?:  |\t|$)')
+BYTES_FIELD = re.compile(r'([0-9A-F]{2,8})[a-z]*(\+?)')
+# End of the source lines: the symbol table, or the segment table without one
+TABLES = ('Symbol Name', 'Groups & Segments')
+
+
+def _read_bytes(text, position):
+    """
+    Read the bytes field of a listing line from position; returns (data,
+    continued, position of the source text)
+    """
+    data = b''
+    continued = False
+    length = len(text)
+    while position < length:
+        match = BYTES_FIELD.match(text, position)
+        if match is None:
+            break
+        end = match.end()
+        if end < length and text[end] not in ' \t':
+            # Not a byte group after all, e.g. source starting with a hex-like word
+            break
+        value = match.group(1)
+        data += int(value, 16).to_bytes(len(value) // 2, 'little')
+        continued = bool(match.group(2))
+        position = end
+        # Bytes are separated by spaces, or by a tab when they reach a tab stop
+        if position < length and text[position] == ' ' and position + 1 < length and text[position + 1] != ' ':
+            position += 1
+        elif position < length and text[position] == '\t' and position + 1 < length \
+                and text[position + 1] in '0123456789ABCDEF':
+            position += 1
+        else:
+            break
+    return data, continued, position
+
+
+def parse_listing(lines, include_empty=False):
+    """
+    Yield (line, segment, offset, bytes, source) for the source lines of a listing.
+
+    lines is an iterable of str. Page headers and the symbol tables are
+    skipped and continuation lines are joined to the line they continue.
+    Only lines that assembled to bytes are yielded unless include_empty,
+    which also yields labels, directives and comments (offset None when the
+    line has none).
+    """
+    segment = None
+    pending = None
+    for text in lines:
+        text = text.rstrip('\r\n')
+        match = NUMBERED_LINE.match(text)
+        if match is None:
+            # Page headers, titles, error messages; the tables end the listing
+            if text.startswith(TABLES):
+                break
+            continue
+        number = int(match.group(1))
+        rest = match.group(2)
+
+        offset_match = OFFSET.match(rest)
+        if offset_match is None:
+            if pending is not None and pending[5]:
+                # Continuation: bytes only, indented to the bytes column
+                data, continued, _ = _read_bytes(rest, len(rest) - len(rest.lstrip(' ')))
+                pending[3] += data
+                pending[5] = continued
+                continue
+            if pending is not None:
+                yield tuple(pending[:5])
+                pending = None
+            source = rest.strip()
+            offset = None
+            data = b''
+            continued = False
+        else:
+            if pending is not None:
+                yield tuple(pending[:5])
+                pending = None
+            offset = int(offset_match.group(1), 16)
+            data, continued, position = _read_bytes(rest, offset_match.end())
+            source = rest[position:].strip()
+
+        words = source.split(None, 2)
+        if len(words) > 1 and words[1].lower() == 'segment':
+            segment = words[0]
+        elif len(words) > 1 and words[1].lower() == 'ends':
+            segment = None
+        if data or include_empty:
+            pending = [number, segment, offset, data, source, continued]
+    if pending is not None:
+        yield tuple(pending[:5])
+
+
+def read_listing(lst_path, include_empty=False):
+    """Yield the rows of a listing file"""
+    with open(lst_path, encoding=ENCODING, errors='replace') as f:
+        yield from parse_listing(f, include_empty)
+
+
+def listing_columns(rows):
+    """
+    Pack listing rows into columns.
+
+    Returns offset, length, start (of the row's bytes in 'data'), line
+    (source line id) and segment (id in 'segments') columns, plus the
+    byte buffer 'data' and the 'source' text of each row.
+    """
+    offsets = array('I')
+    lengths = array('H')
+    starts = array('I')
+    line_ids = array('I')
+    segment_ids = array('H')
+    segments = []
+    segment_index = {}
+    data = bytearray()
+    sources = []
+    for line, segment, offset, row_bytes, source in rows:
+        if segment not in segment_index:
+            segment_index[segment] = len(segments)
+            segments.append(segment)
+        offsets.append(offset or 0)
+        lengths.append(len(row_bytes))
+        starts.append(len(data))
+        line_ids.append(line)
+        segment_ids.append(segment_index[segment])
+        data += row_bytes
+        sources.append(source)
+    columns = {'offset': offsets, 'length': lengths, 'start': starts, 'line': line_ids, 'segment': segment_ids}
+    if numpy is not None:
+        for name, column in columns.items():
+            columns[name] = numpy.frombuffer(column, dtype=column.typecode)
+    columns.update({'data': bytes(data), 'source': sources, 'segments': segments})
+    return columns
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parse Turbo Assembler listings into bytes/source rows')
+    parser.add_argument('listings', nargs='+', help='.LST files')
+    parser.add_argument('--all', action='store_true', help='Also list lines without bytes')
+    parser.add_argument('--json', action='store_true', help='Print columns as JSON instead of text')
+    args = parser.parse_args()
+
+    status = 0
+    for path in args.listings:
+        try:
+            if args.json:
+                columns = listing_columns(read_listing(path, args.all))
+                columns['data'] = columns['data'].hex()
+                print(json.dumps({'path': path, **{name: value if isinstance(value, (str, list)) else
+                                                   list(map(int, value)) for name, value in columns.items()}}))
+                continue
+            for line, segment, offset, data, source in read_listing(path, args.all):
+                location = f"{segment or '':>8}:{offset:04X}" if offset is not None else ' ' * 13
+                print(f"{line:6}  {location}  {data.hex(' ').upper():<24}  {source}")
+        except OSError as e:
+            print(f"Error: {path}: {e}")
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+Read Intel OMF object files (.OBJ) as written by BCC, TCC, TASM and MASM.
+
+An object file is a sequence of records: a type byte, a 2-byte length and
+the body, ending with a checksum byte. The reader works on a memoryview of
+the file (mmap'ed by ObjectFile.open), so records and LEDATA contents are
+slices of the file rather than copies, and the file is only walked when
+names, segments, publics or line numbers are first asked for.
+
+Segment images are assembled from LEDATA/LIDATA records on demand, with
+the FIXUPP records that follow them turned into fixups at segment offsets
+and with their targets resolved to segment, group and external names:
+
+    with ObjectFile.open('CRC16.OBJ') as obj:
+        for function in obj.functions():
+            print(function['name'], function['bytes'].hex(), function['fixups'])
+"""
+import os
+import sys
+import mmap
+import json
+import struct
+import argparse
+
+RECORD_NAMES = {
+    0x80: 'THEADR', 0x82: 'LHEADR', 0x88: 'COMENT', 0x8A: 'MODEND', 0x8C: 'EXTDEF',
+    0x90: 'PUBDEF', 0x94: 'LINNUM', 0x96: 'LNAMES', 0x98: 'SEGDEF', 0x9A: 'GRPDEF',
+    0x9C: 'FIXUPP', 0xA0: 'LEDATA', 0xA2: 'LIDATA', 0xB0: 'COMDEF', 0xB2: 'BAKPAT',
+    0xB4: 'LEXTDEF', 0xB6: 'LPUBDEF', 0xB8: 'LCOMDEF', 0xBC: 'CEXTDEF', 0xC2: 'COMDAT',
+    0xC4: 'LINSYM', 0xC6: 'ALIAS', 0xC8: 'NBKPAT', 0xCA: 'LLNAMES', 0xF0: 'LIBHDR', 0xF1: 'LIBEND'
+}
+# Fixup location types (FIXUPP "Loc" field)
+LOCATIONS = {
+    0: 'low_byte', 1: 'offset', 2: 'segment', 3: 'pointer', 4: 'high_byte',
+    5: 'offset', 9: 'offset32', 11: 'pointer48', 13: 'offset32'
+}
+# Size in bytes of the patched field, by location type
+LOCATION_SIZES = {'low_byte': 1, 'high_byte': 1, 'offset': 2, 'segment': 2, 'pointer': 4,
+                  'offset32': 4, 'pointer48': 6}
+# Frame and target methods of FIXUPP; methods 0-2 are followed by an index
+FRAME_KINDS = {0: 'segment', 1: 'group', 2: 'external', 3: 'frame', 4: 'location', 5: 'target', 6: 'none'}
+TARGET_KINDS = {0: 'segment', 1: 'group', 2: 'external', 3: 'frame'}
+ALIGNMENTS = {0: 'absolute', 1: 'byte', 2: 'word', 3: 'paragraph', 4: 'page', 5: 'dword'}
+COMBINATIONS = {0: 'private', 2: 'public', 4: 'public', 5: 'stack', 6: 'common', 7: 'public'}
+
+
+def _index(body, position):
+    """Read an OMF index (1 byte, or 2 with the high bit set); returns (value, position)"""
+    value = body[position]
+    if value & 0x80:
+        return ((value & 0x7F) << 8) | body[position + 1], position + 2
+    return value, position + 1
+
+
+def _name(body, position):
+    """Read a length-prefixed name; returns (name, position)"""
+    length = body[position]
+    end = position + 1 + length
+    return bytes(body[position + 1:end]).decode('cp866', errors='replace'), end
+
+
+def _word(body, position, wide):
+    """Read a 2-byte, or for 32-bit records 4-byte, little-endian number"""
+    if wide:
+        return struct.unpack_from('<I', body, position)[0], position + 4
+    return struct.unpack_from('<H', body, position)[0], position + 2
+
+
+def iter_records(data):
+    """Yield (type, offset, body) for every record; body is a memoryview without the checksum"""
+    view = memoryview(data)
+    offset = 0
+    size = len(view)
+    while offset + 3 <= size:
+        record_type = view[offset]
+        length = view[offset + 1] | (view[offset + 2] << 8)
+        end = offset + 3 + length
+        if length == 0 or end > size:
+            raise ValueError(f"Truncated {RECORD_NAMES.get(record_type & 0xFE, hex(record_type))} "
+                             f"record at offset {offset:#x}")
+        yield record_type, offset, view[offset + 3:end - 1]
+        offset = end
+        if record_type in (0x8A, 0x8B):
+            break
+
+
+def _expand_lidata(body, position, wide):
+    """Expand an iterated data block of a LIDATA record; returns (bytes, position)"""
+    repeat, position = _word(body, position, wide)
+    blocks, position = _word(body, position, False)
+    if blocks == 0:
+        length = body[position]
+        content = bytes(body[position + 1:position + 1 + length])
+        return content * repeat, position + 1 + length
+    content = b''
+    for _ in range(blocks):
+        block, position = _expand_lidata(body, position, wide)
+        content += block
+    return content * repeat, position
+
+
+class ObjectFile:
+    """Lazily parsed OMF object module"""
+
+    def __init__(self, data, path=None):
+        self.data = memoryview(data)
+        self.path = path
+        self._mmap = None
+        self._loaded = False
+
+    @classmethod
+    def open(cls, path):
+        """Map an object file into memory; close() or a with block releases it"""
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise ValueError(f"Empty object file: {path}")
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        obj = cls(mapped, path)
+        obj._mmap = mapped
+        return obj
+
+    def close(self):
+        # Data records are views of the mapping and must go before it
+        self._data_records = []
+        self._loaded = False
+        self.data.release()
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # A view is still referenced, e.g. by the traceback of an
+                # error; the mapping is unmapped when the view goes
+                pass
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def records(self):
+        """Yield (name, type, offset, body) for every record"""
+        for record_type, offset, body in iter_records(self.data):
+            yield RECORD_NAMES.get(record_type & 0xFE, f'{record_type:#04x}'), record_type, offset, body
+
+    def _load(self):
+        """Walk the records once and index what they define"""
+        if self._loaded:
+            return
+        try:
+            self._index_records()
+        except ValueError as e:
+            error = str(e)
+        except (IndexError, struct.error) as e:
+            error = f"Malformed record in {self.path or 'object file'}: {e}"
+        else:
+            self._loaded = True
+            return
+        # Raised outside the handler, so no traceback keeps views of the file alive
+        raise ValueError(error)
+
+    def _index_records(self):
+        """Index names, segments, symbols and data records; errors are _load()'s to report"""
+        self.module = None
+        self.names = []
+        self.segments = []
+        self.groups = []
+        self.externals = []
+        self.publics = []
+        self.line_numbers = []
+        self.comments = []
+        # Segment index, offset, contents (a view for LEDATA) and fixups of each data record
+        self._data_records = []
+        threads = {'frame': {}, 'target': {}}
+
+        for name, record_type, _, body in self.records():
+            wide = bool(record_type & 1)
+            if name in ('THEADR', 'LHEADR'):
+                self.module, _ = _name(body, 0)
+            elif name == 'COMENT':
+                self.comments.append({'class': body[1], 'flags': body[0], 'data': bytes(body[2:])})
+            elif name in ('LNAMES', 'LLNAMES'):
+                position = 0
+                while position < len(body):
+                    value, position = _name(body, position)
+                    self.names.append(value)
+            elif name == 'SEGDEF':
+                self.segments.append(self._segdef(body, wide))
+            elif name == 'GRPDEF':
+                group, position = _index(body, 0)
+                segments = []
+                while position < len(body):
+                    # Component type 0xFF: segment index
+                    segment, position = _index(body, position + 1)
+                    segments.append(segment)
+                self.groups.append({'name': self._lname(group), 'segments': segments})
+            elif name in ('EXTDEF', 'LEXTDEF', 'CEXTDEF'):
+                position = 0
+                while position < len(body):
+                    if name == 'CEXTDEF':
+                        index, position = _index(body, position)
+                        value = self._lname(index)
+                    else:
+                        value, position = _name(body, position)
+                    _, position = _index(body, position)
+                    self.externals.append(value)
+            elif name in ('PUBDEF', 'LPUBDEF'):
+                self.publics.extend(self._pubdef(body, wide, local=name == 'LPUBDEF'))
+            elif name == 'LINNUM':
+                _, position = _index(body, 0)
+                segment, position = _index(body, position)
+                while position < len(body):
+                    line, position = _word(body, position, False)
+                    offset, position = _word(body, position, wide)
+                    self.line_numbers.append({'segment': segment, 'line': line, 'offset': offset})
+            elif name in ('LEDATA', 'LIDATA'):
+                segment, position = _index(body, 0)
+                offset, position = _word(body, position, wide)
+                if name == 'LEDATA':
+                    content = body[position:]
+                else:
+                    content = b''
+                    while position < len(body):
+                        block, position = _expand_lidata(body, position, wide)
+                        content += block
+                self._data_records.append({'segment': segment, 'offset': offset, 'data': content, 'fixups': []})
+            elif name == 'FIXUPP':
+                fixups = self._data_records[-1]['fixups'] if self._data_records else []
+                self._fixupp(body, wide, threads, fixups)
+
+    def _lname(self, index):
+        return self.names[index - 1] if 0 < index <= len(self.names) else ''
+
+    def _segdef(self, body, wide):
+        acbp = body[0]
+        position = 1
+        alignment = acbp >> 5
+        if alignment == 0:
+            # Absolute segment: frame number and offset
+            position += 3
+        length, position = _word(body, position, wide)
+        if acbp & 0x02:
+            # Big: exactly 64K (or 4G)
+            length = 1 << (32 if wide else 16)
+        name, position = _index(body, position)
+        class_name, position = _index(body, position)
+        overlay, position = _index(body, position)
+        return {
+            'name': self._lname(name),
+            'class': self._lname(class_name),
+            'overlay': self._lname(overlay),
+            'length': length,
+            'alignment': ALIGNMENTS.get(alignment, str(alignment)),
+            'combination': COMBINATIONS.get((acbp >> 2) & 7, str((acbp >> 2) & 7)),
+            'use32': bool(acbp & 1)
+        }
+
+    def _pubdef(self, body, wide, local):
+        group, position = _index(body, 0)
+        segment, position = _index(body, position)
+        if segment == 0:
+            # Absolute symbols carry a frame number
+            position += 2
+        while position < len(body):
+            name, position = _name(body, position)
+            offset, position = _word(body, position, wide)
+            _, position = _index(body, position)
+            yield {'name': name, 'segment': segment, 'group': group, 'offset': offset, 'local': local}
+
+    def _reference(self, kind, index):
+        """Resolve a frame or target datum to (kind, name)"""
+        if kind == 'segment':
+            return kind, self.segments[index - 1]['name'] if 0 < index <= len(self.segments) else ''
+        if kind == 'group':
+            return kind, self.groups[index - 1]['name'] if 0 < index <= len(self.groups) else ''
+        if kind == 'external':
+            return kind, self.externals[index - 1] if 0 < index <= len(self.externals) else ''
+        return kind, None
+
+    def _fixupp(self, body, wide, threads, fixups):
+        position = 0
+        while position < len(body):
+            first = body[position]
+            if not first & 0x80:
+                # THREAD subrecord: remember a frame or target for later fixups
+                method = (first >> 2) & 7
+                thread = first & 3
+                position += 1
+                if first & 0x40:
+                    index = 0
+                    if method < 3:
+                        index, position = _index(body, position)
+                    threads['frame'][thread] = (method, index)
+                else:
+                    index, position = _index(body, position)
+                    threads['target'][thread] = (method & 3, index)
+                continue
+
+            # FIXUP subrecord: locat (2 bytes, high byte first), fix data, datums
+            record_offset = ((first & 3) << 8) | body[position + 1]
+            location = (first >> 2) & 0xF
+            segment_relative = bool(first & 0x40)
+            fix_data = body[position + 2]
+            position += 3
+
+            if fix_data & 0x80:
+                frame_method, frame_index = threads['frame'].get((fix_data >> 4) & 3, (6, 0))
+            else:
+                frame_method = (fix_data >> 4) & 7
+                frame_index = 0
+                if frame_method < 3:
+                    frame_index, position = _index(body, position)
+            if fix_data & 0x08:
+                target_method, target_index = threads['target'].get(fix_data & 3, (0, 0))
+            else:
+                target_method = fix_data & 3
+                target_index, position = _index(body, position)
+            displacement = 0
+            if not fix_data & 0x04:
+                displacement, position = _word(body, position, wide)
+
+            kind = LOCATIONS.get(location, str(location))
+            fixups.append({
+                'record_offset': record_offset,
+                'location': kind,
+                'size': LOCATION_SIZES.get(kind, 2),
+                'relative': not segment_relative,
+                'frame': self._reference(FRAME_KINDS.get(frame_method, 'none'), frame_index),
+                'target': self._reference(TARGET_KINDS[target_method & 3], target_index),
+                'displacement': displacement
+            })
+
+    def segment_image(self, segment):
+        """
+        Assemble the bytes of a segment (index from 1, or name) from its data records.
+
+        Returns (bytearray, fixups); each fixup has the segment 'offset' it patches.
+        Bytes not covered by any data record are zero.
+        """
+        self._load()
+        if isinstance(segment, str):
+            segment = next(index for index, s in enumerate(self.segments, 1) if s['name'] == segment)
+        length = self.segments[segment - 1]['length']
+        records = [record for record in self._data_records if record['segment'] == segment]
+        length = max([length] + [record['offset'] + len(record['data']) for record in records])
+        image = bytearray(length)
+        fixups = []
+        for record in records:
+            image[record['offset']:record['offset'] + len(record['data'])] = record['data']
+            for fixup in record['fixups']:
+                fixup = dict(fixup, offset=record['offset'] + fixup['record_offset'])
+                del fixup['record_offset']
+                fixups.append(fixup)
+        fixups.sort(key=lambda fixup: fixup['offset'])
+        return image, fixups
+
+    def functions(self):
+        """
+        Yield the code of every public symbol in a code segment, up to the next
+        public (or the end of the segment), with its fixups and line numbers
+        """
+        self._load()
+        for index, segment in enumerate(self.segments, 1):
+            if not segment['class'].upper().endswith('CODE'):
+                continue
+            publics = sorted((public for public in self.publics if public['segment'] == index),
+                             key=lambda public: public['offset'])
+            if not publics:
+                continue
+            image, fixups = self.segment_image(index)
+            lines = [entry for entry in self.line_numbers if entry['segment'] == index]
+            for number, public in enumerate(publics):
+                start = public['offset']
+                end = publics[number + 1]['offset'] if number + 1 < len(publics) else len(image)
+                yield {
+                    'name': public['name'],
+                    'segment': segment['name'],
+                    'offset': start,
+                    'bytes': bytes(image[start:end]),
+                    'fixups': [dict(fixup, offset=fixup['offset'] - start) for fixup in fixups
+                               if start <= fixup['offset'] < end],
+                    'lines': [(entry['line'], entry['offset'] - start) for entry in lines
+                              if start <= entry['offset'] < end]
+                }
+
+    def summary(self):
+        """Describe the module as plain data"""
+        self._load()
+        return {
+            'module': self.module,
+            'segments': self.segments,
+            'groups': [dict(group, segments=[self.segments[s - 1]['name'] for s in group['segments']])
+                       for group in self.groups],
+            'externals': self.externals,
+            'publics': [dict(public, segment=self.segments[public['segment'] - 1]['name']
+                             if public['segment'] else None) for public in self.publics],
+            'line_numbers': len(self.line_numbers)
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Read OMF object files without an assembler')
+    parser.add_argument('objects', nargs='+', help='.OBJ files')
+    parser.add_argument('--records', action='store_true', help='List the records instead')
+    parser.add_argument('--functions', action='store_true', help='Print the bytes and fixups of every function')
+    args = parser.parse_args()
+
+    status = 0
+    for path in args.objects:
+        try:
+            with ObjectFile.open(path) as obj:
+                if args.records:
+                    for name, _, offset, body in obj.records():
+                        print(f"{path}: {offset:#07x} {name:<8} {len(body):5}")
+                elif args.functions:
+                    for function in obj.functions():
+                        function['bytes'] = function['bytes'].hex()
+                        print(json.dumps(dict(function, path=path)))
+                else:
+                    print(json.dumps(dict(obj.summary(), path=path), indent=2))
+        except (OSError, ValueError, IndexError, struct.error) as e:
+            print(f"Error: {path}: {e}")
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
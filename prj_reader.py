@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Read Borland/Turbo C++ IDE project files (.PRJ) without DOSBox.
+
+Extracts the file list, directories, defines, limits and the code
+generation, optimization, warning and linker options of a project and
+writes the makefile and .CFG file PRJ2MAK would, so projects can be
+converted and planned without launching the emulator.
+
+Option records hold one dialog setting each. Their meaning was inferred
+from the order of the IDE's option dialogs and the values of a project at
+the IDE defaults, which converts byte for byte to what PRJ2MAK wrote for
+it. Records that aren't decoded are listed in 'undecoded_options' when
+they differ from the IDE defaults.
+
+A .PRJ file is a signature ending with ^Z, a short header and then records
+of a 2-byte id, a 2-byte length and the data, all little-endian. Records
+0xFFFF separate the option section from the file list section.
+"""
+import os
+import re
+import sys
+import json
+import struct
+import argparse
+from pathlib import Path
+
+SIGNATURES = (b'Turbo C Project File', b'Borland C++ Project File')
+# Records start after the signature and a 14-byte header
+RECORDS_OFFSET = 0x24
+SECTION_END = 0xFFFF
+
+# Option records holding zero-terminated text
+TEXT_RECORDS = {
+    0x12E: 'include_path',
+    0x12F: 'lib_path',
+    0x130: 'identifier_length',
+    0x131: 'error_limit',
+    0x132: 'warning_limit',
+    0x133: 'defines',
+    0x140: 'output_dir',
+    0x141: 'source_dir',
+    0x143: 'default_extension',
+}
+# File list section: one entry per project file, then the dependency list
+# written by autodependency checking
+FILE_LIST_RECORD = 0x35
+DEPENDENCY_RECORD = 0x36
+FILE_NAME = re.compile(rb'(?<![\\\w$~!-])([\w$~!-]{1,8}\.[A-Za-z0-9]{1,3})\0')
+DEPENDENCY_ENTRY = re.compile(rb'\xff.{4}((?:[\w$~!-]+:)?[\w$~!.\\-]+\.[A-Za-z0-9]{1,3})\0', re.DOTALL)
+
+# Defaults PRJ2MAK leaves out of the .CFG file
+DEFAULT_LIMITS = {'identifier_length': '32', 'error_limit': '25', 'warning_limit': '100'}
+LIMIT_OPTIONS = {'identifier_length': '-i', 'error_limit': '-j', 'warning_limit': '-g'}
+
+# Numeric copies of the limits, decoded from their text records instead
+LIMIT_RECORDS = (0x107, 0x108, 0x109)
+
+# Code generation: tiny, small, medium, compact, large, huge
+MEMORY_MODEL_RECORD = 0xC9
+MEMORY_MODELS = 'tsmclh'
+# Floating point: none, emulation, 8087, 80287
+FLOAT_RECORD = 0xCB
+FLOAT_LIBRARIES = {1: 'emu.lib', 2: 'fp87.lib', 3: 'fp87.lib'}
+# Debug information in OBJs, for both BCC and TLINK
+DEBUG_INFO_RECORD = 0xD3
+
+# Compiler switches by record id and value, in the order they are written;
+# values that aren't listed are the BCC defaults
+COMPILER_SWITCHES = {
+    0xCA: {1: '-p', 2: '-pr'},                  # calling convention: C, Pascal, register
+    FLOAT_RECORD: {0: '-f-', 2: '-f87', 3: '-f287'},
+    0xBBC: {1: '-1', 2: '-2'},                  # instruction set: 8086, 80186, 80286
+    0xCC: {0: '-K'},                            # default char type: unsigned, signed
+    0xCD: {1: '-a'},                            # word alignment
+    0xCE: {1: '-d'},                            # merge duplicate strings
+    0xD2: {0: '-u-'},                           # generate underbars
+    0xD8: {0: '-k-'},                           # standard stack frame
+    0xDA: {1: '-N'},                            # test stack overflow
+    0x112: {1: '-O'},                           # jump optimization
+    0x113: {1: '-Oc', 2: '-Og'},                # common subexpressions: none, local, global
+    0x114: {0: '-r-', 2: '-rd'},                # register variables: none, automatic, keyword
+    0x118: {1: '-Ol'},                          # loop optimization
+    0x119: {1: '-Z'},                           # suppress redundant loads
+    0x11A: {1: '-Oa'},                          # assume no pointer aliasing
+    0x11B: {1: '-Oi'},                          # inline intrinsic functions
+    0x11C: {0: '-G'},                           # optimize for speed, size
+    DEBUG_INFO_RECORD: {1: '-v'},
+    0xD7: {1: '-vi-'},                          # out-of-line inline functions
+}
+
+# Warning check boxes: record id -> (BCC -w switch, on by default in BCC).
+# Only warnings set differently from the BCC defaults are written
+WARNING_RECORDS = {
+    0x25B: ('rpt', True), 0x25D: ('cpt', True), 0x25E: ('rng', True), 0x262: ('voi', True),
+    0x263: ('ret', True), 0x264: ('sus', True), 0x265: ('stu', True), 0x266: ('dup', True),
+    0x267: ('big', True), 0x268: ('cln', False), 0x26B: ('sig', False), 0x26D: ('ucp', False),
+    0x26E: ('bbf', False), 0x26F: ('ext', True), 0x271: ('pin', False), 0x273: ('dpu', True),
+    0x275: ('def', False), 0x276: ('zdi', True), 0x277: ('amb', False), 0x278: ('bei', True),
+    0x279: ('obi', True), 0x27A: ('inl', True), 0x27B: ('lin', True), 0x27C: ('stv', False),
+    0x27D: ('lvc', True), 0x27E: ('nci', True), 0x27F: ('pro', False), 0x280: ('hid', True),
+    0x281: ('ncf', True), 0x282: ('ibc', True), 0x283: ('amp', False), 0x284: ('nst', True),
+    0x285: ('eas', False), 0x286: ('use', False), 0x287: ('nod', False), 0x288: ('rvl', True),
+    0x28A: ('rch', True), 0x28B: ('eff', True), 0x28D: ('aus', True), 0x28E: ('asm', False),
+    0x290: ('par', True), 0x291: ('pia', True), 0x292: ('pre', False), 0x293: ('ill', True),
+}
+
+# TLINK switches by record id and value, in the order they are written
+LINKER_SWITCHES = {
+    DEBUG_INFO_RECORD: {1: '/v'},
+    0xF1: {0: '/x', 2: '/m', 3: '/s'},          # map file: off, segments, publics, detailed
+    0xF2: {1: '/i'},                            # initialize segments
+    0xF4: {1: '/c'},                            # case-sensitive link
+    0xF5: {0: '/P-', 1: '/P'},                  # pack code segments
+    0xF7: {1: '/d'},                            # warn duplicate symbols
+    0xFC: {0: '/n'},                            # default libraries
+}
+SEGMENT_ALIGNMENT_RECORD = 0x4B0
+DEFAULT_SEGMENT_ALIGNMENT = 512
+
+DECODED_OPTIONS = ({MEMORY_MODEL_RECORD, SEGMENT_ALIGNMENT_RECORD} | COMPILER_SWITCHES.keys()
+                   | WARNING_RECORDS.keys() | LINKER_SWITCHES.keys())
+
+# Option records of a project left at the IDE defaults (CRC16.PRJ, Borland
+# C++ 3.1): numbers by value, strings as text. Stand in for records a
+# project doesn't have
+IDE_DEFAULT_OPTIONS = {
+    0xc9: 1, 0xca: 0, 0xcb: 1, 0xcc: 1, 0xcd: 0, 0xce: 0, 0xbbc: 0, 0xbbd: 0, 0xbbe: 0, 0xbbf: 1, 0xd2: 1,
+    0xd3: 1, 0xd4: 3, 0xd6: 64, 0xd7: 1, 0xd8: 1, 0xd9: 768, 0xda: 0, 0xf1: 0, 0xf2: 0, 0xf3: 0, 0xf4: 1,
+    0xf5: 0, 0xf6: 32768, 0xf7: 0, 0xf8: 0, 0xf9: 0, 0xfa: 8192, 0x4b0: 512, 0xf0: 0, 0xbd6: 0, 0xbd7: 0,
+    0xbd8: 0, 0xbd9: 0, 0xbda: 16, 0xbdb: 4, 0xfb: 0, 0xfb4: 0, 0xfc: 1, 0xfd: 0, 0xfe: 0, 0xff: 0,
+    0x100: 1, 0x101: 1, 0x103: 0, 0x104: 0, 0x105: 0, 0x106: 1, 0x10a: 0, 0x10b: 0, 0x10c: 0, 0x10d: 0,
+    0x10e: 1, 0x10f: 0, 0x110: 0, 0x111: 0, 0xfa0: 2, 0xfa1: 0, 0xfa2: 0, 0xfa3: 0, 0xfa4: 0, 0xfa5: 0,
+    0xfa6: 0, 0xfa7: 0, 0xfa8: 0, 0xfb0: 0, 0xfb1: 0, 0xfb2: 0, 0xfb3: 0, 0xfa9: 0, 0xfaa: 3, 0xfab: 0,
+    0xfac: 0, 0xfad: 0, 0xfae: 0, 0xfaf: 0, 0xfb5: 0, 0xfb6: 0, 0x112: 0, 0x113: 0, 0x114: 1, 0x115: 1,
+    0x116: 0, 0x117: 32768, 0x118: 0, 0x119: 0, 0x11a: 0, 0x11b: 0, 0x11c: 1, 0x11d: 1, 0x11e: 3, 0x11f: 1,
+    0x120: 0, 0x122: 0, 0x123: 0, 0x124: 0, 0x125: 0, 0x126: 32767, 0x127: 0, 0x12b: 0, 0x26b: 0, 0x25b: 1,
+    0x25d: 1, 0x25e: 1, 0x262: 1, 0x263: 1, 0x264: 1, 0x265: 1, 0x266: 1, 0x267: 1, 0x268: 0, 0x26d: 0,
+    0x26e: 0, 0x26f: 1, 0x271: 0, 0x273: 1, 0x275: 0, 0x276: 1, 0x277: 0, 0x278: 1, 0x279: 1, 0x27a: 1,
+    0x27b: 1, 0x27c: 0, 0x28e: 0, 0x27d: 1, 0x27e: 1, 0x27f: 1, 0x280: 1, 0x281: 1, 0x282: 1, 0x283: 0,
+    0x284: 1, 0x285: 1, 0x286: 0, 0x287: 0, 0x288: 1, 0x28a: 1, 0x28b: 1, 0x28d: 1, 0x290: 1, 0x291: 1,
+    0x292: 1, 0x293: 1, 0x1004: 1, 0x1005: 1, 0x1006: 1, 0x1007: 1, 0x1008: 1, 0x12d: '', 0x134: '*',
+    0x135: '*', 0x136: '*', 0x137: '*', 0x138: '*', 0x139: '*', 0x13a: '*', 0x13b: '*', 0x13c: '*',
+    0x13d: '*', 0x13e: '*', 0x13f: '*', 0x144: '32767', 0x145: '8192', 0x146: '', 0x147: 0
+}
+
+SOURCE_EXTENSIONS = ('.c', '.cpp', '.asm')
+
+
+def read_records(data):
+    """Yield (record id, data) for every record of a .PRJ file"""
+    if not data.startswith(SIGNATURES):
+        raise ValueError("Not a Borland project file")
+    offset = RECORDS_OFFSET
+    while offset + 4 <= len(data):
+        record_id, length = struct.unpack_from('<HH', data, offset)
+        offset += 4
+        if offset + length > len(data):
+            raise ValueError(f"Truncated record {record_id:#06x} at offset {offset - 4:#x}")
+        yield record_id, data[offset:offset + length]
+        offset += length
+
+
+def _text(value):
+    """Decode a zero-terminated string"""
+    return value.split(b'\0', 1)[0].decode('cp866', errors='replace').strip()
+
+
+def _option_value(value):
+    """Decode an option record the way IDE_DEFAULT_OPTIONS lists it"""
+    return int.from_bytes(value, 'little') if len(value) <= 4 else _text(value)
+
+
+def _split_paths(value):
+    """Split a ;-separated directory list"""
+    return [path.strip() for path in value.split(';') if path.strip()]
+
+
+def _parse_defines(value):
+    """Parse 'A;B=1' (the IDE also accepts spaces) into {'A': None, 'B': '1'}"""
+    defines = {}
+    for define in value.replace(' ', ';').split(';'):
+        if define:
+            name, sep, definition = define.partition('=')
+            defines[name] = definition if sep else None
+    return defines
+
+
+def _file_names(value):
+    """List the file names stored in the entries of the file list record"""
+    # Each entry holds the 8.3 name, then the path it was added from
+    names = []
+    for match in FILE_NAME.finditer(value):
+        name = match.group(1).decode('cp866')
+        if name.upper() not in (n.upper() for n in names):
+            names.append(name)
+    return names
+
+
+def _dependencies(value):
+    """Read the autodependency list: each file is 0xFF, a DOS time stamp and a path"""
+    return [match.group(1).decode('cp866') for match in DEPENDENCY_ENTRY.finditer(value)]
+
+
+def _decode_options(options):
+    """Turn the option records into the memory model, switches and run-time libraries"""
+    def value(record_id):
+        return options.get(record_id, IDE_DEFAULT_OPTIONS[record_id])
+
+    model_index = value(MEMORY_MODEL_RECORD)
+    if not isinstance(model_index, int) or not 0 <= model_index < len(MEMORY_MODELS):
+        raise ValueError(f"Unknown memory model {model_index!r} in record {MEMORY_MODEL_RECORD:#06x}")
+    model = MEMORY_MODELS[model_index]
+    compiler_options = [] if model == 's' else [f"-m{model}"]
+    compiler_options += [switches[value(record_id)] for record_id, switches in COMPILER_SWITCHES.items()
+                         if value(record_id) in switches]
+    compiler_options += [f"-w{code}" if value(record_id) else f"-w-{code}"
+                         for record_id, (code, default) in WARNING_RECORDS.items()
+                         if bool(value(record_id)) != default]
+
+    link_options = [switches[value(record_id)] for record_id, switches in LINKER_SWITCHES.items()
+                    if value(record_id) in switches]
+    if value(SEGMENT_ALIGNMENT_RECORD) != DEFAULT_SEGMENT_ALIGNMENT:
+        link_options.append(f"/A={value(SEGMENT_ALIGNMENT_RECORD)}")
+    if model == 't':
+        link_options.append('/t')
+
+    # Tiny model programs link with the small model libraries
+    library_model = 's' if model == 't' else model
+    float_library = FLOAT_LIBRARIES.get(value(FLOAT_RECORD))
+    runtime_libraries = [float_library, f"math{library_model}.lib"] if float_library else []
+    return {
+        'memory_model': model,
+        'compiler_options': compiler_options,
+        'link_options': ''.join(link_options),
+        'runtime_libraries': runtime_libraries + [f"c{library_model}.lib"]
+    }
+
+
+def parse_prj(prj_path):
+    """
+    Parse a .PRJ file into a project description.
+
+    Option records a project doesn't have take their IDE defaults. Option
+    records that aren't decoded and differ from the IDE defaults are listed
+    by id in 'undecoded_options'. Records that are not understood are kept,
+    by id, in 'records'.
+    """
+    prj_path = Path(prj_path)
+    data = prj_path.read_bytes()
+    project = {
+        'name': prj_path.stem.lower(),
+        'signature': _text(data[:data.index(b'\x1a')]) if b'\x1a' in data else '',
+        'memory_model': 's',
+        'compiler_options': [],
+        'link_options': '',
+        'runtime_libraries': [],
+        'undecoded_options': [],
+        'files': [],
+        'dependencies': [],
+        'include_path': [],
+        'lib_path': [],
+        'output_dir': '',
+        'source_dir': [],
+        'defines': {},
+        'limits': {},
+        'default_extension': '.C',
+        'records': {}
+    }
+    options = {}
+    in_options = True
+    for record_id, value in read_records(data):
+        if record_id == SECTION_END:
+            in_options = False
+        elif in_options and record_id not in TEXT_RECORDS and record_id not in LIMIT_RECORDS:
+            options[record_id] = _option_value(value)
+        if record_id in TEXT_RECORDS:
+            field = TEXT_RECORDS[record_id]
+            text = _text(value)
+            if field in ('include_path', 'lib_path', 'source_dir'):
+                project[field] = _split_paths(text)
+            elif field == 'defines':
+                project['defines'] = _parse_defines(text)
+            elif field in DEFAULT_LIMITS:
+                if text:
+                    project['limits'][field] = text
+            elif text:
+                project[field] = text
+        elif record_id == FILE_LIST_RECORD:
+            project['files'] = _file_names(value)
+        elif record_id == DEPENDENCY_RECORD:
+            project['dependencies'] = _dependencies(value)
+        elif record_id != SECTION_END:
+            project['records'][record_id] = value
+    project.update(_decode_options(options))
+    project['undecoded_options'] = sorted(
+        record_id for record_id, value in options.items()
+        if record_id not in DECODED_OPTIONS and value != IDE_DEFAULT_OPTIONS.get(record_id))
+    return project
+
+
+def generate_cfg(project):
+    """Generate the compiler configuration file for a project"""
+    lines = list(project['compiler_options'])
+    for field, option in LIMIT_OPTIONS.items():
+        value = project['limits'].get(field)
+        if value and value != DEFAULT_LIMITS[field]:
+            lines.append(f"{option}{value}")
+    if project['output_dir']:
+        lines.append(f"-n{project['output_dir']}")
+    for name, definition in project['defines'].items():
+        lines.append(f"-D{name}" if definition is None else f"-D{name}={definition}")
+    if project['include_path']:
+        lines.append("-I$(INCLUDEPATH)")
+    if project['lib_path']:
+        lines.append("-L$(LIBPATH)")
+    return lines
+
+
+def generate_makefile(project):
+    """Generate the makefile PRJ2MAK would write for a project"""
+    name = project['name']
+    sources = [f for f in project['files'] if os.path.splitext(f)[1].lower() in SOURCE_EXTENSIONS]
+    objects = [os.path.splitext(f)[0].lower() + '.obj' for f in sources]
+    objects += [f.lower() for f in project['files'] if f.lower().endswith('.obj')]
+    libraries = [f.lower() for f in project['files'] if f.lower().endswith('.lib')]
+
+    lines = [".AUTODEPEND", "", "#\t\t*Translator Definitions*",
+             f"CC = bcc +{name.upper()}.CFG", "TASM = TASM", "TLIB = tlib", "TLINK = tlink"]
+    lines.append(f"LIBPATH = {';'.join(project['lib_path'])}")
+    lines.append(f"INCLUDEPATH = {';'.join(project['include_path'])}")
+    lines += ["", "", "#\t\t*Implicit Rules*", ".c.obj:", "  $(CC) -c {$< }", "", ".cpp.obj:", "  $(CC) -c {$< }", ""]
+    if any(f.lower().endswith('.asm') for f in sources):
+        lines += [".asm.obj:", "  $(TASM) /MX /ZI /O $<,$*.obj", ""]
+    lines += ["#\t\t*List Macros*", "", "", "EXE_dependencies =  \\"]
+    lines += [f" {obj}" + (" \\" if index < len(objects) - 1 else "") for index, obj in enumerate(objects)]
+    lines += ["", "#\t\t*Explicit Rules*", f"{name}.exe: {name}.cfg $(EXE_dependencies)",
+              f"  $(TLINK) {project['link_options']}/L$(LIBPATH) @&&|"]
+    link_objects = [f"c0{project['memory_model']}.obj"] + objects
+    lines += [obj + '+' for obj in link_objects[:-1]] + [link_objects[-1]]
+    # The map file line names the map, or is a comment when /x turns it off
+    lines += [name, "\t\t# no map file" if '/x' in project['link_options'] else name]
+    link_libraries = libraries + project['runtime_libraries']
+    lines += [lib + '+' for lib in link_libraries[:-1]] + [link_libraries[-1], "|", "", ""]
+    lines += ["#\t\t*Individual File Dependencies*"]
+    for source, obj in zip(sources, objects):
+        lines.append(f"{obj}: {name}.cfg {source.lower()} ")
+    lines += ["", "#\t\t*Compiler Configuration File*", f"{name}.cfg: {name}.mak", "  copy &&|"]
+    lines += generate_cfg(project)
+    lines += [f"| {name}.cfg", "", "", ""]
+    return '\r\n'.join(lines)
+
+
+def _resolve_cfg(project):
+    """Write out the .CFG file with the directory macros substituted"""
+    text = '\r\n'.join(generate_cfg(project))
+    text = text.replace('$(INCLUDEPATH)', ';'.join(project['include_path']))
+    text = text.replace('$(LIBPATH)', ';'.join(project['lib_path']))
+    return text + '\r\n'
+
+
+def _existing(directory, name):
+    """Path of a file in directory ignoring case, as DOS would; None if there is none"""
+    if directory.is_dir():
+        for entry in directory.iterdir():
+            if entry.name.upper() == name.upper() and entry.is_file():
+                return entry
+    return None
+
+
+def convert_prj(prj_path, output_dir=None, overwrite=False):
+    """
+    Write NAME.MAK and NAME.CFG for a .PRJ file; returns their paths.
+
+    Files that already exist are kept, since they may hold options this
+    reader doesn't decode, unless overwrite.
+    """
+    prj_path = Path(prj_path)
+    output_dir = Path(output_dir) if output_dir else prj_path.parent
+    outputs = []
+    for extension in ('.MAK', '.CFG'):
+        name = f"{prj_path.stem.upper()}{extension}"
+        existing = None if overwrite else _existing(output_dir, name)
+        outputs.append((existing or output_dir / name, existing is None))
+    (makefile, write_makefile), (cfg, write_cfg) = outputs
+    if write_makefile or write_cfg:
+        project = parse_prj(prj_path)
+        if write_makefile:
+            makefile.write_bytes(generate_makefile(project).encode('cp866', errors='replace'))
+        if write_cfg:
+            cfg.write_bytes(_resolve_cfg(project).encode('cp866', errors='replace'))
+    return makefile, cfg
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert Borland .PRJ files to makefiles without DOSBox')
+    parser.add_argument('projects', nargs='+', help='.PRJ files')
+    parser.add_argument('--output-dir', help='Directory for the .MAK and .CFG files (default: next to the .PRJ)')
+    parser.add_argument('--overwrite', action='store_true', help='Replace existing .MAK and .CFG files')
+    parser.add_argument('--json', action='store_true', help='Print the parsed projects as JSON instead')
+    args = parser.parse_args()
+
+    status = 0
+    for prj_path in args.projects:
+        try:
+            if args.json:
+                project = parse_prj(prj_path)
+                project['undecoded_options'] = [f"{key:#06x}" for key in project['undecoded_options']]
+                project['records'] = {f"{key:#06x}": value.hex() for key, value in project['records'].items()}
+                print(json.dumps(project, indent=2))
+            else:
+                makefile, cfg = convert_prj(prj_path, args.output_dir, args.overwrite)
+                print(f"Converted '{prj_path}' to '{makefile}' and '{cfg}'")
+                undecoded = parse_prj(prj_path)['undecoded_options']
+                if undecoded:
+                    print(f"Warning: {prj_path}: options not decoded, left at the compiler defaults "
+                          f"(records {', '.join(f'{key:#06x}' for key in undecoded)})")
+        except (OSError, ValueError) as e:
+            print(f"Error: {prj_path}: {e}")
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
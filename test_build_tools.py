@@ -0,0 +1,511 @@
+"""
+Unit tests for the build and decompilation tools, run against the checked-in
+CRC16 example project (bcex/crc16eas/Source).
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import subprocess
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# The tools are scripts in the repository root rather than a package
+sys.path.insert(0, str(Path(__file__).parent))
+import prj_reader
+import convert_makefile
+from build_toolchain import BuildToolchain
+from build_state import BuildState, prepare_incremental_build, record_incremental_build, runs_make
+from build_cache import BuildCache
+import asm_splitter
+import cpp_filter
+from omf_reader import ObjectFile
+from disasm16 import disassemble_corpus, verify_listing
+import lst_parser
+from build_corpus import read_manifest, _artifacts_name
+from borland_pipeline import pipeline_commands
+
+SOURCE_DIR = Path(__file__).parent / 'bcex' / 'crc16eas' / 'Source'
+
+
+def fixture(name):
+    return SOURCE_DIR / name
+
+
+class TestBuildCorpus(unittest.TestCase):
+    """Test cases for the corpus builder."""
+
+    def test_read_manifest(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            manifest = Path(temp_dir) / 'projects.txt'
+            manifest.write_text('# corpus\nbcex/crc16eas/Source borland\n\nother dir TURBO  # spaces\n')
+            self.assertEqual(read_manifest(manifest), [
+                (str((Path(temp_dir) / 'bcex/crc16eas/Source').resolve()), 'borland'),
+                (str((Path(temp_dir) / 'other dir').resolve()), 'turbo')])
+            manifest.write_text('project gcc\n')
+            with self.assertRaises(ValueError):
+                read_manifest(manifest)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def test_artifacts_names_are_unique(self):
+        first, second = _artifacts_name('/a/x/y/z'), _artifacts_name('/b/x/y/z')
+        self.assertNotEqual(first, second)
+        self.assertTrue(first.startswith('x_y_z_'))
+        self.assertEqual(_artifacts_name('/a/x/y/z'), first)
+        self.assertTrue(_artifacts_name('/z').startswith('z_'))
+
+
+
+class TestPrjReader(unittest.TestCase):
+    """Test cases for converting .PRJ files."""
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def _project(self, **changes):
+        """Copy CRC16.PRJ with option records (given as r<id in hex>=value) changed"""
+        data = bytearray(fixture('CRC16.PRJ').read_bytes())
+        offset = prj_reader.RECORDS_OFFSET
+        for record_id, value in prj_reader.read_records(bytes(data)):
+            key = f"r{record_id:x}"
+            if key in changes:
+                data[offset + 4:offset + 4 + len(value)] = changes.pop(key).to_bytes(len(value), 'little')
+            offset += 4 + len(value)
+        self.assertEqual(changes, {})
+        path = Path(self.output_dir) / 'CRC16.PRJ'
+        path.write_bytes(data)
+        return path
+
+    def test_parse_project(self):
+        project = prj_reader.parse_prj(fixture('CRC16.PRJ'))
+        self.assertEqual(project['name'], 'crc16')
+        self.assertIn('CRC16.CPP', [name.upper() for name in project['files']])
+        self.assertEqual(project['memory_model'], 's')
+        self.assertEqual(project['undecoded_options'], [])
+
+    def test_converts_like_prj2mak(self):
+        makefile, cfg = prj_reader.convert_prj(fixture('CRC16.PRJ'), self.output_dir)
+        self.assertEqual(Path(makefile).read_bytes(), fixture('CRC16.MAK').read_bytes())
+        self.assertEqual(Path(cfg).read_bytes(), fixture('CRC16.CFG').read_bytes())
+
+    def test_keeps_existing_files(self):
+        existing = Path(self.output_dir) / 'crc16.mak'
+        existing.write_bytes(b'# hand written\r\n')
+        makefile, cfg = prj_reader.convert_prj(fixture('CRC16.PRJ'), self.output_dir)
+        self.assertEqual(Path(makefile), existing)
+        self.assertEqual(existing.read_bytes(), b'# hand written\r\n')
+        self.assertEqual(Path(cfg).read_bytes(), fixture('CRC16.CFG').read_bytes())
+
+    def test_decodes_options(self):
+        # Large model, 8087, jump and global optimization, no debug info,
+        # "ambiguous operators" on and "call with no prototype" off, publics map
+        project = prj_reader.parse_prj(self._project(rc9=4, rcb=2, r112=1, r113=2, rd3=0, r277=1, r27f=0,
+                                                      rf1=2, r4b0=16))
+        self.assertEqual(project['compiler_options'],
+                         ['-ml', '-f87', '-O', '-Og', '-vi-', '-wamb', '-weas', '-wpre'])
+        self.assertEqual(project['link_options'], '/m/c/P-/A=16')
+        self.assertEqual(project['runtime_libraries'], ['fp87.lib', 'mathl.lib', 'cl.lib'])
+        makefile = prj_reader.generate_makefile(project)
+        self.assertIn('c0l.obj+\r\ncrc16.obj\r\ncrc16\r\ncrc16\r\nfp87.lib+', makefile)
+
+    def test_tiny_model(self):
+        project = prj_reader.parse_prj(self._project(rc9=0, rcb=0))
+        self.assertEqual(project['compiler_options'][:2], ['-mt', '-f-'])
+        self.assertTrue(project['link_options'].endswith('/t'))
+        self.assertEqual(project['runtime_libraries'], ['cs.lib'])
+        self.assertIn('c0t.obj', prj_reader.generate_makefile(project))
+
+    def test_undecoded_options_are_reported(self):
+        prj_path = self._project(rd4=1)
+        self.assertEqual(prj_reader.parse_prj(prj_path)['undecoded_options'], [0xd4])
+        makefile, cfg = prj_reader.convert_prj(prj_path, self.output_dir)
+        self.assertEqual(Path(cfg).read_bytes(), fixture('CRC16.CFG').read_bytes())
+
+
+class TestConvertMakefile(unittest.TestCase):
+    """Test cases for the makefile dependency graph."""
+
+    def setUp(self):
+        content = fixture('CRC16.MAK').read_text()
+        variables, targets, rules = convert_makefile.parse_dos_makefile(content, str(SOURCE_DIR))
+        self.graph = convert_makefile.build_dependency_graph(variables, targets, rules, str(SOURCE_DIR))
+
+    def test_dependency_order(self):
+        self.assertEqual(convert_makefile.topological_order(self.graph), ['crc16.cfg', 'crc16.obj', 'crc16.exe'])
+        self.assertEqual(self.graph['crc16.exe']['dependencies'], ['crc16.cfg', 'crc16.obj'])
+
+    def test_cycle_raises(self):
+        graph = {'a': {'target': 'a', 'dependencies': ['b'], 'commands': []},
+                 'b': {'target': 'b', 'dependencies': ['a'], 'commands': []}}
+        with self.assertRaises(ValueError):
+            convert_makefile.topological_order(graph)
+
+
+
+class TestBorlandMakefile(unittest.TestCase):
+    """Test cases for the Borland MAKE dialect."""
+
+    MAKEFILE = ('CC = bcc\n'
+                '!if $d(DEBUG)\nOPT = -v\n!else\nOPT = -O\n!endif\n'
+                'OBJS = a.obj \\\n  b.obj\n'
+                '.AUTODEPEND\n'
+                '.c.obj:\n  $(CC) $(OPT) -c {$< }\n'
+                'prog.exe: $(OBJS)\n  tlink @&&|\nc0s $(OBJS)\n|\n')
+
+    def test_dialect(self):
+        makefile = convert_makefile.parse_borland_makefile(self.MAKEFILE)
+        self.assertEqual(makefile['variables'], {'CC': 'bcc', 'OPT': '-O', 'OBJS': 'a.obj  b.obj'})
+        self.assertEqual(makefile['directives'], [('.AUTODEPEND', [])])
+        self.assertEqual(makefile['default_target'], 'prog.exe')
+        self.assertEqual(makefile['targets']['prog.exe']['dependencies'], ['a.obj', 'b.obj'])
+        self.assertEqual(makefile['targets']['prog.exe']['commands'], ['tlink @&&|\nc0s $(OBJS)\n|'])
+        debug = convert_makefile.parse_borland_makefile(self.MAKEFILE, macros={'DEBUG': '1'})
+        self.assertEqual(debug['variables']['OPT'], '-v')
+
+    def test_implicit_rule_commands(self):
+        content = fixture('CRC16.MAK').read_text()
+        variables, targets, rules = convert_makefile.parse_dos_makefile(content, str(SOURCE_DIR))
+        graph = convert_makefile.build_dependency_graph(variables, targets, rules, str(SOURCE_DIR))
+        self.assertEqual(graph['crc16.obj']['commands'], ['bcc +CRC16.CFG -c crc16.cpp'])
+        self.assertTrue(graph['crc16.exe']['commands'][0].startswith('tlink /v/x/c/P-/LC:\\BORLANDC\\LIB @&&|'))
+
+    def test_batched_commands(self):
+        self.assertEqual(convert_makefile._expand_batch_commands(['bcc -c {$< }'], ['a.c', 'b.c']),
+                         ['bcc -c a.c b.c'])
+        sources = [f'x{index:02}.c' for index in range(30)]
+        chunks = convert_makefile._batch_chunks(['bcc -c {$< }'], sources)
+        self.assertEqual(sum(chunks, []), sources)
+        self.assertEqual(len(chunks), 2)
+        for chunk in chunks:
+            self.assertLessEqual(len(convert_makefile._expand_batch_commands(['bcc -c {$< }'], chunk)[0]),
+                                 convert_makefile.DOS_COMMAND_LINE)
+
+
+class TestBuildState(unittest.TestCase):
+    """Test cases for incremental builds."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.project = Path(self.temp_dir) / 'project'
+        # CRC16.CPP is the only unit; CRC16.ASM and CRC16.OBJ are its outputs
+        shutil.copytree(SOURCE_DIR, self.project)
+        self.state = BuildState(Path(self.temp_dir) / 'state')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_unchanged_unit_is_restored(self):
+        stale = prepare_incremental_build(self.state, self.project, 'bcc')
+        self.assertEqual(list(stale), ['crc16.cpp'])
+        self.assertFalse((self.project / 'CRC16.OBJ').exists())
+        shutil.copyfile(fixture('CRC16.OBJ'), self.project / 'CRC16.OBJ')
+        record_incremental_build(self.state, self.project, stale)
+
+        (self.project / 'CRC16.OBJ').unlink()
+        state = BuildState(Path(self.temp_dir) / 'state')
+        self.assertEqual(prepare_incremental_build(state, self.project, 'bcc'), {})
+        self.assertEqual((self.project / 'CRC16.OBJ').read_bytes(), fixture('CRC16.OBJ').read_bytes())
+        # Another compiler invalidates every unit
+        self.assertEqual(list(prepare_incremental_build(state, self.project, 'tcc')), ['crc16.cpp'])
+
+    def test_runs_make(self):
+        self.assertFalse(runs_make(self.project))
+        (self.project / 'BUILD.BAT').write_text('@echo off\r\nmake -fCRC16.MAK\r\n')
+        self.assertTrue(runs_make(self.project))
+        (self.project / 'BUILD.BAT').write_text('bcc +CRC16.CFG -c crc16.cpp\r\nrem make it\r\n')
+        self.assertFalse(runs_make(self.project))
+
+
+# Stand-in for DOSBox: "runs" the redirected build script by writing a fatal
+# diagnostic to the log, then hangs like a build that won't finish
+FAKE_DOSBOX = """#!{python}
+import re, sys, time
+for argument in sys.argv:
+    match = re.match(r'COMMAND /C BUILD.BAT > (\\S+)$', argument)
+    if match:
+        with open(match.group(1), 'w') as log:
+            log.write("MAKE Version 3.6\\n")
+            log.write("Fatal crc16.cpp 5: Unable to open include file 'MISSING.H'\\n")
+time.sleep(30)
+"""
+
+
+class TestBuildToolchain(unittest.TestCase):
+    """Test cases for running a build in DOSBox."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.project = Path(self.temp_dir) / 'project'
+        shutil.copytree(SOURCE_DIR, self.project)
+        # Hand written, so it redirects nothing itself
+        (self.project / 'BUILD.BAT').write_text('make -fCRC16.MAK\r\n')
+        bin_dir = Path(self.temp_dir) / 'bin'
+        bin_dir.mkdir()
+        (bin_dir / 'dosbox').write_text(FAKE_DOSBOX.format(python=sys.executable))
+        (bin_dir / 'dosbox').chmod(0o755)
+        path = mock.patch.dict(os.environ, {'PATH': f"{bin_dir}{os.pathsep}{os.environ['PATH']}"})
+        path.start()
+        self.addCleanup(path.stop)
+        self.toolchain = BuildToolchain(self.project, 'borland', incremental=False)
+        self.toolchain.artifacts_dir = Path(self.temp_dir) / 'artifacts'
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_captures_build_script_output(self):
+        start = time.monotonic()
+        with self.assertRaises(subprocess.CalledProcessError):
+            self.toolchain.execute_build([])
+        self.assertLess(time.monotonic() - start, 20)
+        self.assertEqual([(d['severity'], d['file']) for d in self.toolchain.diagnostics], [('fatal', 'crc16.cpp')])
+
+
+class TestArtifactCollector(unittest.TestCase):
+    """Test cases for collecting build artifacts."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.project = Path(self.temp_dir) / 'project'
+        shutil.copytree(SOURCE_DIR, self.project)
+        (self.project / 'OUT').mkdir()
+        (self.project / 'OUT' / 'crc16.obj').write_bytes(b'other')
+        self.toolchain = BuildToolchain(self.project, 'borland')
+        self.toolchain.artifacts_dir = Path(self.temp_dir) / 'artifacts'
+        self.toolchain.artifacts_dir.mkdir()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_categories(self):
+        self.toolchain.collect_artifacts('ok')
+        artifacts = self.toolchain.artifacts_dir
+        self.assertEqual((artifacts / 'binaries' / 'CRC16.OBJ').read_bytes(), fixture('CRC16.OBJ').read_bytes())
+        self.assertEqual((artifacts / 'binaries' / 'OUT' / 'crc16.obj').read_bytes(), b'other')
+        self.assertTrue((artifacts / 'sources' / 'CRC16.CPP').exists())
+        self.assertFalse((artifacts / 'binaries' / 'CRC16.CPP').exists())
+        manifest = {entry['path']: entry for entry in json.loads((artifacts / 'manifest.json').read_text())}
+        self.assertEqual(manifest['CRC16.OBJ']['categories'], ['sources', 'binaries'])
+
+    def test_rebuild_leaves_artifacts_alone(self):
+        self.toolchain.collect_artifacts('ok')
+        # The compiler rewrites its outputs in place
+        with open(self.project / 'CRC16.OBJ', 'r+b') as f:
+            f.write(b'\0\0\0')
+        artifacts = self.toolchain.artifacts_dir
+        for category in ('sources', 'binaries'):
+            self.assertEqual((artifacts / category / 'CRC16.OBJ').read_bytes(), fixture('CRC16.OBJ').read_bytes())
+
+
+class TestBorlandPipeline(unittest.TestCase):
+    """Test cases for the Borland pipeline commands."""
+
+    def test_pipeline_commands(self):
+        commands = pipeline_commands('CRC16.MAK', 'CRC16.CFG', ['CRC16.CPP'])
+        self.assertEqual([(stage, source) for stage, source, _ in commands], [
+            ('make', None), ('asm', 'CRC16.CPP'), ('preprocess', 'CRC16.CPP'), ('listing', 'CRC16.CPP')])
+        self.assertEqual(commands[0][2], ('MAKE', ['-f', 'CRC16.MAK']))
+        self.assertEqual(commands[1][2], ('BCC', ['-S', '+CRC16.CFG', 'CRC16.CPP']))
+        self.assertEqual(commands[-1][2], ('TASMX', ['/la', 'CRC16.ASM']))
+
+
+
+class TestBuildCache(unittest.TestCase):
+    """Test cases for the cache of project builds."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = BuildCache(os.path.join(self.temp_dir, 'cache'))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _artifacts(self, name, content):
+        artifacts = Path(self.temp_dir) / name
+        (artifacts / 'binaries').mkdir(parents=True)
+        (artifacts / 'binaries' / 'CRC16.EXE').write_bytes(content)
+        (artifacts / 'build.log').write_text('ok')
+        return artifacts
+
+    def test_store_and_restore(self):
+        self.cache.store('a' * 64, self._artifacts('built', b'MZ1'))
+        restored = Path(self.temp_dir) / 'restored'
+        self.assertTrue(self.cache.restore('a' * 64, restored))
+        self.assertEqual((restored / 'binaries' / 'CRC16.EXE').read_bytes(), b'MZ1')
+        self.assertEqual((restored / 'build.log').read_text(), 'ok')
+        self.assertFalse(self.cache.restore('b' * 64, restored))
+        self.assertEqual((self.cache.hits, self.cache.misses, self.cache.stores), (1, 1, 1))
+
+    def test_evicts_least_recently_used(self):
+        self.cache.max_entries = 2
+        for index, key in enumerate(('a' * 64, 'b' * 64)):
+            self.cache.store(key, self._artifacts(f'built{index}', b'MZ'))
+            # Distinct last use times, oldest first
+            os.utime(self.cache._entry_dir(key) / BuildCache.ENTRY_FILE, (index, index))
+        self.cache.store('c' * 64, self._artifacts('built2', b'MZ'))
+        restored = Path(self.temp_dir) / 'restored'
+        self.assertFalse(self.cache.restore('a' * 64, restored))
+        self.assertTrue(self.cache.restore('b' * 64, restored))
+        self.assertTrue(self.cache.restore('c' * 64, restored))
+        self.assertEqual(self.cache.evictions, 1)
+
+    def test_key_follows_content(self):
+        project = Path(self.temp_dir) / 'project'
+        shutil.copytree(SOURCE_DIR, project)
+        key, _ = self.cache.make_key(project, 'borland', None, None)
+        self.assertEqual(self.cache.make_key(project, 'borland', None, None)[0], key)
+        (project / 'CRC16.CPP').write_bytes((project / 'CRC16.CPP').read_bytes() + b'\r\n')
+        self.assertNotEqual(self.cache.make_key(project, 'borland', None, None)[0], key)
+
+
+class TestAsmSplitter(unittest.TestCase):
+    """Test cases for splitting BCC -S output into functions."""
+
+    def test_functions(self):
+        functions = list(asm_splitter.split_asm(fixture('CRC16.ASM')))
+        self.assertEqual([function['name'] for function in functions], ['_main', '@updcrcr$quii'])
+        main, updcrcr = functions
+        self.assertEqual((main['first_line'], main['last_line']), (62, 113))
+        self.assertEqual((updcrcr['first_line'], updcrcr['last_line']), (116, 122))
+        self.assertEqual(main['segment'], '_TEXT')
+        self.assertEqual(main['instructions'][:2], ['push bp', 'mov bp,sp'])
+        self.assertEqual(len(main['instructions']), len(main['instruction_lines']))
+        self.assertEqual(len(main['includes']), 8)
+        self.assertIs(main['includes'], updcrcr['includes'])
+
+
+class TestCppFilter(unittest.TestCase):
+    """Test cases for stripping system headers from .I files."""
+
+    def _filter(self, **kwargs):
+        with open(fixture('CRC16.I'), 'rb') as stream:
+            return list(cpp_filter.iter_user_lines(stream, **kwargs))
+
+    def test_user_lines(self):
+        lines = self._filter()
+        self.assertEqual(len(lines), 87)
+        self.assertEqual(lines[0], ('crc16.cpp', 25, 'unsigned int updcrcr(unsigned int, int);'))
+        self.assertTrue(all(name == 'crc16.cpp' for name, _, _ in lines))
+
+    def test_chunk_sizes(self):
+        expected = self._filter()
+        for chunk_size in (1, 7, 100, 4096):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(self._filter(chunk_size=chunk_size), expected)
+
+    def test_line_map(self):
+        output = os.path.join(tempfile.mkdtemp(), 'CRC16.USR')
+        try:
+            line_map = cpp_filter.filter_file(fixture('CRC16.I'), output)
+            self.assertEqual((line_map.lines, len(line_map.runs)), (87, 11))
+            self.assertEqual(line_map.lookup(1), ('crc16.cpp', 25))
+            restored = cpp_filter.LineMap.from_dict(json.loads(json.dumps(line_map.to_dict())))
+            self.assertEqual(restored.lookup(87), line_map.lookup(87))
+            blank = cpp_filter.filter_file(fixture('CRC16.I'), output, keep_blank=True)
+            self.assertEqual((blank.lines, len(blank.runs)), (124, 1))
+        finally:
+            shutil.rmtree(os.path.dirname(output), ignore_errors=True)
+
+    def test_split_line_across_chunks(self):
+        data = b'C:\\BORLANDC\\INCLUDE\\stdio.h 1: int x;\r\nmain.c 3: int y;\r\n'
+        lines = list(cpp_filter.iter_user_lines(io.BytesIO(data), chunk_size=5))
+        self.assertEqual(lines, [('main.c', 3, 'int y;')])
+
+
+class TestOmfReader(unittest.TestCase):
+    """Test cases for reading OMF object files."""
+
+    def test_summary(self):
+        with ObjectFile.open(fixture('CRC16.OBJ')) as obj:
+            summary = obj.summary()
+        self.assertEqual(summary['module'], 'CRC16.CPP')
+        self.assertEqual([(s['name'], s['class'], s['length']) for s in summary['segments']],
+                         [('_TEXT', 'CODE', 303), ('_DATA', 'DATA', 787), ('_BSS', 'BSS', 0)])
+        self.assertEqual([(p['name'], p['segment'], p['offset']) for p in summary['publics']],
+                         [('_CRC16TAB', '_DATA', 0), ('_MAIN', '_TEXT', 0), ('@UPDCRCR$QUII', '_TEXT', 0x101)])
+        self.assertEqual(len(summary['externals']), 10)
+        self.assertIn('_PRINTF', summary['externals'])
+
+    def test_segment_image(self):
+        with ObjectFile.open(fixture('CRC16.OBJ')) as obj:
+            image, fixups = obj.segment_image('_TEXT')
+        self.assertEqual(len(image), 303)
+        self.assertEqual(bytes(image[:3]), b'\x55\x8b\xec')
+        self.assertEqual([fixup['offset'] for fixup in fixups], sorted(fixup['offset'] for fixup in fixups))
+
+    def test_truncated_file(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, 'BAD.OBJ')
+            with open(path, 'wb') as f:
+                f.write(fixture('CRC16.OBJ').read_bytes()[:1000])
+            with self.assertRaises(ValueError):
+                with ObjectFile.open(path) as obj:
+                    obj.summary()
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+class TestDisassembler(unittest.TestCase):
+    """Test cases for the 16-bit disassembler."""
+
+    def test_matches_listing(self):
+        result = verify_listing(fixture('CRC16.OBJ'), fixture('CRC16.LST'))
+        self.assertEqual(result['checked'], 137)
+        self.assertEqual(result['mismatches'], [])
+
+    def test_corpus_reports_corrupt_files(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            corrupt = os.path.join(temp_dir, 'BAD.OBJ')
+            data = bytearray(fixture('CRC16.OBJ').read_bytes())
+            # Out of range segment and name indices
+            data[0x60:0x70] = b'\xff' * 16
+            with open(corrupt, 'wb') as f:
+                f.write(data)
+            results = {path: (columns, error) for path, columns, error
+                       in disassemble_corpus([str(fixture('CRC16.OBJ')), corrupt], workers=2)}
+            self.assertIsNone(results[str(fixture('CRC16.OBJ'))][1])
+            self.assertIn('_TEXT', results[str(fixture('CRC16.OBJ'))][0])
+            self.assertIsNotNone(results[corrupt][1])
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+class TestLstParser(unittest.TestCase):
+    """Test cases for parsing TASM listings."""
+
+    def test_rows(self):
+        rows = list(lst_parser.read_listing(fixture('CRC16.LST')))
+        text = [row for row in rows if row[1] == '_TEXT']
+        self.assertEqual(len(text), 137)
+        self.assertEqual(text[0], (570, '_TEXT', 0, b'\x55', 'push    bp'))
+        self.assertEqual(text[5], (589, '_TEXT', 8, b'\xb8\x00\x02', 'mov     ax,offset DGROUP:s@'))
+
+    def test_continued_bytes(self):
+        rows = {row[0]: row for row in lst_parser.read_listing(fixture('CRC16.LST'))}
+        self.assertEqual(rows[890][3], b'CRC16 Easy!  Version 0.1 (pre-official release)   May 26 1997')
+        self.assertEqual(rows[890][2], 0x200)
+
+    def test_include_empty(self):
+        rows = list(lst_parser.read_listing(fixture('CRC16.LST'), include_empty=True))
+        self.assertTrue(any(offset is None for _, _, offset, _, _ in rows))
+        self.assertGreater(len(rows), len(list(lst_parser.read_listing(fixture('CRC16.LST')))))
+
+    def test_columns(self):
+        columns = lst_parser.listing_columns(lst_parser.read_listing(fixture('CRC16.LST')))
+        self.assertEqual(columns['segments'], ['_DATA', '_TEXT'])
+        self.assertEqual(len(columns['data']), 787 + 303)
+        self.assertEqual(len(columns['offset']), len(columns['source']))
+
+if __name__ == '__main__':
+    unittest.main()